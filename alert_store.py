@@ -0,0 +1,414 @@
+"""
+报警历史存储 (SQLite WAL)
+
+各监控发出的报警 (连同投递结果) 写入同一个 SQLite 文件, 用于回测阈值和审计已发送的内容。
+
+- 写入: record() 只把一行放入有界队列, 后台线程按批 (最多 batch_size 行或每 flush_interval 秒)
+  在一个事务里 executemany 写入; 队列满时丢弃并计数, 不阻塞行情处理 / 请求线程
+- 多进程: main.py 启动的每个监控进程各有一个写线程, 共用同一个数据库文件
+  (WAL 模式下读写互不阻塞, 写锁冲突时按 busy_timeout 等待)
+- 索引: ts / (source, ts) / (symbol, ts) / (alert_type, ts), 按时间倒序分页查询走索引,
+  百万行级别仍只扫描命中的一页; symbol 不区分大小写 (币安交易对 / Arkham 实体 / 推特用户)
+- 分页: 按 (ts, id) 倒序的游标分页, 不用 OFFSET (深翻页不会越来越慢)
+
+环境变量:
+    ALERT_STORE_PATH            数据库文件 (默认 .alerts.db, 为空则不记录)
+    ALERT_STORE_BATCH           每个事务最多写入的行数 (默认 500)
+    ALERT_STORE_FLUSH_INTERVAL  未攒满一批时最多等待的秒数 (默认 1)
+    ALERT_STORE_QUEUE_SIZE      待写入队列上限 (默认 10000)
+    ALERT_STORE_RETENTION_DAYS  保留天数, 每小时清理一次更早的记录 (默认 0 = 永久保留)
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Any, Optional
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+ALERT_STORE_PATH = os.environ.get("ALERT_STORE_PATH", ".alerts.db")
+ALERT_STORE_BATCH = int(os.environ.get("ALERT_STORE_BATCH", "500"))
+ALERT_STORE_FLUSH_INTERVAL = float(os.environ.get("ALERT_STORE_FLUSH_INTERVAL", "1"))
+ALERT_STORE_QUEUE_SIZE = int(os.environ.get("ALERT_STORE_QUEUE_SIZE", "10000"))
+ALERT_STORE_RETENTION_DAYS = float(os.environ.get("ALERT_STORE_RETENTION_DAYS", "0"))
+
+# 单次查询返回的最大行数
+MAX_LIMIT = 1000
+PRUNE_INTERVAL = 3600.0
+
+WRITTEN = metrics.REGISTRY.counter("alert_store_written_total", "写入报警存储的记录数", ["source"])
+DROPPED = metrics.REGISTRY.counter("alert_store_dropped_total", "队列已满或写入失败被丢弃的报警记录数")
+WRITE_SECONDS = metrics.REGISTRY.histogram("alert_store_batch_write_seconds", "报警存储每批写入耗时（秒）")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS alerts (
+    id         INTEGER PRIMARY KEY,
+    ts         REAL NOT NULL,
+    source     TEXT NOT NULL,
+    alert_type TEXT NOT NULL,
+    symbol     TEXT COLLATE NOCASE,
+    value      REAL,
+    delivered  INTEGER,
+    text       TEXT,
+    data       TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_alerts_ts ON alerts (ts);
+CREATE INDEX IF NOT EXISTS idx_alerts_source_ts ON alerts (source, ts);
+CREATE INDEX IF NOT EXISTS idx_alerts_symbol_ts ON alerts (symbol, ts);
+CREATE INDEX IF NOT EXISTS idx_alerts_type_ts ON alerts (alert_type, ts);
+"""
+
+_COLUMNS = ("ts", "source", "alert_type", "symbol", "value", "delivered", "text", "data")
+_INSERT = f"INSERT INTO alerts ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))})"
+
+_STOP = object()
+
+
+def parse_time(value) -> Optional[float]:
+    """查询参数中的时间 -> unix 秒; 支持秒 / 毫秒时间戳和 ISO 8601 字符串, 空值返回 None"""
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        number = float(value)
+    else:
+        try:
+            number = float(value)
+        except ValueError:
+            try:
+                return datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp()
+            except ValueError:
+                raise ValueError(f"无法解析的时间: {value}") from None
+    return number / 1000 if number > 1e12 else number
+
+
+def encode_cursor(row: dict) -> str:
+    return f"{row['ts']!r}:{row['id']}"
+
+
+def decode_cursor(cursor: str):
+    ts, sep, row_id = str(cursor).rpartition(":")
+    if not sep:
+        raise ValueError(f"无效的分页游标: {cursor}")
+    try:
+        return float(ts), int(row_id)
+    except ValueError:
+        raise ValueError(f"无效的分页游标: {cursor}") from None
+
+
+class AlertStore:
+    """报警历史: 后台批量写入 + 索引查询"""
+
+    def __init__(
+        self,
+        path: str = ALERT_STORE_PATH,
+        *,
+        batch_size: int = ALERT_STORE_BATCH,
+        flush_interval: float = ALERT_STORE_FLUSH_INTERVAL,
+        queue_size: int = ALERT_STORE_QUEUE_SIZE,
+        retention_days: float = ALERT_STORE_RETENTION_DAYS,
+    ):
+        self.path = path
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.retention_days = retention_days
+
+        self._queue: queue.Queue = queue.Queue(queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._schema_ready = False
+        # 查询用的连接 (写线程有自己的连接); 一次查询只走一页索引, 串行足够
+        self._reader: Optional[sqlite3.Connection] = None
+        self._reader_lock = threading.Lock()
+        self._last_prune = float("-inf")
+
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    # ------------------------------------------------------------------
+    # 连接
+    # ------------------------------------------------------------------
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        # WAL 下 NORMAL 只在断电时可能丢最后几个事务, 不会损坏数据库
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _ensure_schema(self, conn: sqlite3.Connection):
+        if self._schema_ready:
+            return
+        with self._lock:
+            if not self._schema_ready:
+                conn.executescript(SCHEMA)
+                self._schema_ready = True
+
+    # ------------------------------------------------------------------
+    # 写入
+    # ------------------------------------------------------------------
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None or not self.enabled:
+                return
+            self._thread = threading.Thread(target=self._writer, name="alert-store", daemon=True)
+            self._thread.start()
+        atexit.register(self.close)
+
+    def record(
+        self,
+        source: str,
+        alert_type: str,
+        text: str = "",
+        *,
+        symbol: Optional[str] = None,
+        value: Optional[float] = None,
+        delivered: Optional[bool] = None,
+        ts: Optional[float] = None,
+        **data: Any,
+    ) -> bool:
+        """
+        记录一条报警 (非阻塞); 未启用或队列已满时返回 False
+
+        value 为触发报警的数值 (成交额 / 倍数等), 便于回测阈值; 其余关键字参数以 JSON 存入 data。
+        """
+        if not self.enabled:
+            return False
+        if self._thread is None:
+            self.start()
+        row = (
+            time.time() if ts is None else ts,
+            source,
+            alert_type,
+            symbol,
+            value,
+            None if delivered is None else int(bool(delivered)),
+            text,
+            json.dumps(data, ensure_ascii=False, default=str) if data else None,
+        )
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            self.dropped += 1
+            DROPPED.inc()
+            return False
+        return True
+
+    def track(self, future, source: str, alert_type: str, text: str = "", **fields):
+        """
+        投递完成后连同结果记录报警 (时间取提交时刻), 原样返回 future
+
+        future 可以是 concurrent.futures.Future 或 asyncio.Future。
+        """
+        if not self.enabled or future is None:
+            return future
+        fields.setdefault("ts", time.time())
+
+        def on_done(done):
+            ok = not done.cancelled() and done.exception() is None and bool(done.result())
+            self.record(source, alert_type, text, delivered=ok, **fields)
+
+        future.add_done_callback(on_done)
+        return future
+
+    def _writer(self):
+        conn = None
+        while True:
+            try:
+                first = self._queue.get()
+            except Exception:  # pragma: no cover - 解释器退出时
+                return
+            rows, stop = [], first is _STOP
+            if not stop:
+                rows.append(first)
+            deadline = time.monotonic() + self.flush_interval
+            while not stop and len(rows) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                else:
+                    rows.append(item)
+            try:
+                if rows:
+                    if conn is None:
+                        conn = self._connect()
+                        self._ensure_schema(conn)
+                    self._write(conn, rows)
+                    self._maybe_prune(conn)
+            except sqlite3.Error as e:
+                self.dropped += len(rows)
+                DROPPED.inc(len(rows))
+                logger.error("报警存储写入失败, 丢弃 %s 条: %s", len(rows), e)
+            finally:
+                for _ in range(len(rows) + (1 if stop else 0)):
+                    self._queue.task_done()
+            if stop:
+                if conn is not None:
+                    conn.close()
+                return
+
+    def _write(self, conn: sqlite3.Connection, rows: list):
+        with WRITE_SECONDS.time():
+            with conn:
+                conn.executemany(_INSERT, rows)
+        self.written += len(rows)
+        self.batches += 1
+        counts: dict = {}
+        for row in rows:
+            counts[row[1]] = counts.get(row[1], 0) + 1
+        for source, count in counts.items():
+            WRITTEN.labels(source).inc(count)
+
+    def _maybe_prune(self, conn: sqlite3.Connection):
+        if self.retention_days <= 0:
+            return
+        now = time.monotonic()
+        if now - self._last_prune < PRUNE_INTERVAL:
+            return
+        self._last_prune = now
+        cutoff = time.time() - self.retention_days * 86400
+        with conn:
+            deleted = conn.execute("DELETE FROM alerts WHERE ts < ?", (cutoff,)).rowcount
+        if deleted:
+            logger.info("报警存储已清理 %s 条超过 %s 天的记录", deleted, self.retention_days)
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """等待已入队的记录全部写入"""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.005)
+        return True
+
+    def close(self, timeout: float = 10.0):
+        """写完剩余记录并停止写线程"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join(timeout)
+        with self._reader_lock:
+            if self._reader is not None:
+                self._reader.close()
+                self._reader = None
+
+    # ------------------------------------------------------------------
+    # 查询
+    # ------------------------------------------------------------------
+
+    def _read(self, sql: str, params: list) -> list:
+        with self._reader_lock:
+            if self._reader is None:
+                self._reader = self._connect()
+                self._ensure_schema(self._reader)
+            return self._reader.execute(sql, params).fetchall()
+
+    @staticmethod
+    def _where(since, until, source, symbol, alert_type, delivered):
+        clauses, params = [], []
+        if since is not None:
+            clauses.append("ts >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("ts < ?")
+            params.append(until)
+        for column, value in (("source", source), ("symbol", symbol), ("alert_type", alert_type)):
+            if value:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if delivered is not None:
+            clauses.append("delivered = ?")
+            params.append(int(bool(delivered)))
+        return clauses, params
+
+    def query(
+        self,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        source: Optional[str] = None,
+        symbol: Optional[str] = None,
+        alert_type: Optional[str] = None,
+        delivered: Optional[bool] = None,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+    ) -> dict:
+        """
+        按时间倒序查询, 返回 {"alerts": [...], "next_cursor": 下一页游标或 None}
+
+        since / until 为 unix 秒 (until 不含); cursor 为上一页返回的 next_cursor。
+        """
+        limit = max(1, min(int(limit), MAX_LIMIT))
+        clauses, params = self._where(since, until, source, symbol, alert_type, delivered)
+        if cursor:
+            cursor_ts, cursor_id = decode_cursor(cursor)
+            # ts <= ? 单独成条件, 才能作为索引范围 (直接定位到游标处, 不从头扫描)
+            clauses.append("ts <= ? AND (ts < ? OR id < ?)")
+            params.extend([cursor_ts, cursor_ts, cursor_id])
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self._read(
+            f"SELECT id, {', '.join(_COLUMNS)} FROM alerts {where} ORDER BY ts DESC, id DESC LIMIT ?",
+            params + [limit],
+        )
+        alerts = [self._row_to_dict(row) for row in rows]
+        return {
+            "alerts": alerts,
+            "next_cursor": encode_cursor(alerts[-1]) if len(alerts) == limit else None,
+        }
+
+    def count(self, since=None, until=None, source=None, symbol=None, alert_type=None, delivered=None) -> int:
+        clauses, params = self._where(since, until, source, symbol, alert_type, delivered)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        return self._read(f"SELECT COUNT(*) FROM alerts {where}", params)[0][0]
+
+    @staticmethod
+    def _row_to_dict(row: sqlite3.Row) -> dict:
+        entry = dict(row)
+        entry["delivered"] = None if entry["delivered"] is None else bool(entry["delivered"])
+        entry["data"] = json.loads(entry["data"]) if entry["data"] else {}
+        return entry
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "path": self.path,
+            "written": self.written,
+            "dropped": self.dropped,
+            "batches": self.batches,
+            "pending": self._queue.qsize(),
+        }
+
+
+# ==========================================
+# 进程内共享实例
+# ==========================================
+
+_default_store: Optional[AlertStore] = None
+_default_lock = threading.Lock()
+
+
+def get_store() -> AlertStore:
+    """获取进程内共享的报警存储 (按环境变量配置, 首次记录时才启动写线程)"""
+    global _default_store
+    with _default_lock:
+        if _default_store is None:
+            _default_store = AlertStore(os.environ.get("ALERT_STORE_PATH", ALERT_STORE_PATH))
+        return _default_store
@@ -1,8 +1,22 @@
 import os
+import json
+import logging
+import threading
 import time
-import requests
 import schedule
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
+from urllib.parse import urlsplit
+
+import tg_delivery
+import alert_store
+import http_client
+import metrics
+import worker_stats
+import structured_log
+import supervisor
+from rate_limit import TokenBucket
+from cooldown_store import CooldownStore, PersistentCooldownStore
 
 # ======================= ⚙️ 配置区域 =======================
 
@@ -21,6 +35,29 @@ MIN_VALUE_USD = int(os.environ.get('ARKHAM_MIN_VALUE_USD', '1000000'))  # 只推
 # 监控目标 (Arkham Entity ID 或 Label)
 TARGET_ENTITIES = os.environ.get('ARKHAM_ENTITIES', 'binance,blackrock,jump-trading,falconx,us-government,vitalik-buterin').split(',')
 
+# 并发轮询: 同时进行的请求数, 以及 Arkham API 的请求预算 (每秒请求数 / 突发上限)
+ARKHAM_CONCURRENCY = int(os.environ.get('ARKHAM_CONCURRENCY', '5'))
+ARKHAM_RATE_PER_SEC = float(os.environ.get('ARKHAM_RATE_PER_SEC', '5'))
+ARKHAM_RATE_BURST = int(os.environ.get('ARKHAM_RATE_BURST', str(ARKHAM_CONCURRENCY)))
+ARKHAM_REQUEST_TIMEOUT = 15
+POLL_INTERVAL_MINUTES = 2
+
+# 增量拉取: 每页条数 / 单轮最多翻页数 / 游标文件 (重启后从上次位置继续)
+ARKHAM_PAGE_SIZE = int(os.environ.get('ARKHAM_PAGE_SIZE', '100'))
+ARKHAM_MAX_PAGES = int(os.environ.get('ARKHAM_MAX_PAGES', '10'))
+ARKHAM_CURSOR_FILE = os.environ.get('ARKHAM_CURSOR_FILE', '.arkm_cursor.json')
+
+# 已推送交易去重: 保留时长 / 条目上限 / 追加日志文件 (重启后恢复)
+ARKHAM_DEDUP_TTL = int(os.environ.get('ARKHAM_DEDUP_TTL', str(3 * 24 * 3600)))
+ARKHAM_DEDUP_MAX_KEYS = int(os.environ.get('ARKHAM_DEDUP_MAX_KEYS', '100000'))
+ARKHAM_DEDUP_FILE = os.environ.get('ARKHAM_DEDUP_FILE', '.arkm_seen.log')
+
+# Prometheus 指标 (经 worker_stats 快照汇总到 botsever 的 /metrics)
+REQUEST_SECONDS = metrics.REGISTRY.histogram(
+    'arkham_request_seconds', 'Arkham /transfers 请求耗时（秒）', ['entity', 'status'],
+)
+ALERTS = metrics.REGISTRY.counter('arkham_alerts_total', '推送的大额转账数', ['entity'])
+
 # ======================= 验证配置 =======================
 def check_config():
     missing = []
@@ -38,8 +75,18 @@ check_config()
 
 # ======================= 🚀 核心代码 =======================
 
-# 用于记录已处理的交易哈希，防止重复推送
-processed_txs = set()
+# 用于记录已处理的交易哈希，防止重复推送 (作为脚本运行时换成带日志的版本, 重启后恢复)
+processed_txs = CooldownStore(ARKHAM_DEDUP_TTL, max_size=ARKHAM_DEDUP_MAX_KEYS)
+
+# 各实体的增量游标: entity -> {'ts': 最新 blockTimestamp 毫秒, 'hashes': 该时刻已见过的哈希}
+cursors = {}
+cursor_lock = threading.Lock()
+
+# Telegram 统一投递服务 (限速 / 重试 / 合并发送)
+delivery = tg_delivery.get_delivery()
+
+# 报警历史 (连同投递结果写入 SQLite, 供回测 / 审计)
+alerts = alert_store.get_store()
 
 # 伪装成 Chrome 浏览器的请求头
 COMMON_HEADERS = {
@@ -48,93 +95,229 @@ COMMON_HEADERS = {
     "Accept-Language": "en-US,en;q=0.9",
 }
 
-def log(msg):
-    """打印带时间戳的日志"""
-    print(f"[{datetime.now().strftime('%H:%M:%S')}] {msg}", flush=True)
+# 共享连接池的 HTTP 客户端 (所有实体复用 keep-alive 连接, 连接失败/5xx 自动重试)
+http = http_client.HttpClient(
+    pool_size=max(http_client.HTTP_POOL_SIZE, ARKHAM_CONCURRENCY),
+    headers=COMMON_HEADERS,
+    host_timeouts={urlsplit(ARKHAM_BASE_URL).hostname: (5, ARKHAM_REQUEST_TIMEOUT)},
+)
 
-def send_tg(text):
-    """发送 Telegram 消息 (包含自动修复话题ID错误的逻辑)"""
-    url = f"https://api.telegram.org/bot{BOT_TOKEN}/sendMessage"
-
-    payload = {
-        "chat_id": TG_CHAT_ID,
-        "text": text,
-        "parse_mode": "HTML",
-        "disable_web_page_preview": True
-    }
+# Arkham API 请求预算, 所有轮询线程共享
+arkham_budget = TokenBucket(ARKHAM_RATE_PER_SEC, ARKHAM_RATE_BURST)
 
-    # 如果配置了话题ID，尝试加入参数
-    if TOPIC_ID:
-        payload["message_thread_id"] = TOPIC_ID
+# 实体轮询线程池
+fetch_executor = ThreadPoolExecutor(max_workers=ARKHAM_CONCURRENCY, thread_name_prefix='arkham')
 
-    try:
-        # 第一次尝试发送
-        resp = requests.post(url, json=payload, headers=COMMON_HEADERS, timeout=10)
-        result = resp.json()
-
-        # === 关键修复：自动处理话题 ID 错误 ===
-        if not result.get("ok") and "message thread not found" in result.get("description", ""):
-            log(f"⚠️ 话题 ID ({TOPIC_ID}) 无效或不存在，正在尝试发送到主群组...")
-
-            # 移除错误的 ID，重新发送
-            payload.pop("message_thread_id", None)
-            resp = requests.post(url, json=payload, headers=COMMON_HEADERS, timeout=10)
-            result = resp.json()
-
-        # 检查最终结果
-        if result.get("ok"):
-            log("✅ TG 消息发送成功")
-        else:
-            log(f"⚠️ TG 发送失败: {resp.status_code} - {resp.text}")
-
-    except Exception as e:
-        log(f"⚠️ TG 网络错误 (可能是Replit IP被封): {e}")
+logger = logging.getLogger("arkm")
 
-def get_arkham_transfers(entity_id):
-    """获取 Arkham 交易数据"""
-    endpoint = "/transfers"
-    url = ARKHAM_BASE_URL + endpoint
+def log(msg, *args, level=logging.INFO):
+    """记录日志 (经 structured_log 后台线程写出, 不在扫描线程中同步 flush stdout)
 
-    # 只查询过去 10 分钟的数据
-    now = datetime.now()
-    time_window = now - timedelta(minutes=10)
+    msg 为 % 格式模板, 参数单独传入: 格式化推迟到写出线程, 采样也按模板归类
+    """
+    logger.log(level, msg, *args)
 
-    params = {
-        "base": entity_id,
-        "limit": 20,
-        "time_gte": int(time_window.timestamp() * 1000),
-        "value_gte": MIN_VALUE_USD,
-        "sort": "time",
-        "order": "desc"
+def send_tg(text):
+    """发送 Telegram 消息 (经统一投递服务限速发送, 话题ID无效时自动改发主群组)"""
+    if delivery.send_sync(
+        text, thread_id=TOPIC_ID, disable_web_page_preview=True, timeout=60
+    ):
+        log("✅ TG 消息发送成功")
+    else:
+        log("⚠️ TG 发送失败 (详见投递服务日志)", level=logging.WARNING)
+
+def _log_send_result(future):
+    if not future.cancelled() and future.exception() is None and future.result():
+        log("✅ TG 消息发送成功")
+    else:
+        log("⚠️ TG 发送失败 (详见投递服务日志)", level=logging.WARNING)
+
+def send_tg_nowait(text):
+    """提交 Telegram 消息后立即返回, 发送结果在后台记录 (限速由投递服务负责, 不阻塞扫描)"""
+    future = delivery.submit(text, thread_id=TOPIC_ID, disable_web_page_preview=True)
+    future.add_done_callback(_log_send_result)
+    return future
+
+def parse_block_time(value):
+    """blockTimestamp (ISO 字符串或毫秒/秒时间戳) 转为毫秒, 无法解析返回 0"""
+    if isinstance(value, (int, float)):
+        return int(value if value > 1e12 else value * 1000)
+    if isinstance(value, str) and value:
+        try:
+            return int(datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp() * 1000)
+        except ValueError:
+            return 0
+    return 0
+
+def load_cursors(path=None):
+    """从磁盘恢复各实体游标, 文件不存在或损坏时从空开始"""
+    path = path or ARKHAM_CURSOR_FILE
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        loaded = {}
+        for entity, c in data.items():
+            cursor = {'ts': int(c.get('ts', 0)), 'hashes': list(c.get('hashes', []))}
+            if c.get('until'):
+                # 未补齐的积压: 上界与补齐后的位置
+                cursor['until'] = int(c['until'])
+                cursor['next'] = c.get('next')
+            loaded[entity] = cursor
+        return loaded
+    except (OSError, ValueError, AttributeError) as e:
+        log("⚠️ 读取游标文件失败, 将从头拉取: %s", e, level=logging.WARNING)
+        return {}
+
+def save_cursors(path=None):
+    """原子写入游标文件"""
+    path = path or ARKHAM_CURSOR_FILE
+    with cursor_lock:
+        data = {entity: dict(c) for entity, c in cursors.items()}
+    tmp_path = f"{path}.tmp"
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        log("⚠️ 保存游标文件失败: %s", e, level=logging.WARNING)
+
+def fetch_transfers_page(entity_id, params):
+    """请求一页 Arkham 转账, 出错返回 None"""
+    url = ARKHAM_BASE_URL + "/transfers"
+    headers = {
+        "API-Key": ARKHAM_API_KEY,
+        "Content-Type": "application/json",
     }
 
-    headers = COMMON_HEADERS.copy()
-    headers["API-Key"] = ARKHAM_API_KEY
-    headers["Content-Type"] = "application/json"
-
     try:
-        response = requests.get(url, params=params, headers=headers, timeout=15)
+        arkham_budget.acquire()
+        started = time.perf_counter()
+        try:
+            response = http.get(url, params=params, headers=headers)
+        except Exception:
+            REQUEST_SECONDS.labels(entity_id, 'error').observe(time.perf_counter() - started)
+            raise
+        REQUEST_SECONDS.labels(entity_id, response.status_code).observe(time.perf_counter() - started)
 
         if response.status_code == 200:
             data = response.json()
             if isinstance(data, dict) and "transfers" in data:
-                return data["transfers"]
+                return data["transfers"] or []
             elif isinstance(data, list):
                 return data
             return []
 
         elif response.status_code == 401:
-            log(f"❌ Arkham API Key 无效或过期")
+            log("❌ Arkham API Key 无效或过期", level=logging.ERROR)
         elif response.status_code == 403:
-            log(f"❌ Arkham 拒绝访问 (403) - 可能是 IP 问题")
+            log("❌ Arkham 拒绝访问 (403) - 可能是 IP 问题", level=logging.ERROR)
+        elif response.status_code == 429:
+            # 超出 Arkham 限额: 按 Retry-After 暂停所有轮询线程的请求预算
+            try:
+                retry_after = float(response.headers.get('Retry-After', 5))
+            except (TypeError, ValueError):
+                retry_after = 5.0
+            arkham_budget.pause(retry_after)
+            log("⚠️ Arkham 限流 [%s], 暂停 %.0fs", entity_id, retry_after, level=logging.WARNING)
         else:
-            log(f"⚠️ Arkham API 报错 [{entity_id}]: {response.status_code}")
+            log("⚠️ Arkham API 报错 [%s]: %s", entity_id, response.status_code, level=logging.WARNING)
 
-        return []
+        return None
 
     except Exception as e:
-        log(f"Arkham 请求异常: {e}")
-        return []
+        log("Arkham 请求异常: %s", e, level=logging.ERROR)
+        return None
+
+def _cursor_after(transfers, since_ms, seen_at_since):
+    """根据本轮取到的转账计算新游标: 最新 blockTimestamp 及该时刻的全部哈希"""
+    latest = max(parse_block_time(tx.get('blockTimestamp')) for tx in transfers)
+    if latest < since_ms:
+        return None
+    hashes = {
+        tx.get('transactionHash') for tx in transfers
+        if parse_block_time(tx.get('blockTimestamp')) == latest
+    }
+    if latest == since_ms:
+        hashes |= seen_at_since
+    return {'ts': latest, 'hashes': sorted(h for h in hashes if h)}
+
+def get_arkham_transfers(entity_id):
+    """
+    获取 Arkham 交易数据 (按实体游标增量拉取)
+
+    只请求游标之后的新转账, 按页翻到追上为止; 首次运行只看过去 10 分钟。
+    游标记录最新 blockTimestamp 以及该时刻已见过的哈希 (同一毫秒可能有多笔)。
+    单轮翻页达到 ARKHAM_MAX_PAGES 时, 游标停在原处并记下尚未拉取的积压上界 (until)
+    和追完后的位置 (next), 之后几轮从 until 往前补齐, 不会跳过中间的转账。
+    返回按时间倒序的新转账, 请求失败时返回已取到的部分且不推进游标。
+    """
+    with cursor_lock:
+        cursor = dict(cursors.get(entity_id) or {})
+    since_ms = cursor.get('ts', 0)
+    seen_at_since = set(cursor.get('hashes', []))
+    until_ms = cursor.get('until')
+    if not since_ms:
+        since_ms = int((datetime.now() - timedelta(minutes=10)).timestamp() * 1000)
+
+    params = {
+        "base": entity_id,
+        "limit": ARKHAM_PAGE_SIZE,
+        "offset": 0,
+        "time_gte": since_ms,
+        "value_gte": MIN_VALUE_USD,
+        "sort": "time",
+        "order": "desc"
+    }
+    if until_ms:
+        params["time_lte"] = until_ms
+
+    transfers = []
+    complete = capped = False
+    for _ in range(ARKHAM_MAX_PAGES):
+        page = fetch_transfers_page(entity_id, dict(params))
+        if page is None:
+            break
+        transfers.extend(page)
+        if len(page) < ARKHAM_PAGE_SIZE:
+            complete = True
+            break
+        params["offset"] += ARKHAM_PAGE_SIZE
+    else:
+        capped = True
+
+    # 时间相同且已处理过的转账属于上一轮
+    new_transfers = [
+        tx for tx in transfers
+        if not (parse_block_time(tx.get('blockTimestamp')) == since_ms
+                and tx.get('transactionHash') in seen_at_since)
+    ]
+
+    updated = None
+    if capped:
+        # 积压下一轮从本轮取到的最旧时刻往前补 (含该时刻, 同一毫秒跨页的转账由去重过滤)
+        oldest = min(parse_block_time(tx.get('blockTimestamp')) for tx in transfers)
+        resume = cursor.get('next') if until_ms else _cursor_after(transfers, since_ms, seen_at_since)
+        if oldest > since_ms:
+            log("⚠️ [%s] 新转账超过 %s 页, 先处理最新部分, 其余下轮继续补齐",
+                entity_id, ARKHAM_MAX_PAGES, level=logging.WARNING)
+            updated = {'ts': since_ms, 'hashes': sorted(seen_at_since), 'until': oldest, 'next': resume}
+        else:
+            log("⚠️ [%s] 同一时刻的转账超过 %s 页, 跳过其余部分",
+                entity_id, ARKHAM_MAX_PAGES, level=logging.WARNING)
+            updated = resume
+    elif complete and until_ms:
+        # 积压补齐, 跳到触发积压那一轮已处理到的位置
+        updated = cursor.get('next') or {'ts': until_ms, 'hashes': []}
+    elif complete and transfers:
+        updated = _cursor_after(transfers, since_ms, seen_at_since)
+
+    if updated:
+        with cursor_lock:
+            cursors[entity_id] = updated
+
+    return new_transfers
 
 def analyze_and_alert(entity, txs):
     """分析交易并推送"""
@@ -145,14 +328,9 @@ def analyze_and_alert(entity, txs):
     for tx in reversed(txs):
         tx_hash = tx.get('transactionHash')
 
-        if tx_hash in processed_txs:
+        if not processed_txs.check_and_set(tx_hash):
             continue
 
-        processed_txs.add(tx_hash)
-
-        if len(processed_txs) > 5000:
-            processed_txs.clear()
-
         count += 1
 
         token_symbol = tx.get('tokenSymbol', 'Unknown')
@@ -180,42 +358,68 @@ def analyze_and_alert(entity, txs):
             f"🔗 <a href='https://platform.arkhamintelligence.com/explorer/tx/{tx_hash}'>查看 Arkham 详情</a>"
         )
 
-        send_tg(msg)
-        time.sleep(2) 
+        alerts.track(
+            send_tg_nowait(msg), 'arkm', 'transfer', msg,
+            symbol=entity, value=usd_value, tx_hash=tx_hash, token=token_symbol,
+            amount=token_amount, block_time=block_time,
+        )
 
     if count > 0:
-        log(f"✅ [{entity}] 推送了 {count} 条新交易")
+        ALERTS.labels(entity).inc(count)
+        log("✅ [%s] 推送了 %s 条新交易", entity, count)
 
 def job():
-    """定时任务主体"""
+    """定时任务主体: 所有实体并发拉取, 哪个先返回先处理"""
     log("⏳ 开始新一轮扫描...")
-    for entity in TARGET_ENTITIES:
+    started = time.monotonic()
+    futures = {
+        fetch_executor.submit(get_arkham_transfers, entity): entity
+        for entity in TARGET_ENTITIES
+    }
+    for future in as_completed(futures):
+        entity = futures[future]
         try:
-            txs = get_arkham_transfers(entity)
-            analyze_and_alert(entity, txs)
-            time.sleep(1)
+            analyze_and_alert(entity, future.result())
         except Exception as e:
-            log(f"⚠️ 处理实体 {entity} 时出错: {e}")
+            log("⚠️ 处理实体 %s 时出错: %s", entity, e, level=logging.ERROR)
+    save_cursors()
+    log("🏁 扫描完成: %s 个实体, 耗时 %.1fs | HTTP %s", len(futures), time.monotonic() - started, http.format_stats())
 
-if __name__ == "__main__":
-    print("="*30)
-    print("🤖 Arkham 监控机器人已启动 (自动修复版)")
-    print("="*30)
+def setup():
+    """启动准备: 发送启动消息, 恢复增量游标和去重记录 (独立进程和单进程运行时共用)"""
+    global processed_txs
 
     # 1. 启动时先测试一条消息
     log("📧 正在发送启动测试消息...")
     send_tg(f"🚀 <b>Arkham 监控机器人已启动</b>\n配置检测中...")
 
-    # 2. 立即运行一次
+    # 2. 恢复增量游标和去重记录
+    cursors.update(load_cursors())
+    if not isinstance(processed_txs, PersistentCooldownStore):
+        processed_txs = PersistentCooldownStore(
+            ARKHAM_DEDUP_TTL, ARKHAM_DEDUP_FILE, max_size=ARKHAM_DEDUP_MAX_KEYS,
+        )
+    log("已恢复 %s 条去重记录", len(processed_txs))
+
+if __name__ == "__main__":
+    print("="*30)
+    print("🤖 Arkham 监控机器人已启动 (自动修复版)")
+    print("="*30)
+
+    structured_log.setup_logging()
+    worker_stats.stats.start()
+    setup()
     job()
 
     # 3. 设置定时任务 (每 2 分钟运行一次)
-    schedule.every(2).minutes.do(job)
+    schedule.every(POLL_INTERVAL_MINUTES).minutes.do(job)
 
     while True:
         try:
             schedule.run_pending()
+            # 轮询卡住时心跳停止更新, 由 main.py 的守护进程发现并重启
+            supervisor.beat("arkm.py")
             time.sleep(1)
         except Exception as e:
-            log(f"❌ 主循环发生错误: {e}")
+            log("❌ 主循环发生错误: %s", e, level=logging.ERROR)
             time.sleep(10)
\ No newline at end of file
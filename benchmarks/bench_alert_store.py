@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+报警历史存储基准: 批量写入吞吐与百万行下的索引查询延迟
+
+用法:
+    python benchmarks/bench_alert_store.py [--rows 1000000] [--batch 500] [--queries 200] [--path /tmp/alerts.db]
+
+- 写入: 经 AlertStore.record() (后台线程批量提交) 写入合成报警, 与逐行提交 (每条一个事务) 对比
+- 查询: /alerts 的典型过滤 (since + symbol / source / type / delivered, 首页与游标翻页),
+  输出 p50 / p99 毫秒和 EXPLAIN QUERY PLAN 使用的索引
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import alert_store
+from alert_store import AlertStore
+
+SOURCES = {
+    "bianjk": (["large_trade", "burst", "order_wall", "volume_spike"], [f"COIN{i}USDT" for i in range(200)]),
+    "arkm": (["transfer"], ["binance", "blackrock", "jump-trading", "falconx", "us-government"]),
+    "botsever": (["tweet"], [f"user{i}" for i in range(500)]),
+}
+
+
+def synthetic_rows(count, start_ts, seed=1):
+    """按时间递增的合成报警: (source, alert_type, symbol, value, delivered, ts)"""
+    rng = random.Random(seed)
+    sources = list(SOURCES)
+    step = 30 * 86400 / max(count, 1)  # 铺满 30 天
+    for i in range(count):
+        source = rng.choice(sources)
+        types, symbols = SOURCES[source]
+        yield source, rng.choice(types), rng.choice(symbols), rng.uniform(1e5, 1e7), rng.random() > 0.02, start_ts + i * step
+
+
+def bench_batched(path, count, batch, start_ts):
+    store = AlertStore(path, batch_size=batch, flush_interval=0.5, queue_size=max(batch * 20, 10000))
+    started = time.perf_counter()
+    submitted = 0
+    for source, alert_type, symbol, value, delivered, ts in synthetic_rows(count, start_ts):
+        # 队列满时稍等, 基准要写入全部行 (生产中满了直接丢弃并计数)
+        while not store.record(source, alert_type, "x" * 120, symbol=symbol, value=value,
+                               delivered=delivered, ts=ts, side="buy"):
+            time.sleep(0.001)
+        submitted += 1
+    store.flush(timeout=600)
+    elapsed = time.perf_counter() - started
+    print(f"批量写入 (batch={batch}): {submitted:,} 行, {elapsed:.2f}s, {submitted / elapsed:,.0f} 行/s, "
+          f"{store.batches:,} 个事务")
+    return store
+
+
+def bench_unbatched(path, count, start_ts):
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(alert_store.SCHEMA)
+    started = time.perf_counter()
+    for source, alert_type, symbol, value, delivered, ts in synthetic_rows(count, start_ts):
+        with conn:
+            conn.execute(alert_store._INSERT, (ts, source, alert_type, symbol, value, int(delivered), "x" * 120, None))
+    elapsed = time.perf_counter() - started
+    conn.close()
+    print(f"逐行提交 (对照): {count:,} 行, {elapsed:.2f}s, {count / elapsed:,.0f} 行/s")
+
+
+def time_query(store, repeats, **kwargs):
+    samples = []
+    result = None
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        result = store.query(**kwargs)
+        samples.append(time.perf_counter() - t0)
+    samples.sort()
+    return samples[len(samples) // 2] * 1000, samples[min(len(samples) - 1, int(len(samples) * 0.99))] * 1000, result
+
+
+def query_plan(store, **kwargs):
+    clauses, params = store._where(
+        kwargs.get("since"), kwargs.get("until"), kwargs.get("source"),
+        kwargs.get("symbol"), kwargs.get("alert_type"), kwargs.get("delivered"),
+    )
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    rows = store._read(f"EXPLAIN QUERY PLAN SELECT * FROM alerts {where} ORDER BY ts DESC, id DESC LIMIT 100", params)
+    return "; ".join(row[-1] for row in rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--batch", type=int, default=500)
+    parser.add_argument("--unbatched-rows", type=int, default=20_000, help="逐行提交对照的行数, 0 = 跳过")
+    parser.add_argument("--queries", type=int, default=200, help="每种查询的重复次数")
+    parser.add_argument("--path", default="", help="数据库文件 (默认临时目录, 结束后删除)")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="alert-store-bench-")
+    path = args.path or os.path.join(workdir, "alerts.db")
+    start_ts = time.time() - 30 * 86400
+
+    if args.unbatched_rows:
+        bench_unbatched(os.path.join(workdir, "unbatched.db"), args.unbatched_rows, start_ts)
+    store = bench_batched(path, args.rows, args.batch, start_ts)
+    print(f"数据库大小: {os.path.getsize(path) / 1e6:.1f} MB")
+
+    last_day = time.time() - 86400
+    scenarios = [
+        ("最新 100 条", {}),
+        ("since=1天 & symbol", {"since": last_day, "symbol": "coin7usdt"}),
+        ("symbol 全部时间", {"symbol": "binance"}),
+        ("source=arkm", {"source": "arkm"}),
+        ("type=order_wall & since=1天", {"alert_type": "order_wall", "since": last_day}),
+        ("未送达 (delivered=0)", {"delivered": False}),
+    ]
+    print(f"\n{'查询':<28}{'p50 ms':>10}{'p99 ms':>10}{'行数':>8}  索引")
+    for label, kwargs in scenarios:
+        p50, p99, result = time_query(store, args.queries, **kwargs)
+        print(f"{label:<28}{p50:>10.3f}{p99:>10.3f}{len(result['alerts']):>8}  {query_plan(store, **kwargs)}")
+
+    # 游标连续翻 50 页, 最后一页的耗时与第一页相当 (不使用 OFFSET)
+    cursor = None
+    for _ in range(50):
+        page = store.query(symbol="binance", cursor=cursor)
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    if cursor:
+        p50, p99, result = time_query(store, args.queries, symbol="binance", cursor=cursor)
+        print(f"{'symbol 第 51 页 (游标)':<28}{p50:>10.3f}{p99:>10.3f}{len(result['alerts']):>8}")
+
+    store.close()
+    if not args.path:
+        for name in os.listdir(workdir):
+            os.remove(os.path.join(workdir, name))
+        os.rmdir(workdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+同步 HTTP 请求基准: 每次 requests.get (新建连接) vs HttpClient (连接池复用)
+
+用法:
+    python benchmarks/bench_http_client.py [--requests 200] [--url https://api.telegram.org/]
+
+不指定 --url 时在本机启动一个 HTTPS 服务 (openssl 生成临时自签名证书) 并模拟 RTT,
+只比较连接建立开销; 指定 --url 时请求真实地址 (含网络往返和 TLS 握手)。
+"""
+
+import argparse
+import os
+import ssl
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from http_client import HttpClient
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    delay = 0.0
+
+    def do_GET(self):
+        if self.delay:
+            time.sleep(self.delay)
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, *args):
+        pass
+
+
+def start_local_server(tmpdir, delay):
+    cert = os.path.join(tmpdir, "cert.pem")
+    key = os.path.join(tmpdir, "key.pem")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+         "-subj", "/CN=127.0.0.1", "-keyout", key, "-out", cert],
+        check=True, capture_output=True,
+    )
+    Handler.delay = delay
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(cert, key)
+    httpd.socket = context.wrap_socket(httpd.socket, server_side=True)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    return httpd, f"https://127.0.0.1:{httpd.server_address[1]}/"
+
+
+def run(label, call, n):
+    latencies = []
+    for _ in range(n):
+        started = time.perf_counter()
+        call()
+        latencies.append(time.perf_counter() - started)
+    latencies.sort()
+    print(
+        f"{label:<24}{statistics.mean(latencies) * 1000:>10.2f}"
+        f"{latencies[len(latencies) // 2] * 1000:>10.2f}{latencies[int(len(latencies) * 0.99) - 1] * 1000:>10.2f}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--url", default="")
+    parser.add_argument("--delay-ms", type=float, default=0.0, help="本地服务的模拟处理延迟")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        httpd = None
+        url, verify = args.url, True
+        if not url:
+            httpd, url = start_local_server(tmpdir, args.delay_ms / 1000)
+            verify = False
+            import urllib3
+
+            urllib3.disable_warnings()
+
+        client = HttpClient()
+        print(f"URL: {url} | 请求数: {args.requests}")
+        print(f"{'方式':<24}{'avg ms':>10}{'p50 ms':>10}{'p99 ms':>10}")
+        run("requests.get (新连接)", lambda: requests.get(url, timeout=10, verify=verify), args.requests)
+        run("HttpClient (连接池)", lambda: client.get(url, verify=verify), args.requests)
+        for host, stats in client.stats().items():
+            print(f"{host}: {stats['requests']} 请求, 新建 {stats['connections_opened']} 个连接, 复用率 {stats['reuse_ratio']:.1%}")
+        if httpd is not None:
+            httpd.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+JSON 解码微基准: 对比各后端解码币安组合流帧的吞吐
+
+用法:
+    python benchmarks/bench_json_decode.py [--frames 文件] [--rounds 200]
+
+对每个可用后端分别测量:
+- loads: 仅解码为 dict
+- typed: 解码并构造 AggTrade / Kline / Depth 结构体 (bianjk 实际使用的路径)
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fast_json
+from binance_events import FrameDecoder
+
+DEFAULT_FRAMES = os.path.join(os.path.dirname(__file__), "data", "binance_frames.jsonl")
+
+
+def load_frames(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.rstrip("\n") for line in f if line.strip()]
+
+
+def bench(func, frames, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for frame in frames:
+            func(frame)
+    elapsed = time.perf_counter() - start
+    total = len(frames) * rounds
+    return total / elapsed, elapsed / total * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--frames", default=DEFAULT_FRAMES, help="每行一帧的原始行情文件")
+    parser.add_argument("--rounds", type=int, default=200, help="重复轮数")
+    args = parser.parse_args()
+
+    frames = load_frames(args.frames)
+    print(f"帧数: {len(frames)} x {args.rounds} 轮 | 可用后端: {fast_json.available_backends()}")
+    print(f"{'backend':<10}{'mode':<8}{'msgs/s':>14}{'us/msg':>10}")
+
+    baseline = None
+    for backend in fast_json.available_backends()[::-1]:
+        loads = fast_json.get_loads(backend)
+        decoder = FrameDecoder(backend)
+        for mode, func in (("loads", loads), ("typed", decoder.decode)):
+            rate, per_msg = bench(func, frames, args.rounds)
+            if baseline is None:
+                baseline = rate
+            print(
+                f"{backend:<10}{mode:<8}{rate:>14,.0f}{per_msg:>10.2f}"
+                f"   ({rate / baseline:.2f}x vs json loads)"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+推文关键词匹配基准: 旧的逐关键词 strip/lower/in 循环 vs KeywordMatcher 预编译正则
+
+用法:
+    python benchmarks/bench_keyword_matcher.py [--tweets 2000] [--sizes 10,100,1000]
+
+关键词为随机生成的 "代币代码" 风格短词, 推文为约 200 字符的英文混合文本;
+约 1/4 推文包含一个关键词。旧实现命中第一个关键词即停止, 新实现返回全部命中。
+"子串模式" 为 word_boundary=False 的吞吐 (少于 SUBSTRING_LOOP_MAX 个关键词时逐个 find, 否则前缀树正则)。
+"""
+
+import argparse
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from keyword_matcher import KeywordMatcher
+
+FILLER = (
+    "market update whales moving funds across exchanges liquidity is thin today "
+    "traders watching the macro data funding rates flipped negative overnight"
+).split()
+
+
+def make_keywords(n, rng):
+    keywords = set()
+    while len(keywords) < n:
+        keywords.add("".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 8))))
+    return sorted(keywords)
+
+
+def make_tweets(n, keywords, rng):
+    tweets = []
+    for i in range(n):
+        words = rng.choices(FILLER, k=30)
+        if i % 4 == 0:
+            words.insert(rng.randrange(len(words)), "$" + rng.choice(keywords).upper())
+        tweets.append(" ".join(words))
+    return tweets
+
+
+def legacy_match(tweets, keywords):
+    hits = 0
+    for text in tweets:
+        text_lower = text.lower()
+        for keyword in keywords:
+            keyword = keyword.strip()
+            if keyword and keyword.lower() in text_lower:
+                hits += 1
+                break
+    return hits
+
+
+def matcher_match(tweets, matcher):
+    return sum(1 for text in tweets if matcher.find_all(text))
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tweets", type=int, default=2000)
+    parser.add_argument("--sizes", default="10,100,1000", help="关键词数量, 逗号分隔")
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    print(f"{'关键词数':>8}{'legacy 推文/s':>16}{'matcher 推文/s':>18}{'子串模式 推文/s':>18}{'编译 ms':>10}{'加速':>8}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        keywords = make_keywords(size, rng)
+        tweets = make_tweets(args.tweets, keywords, rng)
+
+        legacy, _ = timed(legacy_match, tweets, keywords)
+        build, matcher = timed(KeywordMatcher, keywords)
+        elapsed, _ = timed(matcher_match, tweets, matcher)
+        substring, _ = timed(matcher_match, tweets, KeywordMatcher(keywords, word_boundary=False))
+        print(
+            f"{size:>8}{args.tweets / legacy:>16,.0f}{args.tweets / elapsed:>18,.0f}"
+            f"{args.tweets / substring:>18,.0f}{build * 1000:>10.2f}{legacy / elapsed:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+常驻内存与启动耗时: 每个监控一个进程 (main.py 默认) vs 单进程运行时 (runtime.py)
+
+用法:
+    python benchmarks/bench_runtime_footprint.py [--repeat 3]
+
+每种方式启动新的解释器导入监控模块 (不连接外部服务), 读取 /proc/<pid>/status 的
+VmRSS; 多进程方式把各进程的 RSS 和启动耗时相加。需要 Linux。
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MONITORS = ["arkm", "bianjk", "botsever"]
+
+PROBE = (
+    "import sys; sys.path.insert(0, {root!r}); {imports}; "
+    "print(next(l.split()[1] for l in open('/proc/self/status') if l.startswith('VmRSS')), flush=True); "
+    "sys.stdin.read()"
+)
+
+
+def measure(modules):
+    """启动一个导入 modules 的解释器, 返回 (RSS KB, 导入完成耗时 秒)"""
+    env = dict(os.environ)
+    env.setdefault("TELEGRAM_BOT_TOKEN", "bench-token")
+    env.setdefault("TELEGRAM_CHAT_ID", "1")
+    env.setdefault("ARKHAM_API_KEY", "bench-key")
+    code = PROBE.format(root=ROOT, imports="; ".join(f"import {m}" for m in modules))
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-c", code], cwd=ROOT, env=env,
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+    )
+    line = proc.stdout.readline()
+    elapsed = time.perf_counter() - started
+    proc.stdin.close()
+    proc.wait()
+    if not line.strip():
+        raise RuntimeError(f"导入失败: {modules}")
+    return int(line), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rows = {"多进程 (每个监控一个)": [], "单进程运行时": []}
+    for _ in range(args.repeat):
+        separate = [measure([name]) for name in MONITORS]
+        rows["多进程 (每个监控一个)"].append((sum(r for r, _ in separate), sum(t for _, t in separate)))
+        rows["单进程运行时"].append(measure(["runtime"] + MONITORS))
+
+    print(f"监控: {', '.join(MONITORS)} | 重复 {args.repeat} 次取中位数")
+    print(f"{'方式':<24}{'RSS MB':>10}{'启动 s':>10}")
+    for label, samples in rows.items():
+        rss = statistics.median(r for r, _ in samples) / 1024
+        seconds = statistics.median(t for _, t in samples)
+        print(f"{label:<24}{rss:>10.1f}{seconds:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+密集大单窗口基准: 旧的 deque + dict + sum() 路径 vs SlidingWindowAggregator
+
+用法:
+    python benchmarks/bench_sliding_window.py [--trades 10000] [--rate 20] [--windows 10,60,300]
+
+模拟每秒 --rate 笔大单的持续成交流, 在每笔成交后判断是否触发 (不触发告警, 只比较维护窗口的开销)。
+旧路径每个窗口一个 deque, 判断时对窗口全量求和。
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+from collections import deque
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sliding_window import SlidingWindowAggregator
+
+
+def make_trades(n, rate):
+    rng = random.Random(42)
+    step = 1000 / rate
+    return [(int(i * step), rng.uniform(1e5, 5e5)) for i in range(n)]
+
+
+def legacy_path(trades, windows_ms, trigger):
+    queues = [deque() for _ in windows_ms]
+    hits = 0
+    for ts, amount in trades:
+        for queue, window in zip(queues, windows_ms):
+            queue.append({'t': ts, 'v': amount})
+            while queue and (ts - queue[0]['t'] > window):
+                queue.popleft()
+            if len(queue) > trigger:
+                total = sum(item['v'] for item in queue)
+                hits += total > 0
+    return hits, queues
+
+
+def aggregator_path(trades, windows_ms, trigger):
+    agg = SlidingWindowAggregator(windows_ms)
+    hits = 0
+    n = len(agg.windows)
+    for ts, amount in trades:
+        agg.add(ts, amount)
+        for index in range(n):
+            if agg.count(index) > trigger:
+                hits += agg.total(index) > 0
+    return hits, agg
+
+
+def measure(label, func, trades, windows_ms, trigger):
+    start = time.perf_counter()
+    func(trades, windows_ms, trigger)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    _, state = func(trades, windows_ms, trigger)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del state
+
+    n = len(trades)
+    print(f"{label:<28}{n / elapsed:>14,.0f} 笔/s{elapsed / n * 1e6:>10.2f} us/笔{current / 1024:>12,.0f} KiB")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--trades", type=int, default=10_000)
+    parser.add_argument("--rate", type=float, default=20, help="每秒大单笔数")
+    parser.add_argument("--windows", default="10,60,300", help="窗口秒数, 逗号分隔")
+    parser.add_argument("--trigger", type=int, default=1)
+    args = parser.parse_args()
+
+    windows_ms = [int(float(w) * 1000) for w in args.windows.split(",")]
+    trades = make_trades(args.trades, args.rate)
+    print(f"成交: {args.trades:,} 笔 @ {args.rate:g} 笔/s | 窗口: {args.windows} 秒")
+
+    legacy = measure("legacy (deque + sum)", legacy_path, trades, windows_ms, args.trigger)
+    elapsed = measure("SlidingWindowAggregator", aggregator_path, trades, windows_ms, args.trigger)
+    print(f"{'':<28}加速 {legacy / elapsed:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Telegram 投递压测: 通过本地模拟 API 驱动 botsever / arkm / bianjk 的发送函数
+
+用法:
+    python benchmarks/bench_telegram_delivery.py [--messages 500] [--latency-ms 30] [--failure-rate 0.02]
+        [--rate-limit-rate 0.02] [--invalid-threads 3] [--no-batch] [--production-limits]
+
+每个发送方式依次发送 --messages 条消息, 统计成功投递的消息数 / 秒与端到端延迟
+(调用发送函数到投递结果返回)。默认放开客户端限速以测量投递链路本身的上限;
+--production-limits 使用默认的 30/s 全局、20/分钟每群组限速。
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mock_telegram import MockTelegramServer
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * q))]
+
+
+class Recorder:
+    """记录每条消息从提交到投递结果的耗时"""
+
+    def __init__(self):
+        self.latencies = []
+        self.delivered = 0
+        self._lock = threading.Lock()
+
+    def record(self, started, ok):
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.latencies.append(elapsed)
+            if ok:
+                self.delivered += 1
+
+    def on_done(self, started):
+        def callback(future):
+            ok = not future.cancelled() and future.exception() is None and bool(future.result())
+            self.record(started, ok)
+        return callback
+
+
+def drive_botsever(botsever, messages, concurrency, recorder):
+    """Flask 处理线程的用法: 多个线程各自同步等待发送结果"""
+    def send(text):
+        started = time.perf_counter()
+        recorder.record(started, botsever.send_to_telegram(text))
+
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(send, messages))
+
+
+def drive_arkm(arkm, messages, recorder):
+    """arkm 扫描的用法: 提交后立即返回, 结果在后台回调"""
+    futures = []
+    for text in messages:
+        future = arkm.send_tg_nowait(text)
+        future.add_done_callback(recorder.on_done(time.perf_counter()))
+        futures.append(future)
+    for future in futures:
+        future.result(120)
+
+
+def drive_bianjk(bianjk, messages, recorder):
+    """bianjk 的用法: 在投递服务所在的事件循环中直接入队"""
+    async def burst():
+        futures = []
+        for text in messages:
+            future = await bianjk.send_telegram_message(None, text)
+            future.add_done_callback(recorder.on_done(time.perf_counter()))
+            futures.append(future)
+        await asyncio.gather(*futures)
+
+    bianjk.delivery.start_background()
+    asyncio.run_coroutine_threadsafe(burst(), bianjk.delivery._loop).result(120)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=16, help="botsever 的并发调用线程数")
+    parser.add_argument("--latency-ms", type=float, default=30.0)
+    parser.add_argument("--jitter-ms", type=float, default=10.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=float, default=0.2)
+    parser.add_argument("--invalid-threads", default="", help="模拟失效的话题 ID, 逗号分隔")
+    parser.add_argument("--no-batch", action="store_true", help="关闭同话题合并发送")
+    parser.add_argument("--production-limits", action="store_true", help="使用生产环境默认的客户端限速")
+    args = parser.parse_args()
+
+    server = MockTelegramServer(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        failure_rate=args.failure_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        retry_after=args.retry_after,
+        invalid_threads=[int(t) for t in args.invalid_threads.split(",") if t.strip()],
+        seed=1,
+    )
+    base_url = server.start_in_thread()
+
+    # 模块导入时读取配置, 必须先设置环境变量
+    os.environ["TELEGRAM_API_BASE"] = base_url
+    os.environ.setdefault("TELEGRAM_BOT_TOKEN", "bench-token")
+    os.environ.setdefault("TELEGRAM_CHAT_ID", "-100123")
+    os.environ.setdefault("ARKHAM_API_KEY", "bench-key")
+    os.environ["TELEGRAM_BATCH"] = "0" if args.no_batch else "1"
+    if not args.production_limits:
+        os.environ["TELEGRAM_GLOBAL_RATE"] = "100000"
+        os.environ["TELEGRAM_CHAT_RATE_PER_MIN"] = "6000000"
+        os.environ["TELEGRAM_TOPIC_RATE_PER_MIN"] = "6000000"
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        import arkm
+        import bianjk
+        import botsever
+    import logging
+
+    logging.getLogger().setLevel(logging.CRITICAL)
+
+    print(
+        f"模拟 API: {base_url} | 延迟 {args.latency_ms}±{args.jitter_ms}ms | 失败率 {args.failure_rate} | "
+        f"随机 429 {args.rate_limit_rate} | 合并发送 {'关' if args.no_batch else '开'} | "
+        f"客户端限速 {'生产默认' if args.production_limits else '放开'}"
+    )
+    print(
+        f"{'发送方':<10}{'消息':>7}{'成功':>7}{'HTTP':>7}{'429':>6}{'5xx':>6}{'耗时 s':>9}"
+        f"{'msg/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}"
+    )
+
+    scenarios = [
+        ("botsever", lambda msgs, rec: drive_botsever(botsever, msgs, args.concurrency, rec)),
+        ("arkm", lambda msgs, rec: drive_arkm(arkm, msgs, rec)),
+        ("bianjk", lambda msgs, rec: drive_bianjk(bianjk, msgs, rec)),
+    ]
+    for name, drive in scenarios:
+        server.reset()
+        recorder = Recorder()
+        messages = [f"<b>{name}</b> 压测消息 #{i}" for i in range(args.messages)]
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            drive(messages, recorder)
+        elapsed = time.perf_counter() - started
+        latencies = sorted(recorder.latencies)
+        print(
+            f"{name:<10}{len(messages):>7}{recorder.delivered:>7}{server.stats['requests']:>7}"
+            f"{server.stats['rate_limited']:>6}{server.stats['failed']:>6}{elapsed:>9.2f}"
+            f"{recorder.delivered / elapsed:>9.1f}"
+            f"{statistics.median(latencies) * 1000:>9.1f}{percentile(latencies, 0.95) * 1000:>9.1f}"
+            f"{percentile(latencies, 0.99) * 1000:>9.1f}{latencies[-1] * 1000:>9.1f}"
+        )
+
+    botsever.delivery.stop_background(drain=False, timeout=1)
+    server.stop_thread()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+挂单墙检测基准: 旧的逐档 await check_wall 路径 vs WallDetector 批量筛选
+
+用法:
+    python benchmarks/bench_wall_detector.py [--rounds 2000] [--threshold 5000000]
+
+使用录制的 depth20 帧; 另外构造 1000 档的深度快照对比 numpy / python 后端。
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from binance_events import Depth, FrameDecoder
+from wall_detector import WallDetector, np
+
+DEFAULT_FRAMES = os.path.join(os.path.dirname(__file__), "data", "binance_frames.jsonl")
+
+
+def load_depths(path):
+    decoder = FrameDecoder("json")
+    with open(path, "r", encoding="utf-8") as f:
+        events = [decoder.decode(line) for line in f if line.strip()]
+    return [(symbol, event) for kind, symbol, event in events if kind == "depth"]
+
+
+async def legacy_path(depths, rounds, threshold):
+    """旧实现: 每个档位 await 一次 check_wall, 构造 key 并查冷却表"""
+    history = {}
+    hits = 0
+
+    async def check_wall(symbol, direction_str, price, qty, current_time):
+        nonlocal hits
+        amount_usd = price * qty
+        if amount_usd >= threshold:
+            alert_key = f"{symbol}_{direction_str}_{int(price)}"
+            if current_time - history.get(alert_key, 0) < 300:
+                return
+            history[alert_key] = current_time
+            hits += 1
+
+    for _ in range(rounds):
+        for symbol, depth in depths:
+            current_time = time.time()
+            for price, qty in depth.bids:
+                await check_wall(symbol, "买入挂单", price, qty, current_time)
+            for price, qty in depth.asks:
+                await check_wall(symbol, "卖出挂单", price, qty, current_time)
+    return hits
+
+
+async def batched_path(depths, rounds, detector):
+    """新实现: 整份快照批量筛选, 只处理超过阈值的档位"""
+    hits = 0
+    for _ in range(rounds):
+        for symbol, depth in depths:
+            bid_walls, ask_walls = detector.detect(depth)
+            hits += len(bid_walls) + len(ask_walls)
+    return hits
+
+
+def timed(label, coro, n_snapshots):
+    start = time.perf_counter()
+    asyncio.run(coro)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<34}{n_snapshots / elapsed:>14,.0f} 快照/s{elapsed / n_snapshots * 1e6:>10.2f} us/快照")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--frames", default=DEFAULT_FRAMES)
+    parser.add_argument("--rounds", type=int, default=2000)
+    parser.add_argument("--threshold", type=float, default=5_000_000)
+    args = parser.parse_args()
+
+    depths = load_depths(args.frames)
+    n = len(depths) * args.rounds
+    print(f"depth20 快照: {len(depths)} x {args.rounds} 轮 | numpy: {'已安装' if np is not None else '未安装'}")
+
+    legacy = timed("legacy (逐档 await)", legacy_path(depths, args.rounds, args.threshold), n)
+    for backend in ("python", "numpy"):
+        if backend == "numpy" and np is None:
+            continue
+        detector = WallDetector(args.threshold, backend)
+        elapsed = timed(f"WallDetector[{backend}]", batched_path(depths, args.rounds, detector), n)
+        print(f"{'':<34}加速 {legacy / elapsed:.1f}x")
+
+    # 深档位场景: 1000 档
+    deep = [(s, Depth(d.bids * 50, d.asks * 50)) for s, d in depths[:4]]
+    rounds = max(1, args.rounds // 50)
+    n = len(deep) * rounds
+    print(f"\n1000 档快照: {len(deep)} x {rounds} 轮")
+    legacy = timed("legacy (逐档 await)", legacy_path(deep, rounds, args.threshold), n)
+    for backend in ("python", "numpy"):
+        if backend == "numpy" and np is None:
+            continue
+        detector = WallDetector(args.threshold, backend)
+        elapsed = timed(f"WallDetector[{backend}]", batched_path(deep, rounds, detector), n)
+        print(f"{'':<34}加速 {legacy / elapsed:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
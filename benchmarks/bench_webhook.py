@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+推文 Webhook 基准与性能剖析: 合成 TwitterAPI.io 负载, 测吞吐 / 延迟 / CPU 热点
+
+用法:
+    python benchmarks/bench_webhook.py [--batch-sizes 1,10,50] [--text-lengths 140,1000] [--hit-rates 0,0.1,0.5]
+        [--requests 500] [--transport inprocess,socket] [--profile webhook.prof] [--pyinstrument webhook.html]
+
+- inprocess: Flask test_client 直接调用 handle_twitter_webhook (不含网络), 可做 cProfile 剖析
+- socket: 子进程启动 prod_server.py (WEB_SERVER 选择服务器), 经真实 TCP 连接发送
+- 命中关键词的推文会真正走 Telegram 投递服务, 目标为进程内的模拟 API (mock_telegram.py, 无延迟)
+- --profile: 对 inprocess 全部场景做 cProfile, 按 关键词匹配 / 消息格式化 / 日志 /
+  Telegram 发送 / Flask 框架 分类汇总自身耗时, 并保存 .prof (可用 snakeviz / flameprof 看火焰图);
+  --pyinstrument 在已安装 pyinstrument 时额外输出 HTML 火焰图
+"""
+
+import argparse
+import cProfile
+import contextlib
+import http.client
+import itertools
+import json
+import logging
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+try:
+    from pyinstrument import Profiler
+except ImportError:  # pragma: no cover - 可选依赖
+    Profiler = None
+
+from load_webhook_server import free_port, percentile, start_server, wait_ready
+from mock_telegram import MockTelegramServer
+import structured_log
+
+KEYWORDS = ["bitcoin", "btc", "ethereum", "eth", "crypto", "binance", "arkham"]
+
+# 不含任何关键词 (也不含关键词子串) 的填充词
+FILLER = (
+    "market today price chart volume update traders watch signal morning news report "
+    "liquidity order book whale wallet move transfer exchange token launch community"
+).split()
+
+# 自身耗时分类: (名称, 匹配 pstats 键 (文件, 行号, 函数) 的条件)
+CATEGORIES = [
+    ("关键词匹配", lambda f, fn: "keyword_matcher" in f or fn in ("<method 'findall' of 're.Pattern' objects>",
+                                                                   "<method 'finditer' of 're.Pattern' objects>")),
+    ("日志", lambda f, fn: fn in ("<built-in method builtins.print>", "<method 'write' of '_io.TextIOWrapper' objects>")
+                             or fn == "_twitter_log" or "structured_log" in f
+                             or f.startswith(os.path.dirname(logging.__file__))),
+    ("JSON 编解码", lambda f, fn: f.startswith(os.path.dirname(json.__file__)) or "json" in fn),
+    # send_sync 等待投递结果 (锁等待) 和唤醒投递线程事件循环 (自管道 socket.send) 都记在发送上
+    ("Telegram 发送", lambda f, fn: "tg_delivery" in f or "concurrent/futures" in f or "threading.py" in f
+                                    or "asyncio" in f or fn in ("<method 'acquire' of '_thread.lock' objects>",
+                                                                "<method 'send' of '_socket.socket' objects>")),
+    ("消息格式化/解析", lambda f, fn: f.endswith("botsever.py") or "counters.py" in f or "metrics.py" in f),
+    ("Flask/Werkzeug", lambda f, fn: "flask" in f or "werkzeug" in f),
+]
+
+
+def make_payload(rng, batch_size, text_length, hit_rate, serial):
+    """构造一个 TwitterAPI.io 推送: batch_size 条推文, 每条约 text_length 字符, 按 hit_rate 带关键词"""
+    tweets = []
+    for i in range(batch_size):
+        words = []
+        while sum(len(w) + 1 for w in words) < text_length:
+            words.append(rng.choice(FILLER))
+        if rng.random() < hit_rate:
+            words[rng.randrange(len(words))] = rng.choice(KEYWORDS)
+        tweets.append({
+            "id": str(serial * 1000 + i),
+            "text": " ".join(words)[:max(text_length, 1)],
+            "author": {"username": f"user{rng.randrange(1000)}"},
+            "retweet_count": rng.randrange(100),
+            "like_count": rng.randrange(1000),
+            "reply_count": rng.randrange(50),
+        })
+    return {"event_type": "tweet", "rule_tag": "bench", "tweets": tweets}
+
+
+def make_bodies(count, batch_size, text_length, hit_rate, seed=1):
+    rng = random.Random(seed)
+    # 预先编码, 计时只包含服务端处理
+    return [json.dumps(make_payload(rng, batch_size, text_length, hit_rate, n)).encode() for n in range(count)]
+
+
+def summarize(label, elapsed, latencies, tweets, errors):
+    latencies.sort()
+    return (
+        f"{label:<34}{len(latencies) / elapsed:>10,.0f}{tweets / elapsed:>12,.0f}"
+        f"{percentile(latencies, 50) * 1000:>10.2f}{percentile(latencies, 99) * 1000:>10.2f}{errors:>7}"
+    )
+
+
+def run_inprocess(client, route, bodies):
+    latencies = []
+    errors = 0
+    started = time.perf_counter()
+    for body in bodies:
+        t0 = time.perf_counter()
+        response = client.post(route, data=body, content_type="application/json")
+        latencies.append(time.perf_counter() - t0)
+        if response.status_code >= 300:
+            errors += 1
+    return time.perf_counter() - started, latencies, errors
+
+
+def run_socket(port, route, bodies, concurrency):
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+    chunks = [bodies[i::concurrency] for i in range(concurrency)]
+
+    def client(chunk):
+        nonlocal errors
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        local, failed = [], 0
+        for body in chunk:
+            t0 = time.perf_counter()
+            try:
+                conn.request("POST", route, body=body, headers={"Content-Type": "application/json"})
+                response = conn.getresponse()
+                response.read()
+                failed += response.status >= 300
+            except (OSError, http.client.HTTPException):
+                failed += 1
+                conn.close()
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+            local.append(time.perf_counter() - t0)
+        conn.close()
+        with lock:
+            latencies.extend(local)
+            errors += failed
+
+    threads = [threading.Thread(target=client, args=(chunk,)) for chunk in chunks]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - started, latencies, errors
+
+
+def report_categories(profile, top):
+    stats = pstats.Stats(profile)
+    totals = dict.fromkeys([name for name, _ in CATEGORIES] + ["其他"], 0.0)
+    for (filename, _, func), (_, _, tottime, _, _) in stats.stats.items():
+        for name, match in CATEGORIES:
+            if match(filename, func):
+                totals[name] += tottime
+                break
+        else:
+            totals["其他"] += tottime
+    overall = sum(totals.values()) or 1.0
+    print("\n自身耗时分类 (cProfile tottime, 墙钟时间, 含等待投递结果的时间):")
+    for name, seconds in sorted(totals.items(), key=lambda item: -item[1]):
+        print(f"  {name:<16}{seconds:>9.3f}s {seconds / overall:>7.1%}")
+    print(f"\n自身耗时最多的 {top} 个函数:")
+    stats.sort_stats("tottime").print_stats(top)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--batch-sizes", default="1,10,50")
+    parser.add_argument("--text-lengths", default="140,1000")
+    parser.add_argument("--hit-rates", default="0,0.1,0.5")
+    parser.add_argument("--requests", type=int, default=300, help="每个场景的请求数")
+    parser.add_argument("--transport", default="inprocess,socket")
+    parser.add_argument("--server", default="dev", help="socket 模式的 WEB_SERVER (dev / gunicorn)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--profile", default="", help="保存 inprocess cProfile 结果的 .prof 路径")
+    parser.add_argument("--pyinstrument", default="", help="保存 pyinstrument HTML 火焰图的路径")
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args()
+
+    mock = MockTelegramServer()
+    os.environ.update({
+        "TELEGRAM_API_BASE": mock.start_in_thread(),
+        "TELEGRAM_BOT_TOKEN": os.environ.get("TELEGRAM_BOT_TOKEN", "bench-token"),
+        "TELEGRAM_CHAT_ID": os.environ.get("TELEGRAM_CHAT_ID", "-100123"),
+        "TELEGRAM_GLOBAL_RATE": "100000",
+        "TELEGRAM_CHAT_RATE_PER_MIN": "6000000",
+        "TELEGRAM_TOPIC_RATE_PER_MIN": "6000000",
+        "TWITTER_KEYWORDS": ",".join(KEYWORDS),
+        "TWITTER_API_KEY": "",
+    })
+
+    scenarios = list(itertools.product(
+        [int(v) for v in args.batch_sizes.split(",")],
+        [int(v) for v in args.text_lengths.split(",")],
+        [float(v) for v in args.hit_rates.split(",")],
+    ))
+    transports = args.transport.split(",")
+    header = f"{'场景 (batch/len/hit)':<34}{'请求/s':>10}{'推文/s':>12}{'p50 ms':>10}{'p99 ms':>10}{'错误':>7}"
+
+    # botsever 的日志经 structured_log 后台线程写出: 写到 /dev/null, 保留入队和格式化的开销
+    devnull = open(os.devnull, "w")
+
+    if "inprocess" in transports:
+        with contextlib.redirect_stdout(devnull):
+            import botsever
+        structured_log.setup_logging()
+        client = botsever.app.test_client()
+        profile = cProfile.Profile() if args.profile else None
+        instrument = None
+        if args.pyinstrument:
+            if Profiler is None:
+                print("未安装 pyinstrument, 跳过 HTML 火焰图 (pip install pyinstrument)")
+            else:
+                instrument = Profiler()
+
+        print(f"\n[inprocess] Flask test_client | 每场景 {args.requests} 请求")
+        print(header)
+        for batch_size, text_length, hit_rate in scenarios:
+            bodies = make_bodies(args.requests, batch_size, text_length, hit_rate)
+            with contextlib.redirect_stdout(devnull):
+                run_inprocess(client, botsever.ROUTE_PATH, bodies[:20])  # 预热
+                if profile:
+                    profile.enable()
+                if instrument:
+                    instrument.start()
+                elapsed, latencies, errors = run_inprocess(client, botsever.ROUTE_PATH, bodies)
+                if instrument:
+                    instrument.stop()
+                if profile:
+                    profile.disable()
+                structured_log.flush()
+            label = f"{batch_size}/{text_length}/{hit_rate:g}"
+            print(summarize(label, elapsed, latencies, args.requests * batch_size, errors))
+
+        if profile:
+            profile.dump_stats(args.profile)
+            print(f"\ncProfile 已保存: {args.profile} (snakeviz {args.profile})")
+            report_categories(profile, args.top)
+        if instrument:
+            with open(args.pyinstrument, "w", encoding="utf-8") as f:
+                f.write(instrument.output_html())
+            print(f"pyinstrument 火焰图已保存: {args.pyinstrument}")
+
+    if "socket" in transports:
+        port = free_port()
+        server = start_server(args.server, port, workers=4, threads=8)
+        try:
+            if not wait_ready(port):
+                print(f"[socket] {args.server} 启动失败")
+                return
+            route = os.environ.get("WEBHOOK_ROUTE_PATH", "/twitter-webhook")
+            print(f"\n[socket] {args.server} 服务器 | 并发 {args.concurrency} | 每场景 {args.requests} 请求")
+            print(header)
+            for batch_size, text_length, hit_rate in scenarios:
+                bodies = make_bodies(args.requests, batch_size, text_length, hit_rate)
+                run_socket(port, route, bodies[:20], args.concurrency)
+                elapsed, latencies, errors = run_socket(port, route, bodies, args.concurrency)
+                label = f"{batch_size}/{text_length}/{hit_rate:g}"
+                print(summarize(label, elapsed, latencies, args.requests * batch_size, errors))
+        finally:
+            server.terminate()
+            try:
+                server.wait(15)
+            except Exception:
+                server.kill()
+
+    print(f"\n模拟 Telegram 收到 {mock.stats['ok']} 条消息")
+    mock.stop_thread()
+
+
+if __name__ == "__main__":
+    main()
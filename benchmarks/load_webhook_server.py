@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Webhook 服务器本地压测: Flask 开发服务器 vs gunicorn 多 worker
+
+用法:
+    python benchmarks/load_webhook_server.py [--requests 5000] [--concurrency 32] [--modes dev,gunicorn]
+
+每种模式在子进程中启动 prod_server.py (随机空闲端口), 用 --concurrency 个线程
+通过 keep-alive 连接发送推文 Webhook (不含关键词, 不会真正发到 Telegram),
+输出吞吐与 p50/p99 延迟, 最后检查 /status 的请求计数是否等于发送数 (多 worker 汇总)。
+"""
+
+import argparse
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PAYLOAD = json.dumps({
+    "event_type": "tweet",
+    "rule_tag": "load",
+    "tweets": [{"id": "1", "text": "just a normal day", "author": {"username": "load"}}],
+}).encode()
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_ready(port, timeout=20):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/")
+            conn.getresponse().read()
+            return True
+        except OSError:
+            time.sleep(0.1)
+    return False
+
+
+def start_server(mode, port, workers, threads):
+    env = dict(os.environ)
+    env.update({
+        "PORT": str(port),
+        "WEB_SERVER": mode,
+        "WEB_WORKERS": str(workers),
+        "WEB_THREADS": str(threads),
+        "TELEGRAM_BOT_TOKEN": env.get("TELEGRAM_BOT_TOKEN", "load-test"),
+        "TELEGRAM_CHAT_ID": env.get("TELEGRAM_CHAT_ID", "0"),
+    })
+    env.pop("WORKER_STATS_DIR", None)
+    return subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, "prod_server.py")],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+
+def run_load(port, total, concurrency):
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+    per_thread = [total // concurrency + (1 if i < total % concurrency else 0) for i in range(concurrency)]
+
+    def client(count):
+        nonlocal errors
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        local = []
+        failed = 0
+        for _ in range(count):
+            start = time.perf_counter()
+            try:
+                conn.request("POST", "/twitter-webhook", body=PAYLOAD,
+                             headers={"Content-Type": "application/json"})
+                response = conn.getresponse()
+                response.read()
+                if response.status >= 300:
+                    failed += 1
+            except (OSError, http.client.HTTPException):
+                failed += 1
+                conn.close()
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+            local.append(time.perf_counter() - start)
+        conn.close()
+        with lock:
+            latencies.extend(local)
+            errors += failed
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in per_thread]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return elapsed, latencies, errors
+
+
+def percentile(values, pct):
+    return values[min(len(values) - 1, int(len(values) * pct / 100))] if values else 0.0
+
+
+def fetch_request_count(port):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    conn.request("GET", "/status")
+    report = json.loads(conn.getresponse().read())
+    return report["metrics"]["total_requests"], report.get("workers", 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--modes", default="dev,gunicorn")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+
+    print(f"请求: {args.requests} | 并发: {args.concurrency} | gunicorn: {args.workers} workers x {args.threads} threads")
+    print(f"{'模式':<10}{'请求/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'错误':>8}{'计数(/status)':>16}")
+    for mode in args.modes.split(","):
+        port = free_port()
+        server = start_server(mode, port, args.workers, args.threads)
+        try:
+            if not wait_ready(port):
+                print(f"{mode:<10}启动失败")
+                continue
+            run_load(port, min(200, args.requests), args.concurrency)  # 预热
+            before, _ = fetch_request_count(port)
+            elapsed, latencies, errors = run_load(port, args.requests, args.concurrency)
+            time.sleep(1.5)  # 等其他 worker 发布快照
+            after, workers = fetch_request_count(port)
+            print(
+                f"{mode:<10}{args.requests / elapsed:>10,.0f}{percentile(latencies, 50) * 1000:>10.2f}"
+                f"{percentile(latencies, 99) * 1000:>10.2f}{errors:>8}{after - before:>10} / {workers} worker"
+            )
+        finally:
+            server.terminate()
+            try:
+                server.wait(15)
+            except subprocess.TimeoutExpired:
+                server.kill()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+币安行情回放基准: 把录制的组合流帧送入 bianjk 的检测逻辑, 统计吞吐和各阶段耗时
+
+用法:
+    python benchmarks/replay_binance.py [capture.gz] [--speed 0] [--loops 50] [--decoder auto] [--tracemalloc]
+
+录制: 运行 bianjk 时设置 BINANCE_CAPTURE_FILE=capture.gz。
+未指定文件时使用 benchmarks/data/binance_frames.jsonl (不带时间戳, 只能按最大速度回放)。
+报警不发送到 Telegram, 只在本地计数。
+"""
+
+import argparse
+import asyncio
+import itertools
+import logging
+import os
+import sys
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# bianjk 导入时校验 Telegram 配置; 回放不会发送消息
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "replay")
+os.environ.setdefault("TELEGRAM_CHAT_ID", "0")
+
+import bianjk
+import stream_capture
+from binance_events import FrameDecoder
+
+DEFAULT_FRAMES = os.path.join(os.path.dirname(__file__), "data", "binance_frames.jsonl")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("capture", nargs="?", default=DEFAULT_FRAMES)
+    parser.add_argument("--speed", type=float, default=0.0, help="回放倍速, 0 = 最大速度, 1 = 实时")
+    parser.add_argument("--loops", type=int, default=1, help="重复回放次数 (放大样本)")
+    parser.add_argument("--decoder", default=bianjk.JSON_DECODER)
+    parser.add_argument("--tracemalloc", action="store_true", help="统计内存分配峰值 (明显变慢)")
+    parser.add_argument("--verbose", action="store_true", help="输出检测逻辑的日志")
+    args = parser.parse_args()
+
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.WARNING)
+
+    alerts = Counter()
+    bianjk.alert_sink = lambda text: alerts.update([text.split("\n", 1)[0]])
+
+    frames = list(stream_capture.read_capture(args.capture))
+    if args.loops > 1:
+        frames = list(itertools.chain.from_iterable(itertools.repeat(frames, args.loops)))
+
+    decoder = FrameDecoder(args.decoder)
+
+    handlers = {
+        "aggTrade": lambda e: bianjk.process_trade_logic(None, e[2], e[1]),
+        "kline": lambda e: bianjk.process_kline_logic(None, e[2], e[1]),
+        "depth": lambda e: bianjk.process_depth_logic(None, e[2], e[1]),
+    }
+    report = asyncio.run(
+        stream_capture.replay(frames, decoder.decode, handlers, speed=args.speed, trace_memory=args.tracemalloc)
+    )
+
+    print(f"录制文件: {args.capture} | 解码后端: {decoder.backend} | 重复 {args.loops} 次")
+    print(stream_capture.format_report(report))
+    print(f"报警: {sum(alerts.values())} 条")
+    for title, count in alerts.most_common():
+        print(f"  {count:>6}  {title}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,26 @@
 import os
 import asyncio
 import aiohttp
-import json
 import logging
 import datetime
 import time
 import sys
-from collections import deque, defaultdict
+from collections import defaultdict
+
+import tg_delivery
+import alert_store
+import metrics
+import worker_stats
+import supervisor
+from stream_pipeline import StreamPipeline
+from binance_events import FrameDecoder
+import binance_shards
+import stream_capture
+import structured_log
+from wall_detector import WallDetector
+from cooldown_store import CooldownStore
+from volume_baseline import VolumeBaselineEngine
+from sliding_window import SlidingWindowAggregator, format_window, parse_windows
 
 # ================= 配置区域 =================
 
@@ -28,16 +42,47 @@ THRESHOLD_SINGLE_QTY = {
 BURST_AMOUNT_USD = float(os.environ.get('BINANCE_BURST_AMOUNT_USD', '100000'))
 BURST_COUNT_TRIGGER = int(os.environ.get('BINANCE_BURST_COUNT_TRIGGER', '1'))
 BURST_WINDOW_MS = 60 * 100
+# 多时间窗口: "窗口秒数[:触发笔数],..." 例如 10:2,60:3,300:6 (未设置时只用 BURST_WINDOW_MS)
+BURST_WINDOWS = parse_windows(os.environ.get('BINANCE_BURST_WINDOWS', ''), BURST_WINDOW_MS, BURST_COUNT_TRIGGER)
+BURST_WINDOW_LENGTHS = [window_ms for window_ms, _ in BURST_WINDOWS]
 
 # 3. 场内异动 - 交易量异常设置
 VOLUME_ANOMALY_MULTIPLIER = float(os.environ.get('BINANCE_VOLUME_ANOMALY_MULTIPLIER', '3.0'))
+# 滚动基准: 最近 N 根已收盘 5m K 线 (288 根 = 24h), 每根收盘 K 线增量更新
+VOLUME_BASELINE_WINDOW = int(os.environ.get('BINANCE_VOLUME_BASELINE_WINDOW', '288'))
+VOLUME_BASELINE_MODE = os.environ.get('BINANCE_VOLUME_BASELINE_MODE', 'mean')  # mean / ewma / median
+VOLUME_BASELINE_MIN_SAMPLES = int(os.environ.get('BINANCE_VOLUME_BASELINE_MIN_SAMPLES', '12'))
+VOLUME_BASELINE_FILE = os.environ.get('BINANCE_VOLUME_BASELINE_FILE', '.bianjk_baseline.json')
+VOLUME_BASELINE_SAVE_INTERVAL = 300
+BASELINE_FETCH_CONCURRENCY = int(os.environ.get('BINANCE_BASELINE_FETCH_CONCURRENCY', '10'))
+KLINE_INTERVAL_MS = 5 * 60 * 1000
 
 # 4. 场内异动 - 巨额挂单设置 (订单簿)
 ORDER_BOOK_WALL_THRESHOLD = float(os.environ.get('BINANCE_ORDER_BOOK_WALL_THRESHOLD', '5000000'))
 WALL_ALERT_COOLDOWN = 300
+WALL_ALERT_MAX_KEYS = int(os.environ.get('BINANCE_WALL_ALERT_MAX_KEYS', '50000'))
+WALL_DETECTOR_BACKEND = os.environ.get('BINANCE_WALL_DETECTOR', 'auto')  # auto / numpy / python
 
 MARKET_TYPE = os.environ.get('BINANCE_MARKET_TYPE', '现货')
 
+# 5. 事件管道 (读 socket 与检测/发送解耦)
+PIPELINE_WORKERS = int(os.environ.get('BINANCE_PIPELINE_WORKERS', '4'))
+PIPELINE_MAXSIZE = int(os.environ.get('BINANCE_PIPELINE_MAXSIZE', '5000'))
+PIPELINE_DROP_POLICY = os.environ.get('BINANCE_PIPELINE_DROP_POLICY', 'drop_oldest')
+PIPELINE_REPORT_INTERVAL = 60
+
+# 6. 行情帧解码后端 (auto / msgspec / orjson / json)
+JSON_DECODER = os.environ.get('BINANCE_JSON_DECODER', 'auto')
+
+# 7. 连接分片 (BINANCE_SYMBOLS=all 时监控全部 QUOTE_ASSET 交易对)
+STREAM_SUFFIXES = ['aggTrade', 'kline_5m', 'depth20@100ms']
+STREAMS_PER_CONNECTION = int(os.environ.get('BINANCE_STREAMS_PER_CONNECTION', '200'))
+SHARD_PROCESSES = int(os.environ.get('BINANCE_SHARD_PROCESSES', '1'))
+QUOTE_ASSET = os.environ.get('BINANCE_QUOTE_ASSET', 'USDT')
+
+# 8. 行情录制 (写入 gzip 文件, 供 benchmarks/replay_binance.py 离线回放; 仅单进程分片模式)
+CAPTURE_FILE = os.environ.get('BINANCE_CAPTURE_FILE', '')
+
 # ======================= 验证配置 =======================
 if not os.environ.get('TELEGRAM_BOT_TOKEN'):
     raise EnvironmentError("缺少必要配置: TELEGRAM_BOT_TOKEN")
@@ -45,48 +90,47 @@ if not os.environ.get('TELEGRAM_CHAT_ID'):
     raise EnvironmentError("缺少必要配置: TELEGRAM_CHAT_ID")
 # ========================================================
 
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s')
+logger = logging.getLogger("bianjk")
 
 # 全局状态存储
-burst_monitor = defaultdict(lambda: {'BUY': deque(), 'SELL': deque()})
-volume_baseline = {} 
-wall_alert_history = {} 
-
-async def send_telegram_message(session, text):
-    """发送消息到 Telegram (包含自动修复话题ID错误的逻辑)"""
-    url = f"https://api.telegram.org/bot{TG_BOT_TOKEN}/sendMessage"
-
-    payload = {
-        'chat_id': TG_CHAT_ID, 
-        'text': text, 
-        'parse_mode': 'HTML'
-    }
-
-    # 只有当 ID 有效时才添加该参数
-    if TG_THREAD_ID is not None:
-        payload['message_thread_id'] = TG_THREAD_ID
-
-    try:
-        async with session.post(url, json=payload) as response:
-            # 获取响应内容
-            resp_json = await response.json()
-
-            # === 关键修复：自动处理话题 ID 错误 ===
-            if not resp_json.get("ok") and "message thread not found" in resp_json.get("description", ""):
-                logging.warning(f"⚠️ 话题 ID ({TG_THREAD_ID}) 无效，正在尝试发送到主群组...")
-
-                # 移除错误的 ID，重新发送
-                payload.pop("message_thread_id", None)
-                async with session.post(url, json=payload) as retry_resp:
-                    retry_json = await retry_resp.json()
-                    if not retry_json.get("ok"):
-                        logging.error(f"TG 重试发送失败: {retry_json}")
-
-            elif not resp_json.get("ok"):
-                logging.error(f"TG 发送失败 (Code {response.status}): {resp_json}")
-
-    except Exception as e:
-        logging.error(f"TG 请求错误: {e}")
+burst_monitor = defaultdict(lambda: {
+    'BUY': SlidingWindowAggregator(BURST_WINDOW_LENGTHS),
+    'SELL': SlidingWindowAggregator(BURST_WINDOW_LENGTHS),
+})
+volume_baseline = VolumeBaselineEngine(
+    VOLUME_BASELINE_WINDOW, VOLUME_BASELINE_MODE, min_samples=VOLUME_BASELINE_MIN_SAMPLES,
+)
+wall_alert_history = CooldownStore(WALL_ALERT_COOLDOWN, max_size=WALL_ALERT_MAX_KEYS)
+
+# Telegram 统一投递服务 (限速 / 重试 / 合并发送)
+delivery = tg_delivery.get_delivery()
+
+# 组合流帧解码器 (直接产出 AggTrade / Kline / Depth 结构体)
+frame_decoder = FrameDecoder(JSON_DECODER)
+
+# 挂单墙批量检测器
+wall_detector = WallDetector(ORDER_BOOK_WALL_THRESHOLD, WALL_DETECTOR_BACKEND)
+
+# Prometheus 指标 (经 worker_stats 快照汇总到 botsever 的 /metrics)
+WS_LAG_SECONDS = metrics.REGISTRY.histogram(
+    'binance_ws_lag_seconds', '行情事件时间到开始处理的延迟（秒）', ['symbol', 'stream'],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0),
+)
+PIPELINE_DEPTH = metrics.REGISTRY.gauge('binance_pipeline_queue_depth', '行情事件管道积压数')
+
+# 报警输出替换 (回放时设为本地收集函数, 不发送到 Telegram, 也不写报警历史)
+alert_sink = None
+
+# 报警历史 (连同投递结果写入 SQLite, 供回测 / 审计)
+alerts = alert_store.get_store()
+
+async def send_telegram_message(session, text, alert_type='alert', symbol=None, value=None, **data):
+    """发送消息到 Telegram (交给统一投递服务排队, 不阻塞行情处理), 投递完成后记入报警历史"""
+    if alert_sink is not None:
+        alert_sink(text)
+        return None
+    future = delivery.enqueue(text, thread_id=TG_THREAD_ID)
+    return alerts.track(future, 'bianjk', alert_type, text, symbol=symbol, value=value, **data)
 
 def format_amount(amount):
     if amount >= 1_000_000:
@@ -104,37 +148,84 @@ def get_time_str(ts_ms=None):
     return dt.strftime('%H:%M:%S')
 
 async def init_volume_baseline(session):
-    """初始化历史成交量基准"""
-    logging.info("正在初始化历史成交量基准...")
+    """初始化历史成交量基准 (先从本地状态恢复, 再并发补齐缺失的 K 线)"""
+    logger.info("正在初始化历史成交量基准...")
+    try:
+        restored = volume_baseline.load(VOLUME_BASELINE_FILE)
+        if restored:
+            logger.info("已从 %s 恢复 %s 个币种的成交量基准", VOLUME_BASELINE_FILE, restored)
+    except Exception as e:
+        logger.error("读取成交量基准状态失败: %s", e)
+
+    semaphore = asyncio.Semaphore(BASELINE_FETCH_CONCURRENCY)
+    await asyncio.gather(*(
+        fill_volume_baseline(session, symbol.upper(), semaphore) for symbol in SYMBOLS
+    ))
+
+async def fill_volume_baseline(session, symbol_upper, semaphore):
+    """拉取单个币种缺失的已收盘 K 线并计入基准"""
     base_url = "https://api.binance.com/api/v3/klines"
+    now_ms = int(time.time() * 1000)
+    last_close = volume_baseline.last_close_time(symbol_upper)
+    missing = (now_ms - last_close) // KLINE_INTERVAL_MS if last_close else VOLUME_BASELINE_WINDOW
+    if missing <= 0:
+        return
+
+    # 多取一根: 最新一根通常尚未收盘, 会被过滤掉
+    params = {'symbol': symbol_upper, 'interval': '5m', 'limit': min(missing, VOLUME_BASELINE_WINDOW, 999) + 1}
+    if last_close and missing < VOLUME_BASELINE_WINDOW:
+        params['startTime'] = last_close + 1
 
-    for symbol in SYMBOLS:
-        symbol_upper = symbol.upper()
+    async with semaphore:
         try:
-            params = {'symbol': symbol_upper, 'interval': '5m', 'limit': 288}
             async with session.get(base_url, params=params) as resp:
                 data = await resp.json()
-                if isinstance(data, list) and len(data) > 0:
-                    total_vol = sum(float(k[5]) for k in data)
-                    avg_vol = total_vol / len(data)
-                    volume_baseline[symbol_upper] = avg_vol
-                    logging.info(f"[{symbol_upper}] 24h平均5min成交量: {avg_vol:.2f}")
-                else:
-                    volume_baseline[symbol_upper] = 99999999
         except Exception as e:
-            logging.error(f"初始化成交量失败: {e}")
-            volume_baseline[symbol_upper] = 99999999
+            logger.error("[%s] 初始化成交量失败: %s", symbol_upper, e)
+            return
+
+    if not isinstance(data, list):
+        logger.error("[%s] 初始化成交量失败: %s", symbol_upper, data)
+        return
+
+    added = 0
+    for k in data:
+        close_time = int(k[6])
+        if close_time < now_ms and volume_baseline.update(symbol_upper, float(k[5]), close_time):
+            added += 1
+    logger.info(
+        "[%s] 补齐 %s 根K线, 样本 %s, 平均5min成交量: %.2f",
+        symbol_upper, added, volume_baseline.samples(symbol_upper), volume_baseline.get(symbol_upper),
+    )
+
+def save_volume_baseline():
+    try:
+        volume_baseline.save(VOLUME_BASELINE_FILE)
+    except Exception as e:
+        logger.error("保存成交量基准失败: %s", e)
+
+async def persist_volume_baseline():
+    """定期把成交量基准写盘, 重启后只需补齐停机期间的 K 线"""
+    while True:
+        await asyncio.sleep(VOLUME_BASELINE_SAVE_INTERVAL)
+        # 在事件循环线程内取快照, 写文件交给线程池
+        snapshot = volume_baseline.snapshot()
+        try:
+            await asyncio.to_thread(volume_baseline.save, VOLUME_BASELINE_FILE, snapshot)
+        except Exception as e:
+            logger.error("保存成交量基准失败: %s", e)
 
-async def process_kline_logic(session, data, symbol_upper):
+async def process_kline_logic(session, kline, symbol_upper):
     """处理 K线数据"""
-    k = data['k']
-    if not k['x']: 
+    if not kline.closed:
         return
 
-    current_vol = float(k['v'])
-    close_price = float(k['c'])
+    current_vol = kline.volume
+    close_price = kline.close
 
+    # 先与历史基准比较, 再把本根 K 线计入基准 (避免自身拉高均值)
     avg_vol = volume_baseline.get(symbol_upper, 0)
+    volume_baseline.update(symbol_upper, current_vol, kline.close_time)
 
     if avg_vol > 0 and current_vol > (avg_vol * VOLUME_ANOMALY_MULTIPLIER):
         multiple = current_vol / avg_vol
@@ -143,37 +234,39 @@ async def process_kline_logic(session, data, symbol_upper):
         msg = (
             f"📈 <b>成交量异常飙升</b>\n"
             f"币对: {symbol_upper}\n"
-            f"时间: {get_time_str(data['E'])}\n"
+            f"时间: {get_time_str(kline.event_time)}\n"
             f"当前量: {format_amount(current_vol)} (均量 {format_amount(avg_vol)})\n"
             f"倍数: <b>{multiple:.1f}倍</b> 🔥\n"
             f"成交额: {format_amount(amount_usd)}\n"
         )
-        logging.info(f"触发成交量异常: {symbol_upper} {multiple:.1f}倍")
-        await send_telegram_message(session, msg)
+        logger.info("触发成交量异常: %s %.1f倍", symbol_upper, multiple)
+        await send_telegram_message(
+            session, msg, 'volume_spike', symbol_upper, multiple,
+            volume=current_vol, baseline=avg_vol, amount_usd=amount_usd,
+        )
 
-async def process_depth_logic(session, data, symbol_upper):
+async def process_depth_logic(session, depth, symbol_upper):
     """处理深度数据 (检测大额挂单)"""
-    bids = data.get('bids') or data.get('b', [])
-    asks = data.get('asks') or data.get('a', [])
+    # 整份快照一次性筛选, 只有超过阈值的档位才进入冷却判断和发送
+    bid_walls, ask_walls = wall_detector.detect(depth)
+    if not bid_walls and not ask_walls:
+        return
 
     current_time = time.time()
 
-    for price_str, qty_str in bids:
-        await check_wall(session, symbol_upper, "买入挂单", float(price_str), float(qty_str), current_time)
+    for price, qty, _ in bid_walls:
+        await check_wall(session, symbol_upper, "买入挂单", price, qty, current_time)
 
-    for price_str, qty_str in asks:
-        await check_wall(session, symbol_upper, "卖出挂单", float(price_str), float(qty_str), current_time)
+    for price, qty, _ in ask_walls:
+        await check_wall(session, symbol_upper, "卖出挂单", price, qty, current_time)
 
 async def check_wall(session, symbol, direction_str, price, qty, current_time):
     amount_usd = price * qty
     if amount_usd >= ORDER_BOOK_WALL_THRESHOLD:
-        alert_key = f"{symbol}_{direction_str}_{int(price)}"
-        last_alert_time = wall_alert_history.get(alert_key, 0)
-
-        if current_time - last_alert_time < WALL_ALERT_COOLDOWN:
+        alert_key = (symbol, direction_str, int(price))
+        if not wall_alert_history.check_and_set(alert_key, current_time):
             return
 
-        wall_alert_history[alert_key] = current_time
         emoji = "🧱" if "买" in direction_str else "🧗"
 
         msg = (
@@ -183,15 +276,17 @@ async def check_wall(session, symbol, direction_str, price, qty, current_time):
             f"价格: {price}\n"
             f"金额: <b>{format_amount(amount_usd)}</b>\n"
         )
-        logging.info(f"触发挂单报警: {symbol} {direction_str} {format_amount(amount_usd)}")
-        await send_telegram_message(session, msg)
+        logger.info("触发挂单报警: %s %s %s", symbol, direction_str, format_amount(amount_usd))
+        await send_telegram_message(
+            session, msg, 'order_wall', symbol, amount_usd, side=direction_str, price=price, qty=qty,
+        )
 
-async def process_trade_logic(session, data, symbol_upper):
+async def process_trade_logic(session, trade, symbol_upper):
     """处理实时成交"""
-    price = float(data['p'])
-    quantity = float(data['q'])
-    trade_time = data['T']
-    is_buyer_maker = data['m']
+    price = trade.price
+    quantity = trade.qty
+    trade_time = trade.trade_time
+    is_buyer_maker = trade.is_buyer_maker
     amount_usd = price * quantity
     direction_str = "🔴 主动卖出" if is_buyer_maker else "🟢 主动买入"
 
@@ -207,80 +302,168 @@ async def process_trade_logic(session, data, symbol_upper):
             f"金额: <b>{format_amount(amount_usd)}</b>\n"
             f"时间: {get_time_str(trade_time)}"
         )
-        logging.info(f"触发单笔报警: {symbol_upper} {format_amount(amount_usd)}")
-        await send_telegram_message(session, msg_text)
+        logger.info("触发单笔报警: %s %s", symbol_upper, format_amount(amount_usd))
+        await send_telegram_message(
+            session, msg_text, 'large_trade', symbol_upper, amount_usd,
+            side=direction_str, price=price, qty=quantity,
+        )
 
-    # 逻辑 B: 1分钟突发
+    # 逻辑 B: 多时间窗口突发
     if amount_usd >= BURST_AMOUNT_USD:
         dir_key = "SELL" if is_buyer_maker else "BUY"
-        queue = burst_monitor[symbol_upper][dir_key]
-        queue.append({'t': trade_time, 'v': amount_usd})
-
-        while queue and (trade_time - queue[0]['t'] > BURST_WINDOW_MS):
-            queue.popleft()
-
-        if len(queue) > BURST_COUNT_TRIGGER:
-            total_volume = sum(item['v'] for item in queue)
+        windows = burst_monitor[symbol_upper][dir_key]
+        windows.add(trade_time, amount_usd)
+
+        # 从最长窗口往短检查, 只报最长的触发窗口, 并重置它和更短的窗口
+        for index in range(len(BURST_WINDOWS) - 1, -1, -1):
+            window_ms, count_trigger = BURST_WINDOWS[index]
+            count = windows.count(index)
+            if count <= count_trigger:
+                continue
             msg = (
-                f"🚨 <b>密集大单报警 (1分钟内)</b>\n"
+                f"🚨 <b>密集大单报警 ({format_window(window_ms)}内)</b>\n"
                 f"币对: {symbol_upper}\n"
                 f"方向: <b>{direction_str}</b>\n"
-                f"频次: {len(queue)}笔\n"
-                f"总金额: <b>{format_amount(total_volume)}</b>\n"
+                f"频次: {count}笔\n"
+                f"总金额: <b>{format_amount(windows.total(index))}</b>\n"
                 f"当前价: {price}"
             )
-            logging.info(f"触发突发报警: {symbol_upper}")
-            await send_telegram_message(session, msg)
-            queue.clear()
-
-async def connect_binance():
-    streams = []
-    for s in SYMBOLS:
-        streams.append(f"{s}@aggTrade")
-        streams.append(f"{s}@kline_5m")
-        streams.append(f"{s}@depth20@100ms")
-
-    stream_str = '/'.join(streams)
-    ws_url = f"wss://stream.binance.com:9443/stream?streams={stream_str}"
-
+            logger.info("触发突发报警: %s %s", symbol_upper, format_window(window_ms))
+            await send_telegram_message(
+                session, msg, 'burst', symbol_upper, windows.total(index),
+                side=direction_str, window_ms=window_ms, count=count, price=price,
+            )
+            windows.reset(index)
+            break
+
+def observe_lag(symbol_upper, kind, event_time_ms):
+    """记录事件时间到处理时的延迟 (含网络与管道排队; 时钟偏差导致的负值记为 0)"""
+    lag = time.time() - event_time_ms / 1000
+    WS_LAG_SECONDS.labels(symbol_upper, kind).observe(lag if lag > 0 else 0.0)
+
+def make_event_handler(session):
+    """构造管道消费端: 按 stream 类型分发到检测逻辑"""
+    async def handle_event(event):
+        kind, symbol_upper, payload = event
+        if kind == 'aggTrade':
+            observe_lag(symbol_upper, kind, payload.trade_time)
+            await process_trade_logic(session, payload, symbol_upper)
+        elif kind == 'kline':
+            observe_lag(symbol_upper, kind, payload.event_time)
+            await process_kline_logic(session, payload, symbol_upper)
+        elif kind == 'depth':
+            await process_depth_logic(session, payload, symbol_upper)
+    return handle_event
+
+async def report_pipeline_metrics(pipeline):
+    """定期输出管道背压指标"""
+    last_dropped = 0
+    while True:
+        await asyncio.sleep(PIPELINE_REPORT_INTERVAL)
+        metrics = pipeline.metrics()
+        if metrics['dropped'] > last_dropped:
+            logger.warning("⚠️ 处理跟不上行情, 已丢弃 %s 条事件 | %s", metrics['dropped'] - last_dropped, pipeline.format_metrics(metrics))
+        else:
+            logger.info("%s", pipeline.format_metrics(metrics))
+        last_dropped = metrics['dropped']
+
+async def resolve_symbols(session):
+    """BINANCE_SYMBOLS=all 时, 从交易所拉取全部 {QUOTE_ASSET} 现货交易对"""
+    if SYMBOLS != ['all']:
+        return
+    symbols = await binance_shards.fetch_quote_symbols(session, QUOTE_ASSET)
+    SYMBOLS[:] = symbols
+    logger.info("已加载 %s 个 %s 交易对", len(SYMBOLS), QUOTE_ASSET)
+
+async def connect_binance(session=None):
+    """运行币安监控; 传入 session 时复用 (单进程运行时共享连接池), 否则自建"""
+    if session is not None:
+        await run_binance(session)
+        return
     async with aiohttp.ClientSession() as session:
-        await init_volume_baseline(session)
-        await send_telegram_message(session, f"🤖 <b>币安监控机器人已启动</b>\n监控项: 实时大单 / 密集交易 / 3倍放量 / 挂单墙")
-
-        while True:
-            try:
-                async with session.ws_connect(ws_url) as ws:
-                    logging.info(f"✅ WebSocket 连接成功，监听 {len(SYMBOLS)} 个币种...")
-
-                    async for msg in ws:
-                        if msg.type == aiohttp.WSMsgType.TEXT:
-                            raw_data = json.loads(msg.data)
-
-                            if 'data' in raw_data:
-                                payload = raw_data['data']
-                                stream_name = raw_data['stream']
-
-                                # 从 stream 名称中提取 symbol
-                                symbol_part = stream_name.split('@')[0]
-                                symbol_upper = symbol_part.upper()
-
-                                if 'aggTrade' in stream_name:
-                                    await process_trade_logic(session, payload, symbol_upper)
-                                elif 'kline' in stream_name:
-                                    await process_kline_logic(session, payload, symbol_upper)
-                                elif 'depth' in stream_name:
-                                    await process_depth_logic(session, payload, symbol_upper)
-
-                        elif msg.type == aiohttp.WSMsgType.ERROR:
-                            break
-            except Exception as e:
-                logging.error(f"⚠️ 连接断开，5秒后重连: {e}")
-                await asyncio.sleep(5)
+        await run_binance(session)
+
+async def run_binance(session):
+    """启动投递服务、补齐基准后建立行情连接, 直到连接全部退出"""
+    await delivery.start(session)
+    await resolve_symbols(session)
+    await init_volume_baseline(session)
+    await send_telegram_message(session, f"🤖 <b>币安监控机器人已启动</b>\n监控项: 实时大单 / 密集交易 / 3倍放量 / 挂单墙")
+
+    # 读 socket 只负责解析入队, 检测与发送在独立消费协程中进行
+    pipeline = StreamPipeline(
+        make_event_handler(session),
+        shards=PIPELINE_WORKERS,
+        maxsize=PIPELINE_MAXSIZE,
+        drop_policy=PIPELINE_DROP_POLICY,
+        name='binance',
+    )
+    await pipeline.start()
+    PIPELINE_DEPTH.set_function(pipeline.depth)
+    reporter = asyncio.create_task(report_pipeline_metrics(pipeline))
+    baseline_saver = asyncio.create_task(persist_volume_baseline())
+    # 事件循环被阻塞时心跳停止更新, 由 main.py 的守护进程发现并重启
+    heartbeat = asyncio.create_task(supervisor.heartbeat_task("bianjk.py"))
+
+    # 交易对拆分到多条组合流连接, 每个分片独立重连
+    shard_symbols = binance_shards.plan_shards(SYMBOLS, STREAM_SUFFIXES, max_streams=STREAMS_PER_CONNECTION)
+    shard_specs = [
+        (shard_id, symbols, binance_shards.shard_url(symbols, STREAM_SUFFIXES))
+        for shard_id, symbols in enumerate(shard_symbols)
+    ]
+    logger.info("共 %s 个币种, 拆分为 %s 条连接, %s 个进程", len(SYMBOLS), len(shard_specs), SHARD_PROCESSES)
+
+    capture = None
+    if CAPTURE_FILE:
+        if SHARD_PROCESSES > 1:
+            logger.warning("多进程分片模式下不支持行情录制, 已忽略 BINANCE_CAPTURE_FILE")
+        else:
+            capture = stream_capture.CaptureWriter(CAPTURE_FILE)
+            logger.info("行情录制已开启: %s", CAPTURE_FILE)
+
+    try:
+        if SHARD_PROCESSES > 1:
+            if PIPELINE_DROP_POLICY == 'block':
+                # 等待管道空位, 背压经有界进程间队列传回分片子进程
+                async def dispatch(batch):
+                    for event in batch:
+                        await pipeline.put(event[1], event)
+            else:
+                def dispatch(batch):
+                    for event in batch:
+                        pipeline.put_nowait(event[1], event)
+
+            group = binance_shards.ProcessShardGroup(
+                shard_specs, SHARD_PROCESSES, dispatch, decoder_backend=JSON_DECODER,
+            )
+            await group.run()
+        else:
+            async def on_frame(raw):
+                if capture is not None:
+                    capture.write(raw)
+                event = frame_decoder.decode(raw)
+                if event is not None:
+                    await pipeline.put(event[1], event)
+
+            await asyncio.gather(*(
+                binance_shards.run_shard(session, url, on_frame, binance_shards.ShardStats(shard_id, symbols))
+                for shard_id, symbols, url in shard_specs
+            ))
+    finally:
+        reporter.cancel()
+        baseline_saver.cancel()
+        heartbeat.cancel()
+        await pipeline.stop()
+        save_volume_baseline()
+        if capture is not None:
+            capture.close()
 
 if __name__ == '__main__':
     if sys.platform == 'win32':
         asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
 
+    structured_log.setup_logging()
+    worker_stats.stats.start()
     try:
         asyncio.run(connect_binance())
     except KeyboardInterrupt:
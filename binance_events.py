@@ -0,0 +1,154 @@
+"""
+币安组合流 (combined stream) 帧解码
+
+把 aggTrade / kline / depth 推送直接解码为带类型的结构体, 价格和数量在解码时
+一次性转为 float, 检测逻辑只做属性访问。
+
+- msgspec 可用时用 Struct 直接解码 (字符串数字在解码阶段转换, 不生成中间 dict)
+- 否则先用 fast_json.loads (orjson / 标准库) 解码, 再构造 NamedTuple
+两种路径产出的对象具有相同的属性名。
+"""
+
+from typing import NamedTuple, Optional
+
+import fast_json
+
+msgspec = fast_json.msgspec
+
+
+class AggTrade(NamedTuple):
+    """归集成交"""
+
+    price: float
+    qty: float
+    trade_time: int
+    is_buyer_maker: bool
+
+
+class Kline(NamedTuple):
+    """K线推送"""
+
+    event_time: int
+    closed: bool
+    volume: float
+    close: float
+    close_time: int
+
+
+class Depth(NamedTuple):
+    """有限档深度快照, bids/asks 为 (price, qty) 列表"""
+
+    bids: list
+    asks: list
+
+
+def stream_kind(stream_name: str) -> Optional[tuple]:
+    """从 stream 名称解析 (类型, 大写交易对), 未知类型返回 None"""
+    symbol_part, _, stream_type = stream_name.partition("@")
+    if stream_type.startswith("aggTrade"):
+        kind = "aggTrade"
+    elif stream_type.startswith("kline"):
+        kind = "kline"
+    elif stream_type.startswith("depth"):
+        kind = "depth"
+    else:
+        return None
+    return kind, symbol_part.upper()
+
+
+def _levels(raw_levels) -> list:
+    return [(float(price), float(qty)) for price, qty in raw_levels]
+
+
+def build_event(kind: str, data: dict):
+    """把已解码的 payload dict 转换为结构体"""
+    if kind == "aggTrade":
+        return AggTrade(float(data["p"]), float(data["q"]), data["T"], data["m"])
+    if kind == "kline":
+        k = data["k"]
+        return Kline(data["E"], k["x"], float(k["v"]), float(k["c"]), k["T"])
+    bids = data.get("bids") or data.get("b", [])
+    asks = data.get("asks") or data.get("a", [])
+    return Depth(_levels(bids), _levels(asks))
+
+
+if msgspec is not None:
+
+    class _Envelope(msgspec.Struct):
+        stream: str = ""
+        data: msgspec.Raw = msgspec.Raw(b"null")
+
+    class _AggTradeStruct(msgspec.Struct):
+        price: float = msgspec.field(name="p")
+        qty: float = msgspec.field(name="q")
+        trade_time: int = msgspec.field(name="T")
+        is_buyer_maker: bool = msgspec.field(name="m")
+
+    class _KlineBody(msgspec.Struct):
+        x: bool
+        v: float
+        c: float
+        T: int
+
+    class _KlineStruct(msgspec.Struct):
+        E: int
+        k: _KlineBody
+
+    class _DepthStruct(msgspec.Struct):
+        bids: list[tuple[float, float]] = []
+        asks: list[tuple[float, float]] = []
+        b: list[tuple[float, float]] = []
+        a: list[tuple[float, float]] = []
+
+    # strict=False 允许把 "123.45" 这类字符串数字直接解码为 float
+    _envelope_decoder = msgspec.json.Decoder(_Envelope)
+    _trade_decoder = msgspec.json.Decoder(_AggTradeStruct, strict=False)
+    _kline_decoder = msgspec.json.Decoder(_KlineStruct, strict=False)
+    _depth_decoder = msgspec.json.Decoder(_DepthStruct, strict=False)
+
+
+class FrameDecoder:
+    """组合流帧解码器"""
+
+    def __init__(self, backend: Optional[str] = None):
+        # 结构体解码场景下 msgspec 直接产出对象, 比 orjson + 构造 NamedTuple 更快
+        if backend in (None, "", "auto") and msgspec is not None:
+            backend = "msgspec"
+        self.backend = fast_json.resolve_backend(backend)
+        self._loads = fast_json.get_loads(self.backend)
+        if self.backend == "msgspec":
+            self.decode = self._decode_msgspec
+        else:
+            self.decode = self._decode_dict
+
+    def _decode_dict(self, raw):
+        """
+        解码一帧
+
+        Returns:
+            (kind, symbol_upper, event) 或 None (非数据帧 / 未知 stream)
+        """
+        envelope = self._loads(raw)
+        if "data" not in envelope:
+            return None
+        routed = stream_kind(envelope["stream"])
+        if routed is None:
+            return None
+        kind, symbol_upper = routed
+        return kind, symbol_upper, build_event(kind, envelope["data"])
+
+    def _decode_msgspec(self, raw):
+        envelope = _envelope_decoder.decode(raw)
+        if not envelope.stream:
+            return None
+        routed = stream_kind(envelope.stream)
+        if routed is None:
+            return None
+        kind, symbol_upper = routed
+        if kind == "aggTrade":
+            return kind, symbol_upper, _trade_decoder.decode(envelope.data)
+        if kind == "kline":
+            msg = _kline_decoder.decode(envelope.data)
+            return kind, symbol_upper, Kline(msg.E, msg.k.x, msg.k.v, msg.k.c, msg.k.T)
+        msg = _depth_decoder.decode(envelope.data)
+        return kind, symbol_upper, Depth(msg.bids or msg.b, msg.asks or msg.a)
@@ -0,0 +1,328 @@
+"""
+币安组合流连接分片
+
+币安限制单连接的 stream 数量和 URL 长度, 上百个交易对放在一条连接里也读不过来。
+这里把交易对拆分到多条组合流连接上:
+- 同一交易对的所有 stream 固定在同一分片, 保证单币种事件有序
+- 每个分片独立重连 (指数退避), 互不影响
+- 可选把分片分散到多个工作进程, 子进程负责读 socket + 解码,
+  按批把结构化事件送回主进程, 统一进入同一条检测 / 告警管道;
+  子进程只导入本模块, 不会重新执行主脚本 (bianjk) 的模块级初始化
+"""
+
+import asyncio
+import concurrent.futures
+import importlib.util
+import logging
+import multiprocessing
+import queue as queue_module
+import random
+import sys
+import threading
+import time
+import types
+from contextlib import contextmanager
+from typing import Awaitable, Callable, Optional
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+BINANCE_WS_BASE = "wss://stream.binance.com:9443/stream?streams="
+BINANCE_EXCHANGE_INFO_URL = "https://api.binance.com/api/v3/exchangeInfo"
+
+# 币安单连接最多 1024 个 stream; 默认留足余量, 让单条连接的消息速率可控
+MAX_STREAMS_PER_CONNECTION = 1024
+DEFAULT_STREAMS_PER_CONNECTION = 200
+DEFAULT_MAX_URL_LENGTH = 4000
+
+RECONNECT_BASE_DELAY = 1.0
+RECONNECT_MAX_DELAY = 60.0
+
+
+def shard_url(symbols: list, suffixes: list, base: str = BINANCE_WS_BASE) -> str:
+    """生成一个分片的组合流 URL"""
+    streams = [f"{symbol}@{suffix}" for symbol in symbols for suffix in suffixes]
+    return base + "/".join(streams)
+
+
+def plan_shards(
+    symbols: list,
+    suffixes: list,
+    max_streams: int = DEFAULT_STREAMS_PER_CONNECTION,
+    max_url_length: int = DEFAULT_MAX_URL_LENGTH,
+    base: str = BINANCE_WS_BASE,
+) -> list:
+    """
+    把交易对拆分为若干分片, 每个分片的 stream 数和 URL 长度都不超过上限
+
+    Returns:
+        list[list[str]]: 每个分片包含的交易对
+    """
+    max_streams = min(max_streams, MAX_STREAMS_PER_CONNECTION)
+    if len(suffixes) > max_streams:
+        raise ValueError("单个交易对的 stream 数超过了单连接上限")
+
+    shards = []
+    current = []
+    url_length = len(base)
+    for symbol in symbols:
+        added = sum(len(symbol) + 1 + len(suffix) + 1 for suffix in suffixes)
+        too_many = (len(current) + 1) * len(suffixes) > max_streams
+        too_long = url_length + added > max_url_length
+        if current and (too_many or too_long):
+            shards.append(current)
+            current = []
+            url_length = len(base)
+        current.append(symbol)
+        url_length += added
+    if current:
+        shards.append(current)
+    return shards
+
+
+async def fetch_quote_symbols(session: aiohttp.ClientSession, quote_asset: str) -> list:
+    """从 exchangeInfo 获取指定计价币种下所有交易中的现货交易对 (小写)"""
+    async with session.get(BINANCE_EXCHANGE_INFO_URL) as resp:
+        data = await resp.json()
+    return sorted(
+        item["symbol"].lower()
+        for item in data.get("symbols", [])
+        if item.get("quoteAsset") == quote_asset.upper()
+        and item.get("status") == "TRADING"
+    )
+
+
+class ShardStats:
+    """单个分片的连接统计"""
+
+    def __init__(self, shard_id: int, symbols: list):
+        self.shard_id = shard_id
+        self.symbols = symbols
+        self.connected = False
+        self.connects = 0
+        self.disconnects = 0
+        self.frames = 0
+        self.last_frame_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    def snapshot(self) -> dict:
+        return {
+            "shard": self.shard_id,
+            "symbols": len(self.symbols),
+            "connected": self.connected,
+            "connects": self.connects,
+            "disconnects": self.disconnects,
+            "frames": self.frames,
+            "idle_seconds": round(time.monotonic() - self.last_frame_at, 1)
+            if self.last_frame_at
+            else None,
+            "last_error": self.last_error,
+        }
+
+
+async def run_shard(
+    session: aiohttp.ClientSession,
+    url: str,
+    on_frame: Callable[[str], Awaitable[None]],
+    stats: ShardStats,
+):
+    """运行单个分片连接, 断线后按指数退避 (带抖动) 独立重连"""
+    delay = RECONNECT_BASE_DELAY
+    while True:
+        try:
+            async with session.ws_connect(url, heartbeat=30) as ws:
+                stats.connected = True
+                stats.connects += 1
+                delay = RECONNECT_BASE_DELAY
+                logger.info(
+                    "✅ 分片 #%s 连接成功，监听 %s 个币种...",
+                    stats.shard_id,
+                    len(stats.symbols),
+                )
+                async for msg in ws:
+                    if msg.type == aiohttp.WSMsgType.TEXT:
+                        stats.frames += 1
+                        stats.last_frame_at = time.monotonic()
+                        await on_frame(msg.data)
+                    elif msg.type == aiohttp.WSMsgType.ERROR:
+                        break
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            stats.last_error = str(e)
+            logger.error("⚠️ 分片 #%s 连接断开: %s", stats.shard_id, e)
+        stats.connected = False
+        stats.disconnects += 1
+        wait = delay * (0.5 + random.random())
+        logger.info("分片 #%s %.1f 秒后重连", stats.shard_id, wait)
+        await asyncio.sleep(wait)
+        delay = min(delay * 2, RECONNECT_MAX_DELAY)
+
+
+# ==========================================
+# 多进程分片
+# ==========================================
+
+
+def _worker_main(worker_id, shard_specs, out_queue, decoder_backend, batch_size, flush_interval):
+    """工作进程入口: 运行分配到的分片, 解码后按批送回主进程"""
+    try:
+        asyncio.run(
+            _worker_async(
+                worker_id, shard_specs, out_queue, decoder_backend, batch_size, flush_interval
+            )
+        )
+    except KeyboardInterrupt:
+        pass
+
+
+async def _worker_async(worker_id, shard_specs, out_queue, decoder_backend, batch_size, flush_interval):
+    from binance_events import FrameDecoder
+
+    logging.basicConfig(level=logging.INFO, format=f"%(asctime)s - [shard-worker {worker_id}] %(message)s")
+    decoder = FrameDecoder(decoder_backend)
+    batch = []
+
+    def flush():
+        if batch:
+            out_queue.put(batch.copy())
+            batch.clear()
+
+    async def on_frame(raw):
+        event = decoder.decode(raw)
+        if event is not None:
+            batch.append(event)
+            if len(batch) >= batch_size:
+                flush()
+
+    async def flusher():
+        while True:
+            await asyncio.sleep(flush_interval)
+            flush()
+
+    async with aiohttp.ClientSession() as session:
+        tasks = [
+            run_shard(session, url, on_frame, ShardStats(shard_id, symbols))
+            for shard_id, symbols, url in shard_specs
+        ]
+        await asyncio.gather(flusher(), *tasks)
+
+
+_spawn_lock = threading.Lock()
+
+
+@contextmanager
+def _worker_main_module():
+    """
+    spawn 启动的子进程会重新导入父进程的 __main__ 脚本 (python bianjk.py 时即 bianjk),
+    并执行其模块级初始化 (日志、报警存储、投递服务等)。启动子进程期间把 __main__
+    临时换成指向本模块的占位模块, 子进程只导入 binance_shards。
+    """
+    with _spawn_lock:
+        main = sys.modules.get("__main__")
+        placeholder = types.ModuleType("__main__")
+        placeholder.__spec__ = importlib.util.find_spec(__name__)
+        sys.modules["__main__"] = placeholder
+        try:
+            yield
+        finally:
+            sys.modules["__main__"] = main
+
+
+class ProcessShardGroup:
+    """
+    把分片分散到多个工作进程运行
+
+    子进程解码出的事件经 multiprocessing 队列按批送回, 由后台线程转交给
+    主事件循环中的 dispatch 回调。子进程意外退出时会被自动拉起。
+
+    dispatch 为协程函数时, 后台线程等待它完成再取下一批, 并且进程间队列有界
+    (max_pending_batches): 主进程处理不过来时子进程写队列阻塞、暂停读 socket,
+    与单进程模式下 block 丢弃策略的行为一致。
+    """
+
+    def __init__(
+        self,
+        shard_specs: list,
+        processes: int,
+        dispatch: Callable[[list], None],
+        decoder_backend: Optional[str] = None,
+        batch_size: int = 200,
+        flush_interval: float = 0.02,
+        max_pending_batches: int = 64,
+    ):
+        self.dispatch = dispatch
+        self.decoder_backend = decoder_backend
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._blocking = asyncio.iscoroutinefunction(dispatch)
+        self._ctx = multiprocessing.get_context("spawn")
+        self._queue = self._ctx.Queue(max_pending_batches if self._blocking else 0)
+        self._assignments = [shard_specs[i::processes] for i in range(processes)]
+        self._assignments = [specs for specs in self._assignments if specs]
+        self._processes: list = [None] * len(self._assignments)
+        self._stopping = threading.Event()
+        self.restarts = 0
+
+    def _spawn(self, index: int):
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(
+                index,
+                self._assignments[index],
+                self._queue,
+                self.decoder_backend,
+                self.batch_size,
+                self.flush_interval,
+            ),
+            name=f"binance-shard-{index}",
+            daemon=True,
+        )
+        with _worker_main_module():
+            process.start()
+        self._processes[index] = process
+        logger.info("🚀 分片工作进程 #%s 已启动 (PID: %s, %s 个分片)", index, process.pid, len(self._assignments[index]))
+
+    def _pump(self, loop: asyncio.AbstractEventLoop):
+        while not self._stopping.is_set():
+            try:
+                batch = self._queue.get(timeout=0.5)
+            except queue_module.Empty:
+                continue
+            except (EOFError, OSError):
+                break
+            if not self._blocking:
+                loop.call_soon_threadsafe(self.dispatch, batch)
+                continue
+            # 等主循环把这一批放进管道再取下一批, 背压经有界队列传回子进程
+            future = asyncio.run_coroutine_threadsafe(self.dispatch(batch), loop)
+            while not self._stopping.is_set():
+                try:
+                    future.result(timeout=0.5)
+                except concurrent.futures.TimeoutError:
+                    continue
+                except Exception as e:
+                    logger.error("分片事件分发失败: %r", e)
+                break
+
+    async def run(self):
+        """启动所有工作进程并守护, 直到被取消"""
+        loop = asyncio.get_running_loop()
+        for index in range(len(self._assignments)):
+            self._spawn(index)
+        pump = threading.Thread(target=self._pump, args=(loop,), name="shard-pump", daemon=True)
+        pump.start()
+        try:
+            while True:
+                await asyncio.sleep(5)
+                for index, process in enumerate(self._processes):
+                    if not process.is_alive():
+                        logger.warning("⚠️ 分片工作进程 #%s 已退出 (退出码: %s)，正在重启", index, process.exitcode)
+                        self.restarts += 1
+                        self._spawn(index)
+        finally:
+            self._stopping.set()
+            for process in self._processes:
+                if process is not None and process.is_alive():
+                    process.terminate()
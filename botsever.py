@@ -1,4 +1,5 @@
 import os
+import logging
 import requests
 from flask import Flask, request, jsonify
 import json
@@ -10,8 +11,25 @@ from datetime import datetime, timedelta
 from collections import defaultdict
 from typing import Optional
 
+import tg_delivery
+import alert_store
+import http_client
+from work_queue import WorkQueue
+from keyword_matcher import KeywordFileWatcher, KeywordMatcher
+from counters import CounterGroup, RingLog, counter_property
+from health_probe import HealthProber
+import worker_stats
+import metrics
+import structured_log
+from structured_log import LazyJson
+
 app = Flask(__name__)
 
+# 热路径日志: 交给 structured_log 的后台线程写出, 不在请求线程里同步写 stdout
+logger = logging.getLogger("botsever")
+# 逐条推文的调试日志 (原始数据 / 忽略原因), 由 LOG_TWEET_DEBUG 控制, 生产环境默认关闭
+tweet_log = logging.getLogger("botsever.tweets")
+
 # ==========================================
 # 0. Twitter 监控日志系统
 # ==========================================
@@ -20,50 +38,72 @@ app = Flask(__name__)
 class TwitterLogger:
     """Twitter 关键词日志 - 监控 Twitter 相关接口的联通性和功能性"""
 
-    def __init__(self):
+    # 计数器由多个请求线程并发更新, 统一放在加锁的 CounterGroup 中
+    COUNTERS = (
+        "webhook_requests",
+        "webhook_success",
+        "webhook_error",
+        "webhook_ignored",
+        "keyword_matched",
+        "keyword_not_matched",
+        "tweet_parsed_success",
+        "tweet_parsed_error",
+        "forward_telegram_success",
+        "forward_telegram_error",
+    )
+
+    webhook_requests = counter_property("webhook_requests")
+    webhook_success = counter_property("webhook_success")
+    webhook_error = counter_property("webhook_error")
+    webhook_ignored = counter_property("webhook_ignored")
+    keyword_matched = counter_property("keyword_matched")
+    keyword_not_matched = counter_property("keyword_not_matched")
+    tweet_parsed_success = counter_property("tweet_parsed_success")
+    tweet_parsed_error = counter_property("tweet_parsed_error")
+    forward_telegram_success = counter_property("forward_telegram_success")
+    forward_telegram_error = counter_property("forward_telegram_error")
+
+    def __init__(self, max_queue_size: int = 100):
         self.start_time = datetime.now()
-        self.webhook_requests = 0
-        self.webhook_success = 0
-        self.webhook_error = 0
-        self.webhook_ignored = 0
+        self.counters = CounterGroup(self.COUNTERS)
 
         # 关键词匹配统计
-        self.keyword_matched = 0
-        self.keyword_not_matched = 0
         self.matched_keywords = set()
+        self._keywords_lock = threading.Lock()
 
         # Twitter API 连通性
         self.twitter_api_status = None  # None=未知, True=正常, False=异常
         self.last_twitter_api_check: Optional[datetime] = None
 
         # 推文解析
-        self.tweet_parsed_success = 0
-        self.tweet_parsed_error = 0
         self.last_tweet_time: Optional[datetime] = None
         self.last_error_msg: Optional[str] = None
 
-        # Telegram 转发
-        self.forward_telegram_success = 0
-        self.forward_telegram_error = 0
+        # 消息队列（用于日志追踪）: 固定容量环形缓冲
+        self.recent_logs = RingLog(max_queue_size)
+
+    @property
+    def max_queue_size(self) -> int:
+        return self.recent_logs.capacity
 
-        # 消息队列（用于日志追踪）
-        self.message_queue: list = []
-        self.max_queue_size = 100
+    @property
+    def message_queue(self) -> list:
+        """最近日志的列表快照 (旧到新)"""
+        return self.recent_logs.recent()
 
     def log_webhook_request(
         self, endpoint: str, success: bool, error_msg: Optional[str] = None
     ):
         """记录 Webhook 请求"""
-        self.webhook_requests += 1
         if success:
-            self.webhook_success += 1
+            self.counters.inc("webhook_requests", "webhook_success")
         else:
-            self.webhook_error += 1
+            self.counters.inc("webhook_requests", "webhook_error")
             self.last_error_msg = error_msg
 
     def log_webhook_ignored(self, reason: str):
         """记录被忽略的 Webhook 请求"""
-        self.webhook_ignored += 1
+        self.counters.inc("webhook_ignored")
         self._add_to_queue(
             {"time": datetime.now().isoformat(), "type": "ignored", "reason": reason}
         )
@@ -71,28 +111,29 @@ class TwitterLogger:
     def log_keyword_match(self, keyword: str, matched: bool):
         """记录关键词匹配"""
         if matched:
-            self.keyword_matched += 1
-            self.matched_keywords.add(keyword)
+            self.counters.inc("keyword_matched")
+            with self._keywords_lock:
+                self.matched_keywords.add(keyword)
         else:
-            self.keyword_not_matched += 1
+            self.counters.inc("keyword_not_matched")
 
     def log_tweet_parsed(
         self, success: bool, tweet_user: str, error_msg: Optional[str] = None
     ):
         """记录推文解析结果"""
         if success:
-            self.tweet_parsed_success += 1
+            self.counters.inc("tweet_parsed_success")
             self.last_tweet_time = datetime.now()
         else:
-            self.tweet_parsed_error += 1
+            self.counters.inc("tweet_parsed_error")
             self.last_error_msg = error_msg
 
     def log_telegram_forward(self, success: bool, error_msg: Optional[str] = None):
         """记录 Telegram 转发结果"""
         if success:
-            self.forward_telegram_success += 1
+            self.counters.inc("forward_telegram_success")
         else:
-            self.forward_telegram_error += 1
+            self.counters.inc("forward_telegram_error")
             self.last_error_msg = error_msg
 
     def log_twitter_api_check(self, status: bool):
@@ -101,40 +142,41 @@ class TwitterLogger:
         self.last_twitter_api_check = datetime.now()
 
     def _add_to_queue(self, entry: dict):
-        """添加日志到消息队列"""
-        self.message_queue.append(entry)
-        if len(self.message_queue) > self.max_queue_size:
-            self.message_queue.pop(0)
+        """添加日志到消息队列 (满了自动丢弃最旧的)"""
+        self.recent_logs.append(entry)
 
     def get_status_report(self) -> dict:
         """获取 Twitter 监控状态报告"""
         uptime_seconds = (datetime.now() - self.start_time).total_seconds()
         uptime = self._format_uptime(uptime_seconds)
+        c = self.counters.snapshot()
+        with self._keywords_lock:
+            matched_keywords = list(self.matched_keywords)
 
         return {
-            "status": "healthy" if self.webhook_error == 0 else "degraded",
+            "status": "healthy" if c["webhook_error"] == 0 else "degraded",
             "uptime": uptime,
             "uptime_seconds": uptime_seconds,
             "webhook": {
-                "total_requests": self.webhook_requests,
-                "success": self.webhook_success,
-                "errors": self.webhook_error,
-                "ignored": self.webhook_ignored,
-                "success_rate": f"{(self.webhook_success / self.webhook_requests * 100) if self.webhook_requests > 0 else 0:.1f}%",
+                "total_requests": c["webhook_requests"],
+                "success": c["webhook_success"],
+                "errors": c["webhook_error"],
+                "ignored": c["webhook_ignored"],
+                "success_rate": f"{(c['webhook_success'] / c['webhook_requests'] * 100) if c['webhook_requests'] > 0 else 0:.1f}%",
             },
             "keyword_matching": {
-                "matched": self.keyword_matched,
-                "not_matched": self.keyword_not_matched,
-                "unique_keywords": len(self.matched_keywords),
-                "matched_keywords": list(self.matched_keywords),
+                "matched": c["keyword_matched"],
+                "not_matched": c["keyword_not_matched"],
+                "unique_keywords": len(matched_keywords),
+                "matched_keywords": matched_keywords,
             },
             "tweet_parsing": {
-                "success": self.tweet_parsed_success,
-                "errors": self.tweet_parsed_error,
+                "success": c["tweet_parsed_success"],
+                "errors": c["tweet_parsed_error"],
             },
             "telegram_forward": {
-                "success": self.forward_telegram_success,
-                "errors": self.forward_telegram_error,
+                "success": c["forward_telegram_success"],
+                "errors": c["forward_telegram_error"],
             },
             "twitter_api": {
                 "status": self.twitter_api_status,
@@ -153,7 +195,7 @@ class TwitterLogger:
                 if self.last_error_msg
                 else None,
             },
-            "recent_logs": self.message_queue[-20:] if self.message_queue else [],
+            "recent_logs": self.recent_logs.recent(20),
         }
 
     def _format_uptime(self, seconds: float) -> str:
@@ -229,18 +271,30 @@ def _twitter_log(message: str) -> str:
 class MonitorLogger:
     """监控日志记录器 - 追踪接口联通性和功能性"""
 
+    COUNTERS = (
+        "request_count",
+        "success_count",
+        "error_count",
+        "telegram_success_count",
+        "telegram_error_count",
+        "webhook_received_count",
+        "webhook_ignored_count",
+    )
+
+    request_count = counter_property("request_count")
+    success_count = counter_property("success_count")
+    error_count = counter_property("error_count")
+    telegram_success_count = counter_property("telegram_success_count")
+    telegram_error_count = counter_property("telegram_error_count")
+    webhook_received_count = counter_property("webhook_received_count")
+    webhook_ignored_count = counter_property("webhook_ignored_count")
+
     def __init__(self):
         self.start_time = datetime.now()
-        self.request_count = 0
-        self.success_count = 0
-        self.error_count = 0
+        self.counters = CounterGroup(self.COUNTERS)
         self.last_request_time: Optional[datetime] = None
         self.last_error_time: Optional[datetime] = None
         self.last_error_msg: Optional[str] = None
-        self.telegram_success_count = 0
-        self.telegram_error_count = 0
-        self.webhook_received_count = 0
-        self.webhook_ignored_count = 0
 
         # 接口健康状态 (True=健康, False=不健康)
         self.interface_status = {
@@ -253,14 +307,13 @@ class MonitorLogger:
         self, endpoint: str, success: bool, error_msg: Optional[str] = None
     ):
         """记录请求日志"""
-        self.request_count += 1
         self.last_request_time = datetime.now()
 
         if success:
-            self.success_count += 1
+            self.counters.inc("request_count", "success_count")
             self.interface_status["webhook_endpoint"] = True
         else:
-            self.error_count += 1
+            self.counters.inc("request_count", "error_count")
             self.last_error_time = datetime.now()
             self.last_error_msg = error_msg
             self.interface_status["webhook_endpoint"] = False
@@ -268,10 +321,10 @@ class MonitorLogger:
     def log_telegram_result(self, success: bool, error_msg: Optional[str] = None):
         """记录 Telegram 发送结果"""
         if success:
-            self.telegram_success_count += 1
+            self.counters.inc("telegram_success_count")
             self.interface_status["telegram_api"] = True
         else:
-            self.telegram_error_count += 1
+            self.counters.inc("telegram_error_count")
             self.last_error_time = datetime.now()
             self.last_error_msg = error_msg
             self.interface_status["telegram_api"] = False
@@ -279,9 +332,9 @@ class MonitorLogger:
     def log_webhook_received(self, ignored: bool = False):
         """记录 Webhook 接收"""
         if ignored:
-            self.webhook_ignored_count += 1
+            self.counters.inc("webhook_ignored_count")
         else:
-            self.webhook_received_count += 1
+            self.counters.inc("webhook_received_count")
 
     def get_uptime(self) -> str:
         """获取运行时间"""
@@ -293,20 +346,21 @@ class MonitorLogger:
     def get_status_report(self) -> dict:
         """获取状态报告"""
         uptime_seconds = (datetime.now() - self.start_time).total_seconds()
+        c = self.counters.snapshot()
 
         return {
-            "status": "healthy" if self.error_count == 0 else "degraded",
+            "status": "healthy" if c["error_count"] == 0 else "degraded",
             "uptime": self.get_uptime(),
             "uptime_seconds": uptime_seconds,
             "metrics": {
-                "total_requests": self.request_count,
-                "successful_requests": self.success_count,
-                "failed_requests": self.error_count,
-                "success_rate": f"{(self.success_count / self.request_count * 100) if self.request_count > 0 else 0:.1f}%",
-                "telegram_success": self.telegram_success_count,
-                "telegram_errors": self.telegram_error_count,
-                "webhook_received": self.webhook_received_count,
-                "webhook_ignored": self.webhook_ignored_count,
+                "total_requests": c["request_count"],
+                "successful_requests": c["success_count"],
+                "failed_requests": c["error_count"],
+                "success_rate": f"{(c['success_count'] / c['request_count'] * 100) if c['request_count'] > 0 else 0:.1f}%",
+                "telegram_success": c["telegram_success_count"],
+                "telegram_errors": c["telegram_error_count"],
+                "webhook_received": c["webhook_received_count"],
+                "webhook_ignored": c["webhook_ignored_count"],
             },
             "interface_status": self.interface_status,
             "last_request": self.last_request_time.isoformat()
@@ -324,17 +378,17 @@ class MonitorLogger:
         }
 
     def log_health_check(self):
-        """执行健康检查并记录"""
+        """执行健康检查并记录 (由后台健康探测定期调用), 返回 (是否正常, 说明)"""
         # 检查 Telegram API
         try:
-            url = f"https://api.telegram.org/bot{BOT_TOKEN}/getMe"
-            resp = requests.get(url, timeout=5)
-            if resp.status_code == 200:
-                self.interface_status["telegram_api"] = True
-            else:
-                self.interface_status["telegram_api"] = False
+            url = f"{tg_delivery.TELEGRAM_API_BASE}/bot{BOT_TOKEN}/getMe"
+            resp = http.get(url, timeout=5)
+            ok = resp.status_code == 200
+            self.interface_status["telegram_api"] = ok
+            return ok, f"HTTP {resp.status_code}"
         except Exception as e:
             self.interface_status["telegram_api"] = False
+            return False, repr(e)
 
     def print_status(self):
         """打印当前状态"""
@@ -392,7 +446,7 @@ class TelegramConnectivityTester:
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         test_message = self.TEST_MESSAGE.format(timestamp=timestamp)
 
-        url = f"https://api.telegram.org/bot{BOT_TOKEN}/sendMessage"
+        url = f"{tg_delivery.TELEGRAM_API_BASE}/bot{BOT_TOKEN}/sendMessage"
         payload = {
             "chat_id": TG_CHAT_ID,
             "text": test_message,
@@ -403,7 +457,7 @@ class TelegramConnectivityTester:
             payload["message_thread_id"] = TOPIC_ID
 
         try:
-            response = requests.post(url, json=payload, timeout=10)
+            response = http.post(url, json=payload, timeout=10)
             resp_data = response.json()
 
             if response.status_code == 200 and resp_data.get("ok"):
@@ -474,9 +528,35 @@ TOPIC_ID = int(os.environ.get("BOTSEVER_TOPIC_ID", "13"))
 # Webhook 监听路径
 ROUTE_PATH = os.environ.get("WEBHOOK_ROUTE_PATH", "/twitter-webhook")
 
+# 单条 Telegram 发送的最长等待时间 (秒)
+TELEGRAM_SEND_TIMEOUT = float(os.environ.get("TELEGRAM_SEND_TIMEOUT", "30"))
+
+# Telegram 统一投递服务 (限速 / 重试 / 合并发送)
+delivery = tg_delivery.get_delivery()
+
+# 同步请求 (联通性测试 / 健康探测) 共用的连接池客户端
+http = http_client.get_client()
+
+# 报警历史 (所有监控写入同一个 SQLite 文件, /alerts 查询)
+alerts = alert_store.get_store()
+
+# 接收即返回模式: 请求只做校验和入队, 立即返回 202, 由工作线程处理
+WEBHOOK_ASYNC = os.environ.get("WEBHOOK_ASYNC", "0").lower() in ("1", "true", "yes")
+WEBHOOK_WORKERS = int(os.environ.get("WEBHOOK_WORKERS", "4"))
+# 0 = 不设上限 (不再返回 503, 健康检查也不按容量判断)
+WEBHOOK_QUEUE_SIZE = max(0, int(os.environ.get("WEBHOOK_QUEUE_SIZE", "1000")))
+
 # 初始端口号 (Replit部署强制使用5000端口)
 START_PORT = 5000
 
+# 健康探测: 后台刷新依赖状态的间隔 / 深度检查 (/health?deep=1) 的最小间隔 (秒)
+HEALTH_CHECK_INTERVAL = float(os.environ.get("HEALTH_CHECK_INTERVAL", "60"))
+HEALTH_DEEP_MIN_INTERVAL = float(os.environ.get("HEALTH_DEEP_MIN_INTERVAL", "10"))
+
+# 逐条推文的调试日志开关 (每个请求 / 每条推文都会输出, 只在排查问题时打开)
+LOG_TWEET_DEBUG = os.environ.get("LOG_TWEET_DEBUG", "0").lower() in ("1", "true", "yes")
+tweet_log.setLevel(logging.DEBUG if LOG_TWEET_DEBUG else logging.INFO)
+
 # ======================= 验证配置 =======================
 CONFIG_VALID = True
 if not os.environ.get("TELEGRAM_BOT_TOKEN"):
@@ -518,37 +598,27 @@ def send_to_telegram(message):
         monitor.log_telegram_result(False, "BOT_TOKEN 未设置")
         return False
 
-    url = f"https://api.telegram.org/bot{BOT_TOKEN}/sendMessage"
-
-    payload = {
-        "chat_id": TG_CHAT_ID,
-        "text": message,
-        "parse_mode": "HTML",
-        "disable_web_page_preview": False,
-    }
-
-    if TOPIC_ID:
-        payload["message_thread_id"] = TOPIC_ID
-
     try:
-        response = requests.post(url, json=payload)
-        resp_data = response.json()
-
-        if response.status_code == 200 and resp_data.get("ok"):
-            print("[成功] 消息已推送到 Telegram")
-            monitor.log_telegram_result(True)
-            return True
-        else:
-            error_msg = str(resp_data)
-            print(f"[失败] Telegram API 报错: {resp_data}")
-            monitor.log_telegram_result(False, error_msg)
-            return False
+        success = delivery.send_sync(
+            message,
+            thread_id=TOPIC_ID,
+            disable_web_page_preview=False,
+            timeout=TELEGRAM_SEND_TIMEOUT,
+        )
     except Exception as e:
         error_msg = str(e)
-        print(f"[异常] 发送 Telegram 失败: {e}")
+        logger.error("[异常] 发送 Telegram 失败: %s", e)
         monitor.log_telegram_result(False, error_msg)
         return False
 
+    if success:
+        logger.info("[成功] 消息已推送到 Telegram")
+        monitor.log_telegram_result(True)
+        return True
+    logger.warning("[失败] Telegram 投递失败 (详见投递服务日志)")
+    monitor.log_telegram_result(False, "Telegram 投递失败")
+    return False
+
 
 # ==========================================
 # 4. Webhook 接收服务 + 监控端点
@@ -567,29 +637,64 @@ def index():
                 "webhook": "/twitter-webhook",
                 "health": "/health",
                 "status": "/status",
+                "alerts": "/alerts",
             },
         }
     )
 
 
+def _check_webhook_queue():
+    """Webhook 队列积压不超过容量的 90% (不设上限时只报告深度)"""
+    depth = webhook_queue.depth()
+    if WEBHOOK_QUEUE_SIZE <= 0:
+        return True, f"{depth}/unbounded"
+    return depth < WEBHOOK_QUEUE_SIZE * 0.9, f"{depth}/{WEBHOOK_QUEUE_SIZE}"
+
+
+# 依赖状态由后台线程定期刷新, /health 只读缓存
+health_prober = HealthProber(
+    {
+        "telegram_api": monitor.log_health_check,
+        "webhook_queue": _check_webhook_queue,
+    },
+    interval=HEALTH_CHECK_INTERVAL,
+    min_interval=HEALTH_DEEP_MIN_INTERVAL,
+)
+
+
 @app.route("/health", methods=["GET"])
 def health_check():
-    """健康检查端点 - 返回服务状态"""
-    monitor.log_health_check()
+    """
+    健康检查端点 - 返回服务状态和缓存的依赖检查结果
+
+    默认不访问任何外部接口; ?deep=1 时立即重新检查 (受 HEALTH_DEEP_MIN_INTERVAL 限制),
+    依赖异常时返回 503。
+    """
+    # 首次请求时启动后台探测 (多 worker 部署时每个 worker 各一个)
+    health_prober.start()
+    deep = request.args.get("deep", "").lower() in ("1", "true", "yes")
+    report = health_prober.run(force=False) if deep else health_prober.snapshot()
+    status = "degraded" if report["status"] == "degraded" else "healthy"
     return jsonify(
         {
-            "status": "healthy",
+            "status": status,
             "timestamp": datetime.now().isoformat(),
             "service": "botsever",
             "port": START_PORT,
+            "dependencies": report,
         }
-    )
+    ), 503 if deep and status == "degraded" else 200
 
 
 @app.route("/status", methods=["GET"])
 def status_check():
     """状态检查端点 - 返回详细监控数据"""
-    return jsonify(monitor.get_status_report())
+    reports = collect_reports()
+    report = reports["monitor"]
+    report["webhook_queue"] = reports["webhook_queue"]
+    if "workers" in reports:
+        report["workers"] = reports["workers"]
+    return jsonify(report)
 
 
 @app.route("/status/print", methods=["GET"])
@@ -602,9 +707,11 @@ def status_print():
 @app.route("/metrics", methods=["GET"])
 def metrics_check():
     """指标端点 - 返回 Prometheus 格式指标"""
-    report = monitor.get_status_report()
-    twitter_report = twitter_logger.get_status_report()
-    metrics = [
+    reports = collect_reports()
+    report = reports["monitor"]
+    twitter_report = reports["twitter"]
+    queue_report = reports["webhook_queue"]
+    lines = [
         f"# HELP botsever_uptime_seconds 服务运行时间（秒）",
         f"# TYPE botsever_uptime_seconds gauge",
         f"botsever_uptime_seconds {report['uptime_seconds']}",
@@ -639,8 +746,26 @@ def metrics_check():
         f"# HELP twitter_forward_success_total Telegram转发成功次数",
         f"# TYPE twitter_forward_success_total counter",
         f"twitter_forward_success_total {twitter_report['telegram_forward']['success']}",
+        # Webhook 工作队列指标
+        f"# HELP botsever_webhook_queue_depth Webhook队列当前深度",
+        f"# TYPE botsever_webhook_queue_depth gauge",
+        f"botsever_webhook_queue_depth {queue_report['depth']}",
+        f"# HELP botsever_webhook_queue_enqueued_total Webhook入队次数",
+        f"# TYPE botsever_webhook_queue_enqueued_total counter",
+        f"botsever_webhook_queue_enqueued_total {queue_report['enqueued']}",
+        f"# HELP botsever_webhook_queue_rejected_total 队列已满被拒绝的请求数",
+        f"# TYPE botsever_webhook_queue_rejected_total counter",
+        f"botsever_webhook_queue_rejected_total {queue_report['rejected']}",
+        f"# HELP botsever_webhook_queue_wait_avg_ms Webhook平均排队延迟（毫秒）",
+        f"# TYPE botsever_webhook_queue_wait_avg_ms gauge",
+        f"botsever_webhook_queue_wait_avg_ms {queue_report['queue_wait']['avg_ms']}",
+        f"# HELP botsever_webhook_handle_avg_ms Webhook平均处理耗时（毫秒）",
+        f"# TYPE botsever_webhook_handle_avg_ms gauge",
+        f"botsever_webhook_handle_avg_ms {queue_report['handle_time']['avg_ms']}",
     ]
-    return "\n".join(metrics), 200, {"Content-Type": "text/plain"}
+    # 指标注册表 (多进程时包含 main.py 启动的全部监控进程)
+    lines.append(metrics.render_all())
+    return "\n".join(lines), 200, {"Content-Type": "text/plain"}
 
 
 # ==========================================
@@ -663,7 +788,7 @@ def telegram_connectivity_test():
 @app.route("/twitter/status", methods=["GET"])
 def twitter_status_check():
     """Twitter 监控状态检查端点"""
-    return jsonify(twitter_logger.get_status_report())
+    return jsonify(collect_reports()["twitter"])
 
 
 @app.route("/twitter/status/print", methods=["GET"])
@@ -673,13 +798,53 @@ def twitter_status_print():
     return jsonify({"status": "printed", "message": "Twitter 状态已打印到控制台"})
 
 
+@app.route("/twitter/keywords", methods=["GET"])
+def twitter_keywords():
+    """当前生效的监控关键词"""
+    return jsonify({
+        "count": len(keyword_matcher),
+        "word_boundary": keyword_matcher.word_boundary,
+        "source": TWITTER_KEYWORDS_FILE or "TWITTER_KEYWORDS",
+        "keywords": keyword_matcher.keywords,
+    })
+
+
 @app.route("/twitter/logs", methods=["GET"])
 def twitter_logs():
     """Twitter 日志查询端点"""
-    logs = twitter_logger.message_queue[-50:]
+    logs = twitter_logger.recent_logs.recent(50)
     return jsonify({"count": len(logs), "logs": logs})
 
 
+@app.route("/alerts", methods=["GET"])
+def alerts_query():
+    """
+    报警历史查询 (所有监控), 按时间倒序分页
+
+    参数: since / until (unix 秒、毫秒或 ISO 时间), source, symbol, type, delivered (0/1),
+    limit (默认 100, 最大 1000), cursor (上一页返回的 next_cursor)
+    """
+    if not alerts.enabled:
+        return jsonify({"status": "disabled", "msg": "ALERT_STORE_PATH 未配置"}), 503
+    args = request.args
+    delivered = args.get("delivered", "")
+    try:
+        result = alerts.query(
+            since=alert_store.parse_time(args.get("since")),
+            until=alert_store.parse_time(args.get("until")),
+            source=args.get("source") or None,
+            symbol=args.get("symbol") or None,
+            alert_type=args.get("type") or None,
+            delivered=None if delivered == "" else delivered.lower() in ("1", "true", "yes"),
+            limit=int(args.get("limit", "100")),
+            cursor=args.get("cursor") or None,
+        )
+    except ValueError as e:
+        return jsonify({"status": "error", "msg": str(e)}), 400
+    result["count"] = len(result["alerts"])
+    return jsonify(result)
+
+
 # ==========================================
 # 6. Twitter 关键词配置
 # ==========================================
@@ -691,16 +856,37 @@ TWITTER_KEYWORDS = (
     .split(",")
 )
 
+# 默认子串匹配 (与原行为一致); 设为 1 启用整词匹配, 关键词两侧不能紧挨英文字母/数字 ("eth" 不命中 "together")
+TWITTER_KEYWORD_WORD_BOUNDARY = os.environ.get("TWITTER_KEYWORD_WORD_BOUNDARY", "0").lower() in ("1", "true", "yes")
+
+# 可选关键词文件 (逗号或换行分隔), 修改后自动热加载, 优先于 TWITTER_KEYWORDS
+TWITTER_KEYWORDS_FILE = os.environ.get("TWITTER_KEYWORDS_FILE", "")
+
+# 预编译的关键词匹配器, 一次扫描返回全部命中
+keyword_matcher = KeywordMatcher(TWITTER_KEYWORDS, word_boundary=TWITTER_KEYWORD_WORD_BOUNDARY)
+keyword_watcher = (
+    KeywordFileWatcher(keyword_matcher, TWITTER_KEYWORDS_FILE) if TWITTER_KEYWORDS_FILE else None
+)
+if keyword_watcher:
+    keyword_watcher.check(force=True)
+
 
 # ==========================================
 # 7. Webhook 处理函数
 # ==========================================
 
+WEBHOOK_SECONDS = metrics.REGISTRY.histogram(
+    "botsever_webhook_process_seconds", "Webhook 推文解析/匹配/转发耗时（秒）", ["mode"]
+)
+KEYWORD_MATCHES = metrics.REGISTRY.counter(
+    "twitter_keyword_hits_total", "各关键词命中次数", ["keyword"]
+)
+
 
 @app.route(ROUTE_PATH, methods=["POST"])
 def handle_twitter_webhook():
     """处理 TwitterAPI.io Webhook 请求 (基于官方文档格式)"""
-    print(_twitter_log(f"[系统] 收到 Webhook 请求: {ROUTE_PATH}"))
+    tweet_log.debug("[系统] 收到 Webhook 请求: %s", ROUTE_PATH)
     monitor.log_request(ROUTE_PATH, True)
     twitter_logger.log_webhook_request(ROUTE_PATH, True)
 
@@ -708,7 +894,7 @@ def handle_twitter_webhook():
     expected_api_key = os.environ.get("TWITTER_API_KEY", "")
     received_api_key = request.headers.get("X-API-Key", "")
     if expected_api_key and received_api_key != expected_api_key:
-        print(_twitter_log("[安全] API Key 验证失败"))
+        logger.warning("[安全] API Key 验证失败")
         return jsonify({"status": "error", "msg": "Unauthorized"}), 401
 
     # 2. 获取数据
@@ -718,106 +904,193 @@ def handle_twitter_webhook():
 
     # 🚨 握手/测试请求处理
     if not data:
-        print(_twitter_log("[握手/测试] 收到空数据，返回 200 以通过验证"))
+        logger.info("[握手/测试] 收到空数据，返回 200 以通过验证")
         monitor.log_webhook_received(ignored=True)
         twitter_logger.log_webhook_ignored("handshake/empty_data")
         return jsonify({"status": "success", "msg": "Handshake received"}), 200
 
-    print(_twitter_log(f"收到原始数据: {json.dumps(data, ensure_ascii=False)[:500]}..."))
+    # 原始数据只在输出时才序列化 (LOG_TWEET_DEBUG 关闭时完全不序列化)
+    tweet_log.debug("收到原始数据: %s", LazyJson(data, 500))
     monitor.log_webhook_received(ignored=False)
 
+    # 3. 接收即返回模式: 入队后立即响应 202, 由工作线程解析/匹配/转发
+    if WEBHOOK_ASYNC:
+        if not webhook_queue.submit(data):
+            logger.warning("[繁忙] Webhook 队列已满, 拒绝请求")
+            monitor.log_request(ROUTE_PATH, False, "queue_full")
+            return jsonify({"status": "busy", "msg": "queue full"}), 503
+        return jsonify({"status": "accepted", "queued": webhook_queue.depth()}), 202
+
     try:
-        # 3. 解析 TwitterAPI.io 格式
-        event_type = data.get("event_type", "tweet")
-        rule_tag = data.get("rule_tag", "unknown")
-        tweets = data.get("tweets", [])
-        
-        # 兼容旧格式：如果没有 tweets 数组，将整个 data 作为单条推文
-        if not tweets and data.get("text") or data.get("content"):
-            tweets = [data]
-        
-        if not tweets:
-            print(_twitter_log("[忽略] 没有推文数据"))
-            twitter_logger.log_webhook_ignored("no_tweets")
-            return jsonify({"status": "ignored", "reason": "no_tweets"}), 200
-
-        processed_count = 0
-        for tweet in tweets:
-            # 解析推文字段
-            tweet_id = tweet.get("id", "")
-            tweet_text = tweet.get("text", tweet.get("content", tweet.get("full_text", "")))
-            
-            # 解析作者信息
-            author = tweet.get("author", {})
-            if isinstance(author, dict):
-                tweet_user = author.get("username", author.get("name", "未知用户"))
-                user_display = f"@{tweet_user}" if tweet_user != "未知用户" else tweet_user
-            else:
-                tweet_user = str(author) if author else tweet.get("user", "未知用户")
-                user_display = tweet_user
-            
-            # 构建推文链接
-            if tweet_id and tweet_user != "未知用户":
-                tweet_link = f"https://twitter.com/{tweet_user}/status/{tweet_id}"
-            else:
-                tweet_link = tweet.get("link", tweet.get("url", tweet.get("tweet_url", "")))
-            
-            # 获取统计数据
-            retweet_count = tweet.get("retweet_count", 0)
-            like_count = tweet.get("like_count", 0)
-            reply_count = tweet.get("reply_count", 0)
-            created_at = tweet.get("created_at", "")
-
-            twitter_logger.log_tweet_parsed(True, tweet_user)
-
-            if not tweet_text:
-                print(_twitter_log(f"[忽略] 推文 {tweet_id} 无内容"))
-                continue
-
-            # 4. 关键词匹配
-            text_lower = tweet_text.lower()
-            matched_keyword = None
-            for keyword in TWITTER_KEYWORDS:
-                keyword = keyword.strip()
-                if keyword and keyword.lower() in text_lower:
-                    matched_keyword = keyword
-                    print(_twitter_log(f"[关键词匹配] '{keyword}' 匹配成功"))
-                    twitter_logger.log_keyword_match(keyword, True)
-                    break
-
-            if not matched_keyword:
-                print(_twitter_log(f"[忽略] 推文不包含监控关键词"))
-                twitter_logger.log_keyword_match("none", False)
-                continue
-
-            # 5. 拼接消息
-            stats_line = ""
-            if retweet_count or like_count or reply_count:
-                stats_line = f"\n📊 转发: {retweet_count} | 点赞: {like_count} | 回复: {reply_count}"
-            
-            tg_message = (
-                f"🚨 <b>新推文提醒</b> [{rule_tag}]\n\n"
-                f"👤 <b>用户:</b> {user_display}\n"
-                f"📝 <b>内容:</b> {tweet_text}{stats_line}\n\n"
-                f"🔗 <a href='{tweet_link}'>点击查看推文</a>"
-            )
+        with WEBHOOK_SECONDS.labels("sync").time():
+            result = process_webhook_payload(data)
+        return jsonify(result), 200
+    except Exception as e:
+        logger.error("[出错] 处理数据异常: %s", e)
+        monitor.log_request(ROUTE_PATH, False, str(e))
+        return jsonify({"status": "error", "msg": str(e)}), 200
+
+
+def process_webhook_payload(data: dict) -> dict:
+    """解析 TwitterAPI.io 推送数据, 匹配关键词并转发到 Telegram, 返回处理结果"""
+    if keyword_watcher and keyword_watcher.check():
+        logger.info("[关键词] 已热加载 %s 个关键词", len(keyword_matcher))
+
+    event_type = data.get("event_type", "tweet")
+    rule_tag = data.get("rule_tag", "unknown")
+    tweets = data.get("tweets", [])
+
+    # 兼容旧格式：如果没有 tweets 数组，将整个 data 作为单条推文
+    if not tweets and data.get("text") or data.get("content"):
+        tweets = [data]
+
+    if not tweets:
+        tweet_log.debug("[忽略] 没有推文数据")
+        twitter_logger.log_webhook_ignored("no_tweets")
+        return {"status": "ignored", "reason": "no_tweets"}
+
+    processed_count = 0
+    for tweet in tweets:
+        # 解析推文字段
+        tweet_id = tweet.get("id", "")
+        tweet_text = tweet.get("text", tweet.get("content", tweet.get("full_text", "")))
+
+        # 解析作者信息
+        author = tweet.get("author", {})
+        if isinstance(author, dict):
+            tweet_user = author.get("username", author.get("name", "未知用户"))
+            user_display = f"@{tweet_user}" if tweet_user != "未知用户" else tweet_user
+        else:
+            tweet_user = str(author) if author else tweet.get("user", "未知用户")
+            user_display = tweet_user
+
+        # 构建推文链接
+        if tweet_id and tweet_user != "未知用户":
+            tweet_link = f"https://twitter.com/{tweet_user}/status/{tweet_id}"
+        else:
+            tweet_link = tweet.get("link", tweet.get("url", tweet.get("tweet_url", "")))
+
+        # 获取统计数据
+        retweet_count = tweet.get("retweet_count", 0)
+        like_count = tweet.get("like_count", 0)
+        reply_count = tweet.get("reply_count", 0)
+        created_at = tweet.get("created_at", "")
+
+        twitter_logger.log_tweet_parsed(True, tweet_user)
+
+        if not tweet_text:
+            tweet_log.debug("[忽略] 推文 %s 无内容", tweet_id)
+            continue
+
+        # 4. 关键词匹配 (一次扫描返回全部命中)
+        matched_keywords = keyword_matcher.find_all(tweet_text)
+        for keyword in matched_keywords:
+            logger.info("[关键词匹配] '%s' 匹配成功", keyword)
+            twitter_logger.log_keyword_match(keyword, True)
+            KEYWORD_MATCHES.labels(keyword).inc()
+
+        if not matched_keywords:
+            tweet_log.debug("[忽略] 推文不包含监控关键词")
+            twitter_logger.log_keyword_match("none", False)
+            continue
+
+        # 5. 拼接消息
+        stats_line = ""
+        if retweet_count or like_count or reply_count:
+            stats_line = f"\n📊 转发: {retweet_count} | 点赞: {like_count} | 回复: {reply_count}"
+
+        tg_message = (
+            f"🚨 <b>新推文提醒</b> [{rule_tag}]\n\n"
+            f"👤 <b>用户:</b> {user_display}\n"
+            f"🏷 <b>关键词:</b> {', '.join(matched_keywords)}\n"
+            f"📝 <b>内容:</b> {tweet_text}{stats_line}\n\n"
+            f"🔗 <a href='{tweet_link}'>点击查看推文</a>"
+        )
+
+        # 6. 发送到 Telegram
+        success = send_to_telegram(tg_message)
+        twitter_logger.log_telegram_forward(success)
+        alerts.record(
+            "botsever", "tweet", tg_message, symbol=tweet_user, delivered=success,
+            keywords=matched_keywords, tweet_id=tweet_id, rule_tag=rule_tag,
+        )
+        if success:
+            processed_count += 1
 
-            # 6. 发送到 Telegram
-            success = send_to_telegram(tg_message)
-            twitter_logger.log_telegram_forward(success)
-            if success:
-                processed_count += 1
+    return {
+        "status": "success",
+        "processed": processed_count,
+        "total": len(tweets)
+    }
 
-        return jsonify({
-            "status": "success", 
-            "processed": processed_count,
-            "total": len(tweets)
-        }), 200
 
+def _process_queued_payload(data: dict):
+    """工作线程入口: 异常计入请求失败后继续抛出, 由队列统计"""
+    try:
+        with WEBHOOK_SECONDS.labels("async").time():
+            process_webhook_payload(data)
     except Exception as e:
-        print(_twitter_log(f"[出错] 处理数据异常: {e}"))
+        logger.error("[出错] 处理数据异常: %s", e)
         monitor.log_request(ROUTE_PATH, False, str(e))
-        return jsonify({"status": "error", "msg": str(e)}), 200
+        raise
+
+
+# Webhook 工作队列 (WEBHOOK_ASYNC=1 时使用, 首次入队时启动工作线程)
+webhook_queue = WorkQueue(
+    _process_queued_payload,
+    workers=WEBHOOK_WORKERS,
+    maxsize=WEBHOOK_QUEUE_SIZE,
+    name="webhook",
+)
+
+
+# ==========================================
+# 8. 多 worker 统计汇总
+# ==========================================
+
+
+def local_reports() -> dict:
+    """本进程的监控数据快照"""
+    return {
+        "monitor": monitor.get_status_report(),
+        "twitter": twitter_logger.get_status_report(),
+        "webhook_queue": webhook_queue.metrics(),
+    }
+
+
+def _success_rate(success: int, total: int) -> str:
+    return f"{(success / total * 100) if total > 0 else 0:.1f}%"
+
+
+def collect_reports() -> dict:
+    """
+    监控数据: 单进程时为本进程快照;
+    多 worker 部署 (设置了 WORKER_STATS_DIR) 时汇总所有 worker, 并重新计算比率类字段
+    """
+    if not worker_stats.stats.enabled:
+        return local_reports()
+
+    reports = worker_stats.stats.aggregate("botsever")
+    monitor_report = reports["monitor"]
+    counts = monitor_report["metrics"]
+    counts["success_rate"] = _success_rate(counts["successful_requests"], counts["total_requests"])
+    monitor_report["status"] = "healthy" if counts["failed_requests"] == 0 else "degraded"
+    monitor_report["uptime"] = twitter_logger._format_uptime(monitor_report["uptime_seconds"])
+
+    twitter_report = reports["twitter"]
+    webhook = twitter_report["webhook"]
+    webhook["success_rate"] = _success_rate(webhook["success"], webhook["total_requests"])
+    twitter_report["status"] = "healthy" if webhook["errors"] == 0 else "degraded"
+    twitter_report["uptime"] = twitter_logger._format_uptime(twitter_report["uptime_seconds"])
+    keywords = list(dict.fromkeys(twitter_report["keyword_matching"]["matched_keywords"] or []))
+    twitter_report["keyword_matching"]["matched_keywords"] = keywords
+    twitter_report["keyword_matching"]["unique_keywords"] = len(keywords)
+    logs = sorted(twitter_report["recent_logs"] or [], key=lambda entry: entry.get("time", ""))
+    twitter_report["recent_logs"] = logs[-20:]
+    return reports
+
+
+worker_stats.stats.register("botsever", local_reports)
 
 
 # ==========================================
@@ -854,6 +1127,7 @@ def run_server():
 
 
 if __name__ == "__main__":
+    structured_log.setup_logging()
     # 直接运行时，也使用线程方式启动，保持一致性
     run_server()
     # 防止主线程立即退出
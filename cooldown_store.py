@@ -0,0 +1,206 @@
+"""
+带 TTL 和容量上限的冷却 / 去重表
+
+用于告警冷却 (同一挂单墙 5 分钟内只报一次) 以及其他需要"一段时间内不重复"的场景。
+
+- 同一个表内 TTL 固定, 因此按写入顺序排列即按过期时间排列;
+  过期清理只需从队头弹出, check_and_set 为均摊 O(1)
+- 超过 max_size 时淘汰最早过期的条目, 内存占用有硬上限
+- PersistentCooldownStore 额外写追加日志, 进程重启后不会重复告警
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Hashable, Optional
+
+
+class CooldownStore:
+    """按过期时间排序的冷却表"""
+
+    def __init__(
+        self,
+        ttl: float,
+        max_size: int = 100_000,
+        clock: Callable[[], float] = time.time,
+    ):
+        if ttl <= 0:
+            raise ValueError("ttl 必须大于 0")
+        if max_size < 1:
+            raise ValueError("max_size 至少为 1")
+        self.ttl = float(ttl)
+        self.max_size = max_size
+        self._clock = clock
+        # key -> 过期时间, 队头最早过期
+        self._expiry: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.evicted = 0
+        self.expired = 0
+
+    def _purge(self, now: float):
+        expiry = self._expiry
+        while expiry:
+            key, expires_at = next(iter(expiry.items()))
+            if expires_at > now:
+                break
+            expiry.popitem(last=False)
+            self.expired += 1
+
+    def _set(self, key: Hashable, now: float):
+        expiry = self._expiry
+        expiry[key] = now + self.ttl
+        expiry.move_to_end(key)
+        while len(expiry) > self.max_size:
+            expiry.popitem(last=False)
+            self.evicted += 1
+
+    def check_and_set(self, key: Hashable, now: Optional[float] = None) -> bool:
+        """
+        检查 key 是否处于冷却期; 不在冷却期则记录并返回 True
+
+        Returns:
+            bool: True 表示允许本次操作 (已开始新的冷却期), False 表示应被抑制
+        """
+        with self._lock:
+            now = self._clock() if now is None else now
+            self._purge(now)
+            expires_at = self._expiry.get(key)
+            if expires_at is not None and expires_at > now:
+                return False
+            self._set(key, now)
+            return True
+
+    def add(self, key: Hashable, now: Optional[float] = None):
+        """记录 key (已存在时刷新冷却期)"""
+        with self._lock:
+            now = self._clock() if now is None else now
+            self._purge(now)
+            self._set(key, now)
+
+    def remaining(self, key: Hashable, now: Optional[float] = None) -> float:
+        """剩余冷却秒数, 不在冷却期返回 0"""
+        with self._lock:
+            now = self._clock() if now is None else now
+            expires_at = self._expiry.get(key)
+            return max(0.0, expires_at - now) if expires_at is not None else 0.0
+
+    def expire(self, now: Optional[float] = None) -> int:
+        """主动清理已过期条目, 返回清理数量"""
+        with self._lock:
+            before = len(self._expiry)
+            self._purge(self._clock() if now is None else now)
+            return before - len(self._expiry)
+
+    def clear(self):
+        with self._lock:
+            self._expiry.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.remaining(key) > 0
+
+    def __len__(self) -> int:
+        return len(self._expiry)
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._expiry),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+            "expired": self.expired,
+            "evicted": self.evicted,
+        }
+
+
+class PersistentCooldownStore(CooldownStore):
+    """
+    写入追加日志的冷却表, 重启后恢复未过期的条目
+
+    日志每行一条 "key<TAB>过期时间"; 启动时顺序回放 (同一 key 以最后一行为准)。
+    日志行数超过存活条目数的 compact_ratio 倍时, 用当前条目重写日志。
+    key 以字符串形式保存, 不能包含制表符或换行。
+    """
+
+    def __init__(
+        self,
+        ttl: float,
+        path: str,
+        max_size: int = 100_000,
+        clock: Callable[[], float] = time.time,
+        compact_ratio: float = 2.0,
+        compact_min: int = 1024,
+    ):
+        super().__init__(ttl, max_size=max_size, clock=clock)
+        self.path = path
+        self.compact_ratio = compact_ratio
+        self.compact_min = compact_min
+        self._log_lines = 0
+        self._load()
+        self._log = open(path, "a", encoding="utf-8", buffering=1)
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        now = self._clock()
+        expiry = self._expiry
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                key, sep, expires_at = line.rstrip("\n").rpartition("\t")
+                if not sep:
+                    continue  # 崩溃时写了一半的行
+                try:
+                    expires_at = float(expires_at)
+                except ValueError:
+                    continue
+                self._log_lines += 1
+                if expires_at <= now:
+                    expiry.pop(key, None)
+                    continue
+                expiry[key] = expires_at
+                expiry.move_to_end(key)
+        while len(expiry) > self.max_size:
+            expiry.popitem(last=False)
+
+    def _set(self, key: Hashable, now: float):
+        key = str(key)
+        super()._set(key, now)
+        self._log.write(f"{key}\t{self._expiry[key]:.3f}\n")
+        self._log_lines += 1
+        if self._log_lines > max(self.compact_min, len(self._expiry) * self.compact_ratio):
+            self._compact()
+
+    def _compact(self):
+        """用当前存活条目重写日志 (tmp + 原子替换)"""
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for key, expires_at in self._expiry.items():
+                f.write(f"{key}\t{expires_at:.3f}\n")
+        self._log.close()
+        os.replace(tmp_path, self.path)
+        self._log = open(self.path, "a", encoding="utf-8", buffering=1)
+        self._log_lines = len(self._expiry)
+
+    def compact(self):
+        with self._lock:
+            self._purge(self._clock())
+            self._compact()
+
+    def check_and_set(self, key: Hashable, now: Optional[float] = None) -> bool:
+        return super().check_and_set(str(key), now)
+
+    def remaining(self, key: Hashable, now: Optional[float] = None) -> float:
+        return super().remaining(str(key), now)
+
+    def clear(self):
+        with self._lock:
+            self._expiry.clear()
+            self._compact()
+
+    def close(self):
+        with self._lock:
+            self._log.close()
+
+    def stats(self) -> dict:
+        stats = super().stats()
+        stats["log_lines"] = self._log_lines
+        return stats
@@ -0,0 +1,59 @@
+"""
+可插拔 JSON 解码层
+
+优先使用已安装的 orjson / msgspec, 都没有时回退到标准库 json。
+通过环境变量 JSON_DECODER=auto|orjson|msgspec|json 强制指定后端。
+"""
+
+import json
+import os
+from typing import Any, Callable, Optional
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - 取决于部署环境
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:  # pragma: no cover - 取决于部署环境
+    msgspec = None
+
+# 按解码速度从快到慢排列
+BACKEND_PREFERENCE = ("orjson", "msgspec", "json")
+
+
+def available_backends() -> list:
+    """当前环境可用的解码后端"""
+    backends = []
+    if orjson is not None:
+        backends.append("orjson")
+    if msgspec is not None:
+        backends.append("msgspec")
+    backends.append("json")
+    return backends
+
+
+def resolve_backend(backend: Optional[str] = None) -> str:
+    """解析后端名称; auto/None 选择最快的可用后端, 指定的后端不可用时报错"""
+    if backend in (None, "", "auto"):
+        return available_backends()[0]
+    if backend not in BACKEND_PREFERENCE:
+        raise ValueError(f"未知 JSON 后端: {backend}")
+    if backend not in available_backends():
+        raise ImportError(f"JSON 后端 {backend} 未安装")
+    return backend
+
+
+def get_loads(backend: Optional[str] = None) -> Callable[[Any], Any]:
+    """返回指定后端的 loads 函数 (接受 str 或 bytes)"""
+    backend = resolve_backend(backend)
+    if backend == "orjson":
+        return orjson.loads
+    if backend == "msgspec":
+        return msgspec.json.decode
+    return json.loads
+
+
+BACKEND = resolve_backend(os.environ.get("JSON_DECODER"))
+loads = get_loads(BACKEND)
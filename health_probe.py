@@ -0,0 +1,149 @@
+"""
+后台健康探测
+
+依赖检查 (如 Telegram getMe) 在后台线程中按固定间隔执行, 结果缓存在内存中:
+/health 只读缓存, 不再每次请求都同步访问外部接口。
+
+- 每项检查记录 ok / detail / 检查时间 / 耗时, snapshot() 附带结果年龄和是否过期
+- run(force=False) 供深度检查使用: 距上次执行不足 min_interval 时直接返回缓存,
+  避免频繁探测把外部接口的限额用光
+- 检查函数返回 bool 或 (bool, detail), 抛异常视为失败
+"""
+
+import logging
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class HealthProber:
+    """定期执行一组健康检查并缓存结果"""
+
+    def __init__(
+        self,
+        checks: Dict[str, Callable[[], object]],
+        interval: float = 60.0,
+        min_interval: float = 10.0,
+        stale_after: Optional[float] = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.checks = dict(checks)
+        self.interval = interval
+        self.min_interval = min_interval
+        # 超过 stale_after 秒未刷新视为过期 (默认 3 个周期, 探测线程卡住或挂掉时可以看出来)
+        self.stale_after = stale_after if stale_after is not None else interval * 3
+        self._clock = clock
+        self._results: Dict[str, dict] = {}
+        self._last_run: Optional[float] = None
+        self._run_lock = threading.Lock()
+        # 保护后台线程的检查与创建 (gunicorn post_worker_init 与首个 /health 请求可能同时 start)
+        self._thread_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    # ------------------------------------------------------------------
+    # 执行检查
+    # ------------------------------------------------------------------
+
+    def _check(self, name: str, check: Callable[[], object]) -> dict:
+        started = time.perf_counter()
+        try:
+            outcome = check()
+            ok, detail = outcome if isinstance(outcome, tuple) else (outcome, None)
+            ok = bool(ok)
+        except Exception as e:
+            ok, detail = False, repr(e)
+        return {
+            "ok": ok,
+            "detail": detail,
+            "checked_at": self._clock(),
+            "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+        }
+
+    def run(self, force: bool = True) -> dict:
+        """
+        立即执行全部检查并更新缓存, 返回最新快照
+
+        force=False 时距上次执行不足 min_interval 秒则直接返回缓存;
+        并发调用只有一个真正执行, 其余等待后返回同一结果。
+        """
+        with self._run_lock:
+            last_run = self._last_run
+            if not force and last_run is not None and self._clock() - last_run < self.min_interval:
+                return self.snapshot()
+            results = {name: self._check(name, check) for name, check in self.checks.items()}
+            # 整体替换, 读取方无需加锁
+            self._results = results
+            self._last_run = self._clock()
+        for name, result in results.items():
+            if not result["ok"]:
+                logger.warning("健康检查失败: %s (%s)", name, result["detail"])
+        return self.snapshot()
+
+    # ------------------------------------------------------------------
+    # 读取缓存
+    # ------------------------------------------------------------------
+
+    def snapshot(self) -> dict:
+        """缓存的检查结果 (不触发任何外部请求)"""
+        results = self._results
+        last_run = self._last_run
+        now = self._clock()
+        checks = {}
+        for name, result in results.items():
+            entry = dict(result)
+            entry["age_seconds"] = round(now - result["checked_at"], 3)
+            checks[name] = entry
+
+        if last_run is None:
+            status = "unknown"
+        elif all(result["ok"] for result in results.values()):
+            status = "healthy"
+        else:
+            status = "degraded"
+        age = None if last_run is None else round(now - last_run, 3)
+        return {
+            "status": status,
+            "checked_at": last_run,
+            "age_seconds": age,
+            "stale": age is None or age > self.stale_after,
+            "interval_seconds": self.interval,
+            "checks": checks,
+        }
+
+    # ------------------------------------------------------------------
+    # 后台线程
+    # ------------------------------------------------------------------
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """启动后台探测线程 (立即执行一次, 之后每 interval 秒一次); 重复或并发调用只启动一个"""
+        with self._thread_lock:
+            if self.running:
+                return
+            self._stop.clear()
+
+            def loop():
+                while True:
+                    try:
+                        self.run()
+                    except Exception as e:
+                        logger.error("健康探测线程异常: %r", e)
+                    if self._stop.wait(self.interval):
+                        return
+
+            self._thread = threading.Thread(target=loop, name="health-prober", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        with self._thread_lock:
+            thread, self._thread = self._thread, None
+            if thread is None:
+                return
+            self._stop.set()
+            thread.join(timeout)
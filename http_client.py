@@ -0,0 +1,191 @@
+"""
+同步 HTTP 客户端 (连接池 / 按主机超时 / 重试 / 复用统计)
+
+同步代码 (arkm / zixun / botsever 的联通性检查) 统一通过这里发请求,
+keep-alive 连接在调用之间复用, 只有第一次请求需要 TCP + TLS 握手。
+
+- 每个 HttpClient 持有一个 requests.Session, 连接池大小可配置
+- 未显式传 timeout 时按主机取 (连接超时, 读取超时), 不会出现无超时的请求
+- 连接失败自动重试; 读取失败和 5xx 只对幂等方法 (GET 等) 重试, POST 不重复发送;
+  429 不重试, 交给调用方按业务处理
+- stats(): 每个主机的请求数 / 失败数 / 平均耗时 / 新建连接数 / 连接复用率
+
+环境变量:
+    HTTP_POOL_SIZE       每个主机的连接池大小 (默认 10)
+    HTTP_RETRIES         重试次数 (默认 2)
+    HTTP_TIMEOUT         默认超时 "连接:读取" 秒 (默认 5:30)
+    HTTP_HOST_TIMEOUTS   按主机覆盖, 如 "api.telegram.org=5:15,api.mlion.ai=5:10"
+"""
+
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import metrics
+
+HTTP_POOL_SIZE = int(os.environ.get("HTTP_POOL_SIZE", "10"))
+HTTP_RETRIES = int(os.environ.get("HTTP_RETRIES", "2"))
+HTTP_TIMEOUT = os.environ.get("HTTP_TIMEOUT", "5:30")
+HTTP_HOST_TIMEOUTS = os.environ.get("HTTP_HOST_TIMEOUTS", "")
+
+REQUEST_SECONDS = metrics.REGISTRY.histogram(
+    "http_client_request_seconds", "同步 HTTP 请求耗时（秒）", ["host", "outcome"]
+)
+
+Timeout = Tuple[float, float]
+
+
+def parse_timeout(spec: str) -> Timeout:
+    """"连接:读取" 或单个秒数 -> (connect, read)"""
+    connect, _, read = str(spec).strip().partition(":")
+    connect = float(connect)
+    return connect, float(read) if read else connect
+
+
+def parse_host_timeouts(spec: str) -> Dict[str, Timeout]:
+    """"host=连接:读取,..." -> {host: (connect, read)}"""
+    timeouts = {}
+    for part in (spec or "").split(","):
+        host, sep, value = part.strip().partition("=")
+        if not sep:
+            continue
+        timeouts[host.strip().lower()] = parse_timeout(value)
+    return timeouts
+
+
+class _HostStats:
+    __slots__ = ("requests", "errors", "seconds")
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.seconds = 0.0
+
+
+class HttpClient:
+    """带连接池、按主机超时和重试的 requests 会话封装"""
+
+    def __init__(
+        self,
+        pool_size: int = HTTP_POOL_SIZE,
+        retries: int = HTTP_RETRIES,
+        backoff: float = 0.5,
+        default_timeout: Timeout = None,
+        host_timeouts: Optional[Dict[str, Timeout]] = None,
+        headers: Optional[dict] = None,
+    ):
+        self.default_timeout = default_timeout or parse_timeout(HTTP_TIMEOUT)
+        self.host_timeouts = dict(parse_host_timeouts(HTTP_HOST_TIMEOUTS))
+        self.host_timeouts.update(host_timeouts or {})
+        self.session = requests.Session()
+        if headers:
+            self.session.headers.update(headers)
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=retries,
+            status=retries,
+            backoff_factor=backoff,
+            status_forcelist=(500, 502, 503, 504),
+            allowed_methods=Retry.DEFAULT_ALLOWED_METHODS,  # 不含 POST
+            raise_on_status=False,
+            respect_retry_after_header=True,
+        )
+        self.adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount("https://", self.adapter)
+        self.session.mount("http://", self.adapter)
+        self._stats: Dict[str, _HostStats] = {}
+        self._lock = threading.Lock()
+
+    def timeout_for(self, host: str) -> Timeout:
+        return self.host_timeouts.get(host.lower(), self.default_timeout)
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        host = urlsplit(url).hostname or ""
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.timeout_for(host)
+        started = time.perf_counter()
+        try:
+            response = self.session.request(method, url, **kwargs)
+        except Exception:
+            self._record(host, "error", time.perf_counter() - started)
+            raise
+        self._record(host, f"{response.status_code // 100}xx", time.perf_counter() - started)
+        return response
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def _record(self, host: str, outcome: str, seconds: float):
+        REQUEST_SECONDS.labels(host, outcome).observe(seconds)
+        with self._lock:
+            stats = self._stats.get(host)
+            if stats is None:
+                stats = self._stats[host] = _HostStats()
+            stats.requests += 1
+            stats.seconds += seconds
+            if outcome == "error":
+                stats.errors += 1
+
+    def _connections_opened(self) -> Dict[str, int]:
+        """各主机连接池累计新建的连接数 (来自 urllib3 连接池计数)"""
+        opened: Dict[str, int] = {}
+        pools = self.adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is not None:
+                opened[pool.host] = opened.get(pool.host, 0) + pool.num_connections
+        return opened
+
+    def stats(self) -> dict:
+        """每个主机的请求与连接复用统计"""
+        opened = self._connections_opened()
+        with self._lock:
+            items = [(host, s.requests, s.errors, s.seconds) for host, s in self._stats.items()]
+        report = {}
+        for host, count, errors, seconds in items:
+            connections = opened.get(host, 0)
+            report[host] = {
+                "requests": count,
+                "errors": errors,
+                "avg_ms": round(seconds / count * 1000, 2) if count else 0.0,
+                "connections_opened": connections,
+                "reuse_ratio": round(1 - min(connections, count) / count, 3) if count else 0.0,
+            }
+        return report
+
+    def format_stats(self) -> str:
+        return ", ".join(
+            f"{host}: {s['requests']} 请求 / {s['connections_opened']} 连接 "
+            f"(复用率 {s['reuse_ratio']:.0%}, avg {s['avg_ms']}ms)"
+            for host, s in self.stats().items()
+        ) or "暂无请求"
+
+    def close(self):
+        self.session.close()
+
+
+# ==========================================
+# 进程内共享实例
+# ==========================================
+
+_default_client: Optional[HttpClient] = None
+_default_lock = threading.Lock()
+
+
+def get_client() -> HttpClient:
+    """获取进程内共享的 HTTP 客户端 (按环境变量配置)"""
+    global _default_client
+    with _default_lock:
+        if _default_client is None:
+            _default_client = HttpClient()
+        return _default_client
@@ -0,0 +1,237 @@
+"""
+多关键词匹配
+
+关键词启动时预编译, 一次扫描返回全部命中的关键词,
+替代"每条推文对每个关键词 strip/lower/in"的 O(关键词数 × 文本长度) 循环。
+
+- 词边界模式下, 纯英文/数字关键词走"分词 + 字典查找", 耗时与关键词数量无关
+- 子串模式且关键词少于 SUBSTRING_LOOP_MAX 个时, 直接对小写文本逐个 find (少量关键词时最快)
+- 其余关键词 (含空格、符号、中文, 或关键词较多时的子串模式)
+  合并成一个前缀树形式的正则, 在每个位置向前查看; 重叠和互为前缀的关键词
+  ("bit" / "bitcoin") 全部返回
+
+- 忽略大小写
+- word_boundary=True 时关键词两侧不能紧挨 ASCII 字母/数字/下划线:
+  "eth" 不再命中 "together", 但 "$ETH"、"#eth" 仍可命中;
+  只按 ASCII 判断, 中文关键词在中文文本中照常匹配
+- reload() 原子替换编译结果, 匹配线程无需加锁
+"""
+
+import os
+import re
+import time
+from typing import Iterable, List, Optional
+
+_WORD = "A-Za-z0-9_"
+_TOKEN = re.compile(f"[{_WORD}]+")
+_PLAIN = re.compile(f"[{_WORD}]+\\Z")
+
+# 子串模式下关键词少于该数量时用逐个 find, 不编译正则 (基准中约 300 个关键词时两者持平)
+SUBSTRING_LOOP_MAX = 256
+
+
+def parse_keywords(text: str) -> List[str]:
+    """解析逗号或换行分隔的关键词 (去空白、去重、保持顺序, # 开头的行为注释)"""
+    keywords = []
+    seen = set()
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        for keyword in line.split(","):
+            keyword = keyword.strip()
+            if keyword and keyword.lower() not in seen:
+                seen.add(keyword.lower())
+                keywords.append(keyword)
+    return keywords
+
+
+def _trie_pattern(words: List[str]) -> str:
+    """
+    把关键词合并成前缀树形式的正则, 如 btc/bnb/eth -> (?:b(?:tc|nb)|eth)
+
+    re 对普通交替式会在每个位置逐个尝试全部分支; 前缀树形式首字符不符即可跳过整棵子树。
+    """
+    trie: dict = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: dict) -> str:
+        ends = "" in node
+        branches = []
+        for char in sorted(k for k in node if k):
+            branches.append(re.escape(char) + build(node[char]))
+        if not branches:
+            return ""
+        if len(branches) == 1 and not ends:
+            return branches[0]
+        body = "(?:" + "|".join(branches) + ")"
+        # 已是完整关键词时后续部分可选; 贪婪匹配保证长词优先
+        return body + "?" if ends else body
+
+    return build(trie)
+
+
+class _Compiled:
+    """一次编译结果, reload 时整体替换"""
+
+    __slots__ = ("canonical", "tokens", "plain", "pattern", "rest", "lengths", "word_boundary")
+
+    def __init__(self, keywords: List[str], word_boundary: bool):
+        self.word_boundary = word_boundary
+        self.canonical = {}
+        for keyword in keywords:
+            self.canonical.setdefault(keyword.lower(), keyword)
+
+        # 词边界模式下, 纯 ASCII 单词型关键词 (btc / eth / binance) 等价于"整词相等",
+        # 用分词 + 字典查找, 与关键词数量无关; 其余 (含空格/符号/中文) 才走正则
+        self.plain = None
+        if word_boundary:
+            self.tokens = {k: v for k, v in self.canonical.items() if _PLAIN.match(k)}
+            rest = [k for k in self.canonical if k not in self.tokens]
+        else:
+            self.tokens = {}
+            rest = list(self.canonical)
+            if len(rest) < SUBSTRING_LOOP_MAX:
+                self.plain = list(self.canonical.items())
+                rest = []
+
+        # 前缀树正则只给出每个位置上最长的关键词, 更短的关键词必是它的前缀:
+        # 按关键词长度截取前缀再查表, 即可补全同一位置的全部命中
+        self.rest = set(rest)
+        self.lengths = sorted({len(k) for k in rest})
+        self.pattern = None
+        if rest:
+            body = _trie_pattern(rest)
+            if word_boundary:
+                body = f"(?<![{_WORD}])(?=((?:{body})(?![{_WORD}])))"
+            else:
+                body = f"(?=({body}))"
+            # 零宽匹配, finditer 会在每个位置尝试, 重叠的关键词不会被跳过
+            self.pattern = re.compile(body, re.IGNORECASE)
+
+    def plain_hits(self, text: str):
+        """逐个查找子串关键词, 产出 (首次出现位置, 关键词)"""
+        lowered = text.lower()
+        for key, keyword in self.plain:
+            position = lowered.find(key)
+            if position >= 0:
+                yield position, keyword
+
+    def token_hits(self, text: str) -> List[str]:
+        """分词查找命中的单词型关键词 (按出现顺序, 可能重复)"""
+        # 纯 ASCII 时整体转小写再分词; 否则逐词转小写, 避免个别 Unicode 字符小写后拆出 ASCII 字母
+        if text.isascii():
+            words = _TOKEN.findall(text.lower())
+        else:
+            words = [word.lower() for word in _TOKEN.findall(text)]
+        tokens = self.tokens
+        if tokens.keys().isdisjoint(words):
+            return []
+        return [tokens[word] for word in words if word in tokens]
+
+    def hits(self, text: str):
+        """按出现位置产出 (位置, 关键词)"""
+        canonical = self.canonical
+        if self.tokens:
+            tokens = self.tokens
+            for match in _TOKEN.finditer(text):
+                keyword = tokens.get(match.group(0).lower())
+                if keyword is not None:
+                    yield match.start(), keyword
+        if self.pattern is not None:
+            rest = self.rest
+            for match in self.pattern.finditer(text):
+                start = match.start()
+                longest = match.group(1).lower()
+                # 同一位置长词在前, 与逐个查找的顺序一致
+                for length in reversed(self.lengths):
+                    if length > len(longest):
+                        continue
+                    key = longest[:length]
+                    if key not in rest:
+                        continue
+                    if self.word_boundary and length < len(longest) and _TOKEN.match(longest, length):
+                        continue
+                    yield start, canonical[key]
+
+
+class KeywordMatcher:
+    """预编译的多关键词匹配器"""
+
+    def __init__(self, keywords: Iterable[str] = (), word_boundary: bool = True):
+        self.word_boundary = word_boundary
+        self._compiled = _Compiled([], word_boundary)
+        self.reload(keywords)
+
+    def reload(self, keywords: Iterable[str]) -> int:
+        """替换关键词集合, 返回生效的关键词数"""
+        keywords = [k.strip() for k in keywords if k and k.strip()]
+        self._compiled = _Compiled(keywords, self.word_boundary)
+        return len(self._compiled.canonical)
+
+    @property
+    def keywords(self) -> List[str]:
+        return list(self._compiled.canonical.values())
+
+    def __len__(self) -> int:
+        return len(self._compiled.canonical)
+
+    def find_all(self, text: str) -> List[str]:
+        """返回文本中命中的全部关键词 (按首次出现顺序, 去重, 保持配置中的写法)"""
+        compiled = self._compiled
+        if not text or not compiled.canonical:
+            return []
+        if compiled.plain is not None:
+            hits = sorted(compiled.plain_hits(text), key=lambda hit: (hit[0], -len(hit[1])))
+            return list(dict.fromkeys(keyword for _, keyword in hits))
+        if compiled.pattern is None:
+            # 只有单词型关键词: 最常见的情况, 走最快路径
+            return list(dict.fromkeys(compiled.token_hits(text)))
+        hits = compiled.hits(text)
+        if compiled.tokens:
+            hits = sorted(hits, key=lambda hit: hit[0])
+        return list(dict.fromkeys(keyword for _, keyword in hits))
+
+    def search(self, text: str) -> Optional[str]:
+        """返回第一个命中的关键词, 没有命中返回 None"""
+        found = self.find_all(text)
+        return found[0] if found else None
+
+
+class KeywordFileWatcher:
+    """
+    关键词文件热加载
+
+    check() 最多每 interval 秒看一次文件修改时间, 变化时重新加载到 matcher。
+    文件不存在或读取失败时保留当前关键词。
+    """
+
+    def __init__(self, matcher: KeywordMatcher, path: str, interval: float = 5.0, clock=None):
+        self.matcher = matcher
+        self.path = path
+        self.interval = interval
+        self._clock = clock or time.monotonic
+        self._mtime = None
+        self._next_check = 0.0
+
+    def check(self, force: bool = False) -> bool:
+        """文件有变化并成功加载时返回 True"""
+        now = self._clock()
+        if not force and now < self._next_check:
+            return False
+        self._next_check = now + self.interval
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+            if not force and mtime == self._mtime:
+                return False
+            with open(self.path, "r", encoding="utf-8") as f:
+                keywords = parse_keywords(f.read())
+        except OSError:
+            return False
+        self._mtime = mtime
+        self.matcher.reload(keywords)
+        return True
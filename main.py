@@ -3,6 +3,11 @@ import sys
 import time
 import os
 
+import worker_stats
+import structured_log
+import tg_delivery
+from supervisor import Supervisor, enable_heartbeats
+
 # 📝 你的脚本列表
 # botsever.py 是 Flask 服务器，已修改为线程模式运行
 SCRIPTS = [
@@ -12,6 +17,9 @@ SCRIPTS = [
     "botsever.py",  # Webhook 服务器
 ]
 
+# 运行方式: process = 每个脚本一个子进程 (默认); asyncio = 单进程运行时 (见 runtime.py)
+MONITOR_RUNTIME = os.environ.get("MONITOR_RUNTIME", "process")
+
 # 存储进程对象
 running_processes = {}
 
@@ -78,12 +86,38 @@ def main():
     current_dir = os.path.dirname(os.path.abspath(__file__))
     os.chdir(current_dir)
     print(f"🚀 主程序启动 | 工作目录: {current_dir}")
+
+    # botsever 在本进程的线程中运行, 它的日志也经异步队列写出
+    structured_log.setup_logging()
+
+    if MONITOR_RUNTIME == "asyncio":
+        import runtime
+
+        runtime.main()
+        return
+
     print(f"📋 计划运行列表: {SCRIPTS}\n" + "=" * 40)
 
+    # 子进程继承 WORKER_STATS_DIR, 各自发布指标快照, 由 botsever 的 /metrics 汇总
+    stats_dir = worker_stats.enable("monitor-stats")
+    worker_stats.reset_directory(stats_dir)
+    worker_stats.stats.start()
+    print(f"📊 指标快照目录: {stats_dir}")
+
+    # 每个脚本一个进程 (botsever 在本进程), 各自的令牌桶互不相通, 按进程数均分 Telegram 限额
+    share = tg_delivery.divide_rate_limits(len(SCRIPTS))
+    print(f"📨 每个进程的 Telegram 限额份额: {share:.2f}")
+
+    # 子进程继承心跳目录, 在主循环中定期更新心跳文件
+    heartbeat_dir = enable_heartbeats()
+    supervisor = Supervisor(SCRIPTS, start_script, running_processes, heartbeat_dir=heartbeat_dir)
+    # 先安装 SIGCHLD 处理, 启动阶段就退出的子进程也能立即发现
+    supervisor.install_signal_handler()
+
     # 1. 交错启动所有脚本（付费版资源充足，可以缩短间隔）
     for index, script in enumerate(SCRIPTS):
         print(f"\n--- 正在处理第 {index + 1}/{len(SCRIPTS)} 个任务 ---")
-        start_script(script)
+        supervisor.start(script)
 
         if index < len(SCRIPTS) - 1:
             print(f"⏳ 等待 5 秒，让 {script} 初始化...", flush=True)
@@ -94,27 +128,9 @@ def main():
     print("=" * 40 + "\n")
 
     # 2. 守护循环（只监控子进程，botsever是线程不监控）
+    # 子进程退出由 SIGCHLD 立即唤醒, 按指数退避重启; 心跳超时的子进程视为卡死
     try:
-        while True:
-            time.sleep(10)  # 每10秒检查一次
-
-            for script in SCRIPTS:
-                info = running_processes.get(script)
-                if not info:
-                    continue
-
-                # 只检查子进程类型的脚本
-                if info.get("type") == "process":
-                    process = info.get("obj")
-                    return_code = process.poll()
-                    if return_code is not None:
-                        # 进程死了
-                        print(
-                            f"\n⚠️ [警告] {script} 已停止运行! (退出码: {return_code})"
-                        )
-                        print(f"🔄 正在尝试重启 {script} ...")
-                        start_script(script)
-
+        supervisor.run_forever()
     except KeyboardInterrupt:
         stop_all()
 
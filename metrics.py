@@ -0,0 +1,396 @@
+"""
+Prometheus 指标注册表
+
+各监控模块共用的 Counter / Gauge / Histogram, 支持标签 (交易对 / 实体 / 话题 ...)。
+
+- 每个指标族一把锁, 子序列按标签值元组存放; 记录一次约 1µs
+- Gauge 可以 set_function(), 抓取时才取值 (队列深度等无需在热路径上更新)
+- 多进程: 每个进程把 REGISTRY.snapshot() 作为 "metrics" 来源发布到 worker_stats 目录,
+  render_all() 合并全部进程后输出 Prometheus 文本格式:
+  Counter / Histogram 求和 (已退出进程的累计值保留);
+  Gauge 只取存活进程, 按 multiprocess_mode 求和 / 取最大 / 取最小
+"""
+
+import bisect
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import worker_stats
+
+logger = logging.getLogger(__name__)
+
+# 秒为单位的默认分桶 (覆盖 1ms ~ 30s)
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+GAUGE_MODES = ("sum", "max", "min")
+
+
+class _Metric:
+    """指标族: 名称 + 标签名 + 按标签值区分的子序列"""
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children: Dict[tuple, object] = {}
+        if not self.labelnames:
+            self._default = self.labels()
+
+    def labels(self, *values, **kwargs):
+        """按标签值取子序列 (不存在时创建)"""
+        if kwargs:
+            if values:
+                raise ValueError("标签值不能同时用位置参数和关键字参数")
+            values = tuple(kwargs[name] for name in self.labelnames)
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} 需要标签 {self.labelnames}, 收到 {values}")
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.get(key)
+                if child is None:
+                    child = self._new_child()
+                    self._children[key] = child
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _child_value(self, child):
+        raise NotImplementedError
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            items = list(self._children.items())
+        return {
+            "type": self.kind,
+            "help": self.documentation,
+            "labelnames": list(self.labelnames),
+            "samples": [[list(key), self._child_value(child)] for key, child in items],
+        }
+
+
+class _CounterChild:
+    __slots__ = ("_lock", "value")
+
+    def __init__(self, lock):
+        self._lock = lock
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        if amount < 0:
+            raise ValueError("Counter 只能增加")
+        with self._lock:
+            self.value += amount
+
+
+class Counter(_Metric):
+    """单调递增计数器"""
+
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild(self._lock)
+
+    def _child_value(self, child):
+        return child.value
+
+    def inc(self, amount: float = 1.0):
+        self._default.inc(amount)
+
+
+class _GaugeChild:
+    __slots__ = ("_lock", "value", "function")
+
+    def __init__(self, lock):
+        self._lock = lock
+        self.value = 0.0
+        self.function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float):
+        self.value = float(value)
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        self.inc(-amount)
+
+    def set_function(self, function: Callable[[], float]):
+        """抓取时调用 function 取值"""
+        self.function = function
+
+    def get(self) -> float:
+        if self.function is not None:
+            try:
+                return float(self.function())
+            except Exception as e:
+                logger.error("Gauge 取值失败: %r", e)
+                return 0.0
+        return self.value
+
+
+class Gauge(_Metric):
+    """可增可减的瞬时值"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 multiprocess_mode: str = "sum"):
+        if multiprocess_mode not in GAUGE_MODES:
+            raise ValueError(f"未知 multiprocess_mode: {multiprocess_mode}")
+        self.multiprocess_mode = multiprocess_mode
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _GaugeChild(self._lock)
+
+    def _child_value(self, child):
+        return child.get()
+
+    def snapshot(self) -> dict:
+        data = super().snapshot()
+        data["mode"] = self.multiprocess_mode
+        return data
+
+    def set(self, value: float):
+        self._default.set(value)
+
+    def inc(self, amount: float = 1.0):
+        self._default.inc(amount)
+
+    def dec(self, amount: float = 1.0):
+        self._default.dec(amount)
+
+    def set_function(self, function: Callable[[], float]):
+        self._default.set_function(function)
+
+
+class _HistogramChild:
+    __slots__ = ("_lock", "_bounds", "counts", "sum", "count")
+
+    def __init__(self, lock, bounds):
+        self._lock = lock
+        self._bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # 最后一格为 +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self._bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    @contextmanager
+    def time(self):
+        """记录 with 块耗时 (秒)"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+
+class Histogram(_Metric):
+    """分桶直方图 (桶上界含等号, 与 Prometheus le 语义一致)"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(float(b) for b in buckets if b != float("inf")))
+        if not self.buckets:
+            raise ValueError("至少需要一个有限的桶上界")
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self._lock, self.buckets)
+
+    def _child_value(self, child):
+        return [list(child.counts), child.sum, child.count]
+
+    def snapshot(self) -> dict:
+        # 子序列与族共用一把锁: 在锁内一次性复制, 保证 counts / sum / count 一致
+        with self._lock:
+            samples = [[list(key), self._child_value(child)] for key, child in self._children.items()]
+        return {
+            "type": self.kind,
+            "help": self.documentation,
+            "labelnames": list(self.labelnames),
+            "buckets": list(self.buckets),
+            "samples": samples,
+        }
+
+    def observe(self, value: float):
+        self._default.observe(value)
+
+    def time(self):
+        return self._default.time()
+
+
+class Registry:
+    """指标注册表; 同名重复注册返回已有指标 (便于模块重载和测试)"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name: str, documentation: str, labelnames: Sequence[str], **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = cls(name, documentation, labelnames, **kwargs)
+                self._metrics[name] = metric
+            elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"指标 {name} 已以不同类型或标签注册")
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+              multiprocess_mode: str = "sum") -> Gauge:
+        return self._register(Gauge, name, documentation, labelnames, multiprocess_mode=multiprocess_mode)
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def snapshot(self) -> dict:
+        """可 JSON 序列化的全部指标快照"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {metric.name: metric.snapshot() for metric in metrics}
+
+
+# ---------------------------------------------------------------------------
+# 多进程合并与输出
+# ---------------------------------------------------------------------------
+
+
+def merge_snapshots(snapshots: List[Tuple[dict, bool]]) -> dict:
+    """
+    合并多个进程的注册表快照
+
+    Args:
+        snapshots: [(snapshot, 进程是否存活), ...]
+    """
+    merged: Dict[str, dict] = {}
+    for snapshot, alive in snapshots:
+        for name, data in snapshot.items():
+            kind = data.get("type")
+            if kind == "gauge" and not alive:
+                continue
+            target = merged.get(name)
+            if target is None:
+                target = {key: value for key, value in data.items() if key != "samples"}
+                target["samples"] = {}
+                merged[name] = target
+            elif target.get("type") != kind or target.get("buckets") != data.get("buckets"):
+                logger.warning("指标 %s 在不同进程中定义不一致, 已跳过", name)
+                continue
+            samples = target["samples"]
+            for labels, value in data.get("samples", []):
+                key = tuple(labels)
+                current = samples.get(key)
+                if current is None:
+                    samples[key] = value
+                elif kind == "histogram":
+                    samples[key] = [
+                        [a + b for a, b in zip(current[0], value[0])],
+                        current[1] + value[1],
+                        current[2] + value[2],
+                    ]
+                elif kind == "gauge" and target.get("mode") == "max":
+                    samples[key] = max(current, value)
+                elif kind == "gauge" and target.get("mode") == "min":
+                    samples[key] = min(current, value)
+                else:
+                    samples[key] = current + value
+    for data in merged.values():
+        data["samples"] = [[list(key), value] for key, value in data["samples"].items()]
+    return merged
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_str(labelnames, labels, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, labels)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def render(snapshot: dict) -> str:
+    """注册表快照转 Prometheus 文本格式"""
+    lines = []
+    for name in sorted(snapshot):
+        data = snapshot[name]
+        kind = data["type"]
+        labelnames = data.get("labelnames", [])
+        lines.append(f"# HELP {name} {data.get('help', '')}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in sorted(data["samples"], key=lambda sample: sample[0]):
+            if kind == "histogram":
+                counts, total, count = value
+                cumulative = 0
+                for bound, bucket_count in zip(data["buckets"] + [float("inf")], counts):
+                    cumulative += bucket_count
+                    le = f'le="{_number(bound)}"'
+                    lines.append(f"{name}_bucket{_label_str(labelnames, labels, le)} {cumulative}")
+                lines.append(f"{name}_sum{_label_str(labelnames, labels)} {_number(total)}")
+                lines.append(f"{name}_count{_label_str(labelnames, labels)} {count}")
+            else:
+                lines.append(f"{name}{_label_str(labelnames, labels)} {_number(value)}")
+    return "\n".join(lines)
+
+
+def collect(registry: "Registry" = None) -> dict:
+    """
+    本进程或全部进程 (设置了 WORKER_STATS_DIR 时) 合并后的快照
+    """
+    registry = registry or REGISTRY
+    stats = worker_stats.stats
+    if not stats.enabled:
+        return merge_snapshots([(registry.snapshot(), True)])
+    stats.publish()
+    snapshots = [
+        (report["metrics"], worker_stats.pid_alive(report.get("pid")))
+        for report in stats.collect()
+        if isinstance(report.get("metrics"), dict)
+    ]
+    return merge_snapshots(snapshots)
+
+
+def render_all(registry: "Registry" = None) -> str:
+    return render(collect(registry))
+
+
+# 进程级共享注册表, 随 worker_stats 快照一起发布
+REGISTRY = Registry()
+worker_stats.stats.register("metrics", REGISTRY.snapshot)
+# 已退出进程的注册表快照并入 retired.json 时按指标类型合并 (丢弃 gauge)
+worker_stats.RETIRED_MERGES["metrics"] = lambda reports: merge_snapshots([(r, False) for r in reports])
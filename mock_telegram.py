@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+本地模拟 Telegram Bot API (压测 / 延迟测试用)
+
+实现 sendMessage 和 getMe, 可注入:
+- 响应延迟: 固定延迟 + 随机抖动
+- 限流: 全局每秒 / 每个群组每分钟上限 (超出返回 429 + retry_after), 或按比例随机返回 429
+- 失败: 按比例随机返回 500
+- 失效话题: 指定的 message_thread_id 返回 400 "message thread not found"
+
+收到的成功消息逐条记录 (接收时间 / chat / 话题 / 文本), 供基准统计投递速率。
+
+用法:
+    python mock_telegram.py --port 8081 --latency-ms 50 --jitter-ms 20 --failure-rate 0.01
+    TELEGRAM_API_BASE=http://127.0.0.1:8081 python main.py
+"""
+
+import argparse
+import asyncio
+import random
+import threading
+import time
+from typing import Iterable, List, Optional
+
+from aiohttp import web
+
+from rate_limit import TokenBucket
+
+
+class MockTelegramServer:
+    """可注入延迟 / 限流 / 失败的 Telegram Bot API 替身"""
+
+    def __init__(
+        self,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        failure_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        retry_after: float = 1.0,
+        global_rate: float = 0.0,
+        chat_rate_per_min: float = 0.0,
+        invalid_threads: Iterable[int] = (),
+        seed: Optional[int] = None,
+    ):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.failure_rate = failure_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.invalid_threads = {int(thread_id) for thread_id in invalid_threads}
+        self._random = random.Random(seed)
+        # 0 表示不限
+        self._global_bucket = TokenBucket(global_rate, max(1.0, global_rate)) if global_rate > 0 else None
+        self._chat_rate_per_min = chat_rate_per_min
+        self._chat_buckets: dict = {}
+
+        self.messages: List[tuple] = []
+        self.stats = {"requests": 0, "ok": 0, "rate_limited": 0, "failed": 0, "thread_not_found": 0}
+        self._runner: Optional[web.AppRunner] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self.base_url: Optional[str] = None
+
+    # ------------------------------------------------------------------
+    # 请求处理
+    # ------------------------------------------------------------------
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/bot{token}/sendMessage", self._send_message)
+        app.router.add_get("/bot{token}/getMe", self._get_me)
+        app.router.add_post("/bot{token}/getMe", self._get_me)
+        return app
+
+    async def _delay(self):
+        delay = self.latency_ms + (self._random.uniform(0, self.jitter_ms) if self.jitter_ms else 0.0)
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+
+    def _rate_limited(self, chat_id) -> Optional[float]:
+        """超过限额时返回 retry_after 秒数"""
+        if self.rate_limit_rate and self._random.random() < self.rate_limit_rate:
+            return self.retry_after
+        buckets = []
+        if self._global_bucket is not None:
+            buckets.append(self._global_bucket)
+        if self._chat_rate_per_min > 0:
+            bucket = self._chat_buckets.get(chat_id)
+            if bucket is None:
+                bucket = self._chat_buckets[chat_id] = TokenBucket(
+                    self._chat_rate_per_min / 60.0, max(1.0, self._chat_rate_per_min)
+                )
+            buckets.append(bucket)
+        for bucket in buckets:
+            if not bucket.try_acquire():
+                return max(self.retry_after, round((1 - bucket.available) / bucket.rate, 2))
+        return None
+
+    async def _send_message(self, request: web.Request) -> web.Response:
+        self.stats["requests"] += 1
+        payload = await request.json()
+        await self._delay()
+
+        chat_id = payload.get("chat_id")
+        thread_id = payload.get("message_thread_id")
+        retry_after = self._rate_limited(chat_id)
+        if retry_after is not None:
+            self.stats["rate_limited"] += 1
+            return web.json_response(
+                {
+                    "ok": False,
+                    "error_code": 429,
+                    "description": f"Too Many Requests: retry after {retry_after}",
+                    "parameters": {"retry_after": retry_after},
+                },
+                status=429,
+            )
+        if self.failure_rate and self._random.random() < self.failure_rate:
+            self.stats["failed"] += 1
+            return web.json_response(
+                {"ok": False, "error_code": 500, "description": "Internal Server Error"}, status=500
+            )
+        if thread_id is not None and int(thread_id) in self.invalid_threads:
+            self.stats["thread_not_found"] += 1
+            return web.json_response(
+                {"ok": False, "error_code": 400, "description": "Bad Request: message thread not found"},
+                status=400,
+            )
+
+        self.stats["ok"] += 1
+        self.messages.append((time.time(), chat_id, thread_id, payload.get("text", "")))
+        return web.json_response(
+            {
+                "ok": True,
+                "result": {
+                    "message_id": self.stats["ok"],
+                    "date": int(time.time()),
+                    "chat": {"id": chat_id},
+                    "text": payload.get("text", ""),
+                },
+            }
+        )
+
+    async def _get_me(self, request: web.Request) -> web.Response:
+        self.stats["requests"] += 1
+        await self._delay()
+        return web.json_response(
+            {"ok": True, "result": {"id": 1, "is_bot": True, "first_name": "mock", "username": "mock_bot"}}
+        )
+
+    def reset(self):
+        self.messages.clear()
+        for key in self.stats:
+            self.stats[key] = 0
+
+    # ------------------------------------------------------------------
+    # 启停
+    # ------------------------------------------------------------------
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """在当前事件循环中启动, 返回 API 基础地址 (用作 TELEGRAM_API_BASE)"""
+        self._runner = web.AppRunner(self.make_app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = self._runner.addresses[0][1]
+        self.base_url = f"http://{host}:{port}"
+        return self.base_url
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def start_in_thread(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """在后台守护线程的独立事件循环中启动 (供同步代码使用)"""
+        started = threading.Event()
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self._loop)
+            self._loop.run_until_complete(self.start(host, port))
+            started.set()
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=run, name="mock-telegram", daemon=True)
+        self._thread.start()
+        started.wait()
+        return self.base_url
+
+    def stop_thread(self):
+        if self._thread is None or self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self.stop(), self._loop).result(5)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(5)
+        self._thread = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地模拟 Telegram Bot API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="随机返回 500 的比例")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="随机返回 429 的比例")
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--global-rate", type=float, default=0.0, help="每秒全局上限, 0 = 不限")
+    parser.add_argument("--chat-rate-per-min", type=float, default=0.0, help="每个群组每分钟上限, 0 = 不限")
+    parser.add_argument("--invalid-threads", default="", help="返回 thread not found 的话题 ID, 逗号分隔")
+    args = parser.parse_args()
+
+    server = MockTelegramServer(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        failure_rate=args.failure_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        retry_after=args.retry_after,
+        global_rate=args.global_rate,
+        chat_rate_per_min=args.chat_rate_per_min,
+        invalid_threads=[int(t) for t in args.invalid_threads.split(",") if t.strip()],
+    )
+    print(f"🧪 模拟 Telegram API: http://{args.host}:{args.port}", flush=True)
+    web.run_app(server.make_app(), host=args.host, port=args.port, access_log=None, print=None)
+
+
+if __name__ == "__main__":
+    main()
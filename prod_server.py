@@ -1,5 +1,14 @@
 #!/usr/bin/env python3
-"""Production entry point for webhook server"""
+"""
+Production entry point for webhook server
+
+用多进程 WSGI 服务器运行 botsever.app:
+
+- WEB_SERVER=auto (默认): 安装了 gunicorn 时使用 gunicorn (gthread worker), 否则回退到 Flask 自带服务器
+- WEB_SERVER=gunicorn / dev: 强制指定
+- 每个 worker 独立统计, 通过 WORKER_STATS_DIR 下的快照文件汇总, /status 和 /metrics 反映全部 worker
+- SIGTERM 时 gunicorn 等待进行中的请求完成, worker 退出前清空 Webhook 队列和 Telegram 投递队列
+"""
 
 import os
 import sys
@@ -7,10 +16,124 @@ import sys
 # Ensure proper path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-# Import Flask app from botsever
-from botsever import app
+import worker_stats
+import structured_log
+import tg_delivery
+
+try:
+    from gunicorn.app.base import BaseApplication
+except ImportError:  # pragma: no cover - 取决于部署环境
+    BaseApplication = None
+
+PORT = int(os.environ.get("PORT", 5000))
+WEB_SERVER = os.environ.get("WEB_SERVER", "auto")  # auto / gunicorn / dev
+WEB_WORKERS = int(os.environ.get("WEB_WORKERS", "2"))
+WEB_THREADS = int(os.environ.get("WEB_THREADS", "8"))
+WEB_KEEPALIVE = int(os.environ.get("WEB_KEEPALIVE", "5"))
+WEB_TIMEOUT = int(os.environ.get("WEB_TIMEOUT", "30"))
+WEB_GRACEFUL_TIMEOUT = int(os.environ.get("WEB_GRACEFUL_TIMEOUT", "20"))
+WEB_MAX_REQUESTS = int(os.environ.get("WEB_MAX_REQUESTS", "0"))
+
+
+def resolve_server(name: str = WEB_SERVER) -> str:
+    if name == "auto":
+        return "gunicorn" if BaseApplication is not None else "dev"
+    if name not in ("gunicorn", "dev"):
+        raise ValueError(f"未知 WEB_SERVER: {name} (可选: auto / gunicorn / dev)")
+    if name == "gunicorn" and BaseApplication is None:
+        raise ImportError("gunicorn 未安装 (pip install gunicorn)")
+    return name
+
+
+# ---------------------------------------------------------------------------
+# gunicorn 钩子 (在 master / worker 进程中执行)
+# ---------------------------------------------------------------------------
+
+
+def on_starting(server):
+    """master 启动: 清空上次运行留下的统计快照"""
+    worker_stats.reset_directory(worker_stats.stats.directory)
+
+
+def post_worker_init(worker):
+    """worker 就绪: 启动异步日志写出线程, 开始定期发布本进程统计快照"""
+    structured_log.setup_logging()
+    worker_stats.stats.start()
+
+
+def worker_exit(server, worker):
+    """worker 退出: 处理完已接收的 Webhook, 发完 Telegram 积压, 写最终快照"""
+    botsever = sys.modules.get("botsever")
+    if botsever is not None:
+        botsever.webhook_queue.stop(drain=True, timeout=WEB_GRACEFUL_TIMEOUT)
+        botsever.delivery.stop_background(drain=True, timeout=WEB_GRACEFUL_TIMEOUT)
+    worker_stats.stats.stop()
+    structured_log.shutdown()
+
+
+def gunicorn_options(port: int = PORT) -> dict:
+    return {
+        "bind": f"0.0.0.0:{port}",
+        "workers": WEB_WORKERS,
+        "threads": WEB_THREADS,
+        "worker_class": "gthread",
+        "keepalive": WEB_KEEPALIVE,
+        "timeout": WEB_TIMEOUT,
+        "graceful_timeout": WEB_GRACEFUL_TIMEOUT,
+        "max_requests": WEB_MAX_REQUESTS,
+        "max_requests_jitter": WEB_MAX_REQUESTS // 10,
+        # 每个 worker 自行导入 botsever, 避免 fork 前创建的线程/连接被复制
+        "preload_app": False,
+        "accesslog": None,
+        "on_starting": on_starting,
+        "post_worker_init": post_worker_init,
+        "worker_exit": worker_exit,
+    }
+
+
+if BaseApplication is not None:
+
+    class WebhookApplication(BaseApplication):
+        """以代码方式配置的 gunicorn 应用 (无需额外配置文件)"""
+
+        def __init__(self, options: dict):
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                if key in self.cfg.settings and value is not None:
+                    self.cfg.set(key, value)
+
+        def load(self):
+            from botsever import app
+
+            return app
+
+
+def enable_worker_stats():
+    """设置多 worker 统计目录 (worker 从 master fork, 继承该设置)"""
+    return worker_stats.enable("botsever-stats")
+
+
+def main():
+    server = resolve_server()
+    if server == "gunicorn":
+        directory = enable_worker_stats()
+        # 每个 worker 有自己的投递服务和令牌桶, 按 worker 数均分 Telegram 限额
+        tg_delivery.divide_rate_limits(WEB_WORKERS)
+        print(
+            f"Starting production webhook server on port {PORT} "
+            f"(gunicorn: {WEB_WORKERS} workers x {WEB_THREADS} threads, stats: {directory})..."
+        )
+        WebhookApplication(gunicorn_options()).run()
+    else:
+        from botsever import app
+
+        structured_log.setup_logging()
+        print(f"Starting webhook server on port {PORT} (Flask development server)...")
+        app.run(host="0.0.0.0", port=PORT, debug=False, threaded=True)
+
 
 if __name__ == "__main__":
-    port = int(os.environ.get("PORT", 5000))
-    print(f"Starting production webhook server on port {port}...")
-    app.run(host="0.0.0.0", port=port, debug=False, threaded=True)
+    main()
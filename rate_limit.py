@@ -0,0 +1,91 @@
+"""
+令牌桶限速器
+
+线程安全, 同时支持同步 (time.sleep) 与异步 (asyncio.sleep) 等待,
+供 Telegram 投递服务和 Arkham 轮询等需要遵守接口限频的模块共用。
+"""
+
+import asyncio
+import threading
+import time
+from typing import Callable, Iterable
+
+
+class TokenBucket:
+    """令牌桶: rate 为每秒补充的令牌数, capacity 为突发上限"""
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if rate <= 0:
+            raise ValueError("rate 必须大于 0")
+        if capacity < 1:
+            raise ValueError("capacity 至少为 1")
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._clock = clock
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        elapsed = now - self._updated
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+            self._updated = now
+
+    def reserve(self, tokens: float = 1.0) -> float:
+        """
+        预占令牌并返回需要等待的秒数 (0 表示立即可用)
+
+        令牌允许透支, 后来者排在透支量之后等待, 保证先到先得。
+        """
+        with self._lock:
+            now = self._clock()
+            self._refill(now)
+            self._tokens -= tokens
+            wait = 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+            return max(wait, self._paused_until - now)
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        """非阻塞获取令牌, 不足时不透支直接返回 False"""
+        with self._lock:
+            now = self._clock()
+            self._refill(now)
+            if now < self._paused_until or self._tokens < tokens:
+                return False
+            self._tokens -= tokens
+            return True
+
+    def pause(self, seconds: float):
+        """暂停发放令牌 (用于服务端返回 retry_after 时整体退避)"""
+        with self._lock:
+            self._paused_until = max(self._paused_until, self._clock() + seconds)
+
+    def acquire(self, tokens: float = 1.0):
+        """同步阻塞直到令牌可用"""
+        wait = self.reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self, tokens: float = 1.0):
+        """异步等待直到令牌可用"""
+        wait = self.reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    @property
+    def available(self) -> float:
+        """当前可用令牌数 (可能为负, 表示已透支)"""
+        with self._lock:
+            self._refill(self._clock())
+            return self._tokens
+
+
+def reserve_all(buckets: Iterable[TokenBucket], tokens: float = 1.0) -> float:
+    """同时向多个令牌桶预占令牌, 返回其中最长的等待时间"""
+    return max((bucket.reserve(tokens) for bucket in buckets), default=0.0)
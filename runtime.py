@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+单进程监控运行时 (可选)
+
+把 arkm / bianjk / botsever 作为同一个事件循环中的任务运行, 代替 main.py 为每个
+监控启动一个 Python 解释器的方式:
+
+- 一份解释器和依赖库内存, 启动时只导入一次
+- 共用一个 aiohttp 会话 (币安 REST / WebSocket 与 Telegram 投递复用连接池)
+  和同一个 Telegram 投递服务 (全局限速在所有监控之间生效)
+- 指标都在同一个注册表中, botsever 的 /metrics 无需跨进程汇总
+- 每个监控单独守护: 异常退出后按指数退避重启, 稳定运行一段时间后退避重置
+
+阻塞代码不进事件循环: arkm 的轮询在线程池中执行, Flask 服务器占用一个独立线程。
+
+用法:
+    MONITOR_RUNTIME=asyncio python main.py
+    python runtime.py
+
+环境变量:
+    RUNTIME_MONITORS        要运行的监控 (默认 arkm,bianjk,botsever)
+    RUNTIME_BACKOFF_MIN     首次重启等待秒数 (默认 1)
+    RUNTIME_BACKOFF_MAX     重启等待上限秒数 (默认 60)
+    RUNTIME_STABLE_AFTER    连续运行超过该秒数后退避重置 (默认 300)
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+import aiohttp
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import metrics
+import structured_log
+
+logger = logging.getLogger(__name__)
+
+RUNTIME_MONITORS = [
+    name.strip() for name in os.environ.get("RUNTIME_MONITORS", "arkm,bianjk,botsever").split(",") if name.strip()
+]
+RUNTIME_BACKOFF_MIN = float(os.environ.get("RUNTIME_BACKOFF_MIN", "1"))
+RUNTIME_BACKOFF_MAX = float(os.environ.get("RUNTIME_BACKOFF_MAX", "60"))
+RUNTIME_STABLE_AFTER = float(os.environ.get("RUNTIME_STABLE_AFTER", "300"))
+
+RESTARTS = metrics.REGISTRY.counter("runtime_monitor_restarts_total", "监控任务重启次数", ["monitor"])
+UP = metrics.REGISTRY.gauge("runtime_monitor_up", "监控任务是否在运行 (1/0)", ["monitor"])
+
+MonitorFactory = Callable[["Runtime"], Awaitable[None]]
+
+
+# ---------------------------------------------------------------------------
+# 各监控的任务入口 (延迟导入, 只加载需要运行的模块)
+# ---------------------------------------------------------------------------
+
+
+async def run_arkm(runtime: "Runtime"):
+    """Arkham: 阻塞的轮询放到线程中, 按 POLL_INTERVAL_MINUTES 周期执行"""
+    import arkm
+
+    await asyncio.to_thread(arkm.setup)
+    while True:
+        await asyncio.to_thread(arkm.job)
+        await asyncio.sleep(arkm.POLL_INTERVAL_MINUTES * 60)
+
+
+async def run_bianjk(runtime: "Runtime"):
+    """币安: 原生协程, 复用运行时的 aiohttp 会话"""
+    import bianjk
+
+    await bianjk.connect_binance(runtime.session)
+
+
+async def run_botsever(runtime: "Runtime"):
+    """Webhook 服务器: Flask 阻塞运行在独立线程中"""
+    import botsever
+
+    port = botsever.get_available_port(botsever.START_PORT)
+    if port is None:
+        raise RuntimeError("无法找到可用端口")
+    logger.info("Webhook 服务器端口: %s", port)
+    await run_in_daemon_thread(botsever.app.run, host="0.0.0.0", port=port, debug=False, threaded=True)
+
+
+async def run_in_daemon_thread(func, *args, **kwargs):
+    """
+    在守护线程中运行不会自行结束的阻塞函数, 等待其返回或抛出异常
+
+    不用 asyncio.to_thread: 默认线程池的线程在退出时会被等待, 永不返回的服务器会卡住关闭流程。
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    def resolve(result, error):
+        if future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def target():
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            loop.call_soon_threadsafe(resolve, None, e)
+        else:
+            loop.call_soon_threadsafe(resolve, result, None)
+
+    threading.Thread(target=target, name=getattr(func, "__qualname__", "monitor"), daemon=True).start()
+    return await future
+
+
+MONITORS: Dict[str, MonitorFactory] = {
+    "arkm": run_arkm,
+    "bianjk": run_bianjk,
+    "botsever": run_botsever,
+}
+
+
+# ---------------------------------------------------------------------------
+# 守护
+# ---------------------------------------------------------------------------
+
+
+class MonitorTask:
+    """单个监控任务的运行、重启与状态"""
+
+    def __init__(
+        self,
+        name: str,
+        factory: MonitorFactory,
+        backoff_min: float = RUNTIME_BACKOFF_MIN,
+        backoff_max: float = RUNTIME_BACKOFF_MAX,
+        stable_after: float = RUNTIME_STABLE_AFTER,
+    ):
+        self.name = name
+        self.factory = factory
+        self.backoff_min = backoff_min
+        self.backoff_max = backoff_max
+        self.stable_after = stable_after
+        self.restarts = 0
+        self.running = False
+        self.last_error: Optional[str] = None
+        self.started_at: Optional[float] = None
+
+    async def supervise(self, runtime: "Runtime"):
+        """运行任务; 退出或异常后退避重启, 直到被取消"""
+        backoff = self.backoff_min
+        while True:
+            self.started_at = time.monotonic()
+            self.running = True
+            UP.labels(self.name).set(1)
+            try:
+                await self.factory(runtime)
+                self.last_error = "任务意外结束"
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.last_error = repr(e)
+                logger.exception("监控 %s 异常退出", self.name)
+            finally:
+                self.running = False
+                UP.labels(self.name).set(0)
+
+            if time.monotonic() - self.started_at >= self.stable_after:
+                backoff = self.backoff_min
+            self.restarts += 1
+            RESTARTS.labels(self.name).inc()
+            logger.warning("监控 %s 将在 %.0fs 后重启 (第 %d 次): %s", self.name, backoff, self.restarts, self.last_error)
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, self.backoff_max)
+
+    def status(self) -> dict:
+        return {
+            "running": self.running,
+            "restarts": self.restarts,
+            "last_error": self.last_error,
+            "uptime_seconds": round(time.monotonic() - self.started_at, 1) if self.running and self.started_at else 0,
+        }
+
+
+class Runtime:
+    """在一个事件循环中运行多个监控任务"""
+
+    def __init__(self, monitors: Dict[str, MonitorFactory], **task_options):
+        self.tasks = [MonitorTask(name, factory, **task_options) for name, factory in monitors.items()]
+        self.session: Optional[aiohttp.ClientSession] = None
+
+    async def run(self):
+        # 共享会话不设总超时 (WebSocket 长连接), 各请求自行设置超时
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=100, keepalive_timeout=60),
+            timeout=aiohttp.ClientTimeout(total=None, sock_connect=10),
+        )
+        try:
+            import tg_delivery
+
+            # 同步代码的 submit() 会投递到这个循环 (不再另起后台线程和事件循环)
+            await tg_delivery.get_delivery().start(self.session)
+            await asyncio.gather(*(task.supervise(self) for task in self.tasks))
+        finally:
+            await self.session.close()
+
+    def status(self) -> dict:
+        return {task.name: task.status() for task in self.tasks}
+
+
+def build_runtime(names=None) -> Runtime:
+    names = names or RUNTIME_MONITORS
+    unknown = [name for name in names if name not in MONITORS]
+    if unknown:
+        raise ValueError(f"未知监控: {unknown} (可选: {list(MONITORS)})")
+    return Runtime({name: MONITORS[name] for name in names})
+
+
+def main():
+    structured_log.setup_logging()
+    if sys.platform == "win32":
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+    runtime = build_runtime()
+    print(f"🚀 单进程运行时启动 | 监控: {', '.join(task.name for task in runtime.tasks)}", flush=True)
+    try:
+        asyncio.run(runtime.run())
+    except KeyboardInterrupt:
+        print("👋 运行时已停止")
+
+
+if __name__ == "__main__":
+    main()
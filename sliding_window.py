@@ -0,0 +1,135 @@
+"""
+多时间窗口滑动聚合
+
+用于密集大单检测: 同一份成交序列同时维护多个窗口 (如 10s / 1m / 5m) 的笔数与金额。
+
+- 时间戳和金额分别存放在 array('q') / array('d') 中, 每笔成交不再分配 dict
+- 每个窗口只记录自己的队头下标和滚动和, 新成交进入时各窗口均摊 O(1) 淘汰过期项,
+  判断是否触发无需重新求和
+- 所有窗口都不再引用的前缀会被批量删除, 内存只与最长窗口内的成交数相关
+"""
+
+from array import array
+from typing import Iterable, List, Tuple
+
+# 队头之前的已淘汰前缀超过该长度且占一半以上时才压缩, 避免频繁搬移
+COMPACT_MIN = 1024
+
+
+def parse_windows(spec: str, default_window_ms: int, default_count: int) -> List[Tuple[int, int]]:
+    """
+    解析窗口配置 "窗口秒数[:触发笔数],..." (如 "10:2,60:3,300:6")
+
+    Returns:
+        list[tuple]: 按窗口长度升序的 (window_ms, 触发笔数); spec 为空时只返回默认窗口
+    """
+    windows = {}
+    for part in (spec or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        seconds, _, count = part.partition(":")
+        window_ms = int(float(seconds) * 1000)
+        if window_ms <= 0:
+            raise ValueError(f"窗口长度必须大于 0: {part}")
+        windows[window_ms] = int(count) if count else default_count
+    if not windows:
+        windows[default_window_ms] = default_count
+    return sorted(windows.items())
+
+
+def format_window(window_ms: int) -> str:
+    """窗口长度转为中文描述, 如 60000 -> 1分钟"""
+    if window_ms % 60000 == 0:
+        return f"{window_ms // 60000}分钟"
+    return f"{window_ms / 1000:g}秒"
+
+
+class SlidingWindowAggregator:
+    """共享一份成交序列的多窗口滚动笔数 / 金额"""
+
+    __slots__ = ("windows", "_times", "_values", "_heads", "_sums")
+
+    def __init__(self, windows_ms: Iterable[int]):
+        windows = sorted({int(w) for w in windows_ms})
+        if not windows or windows[0] <= 0:
+            raise ValueError("至少需要一个大于 0 的窗口长度")
+        self.windows = tuple(windows)
+        self._times = array("q")
+        self._values = array("d")
+        self._heads = [0] * len(windows)
+        self._sums = [0.0] * len(windows)
+
+    def __len__(self) -> int:
+        """当前保留的成交笔数 (最长窗口内)"""
+        return len(self._times) - min(self._heads)
+
+    def add(self, ts: int, value: float):
+        """记录一笔成交, 并淘汰各窗口中早于 ts - window 的成交"""
+        self._times.append(ts)
+        self._values.append(value)
+        sums = self._sums
+        for i in range(len(sums)):
+            sums[i] += value
+        self._evict(ts)
+
+    def advance(self, now: int):
+        """没有新成交时推进时间, 淘汰过期项"""
+        self._evict(now)
+
+    def _evict(self, now: int):
+        times = self._times
+        values = self._values
+        heads = self._heads
+        sums = self._sums
+        end = len(times)
+        for i, window in enumerate(self.windows):
+            head = heads[i]
+            cutoff = now - window
+            if head < end and times[head] < cutoff:
+                total = sums[i]
+                while head < end and times[head] < cutoff:
+                    total -= values[head]
+                    head += 1
+                heads[i] = head
+                # 窗口清空时归零, 消除浮点累积误差
+                sums[i] = total if head < end else 0.0
+        self._compact()
+
+    def _compact(self):
+        oldest = min(self._heads)
+        if oldest < COMPACT_MIN or oldest * 2 < len(self._times):
+            return
+        del self._times[:oldest]
+        del self._values[:oldest]
+        self._heads = [head - oldest for head in self._heads]
+
+    def count(self, index: int = 0) -> int:
+        """第 index 个窗口 (按长度升序) 内的成交笔数"""
+        return len(self._times) - self._heads[index]
+
+    def total(self, index: int = 0) -> float:
+        """第 index 个窗口内的成交金额"""
+        return self._sums[index]
+
+    def snapshot(self) -> List[Tuple[int, int, float]]:
+        """所有窗口的 (window_ms, 笔数, 金额)"""
+        end = len(self._times)
+        return [
+            (window, end - head, total)
+            for window, head, total in zip(self.windows, self._heads, self._sums)
+        ]
+
+    def reset(self, index: int):
+        """清空第 index 个窗口及所有更短的窗口 (告警后重新计数)"""
+        end = len(self._times)
+        for i in range(index + 1):
+            self._heads[i] = end
+            self._sums[i] = 0.0
+        self._compact()
+
+    def clear(self):
+        self._times = array("q")
+        self._values = array("d")
+        self._heads = [0] * len(self.windows)
+        self._sums = [0.0] * len(self.windows)
@@ -0,0 +1,197 @@
+"""
+行情录制与回放
+
+录制: 把组合流的原始帧连同接收时间写入 gzip 文件, 一行一帧:
+    <接收时间 unix 秒>\\t<原始 JSON 帧>
+
+回放: 按录制的时间间隔以 1 倍 / N 倍 / 最大速度把帧重新送入解码器和检测逻辑,
+统计吞吐 (msgs/s)、各阶段耗时 (解码 / 每种事件的处理) 和内存分配, 用于离线对比改动前后的性能。
+
+- read_capture 同时支持 .gz 和纯文本, 以及不带时间戳的旧录制文件 (benchmarks/data/*.jsonl);
+  录制进程被杀掉导致末尾不完整时, 读到最后一个完整的帧为止
+- 内存分配: 默认统计解释器已分配内存块数的净增量 (几乎无开销, 即回放后仍存活的对象数);
+  trace_memory=True 时用 tracemalloc 额外统计峰值和累计分配 (会明显拖慢回放)
+"""
+
+import asyncio
+import gzip
+import logging
+import sys
+import time
+import tracemalloc
+import zlib
+from array import array
+from typing import Awaitable, Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 录制文件至少每隔这么多秒同步刷新一次, 进程异常退出最多丢这段时间的数据
+CAPTURE_FLUSH_INTERVAL = 5.0
+
+Frame = Tuple[Optional[float], str]
+
+
+class CaptureWriter:
+    """把原始帧追加写入 gzip 录制文件"""
+
+    def __init__(self, path: str, compresslevel: int = 6, flush_interval: float = CAPTURE_FLUSH_INTERVAL):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.frames = 0
+        self._file = gzip.open(path, "at", encoding="utf-8", compresslevel=compresslevel)
+        self._last_flush = time.monotonic()
+
+    def write(self, raw: str, ts: Optional[float] = None):
+        if ts is None:
+            ts = time.time()
+        self._file.write(f"{ts:.3f}\t{raw}\n")
+        self.frames += 1
+        now = time.monotonic()
+        if now - self._last_flush >= self.flush_interval:
+            self._file.flush()
+            self._last_flush = now
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+            logger.info("行情录制已保存: %s (%s 帧)", self.path, self.frames)
+
+
+def parse_line(line: str) -> Optional[Frame]:
+    """录制文件的一行 -> (时间戳或 None, 原始帧); 空行返回 None"""
+    line = line.rstrip("\n")
+    if not line.strip():
+        return None
+    # 紧凑 JSON 中不会出现字面的制表符, 以 { 开头的是不带时间戳的旧格式
+    if not line.startswith("{"):
+        ts, sep, raw = line.partition("\t")
+        if sep:
+            return float(ts), raw
+    return None, line
+
+
+def read_capture(path: str) -> Iterator[Frame]:
+    """逐帧读取录制文件 (gzip 或纯文本)"""
+    with open(path, "rb") as f:
+        compressed = f.read(2) == b"\x1f\x8b"
+    opener = gzip.open if compressed else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        try:
+            for line in f:
+                frame = parse_line(line)
+                if frame is not None:
+                    yield frame
+        except (EOFError, zlib.error):
+            logger.warning("录制文件 %s 末尾不完整, 已读到最后一个完整帧", path)
+
+
+# ---------------------------------------------------------------------------
+# 回放
+# ---------------------------------------------------------------------------
+
+
+class StageTimer:
+    """单个阶段的耗时样本 (array 存原始 double, 不为每个样本分配对象, 避免干扰内存统计)"""
+
+    __slots__ = ("samples",)
+
+    def __init__(self):
+        self.samples = array("d")
+
+    def summary(self) -> dict:
+        samples = sorted(self.samples)
+        count = len(samples)
+        if not count:
+            return {"count": 0}
+        return {
+            "count": count,
+            "avg_us": round(sum(samples) / count * 1e6, 2),
+            "p50_us": round(samples[count // 2] * 1e6, 2),
+            "p99_us": round(samples[min(count - 1, int(count * 0.99))] * 1e6, 2),
+            "max_us": round(samples[-1] * 1e6, 2),
+        }
+
+
+async def replay(
+    frames: Iterable[Frame],
+    decode: Callable[[str], Optional[tuple]],
+    handlers: Dict[str, Callable[[tuple], Awaitable[None]]],
+    speed: float = 0.0,
+    trace_memory: bool = False,
+) -> dict:
+    """
+    回放录制的帧, 返回统计报告
+
+    decode(raw) -> (kind, symbol, payload) 或 None; handlers 按 kind 处理解码后的事件。
+    speed <= 0 为最大速度; 否则按录制时间间隔 / speed 等待 (1 = 实时)。
+    """
+    stages: Dict[str, StageTimer] = {"decode": StageTimer()}
+    messages = skipped = 0
+    perf = time.perf_counter
+    first_ts: Optional[float] = None
+    started = perf()
+
+    if trace_memory:
+        tracemalloc.start()
+    blocks_before = sys.getallocatedblocks()
+    try:
+        for ts, raw in frames:
+            if speed > 0 and ts is not None:
+                if first_ts is None:
+                    first_ts = ts
+                delay = (ts - first_ts) / speed - (perf() - started)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+            messages += 1
+            t0 = perf()
+            event = decode(raw)
+            t1 = perf()
+            stages["decode"].samples.append(t1 - t0)
+            if event is None:
+                skipped += 1
+                continue
+            handler = handlers.get(event[0])
+            if handler is None:
+                skipped += 1
+                continue
+            await handler(event)
+            timer = stages.get(event[0])
+            if timer is None:
+                timer = stages[event[0]] = StageTimer()
+            timer.samples.append(perf() - t1)
+        elapsed = perf() - started
+        blocks_delta = sys.getallocatedblocks() - blocks_before
+        memory = {"allocated_blocks_delta": blocks_delta}
+        if trace_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            memory.update({"traced_current_kb": round(current / 1024, 1), "traced_peak_kb": round(peak / 1024, 1)})
+    finally:
+        if trace_memory:
+            tracemalloc.stop()
+
+    return {
+        "messages": messages,
+        "skipped": skipped,
+        "seconds": round(elapsed, 4),
+        "msgs_per_sec": round(messages / elapsed, 1) if elapsed > 0 else 0.0,
+        "speed": speed if speed > 0 else "max",
+        "stages": {name: timer.summary() for name, timer in stages.items()},
+        "memory": memory,
+    }
+
+
+def format_report(report: dict) -> str:
+    lines = [
+        f"帧数: {report['messages']} (跳过 {report['skipped']}) | 用时 {report['seconds']}s | "
+        f"{report['msgs_per_sec']} msgs/s | 速度: {report['speed']}",
+        f"{'阶段':<12}{'次数':>8}{'avg us':>10}{'p50 us':>10}{'p99 us':>10}{'max us':>10}",
+    ]
+    for name, s in report["stages"].items():
+        if not s["count"]:
+            continue
+        lines.append(
+            f"{name:<12}{s['count']:>8}{s['avg_us']:>10}{s['p50_us']:>10}{s['p99_us']:>10}{s['max_us']:>10}"
+        )
+    lines.append("内存: " + ", ".join(f"{k}={v}" for k, v in report["memory"].items()))
+    return "\n".join(lines)
@@ -0,0 +1,198 @@
+"""
+有界进程内事件管道
+
+WebSocket 读取协程只负责解析和入队, 检测与告警发送由独立的消费协程完成,
+Telegram 再慢也不会拖住读 socket。
+
+- 按 key (如交易对) 分片到多个有界队列, 每个分片一个消费协程, 同一 key 严格有序
+- 队列满时按丢弃策略处理: drop_oldest (丢最旧) / drop_newest (丢新到) / block (阻塞读取方)
+- 记录入队/处理/丢弃计数、队列深度、排队延迟与处理耗时, 用于观察背压
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+DROP_POLICIES = ("drop_oldest", "drop_newest", "block")
+
+
+class LatencyStat:
+    """累计平均值与最大值 (秒)"""
+
+    __slots__ = ("count", "total", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value: float):
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def snapshot(self) -> dict:
+        avg = self.total / self.count if self.count else 0.0
+        return {"avg_ms": round(avg * 1000, 3), "max_ms": round(self.max * 1000, 3)}
+
+
+class StreamPipeline:
+    """按 key 分片的有界异步管道"""
+
+    def __init__(
+        self,
+        handler: Callable[[Any], Awaitable[None]],
+        *,
+        shards: int = 4,
+        maxsize: int = 10000,
+        drop_policy: str = "drop_oldest",
+        name: str = "pipeline",
+    ):
+        if drop_policy not in DROP_POLICIES:
+            raise ValueError(f"未知丢弃策略: {drop_policy} (可选: {', '.join(DROP_POLICIES)})")
+        if shards < 1:
+            raise ValueError("shards 至少为 1")
+        self.handler = handler
+        self.shards = shards
+        self.maxsize = maxsize
+        self.drop_policy = drop_policy
+        self.name = name
+
+        self._queues: list = [asyncio.Queue(maxsize) for _ in range(shards)]
+        self._tasks: list = []
+
+        self.enqueued = 0
+        self.processed = 0
+        self.dropped = 0
+        self.errors = 0
+        self.max_depth = 0
+        self.queue_wait = LatencyStat()
+        self.handle_time = LatencyStat()
+
+    # ------------------------------------------------------------------
+    # 生命周期
+    # ------------------------------------------------------------------
+
+    async def start(self):
+        if self._tasks:
+            return
+        self._tasks = [
+            asyncio.create_task(self._consume(queue)) for queue in self._queues
+        ]
+
+    async def stop(self, drain: bool = True, timeout: float = 5.0):
+        """停止消费协程; drain=True 时先处理完已入队的事件"""
+        if drain and self._tasks:
+            try:
+                await asyncio.wait_for(
+                    asyncio.gather(*(queue.join() for queue in self._queues)), timeout
+                )
+            except asyncio.TimeoutError:
+                logger.warning("[%s] 未能在 %.0fs 内处理完积压事件", self.name, timeout)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    # ------------------------------------------------------------------
+    # 生产端
+    # ------------------------------------------------------------------
+
+    def _queue_for(self, key: Hashable) -> asyncio.Queue:
+        if self.shards == 1:
+            return self._queues[0]
+        return self._queues[hash(key) % self.shards]
+
+    def put_nowait(self, key: Hashable, item: Any) -> bool:
+        """
+        非阻塞入队 (block 策略下队列满时按 drop_newest 处理)
+
+        Returns:
+            bool: 新事件是否入队成功
+        """
+        queue = self._queue_for(key)
+        entry = (time.monotonic(), item)
+        if queue.full():
+            if self.drop_policy == "drop_oldest":
+                queue.get_nowait()
+                queue.task_done()
+                self.dropped += 1
+            else:
+                self.dropped += 1
+                return False
+        queue.put_nowait(entry)
+        self._after_put(queue)
+        return True
+
+    async def put(self, key: Hashable, item: Any) -> bool:
+        """入队; block 策略下队列满时等待空位, 其余策略同 put_nowait"""
+        if self.drop_policy != "block":
+            return self.put_nowait(key, item)
+        queue = self._queue_for(key)
+        await queue.put((time.monotonic(), item))
+        self._after_put(queue)
+        return True
+
+    def _after_put(self, queue: asyncio.Queue):
+        self.enqueued += 1
+        depth = queue.qsize()
+        if depth > self.max_depth:
+            self.max_depth = depth
+
+    # ------------------------------------------------------------------
+    # 消费端
+    # ------------------------------------------------------------------
+
+    async def _consume(self, queue: asyncio.Queue):
+        while True:
+            enqueued_at, item = await queue.get()
+            started = time.monotonic()
+            self.queue_wait.add(started - enqueued_at)
+            try:
+                await self.handler(item)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.errors += 1
+                logger.error("[%s] 事件处理异常: %r", self.name, e)
+            finally:
+                self.handle_time.add(time.monotonic() - started)
+                self.processed += 1
+                queue.task_done()
+
+    # ------------------------------------------------------------------
+    # 指标
+    # ------------------------------------------------------------------
+
+    def depth(self) -> int:
+        return sum(queue.qsize() for queue in self._queues)
+
+    def metrics(self) -> dict:
+        """背压指标快照"""
+        return {
+            "name": self.name,
+            "drop_policy": self.drop_policy,
+            "shards": self.shards,
+            "capacity": self.maxsize * self.shards,
+            "depth": self.depth(),
+            "max_depth": self.max_depth,
+            "enqueued": self.enqueued,
+            "processed": self.processed,
+            "dropped": self.dropped,
+            "errors": self.errors,
+            "queue_wait": self.queue_wait.snapshot(),
+            "handle_time": self.handle_time.snapshot(),
+        }
+
+    def format_metrics(self, metrics: Optional[dict] = None) -> str:
+        m = metrics or self.metrics()
+        return (
+            f"[{m['name']}] 深度 {m['depth']}/{m['capacity']} (峰值 {m['max_depth']}), "
+            f"入队 {m['enqueued']}, 处理 {m['processed']}, 丢弃 {m['dropped']}, "
+            f"异常 {m['errors']}, 排队延迟 avg {m['queue_wait']['avg_ms']}ms "
+            f"max {m['queue_wait']['max_ms']}ms"
+        )
@@ -0,0 +1,215 @@
+"""
+结构化异步日志
+
+热路径上的 print(..., flush=True) / 同步 StreamHandler 每条日志都要等一次 stdout 写入,
+压测时占请求耗时的可观比例。这里把日志改为:
+
+- 调用方只创建 LogRecord 放入有界队列 (QueueHandler), 后台线程 (QueueListener) 负责格式化和写出;
+  消息参数延迟到写出线程才格式化 (logger.info("... %s", obj) 时 obj 的 __str__ 在后台执行)
+- 队列满时丢弃并计数, 不阻塞业务线程 / 事件循环
+- 输出格式: text (默认, 便于控制台阅读) 或 json (每行一个 JSON 对象, 带 extra 字段, 便于采集)
+- 采样: 同一条日志模板 (logger 名 + 未格式化的 msg) 每个时间窗口最多输出 N 条,
+  WARNING 及以上不采样; 被抑制的条数附在该模板下一窗口的第一条日志上 (suppressed 字段)
+
+环境变量:
+    LOG_FORMAT            text / json (默认 text)
+    LOG_LEVEL             根日志级别 (默认 INFO)
+    LOG_QUEUE_SIZE        待写出日志队列上限 (默认 10000)
+    LOG_SAMPLE_BURST      每个模板每个窗口最多输出的 INFO/DEBUG 条数 (默认 50, 0 = 不采样)
+    LOG_SAMPLE_INTERVAL   采样窗口秒数 (默认 10)
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+from typing import Optional
+
+import metrics
+
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "text")
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+LOG_QUEUE_SIZE = int(os.environ.get("LOG_QUEUE_SIZE", "10000"))
+LOG_SAMPLE_BURST = int(os.environ.get("LOG_SAMPLE_BURST", "50"))
+LOG_SAMPLE_INTERVAL = float(os.environ.get("LOG_SAMPLE_INTERVAL", "10"))
+
+TEXT_FORMAT = "%(asctime)s [%(name)s] %(message)s"
+
+DROPPED = metrics.REGISTRY.counter("log_records_dropped_total", "日志队列已满被丢弃的记录数")
+SUPPRESSED = metrics.REGISTRY.counter("log_records_sampled_out_total", "被采样抑制的日志记录数")
+
+# LogRecord 自带的属性, 其余 (extra 传入的) 字段原样写入 JSON
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """每条日志格式化为一行 JSON"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "pid": record.process,
+            "thread": record.threadName,
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """按日志模板限制每个时间窗口的输出条数 (WARNING 及以上始终放行)"""
+
+    def __init__(self, burst: int = LOG_SAMPLE_BURST, interval: float = LOG_SAMPLE_INTERVAL, clock=time.monotonic):
+        super().__init__()
+        self.burst = burst
+        self.interval = interval
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._window_start = clock()
+        self._counts: dict = {}
+        self._carry: dict = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.burst <= 0 or record.levelno >= logging.WARNING:
+            return True
+        key = (record.name, record.msg if isinstance(record.msg, str) else id(record.msg))
+        with self._lock:
+            now = self._clock()
+            if now - self._window_start >= self.interval:
+                # 只保留上一窗口的抑制计数, 模板字典不会无限增长
+                self._carry = {k: n - self.burst for k, n in self._counts.items() if n > self.burst}
+                self._counts = {}
+                self._window_start = now
+            count = self._counts.get(key, 0) + 1
+            self._counts[key] = count
+            if count > self.burst:
+                SUPPRESSED.inc()
+                return False
+            suppressed = self._carry.pop(key, 0)
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+
+class _AsyncQueueHandler(logging.handlers.QueueHandler):
+    """入队不格式化 (由写出线程完成), 队列满时丢弃"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            DROPPED.inc()
+
+
+class _StdoutHandler(logging.StreamHandler):
+    """每次写出时取当前的 sys.stdout (兼容运行中替换 stdout)"""
+
+    def __init__(self):
+        super().__init__(sys.stdout)
+
+    @property
+    def stream(self):
+        return sys.stdout
+
+    @stream.setter
+    def stream(self, value):
+        pass
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue: Optional[queue.Queue] = None
+_setup_lock = threading.Lock()
+
+
+def make_formatter(fmt: str = LOG_FORMAT) -> logging.Formatter:
+    if fmt == "json":
+        return JsonFormatter()
+    if fmt != "text":
+        raise ValueError(f"未知 LOG_FORMAT: {fmt} (可选: text / json)")
+    return logging.Formatter(TEXT_FORMAT)
+
+
+def setup_logging(fmt: str = LOG_FORMAT, level: str = LOG_LEVEL) -> logging.handlers.QueueListener:
+    """
+    给根 logger 装上异步队列 handler 并启动写出线程 (各进程入口调用一次, 重复调用无副作用)
+
+    会移除根 logger 上已有的 handler (如 basicConfig 装的同步 StreamHandler)。
+    """
+    global _listener, _queue
+    with _setup_lock:
+        if _listener is not None:
+            return _listener
+        _queue = queue.Queue(LOG_QUEUE_SIZE)
+        output = _StdoutHandler()
+        output.setFormatter(make_formatter(fmt))
+        handler = _AsyncQueueHandler(_queue)
+        handler.addFilter(SamplingFilter())
+
+        root = logging.getLogger()
+        for existing in list(root.handlers):
+            root.removeHandler(existing)
+        root.addHandler(handler)
+        root.setLevel(level)
+
+        _listener = logging.handlers.QueueListener(_queue, output, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown)
+        return _listener
+
+
+def flush(timeout: float = 5.0) -> bool:
+    """等待队列中已有的日志写出完毕"""
+    if _queue is None:
+        return True
+    deadline = time.monotonic() + timeout
+    while _queue.unfinished_tasks:
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(0.005)
+    return True
+
+
+def shutdown():
+    """写完剩余日志并停止写出线程"""
+    global _listener, _queue
+    with _setup_lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            if isinstance(handler, _AsyncQueueHandler):
+                root.removeHandler(handler)
+        _listener = None
+        _queue = None
+
+
+class LazyJson:
+    """延迟序列化: 只有日志真正写出时才在写出线程里 json.dumps (截断到 limit 字符)"""
+
+    __slots__ = ("data", "limit")
+
+    def __init__(self, data, limit: int = 500):
+        self.data = data
+        self.limit = limit
+
+    def __str__(self) -> str:
+        try:
+            text = json.dumps(self.data, ensure_ascii=False, default=str)
+        except (TypeError, ValueError) as e:
+            return f"<无法序列化: {e!r}>"
+        return text if len(text) <= self.limit else text[: self.limit] + "..."
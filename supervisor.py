@@ -0,0 +1,326 @@
+"""
+子进程守护 (main.py 的 process 模式)
+
+- 即时发现退出: 安装 SIGCHLD 处理函数, 子进程一退出就唤醒守护循环, 随即用
+  Popen.poll() (waitpid WNOHANG) 回收; 没有 SIGCHLD 的平台退回定时检查
+- 指数退避重启: 启动后很快又退出 (如缺少环境变量在导入时报错) 的脚本, 重启间隔
+  按 1s, 2s, 4s ... 增长到上限; 稳定运行超过 stable_after 秒后退避重置
+- 心跳检测卡死: 子进程在主循环中调用 beat() 更新心跳文件, 超过 heartbeat_timeout
+  未更新视为卡死, 终止后按退避重启; 从未写过心跳的脚本不做这项检查
+- 指标: supervisor_restarts_total{script,reason} / supervisor_process_up / supervisor_backoff_seconds
+
+环境变量:
+    SUPERVISOR_BACKOFF_MIN         首次重启等待秒数 (默认 1)
+    SUPERVISOR_BACKOFF_MAX         重启等待上限秒数 (默认 300)
+    SUPERVISOR_STABLE_AFTER        连续运行超过该秒数后退避重置 (默认 300)
+    SUPERVISOR_HEARTBEAT_TIMEOUT   心跳超时秒数 (默认 600, 0 = 不检查)
+    SUPERVISOR_CHECK_INTERVAL      心跳 / 定时检查间隔秒数 (默认 5)
+    SUPERVISOR_HEARTBEAT_DIR       心跳文件目录 (由主进程设置, 子进程继承)
+"""
+
+import asyncio
+import logging
+import os
+import select
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+HEARTBEAT_DIR_ENV = "SUPERVISOR_HEARTBEAT_DIR"
+
+SUPERVISOR_BACKOFF_MIN = float(os.environ.get("SUPERVISOR_BACKOFF_MIN", "1"))
+SUPERVISOR_BACKOFF_MAX = float(os.environ.get("SUPERVISOR_BACKOFF_MAX", "300"))
+SUPERVISOR_STABLE_AFTER = float(os.environ.get("SUPERVISOR_STABLE_AFTER", "300"))
+SUPERVISOR_HEARTBEAT_TIMEOUT = float(os.environ.get("SUPERVISOR_HEARTBEAT_TIMEOUT", "600"))
+SUPERVISOR_CHECK_INTERVAL = float(os.environ.get("SUPERVISOR_CHECK_INTERVAL", "5"))
+
+RESTARTS = metrics.REGISTRY.counter("supervisor_restarts_total", "子进程重启次数", ["script", "reason"])
+UP = metrics.REGISTRY.gauge("supervisor_process_up", "子进程是否在运行 (1/0)", ["script"])
+BACKOFF = metrics.REGISTRY.gauge("supervisor_backoff_seconds", "下次重启前的等待秒数", ["script"])
+
+
+# ---------------------------------------------------------------------------
+# 子进程侧: 心跳
+# ---------------------------------------------------------------------------
+
+# 两次写心跳文件的最小间隔, 主循环每秒调用 beat() 也只会每 5 秒写一次
+BEAT_MIN_INTERVAL = 5.0
+
+_last_beat: Dict[str, float] = {}
+
+
+def heartbeat_path(directory: str, script: str) -> str:
+    return os.path.join(directory, f"{os.path.splitext(os.path.basename(script))[0]}.hb")
+
+
+def beat(script: Optional[str] = None, force: bool = False):
+    """
+    更新本进程的心跳文件 (在主循环中调用); 未由守护进程启动时什么也不做
+
+    script 默认取 sys.argv[0], 即 main.py 启动的脚本名。
+    """
+    directory = os.environ.get(HEARTBEAT_DIR_ENV)
+    if not directory:
+        return
+    script = script or sys.argv[0]
+    now = time.monotonic()
+    if not force and now - _last_beat.get(script, float("-inf")) < BEAT_MIN_INTERVAL:
+        return
+    _last_beat[script] = now
+    path = heartbeat_path(directory, script)
+    try:
+        with open(path, "a"):
+            pass
+        os.utime(path)
+    except OSError as e:
+        logger.warning("心跳文件写入失败 %s: %r", path, e)
+
+
+async def heartbeat_task(script: Optional[str] = None, interval: float = BEAT_MIN_INTERVAL):
+    """asyncio 进程用: 事件循环没有被阻塞时定期写心跳"""
+    while True:
+        beat(script, force=True)
+        await asyncio.sleep(interval)
+
+
+def enable_heartbeats(prefix: str = "monitor-heartbeats") -> str:
+    """
+    启用心跳: 未设置 SUPERVISOR_HEARTBEAT_DIR 时在临时目录下创建一个,
+    写回环境变量让之后启动的子进程继承, 返回目录
+    """
+    directory = os.environ.get(HEARTBEAT_DIR_ENV) or os.path.join(
+        tempfile.gettempdir(), f"{prefix}-{os.getpid()}"
+    )
+    os.makedirs(directory, exist_ok=True)
+    for name in os.listdir(directory):
+        if name.endswith(".hb"):
+            try:
+                os.remove(os.path.join(directory, name))
+            except OSError:
+                pass
+    os.environ[HEARTBEAT_DIR_ENV] = directory
+    return directory
+
+
+# ---------------------------------------------------------------------------
+# 守护进程侧
+# ---------------------------------------------------------------------------
+
+
+class ScriptState:
+    """单个脚本的重启状态"""
+
+    __slots__ = ("script", "backoff", "restarts", "started_at", "next_start", "last_exit", "last_reason")
+
+    def __init__(self, script: str, backoff: float):
+        self.script = script
+        self.backoff = backoff
+        self.restarts = 0
+        self.started_at: Optional[float] = None
+        self.next_start: Optional[float] = None
+        self.last_exit: Optional[int] = None
+        self.last_reason: Optional[str] = None
+
+
+class Supervisor:
+    """
+    守护 main.start_script 启动的子进程
+
+    spawn(script) -> bool 负责启动并把 {"type": "process", "obj": Popen} 写入 processes;
+    线程类型 (botsever) 的条目不受守护。
+    """
+
+    def __init__(
+        self,
+        scripts: Iterable[str],
+        spawn: Callable[[str], bool],
+        processes: dict,
+        backoff_min: float = SUPERVISOR_BACKOFF_MIN,
+        backoff_max: float = SUPERVISOR_BACKOFF_MAX,
+        stable_after: float = SUPERVISOR_STABLE_AFTER,
+        heartbeat_timeout: float = SUPERVISOR_HEARTBEAT_TIMEOUT,
+        check_interval: float = SUPERVISOR_CHECK_INTERVAL,
+        heartbeat_dir: Optional[str] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.scripts = list(scripts)
+        self.spawn = spawn
+        self.processes = processes
+        self.backoff_min = backoff_min
+        self.backoff_max = backoff_max
+        self.stable_after = stable_after
+        self.heartbeat_timeout = heartbeat_timeout
+        self.check_interval = check_interval
+        self.heartbeat_dir = heartbeat_dir
+        self._clock = clock
+        self.states: Dict[str, ScriptState] = {script: ScriptState(script, backoff_min) for script in self.scripts}
+        self._wakeup_r: Optional[int] = None
+        self._wakeup_w: Optional[int] = None
+
+    # ------------------------------------------------------------------
+    # 启动 / 重启
+    # ------------------------------------------------------------------
+
+    def _process(self, script: str) -> Optional[subprocess.Popen]:
+        info = self.processes.get(script)
+        if info and info.get("type") == "process":
+            return info.get("obj")
+        return None
+
+    def start(self, script: str) -> bool:
+        """启动脚本并记录启动时间; 启动失败同样按退避安排重试"""
+        state = self.states[script]
+        state.next_start = None
+        state.started_at = self._clock()
+        ok = self.spawn(script)
+        if not ok:
+            self._schedule_restart(state, None, "spawn_failed")
+        elif self._process(script) is not None:
+            UP.labels(script).set(1)
+        return ok
+
+    def _schedule_restart(self, state: ScriptState, return_code: Optional[int], reason: str):
+        now = self._clock()
+        if state.started_at is not None and now - state.started_at >= self.stable_after:
+            state.backoff = self.backoff_min
+        delay = state.backoff
+        state.backoff = min(state.backoff * 2, self.backoff_max)
+        state.next_start = now + delay
+        state.last_exit = return_code
+        state.last_reason = reason
+        state.restarts += 1
+        RESTARTS.labels(state.script, reason).inc()
+        UP.labels(state.script).set(0)
+        BACKOFF.labels(state.script).set(delay)
+        print(
+            f"\n⚠️ [警告] {state.script} 已停止运行! (退出码: {return_code}, 原因: {reason})\n"
+            f"🔄 {delay:.0f} 秒后重启 {state.script} (第 {state.restarts} 次)",
+            flush=True,
+        )
+
+    # ------------------------------------------------------------------
+    # 心跳
+    # ------------------------------------------------------------------
+
+    def heartbeat_age(self, script: str) -> Optional[float]:
+        """距上次心跳的秒数; 没有心跳文件 (脚本未接入心跳) 时为 None"""
+        if not self.heartbeat_dir:
+            return None
+        try:
+            mtime = os.stat(heartbeat_path(self.heartbeat_dir, script)).st_mtime
+        except OSError:
+            return None
+        return max(0.0, time.time() - mtime)
+
+    def _clear_heartbeat(self, script: str):
+        if self.heartbeat_dir:
+            try:
+                os.remove(heartbeat_path(self.heartbeat_dir, script))
+            except OSError:
+                pass
+
+    def _kill_hung(self, script: str, process: subprocess.Popen, age: float):
+        print(f"\n🧊 [卡死] {script} 已 {age:.0f} 秒没有心跳, 正在终止 (PID: {process.pid})", flush=True)
+        process.terminate()
+        try:
+            process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+    # ------------------------------------------------------------------
+    # 守护循环
+    # ------------------------------------------------------------------
+
+    def check(self):
+        """回收已退出的子进程, 终止卡死的子进程, 启动到期的重启"""
+        now = self._clock()
+        for script, state in self.states.items():
+            if state.next_start is not None:
+                if now >= state.next_start:
+                    self.start(script)
+                continue
+
+            process = self._process(script)
+            if process is None:
+                continue
+            return_code = process.poll()
+            if return_code is not None:
+                self._clear_heartbeat(script)
+                self._schedule_restart(state, return_code, "exit")
+                continue
+
+            age = self.heartbeat_age(script)
+            if self.heartbeat_timeout > 0 and age is not None and age > self.heartbeat_timeout:
+                self._kill_hung(script, process, age)
+                self._clear_heartbeat(script)
+                self._schedule_restart(state, process.returncode, "hung")
+
+    def next_timeout(self) -> float:
+        """距下一次需要处理的事件 (到期重启或定时检查) 的秒数"""
+        timeout = self.check_interval
+        now = self._clock()
+        for state in self.states.values():
+            if state.next_start is not None:
+                timeout = min(timeout, max(0.0, state.next_start - now))
+        return timeout
+
+    def install_signal_handler(self) -> bool:
+        """安装 SIGCHLD 处理函数 (只能在主线程调用); 平台不支持时返回 False"""
+        if not hasattr(signal, "SIGCHLD") or threading.current_thread() is not threading.main_thread():
+            return False
+        self._wakeup_r, self._wakeup_w = os.pipe()
+        os.set_blocking(self._wakeup_r, False)
+        os.set_blocking(self._wakeup_w, False)
+
+        def on_sigchld(signum, frame):
+            try:
+                os.write(self._wakeup_w, b"\0")
+            except (BlockingIOError, OSError):
+                pass
+
+        signal.signal(signal.SIGCHLD, on_sigchld)
+        return True
+
+    def wait(self, timeout: float) -> bool:
+        """等待子进程退出信号或超时; 收到信号返回 True"""
+        if self._wakeup_r is None:
+            time.sleep(timeout)
+            return False
+        readable, _, _ = select.select([self._wakeup_r], [], [], timeout)
+        if not readable:
+            return False
+        try:
+            while os.read(self._wakeup_r, 512):
+                pass
+        except BlockingIOError:
+            pass
+        return True
+
+    def run_forever(self):
+        while True:
+            self.wait(self.next_timeout())
+            self.check()
+
+    def status(self) -> dict:
+        now = self._clock()
+        report = {}
+        for script, state in self.states.items():
+            process = self._process(script)
+            report[script] = {
+                "running": state.next_start is None and process is not None and process.poll() is None,
+                "restarts": state.restarts,
+                "last_exit": state.last_exit,
+                "last_reason": state.last_reason,
+                "restart_in": round(max(0.0, state.next_start - now), 1) if state.next_start is not None else None,
+                "heartbeat_age": self.heartbeat_age(script),
+            }
+        return report
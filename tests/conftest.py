@@ -11,6 +11,8 @@ os.environ['ARKHAM_TOPIC_ID'] = '1'
 os.environ['BINANCE_TOPIC_ID'] = '3'
 os.environ['ZIXUN_TOPIC_ID'] = '4'
 os.environ['BOTSEVER_TOPIC_ID'] = '13'
+# Don't write the alert history DB during tests (use tmp_path stores instead)
+os.environ['ALERT_STORE_PATH'] = ''
 
 # Add project root to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
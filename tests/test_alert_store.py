@@ -0,0 +1,200 @@
+"""Tests for alert_store.py - batched SQLite alert history."""
+import asyncio
+import os
+import sys
+from concurrent.futures import Future
+from unittest.mock import patch
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import alert_store
+from alert_store import AlertStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    s = AlertStore(str(tmp_path / "alerts.db"), batch_size=50, flush_interval=0.05)
+    yield s
+    s.close()
+
+
+class TestParseTime:
+    """Test query time parameter parsing."""
+
+    def test_seconds_and_milliseconds(self):
+        """Test numeric timestamps in seconds or milliseconds."""
+        assert alert_store.parse_time("1704067200") == 1704067200
+        assert alert_store.parse_time("1704067200000") == 1704067200
+
+    def test_iso_string(self):
+        """Test ISO 8601 strings with a Z suffix."""
+        assert alert_store.parse_time("2024-01-01T00:00:00Z") == 1704067200
+
+    def test_empty_and_invalid(self):
+        """Test empty values mean no bound and garbage is rejected."""
+        assert alert_store.parse_time("") is None
+        assert alert_store.parse_time(None) is None
+        with pytest.raises(ValueError):
+            alert_store.parse_time("yesterday")
+
+
+class TestRecordAndQuery:
+    """Test writing through the background writer and reading back."""
+
+    def test_roundtrip(self, store):
+        """Test a recorded alert is returned with its fields and extra data."""
+        assert store.record("bianjk", "large_trade", "⚡ BTC", symbol="BTCUSDT", value=1.5e6,
+                            delivered=True, ts=100.0, side="buy")
+        assert store.flush()
+
+        alert = store.query()["alerts"][0]
+        assert alert["source"] == "bianjk"
+        assert alert["alert_type"] == "large_trade"
+        assert alert["symbol"] == "BTCUSDT"
+        assert alert["value"] == 1.5e6
+        assert alert["delivered"] is True
+        assert alert["data"] == {"side": "buy"}
+
+    def test_writes_in_batches(self, store):
+        """Test many records are committed in a few transactions."""
+        for i in range(200):
+            store.record("arkm", "transfer", symbol="binance", ts=float(i))
+        assert store.flush()
+
+        assert store.written == 200
+        assert store.batches <= 10
+        assert store.count() == 200
+
+    def test_filters(self, store):
+        """Test since/until/source/symbol/type/delivered filters."""
+        store.record("bianjk", "burst", symbol="BTCUSDT", ts=10.0, delivered=True)
+        store.record("bianjk", "order_wall", symbol="ETHUSDT", ts=20.0, delivered=False)
+        store.record("arkm", "transfer", symbol="binance", ts=30.0, delivered=True)
+        store.flush()
+
+        assert [a["ts"] for a in store.query(since=15)["alerts"]] == [30.0, 20.0]
+        assert [a["ts"] for a in store.query(until=20)["alerts"]] == [10.0]
+        assert [a["source"] for a in store.query(source="arkm")["alerts"]] == ["arkm"]
+        assert [a["alert_type"] for a in store.query(alert_type="burst")["alerts"]] == ["burst"]
+        assert [a["symbol"] for a in store.query(delivered=False)["alerts"]] == ["ETHUSDT"]
+
+    def test_symbol_case_insensitive(self, store):
+        """Test symbol filters ignore case."""
+        store.record("bianjk", "burst", symbol="BTCUSDT", ts=1.0)
+        store.flush()
+        assert len(store.query(symbol="btcusdt")["alerts"]) == 1
+
+    def test_cursor_pagination(self, store):
+        """Test pages follow each other without gaps or repeats, including equal timestamps."""
+        for i in range(25):
+            store.record("bianjk", "burst", symbol="BTCUSDT", ts=float(i // 2))
+        store.flush()
+
+        seen, cursor = [], None
+        while True:
+            page = store.query(symbol="BTCUSDT", limit=10, cursor=cursor)
+            seen.extend(a["id"] for a in page["alerts"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+        assert len(seen) == 25 == len(set(seen))
+
+    def test_invalid_cursor(self, store):
+        """Test a malformed cursor raises ValueError."""
+        with pytest.raises(ValueError):
+            store.query(cursor="nope")
+
+    def test_symbol_query_uses_index(self, store):
+        """Test symbol + time queries are served from the (symbol, ts) index."""
+        store.record("bianjk", "burst", symbol="BTCUSDT", ts=1.0)
+        store.flush()
+        plan = store._read(
+            "EXPLAIN QUERY PLAN SELECT * FROM alerts WHERE symbol = ? AND ts >= ? ORDER BY ts DESC, id DESC LIMIT 10",
+            ["BTCUSDT", 0],
+        )
+        detail = " ".join(row[-1] for row in plan)
+        assert "idx_alerts_symbol_ts" in detail
+        assert "TEMP B-TREE" not in detail
+
+    def test_cursor_query_seeks_index(self, store):
+        """Test later pages start from the cursor position in the index."""
+        store.record("bianjk", "burst", symbol="BTCUSDT", ts=1.0)
+        store.flush()
+        with patch.object(store, "_read", wraps=store._read) as read:
+            store.query(symbol="BTCUSDT", cursor="5.0:10")
+        sql, params = read.call_args[0]
+        plan = store._read("EXPLAIN QUERY PLAN " + sql, params)
+        assert "(symbol=? AND ts<?)" in " ".join(row[-1] for row in plan)
+
+
+class TestWriterBehaviour:
+    """Test the non-blocking writer."""
+
+    def test_disabled_store_records_nothing(self):
+        """Test an empty path disables recording."""
+        store = AlertStore("")
+        assert not store.enabled
+        assert store.record("arkm", "transfer") is False
+
+    def test_full_queue_drops(self, tmp_path):
+        """Test records are dropped (not blocked on) when the queue is full."""
+        store = AlertStore(str(tmp_path / "alerts.db"), queue_size=1)
+        store._thread = object()  # keep the writer from draining the queue
+        assert store.record("arkm", "transfer")
+        assert not store.record("arkm", "transfer")
+        assert store.dropped == 1
+
+    def test_close_flushes_pending(self, tmp_path):
+        """Test close() writes what is still queued."""
+        path = str(tmp_path / "alerts.db")
+        store = AlertStore(path, flush_interval=60)
+        for i in range(5):
+            store.record("arkm", "transfer", ts=float(i))
+        store.close()
+
+        reader = AlertStore(path)
+        assert reader.count() == 5
+        reader.close()
+
+    def test_retention_prunes_old_rows(self, tmp_path):
+        """Test rows older than the retention window are deleted."""
+        import time
+
+        store = AlertStore(str(tmp_path / "alerts.db"), flush_interval=0.05, retention_days=1)
+        store.record("arkm", "transfer", ts=time.time() - 3 * 86400)
+        store.record("arkm", "transfer")
+        store.flush()
+        assert store.count() == 1
+        store.close()
+
+
+class TestTrack:
+    """Test recording delivery results from futures."""
+
+    def test_concurrent_future(self, store):
+        """Test the result of a thread future is stored as delivered."""
+        future = Future()
+        assert store.track(future, "arkm", "transfer", "msg", symbol="binance") is future
+        future.set_result(True)
+        store.flush()
+        assert store.query()["alerts"][0]["delivered"] is True
+
+    def test_asyncio_future_failure(self, store):
+        """Test a failed asyncio future is stored as not delivered."""
+        async def run():
+            future = asyncio.get_running_loop().create_future()
+            store.track(future, "bianjk", "burst", "msg")
+            future.set_exception(RuntimeError("boom"))
+            await asyncio.sleep(0)
+            future.exception()
+
+        asyncio.run(run())
+        store.flush()
+        assert store.query()["alerts"][0]["delivered"] is False
+
+    def test_disabled_store_passes_future_through(self):
+        """Test tracking is a no-op when the store is disabled."""
+        future = Future()
+        assert AlertStore("").track(future, "arkm", "transfer") is future
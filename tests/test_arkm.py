@@ -1,4 +1,5 @@
 """Tests for arkm.py - Arkham Intelligence monitoring."""
+import logging
 import os
 import sys
 import pytest
@@ -9,14 +10,31 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # Import once at module level
 import arkm
+from cooldown_store import CooldownStore
 
 
 @pytest.fixture(autouse=True)
-def reset_arkm_state():
+def reset_arkm_state(tmp_path, monkeypatch):
     """Reset module state before each test."""
-    arkm.processed_txs = set()
+    arkm.processed_txs = CooldownStore(arkm.ARKHAM_DEDUP_TTL)
+    arkm.cursors.clear()
+    monkeypatch.setattr(arkm, 'ARKHAM_CURSOR_FILE', str(tmp_path / 'cursor.json'))
     yield
-    arkm.processed_txs = set()
+    arkm.processed_txs = CooldownStore(arkm.ARKHAM_DEDUP_TTL)
+    arkm.cursors.clear()
+
+
+def make_response(transfers, status_code=200):
+    """Build a mocked Arkham /transfers response."""
+    response = Mock()
+    response.status_code = status_code
+    response.json.return_value = {'transfers': transfers}
+    return response
+
+
+def make_tx(tx_hash, timestamp):
+    """Build a minimal transfer record."""
+    return {'transactionHash': tx_hash, 'blockTimestamp': timestamp, 'historicalUSD': 2e6}
 
 
 class TestArkhamConfig:
@@ -43,7 +61,7 @@ class TestArkhamConfig:
 class TestArkhamAPI:
     """Test Arkham API interactions."""
 
-    @patch('arkm.requests.get')
+    @patch('arkm.http.get')
     def test_get_transfers_success(self, mock_get):
         """Test successful transfer retrieval."""
         mock_response = Mock()
@@ -69,7 +87,7 @@ class TestArkhamAPI:
         assert len(transfers) == 1
         assert transfers[0]['transactionHash'] == '0x123'
 
-    @patch('arkm.requests.get')
+    @patch('arkm.http.get')
     def test_get_transfers_empty(self, mock_get):
         """Test empty transfer list."""
         mock_response = Mock()
@@ -80,7 +98,7 @@ class TestArkhamAPI:
         transfers = arkm.get_arkham_transfers('binance')
         assert transfers == []
 
-    @patch('arkm.requests.get')
+    @patch('arkm.http.get')
     def test_get_transfers_api_error(self, mock_get):
         """Test API error handling."""
         mock_response = Mock()
@@ -94,36 +112,194 @@ class TestArkhamAPI:
 class TestTelegramSending:
     """Test Telegram message sending."""
 
-    @patch('arkm.requests.post')
-    def test_send_telegram_success(self, mock_post):
-        """Test successful Telegram message send."""
+    def test_send_telegram_success(self):
+        """Test successful Telegram message send goes through the delivery service."""
+        with patch.object(arkm.delivery, 'send_sync', return_value=True) as mock_send:
+            arkm.send_tg('Test message')
+
+        mock_send.assert_called_once()
+        call_args = mock_send.call_args
+        assert call_args[0][0] == 'Test message'
+        assert call_args[1]['thread_id'] == arkm.TOPIC_ID
+        assert call_args[1]['disable_web_page_preview'] is True
+
+    def test_send_telegram_failure_logged(self, caplog):
+        """Test that a failed delivery is logged as a warning."""
+        with caplog.at_level(logging.INFO, logger='arkm'):
+            with patch.object(arkm.delivery, 'send_sync', return_value=False):
+                arkm.send_tg('Test message')
+
+        records = [r for r in caplog.records if 'TG 发送失败' in r.getMessage()]
+        assert records and records[0].levelno == logging.WARNING
+
+
+class TestIncrementalCursor:
+    """Test per-entity cursors and pagination."""
+
+    def test_parse_block_time(self):
+        """Test ISO strings and numeric timestamps are normalised to ms."""
+        assert arkm.parse_block_time('2024-01-01T00:00:00Z') == 1704067200000
+        assert arkm.parse_block_time(1704067200) == 1704067200000
+        assert arkm.parse_block_time(1704067200000) == 1704067200000
+        assert arkm.parse_block_time('bad') == 0
+        assert arkm.parse_block_time(None) == 0
+
+    @patch('arkm.http.get')
+    def test_cursor_advances_and_filters_seen(self, mock_get):
+        """Test the next run starts at the cursor and skips already seen hashes."""
+        mock_get.return_value = make_response([
+            make_tx('0xb', '2024-01-01T00:01:00Z'),
+            make_tx('0xa', '2024-01-01T00:00:00Z'),
+        ])
+        arkm.cursors['binance'] = {'ts': 1704067200000, 'hashes': ['0xa']}
+        transfers = arkm.get_arkham_transfers('binance')
+
+        assert [tx['transactionHash'] for tx in transfers] == ['0xb']
+        assert mock_get.call_args[1]['params']['time_gte'] == 1704067200000
+        assert arkm.cursors['binance'] == {'ts': 1704067260000, 'hashes': ['0xb']}
+
+    @patch('arkm.http.get')
+    def test_paginates_until_caught_up(self, mock_get):
+        """Test full pages trigger another request with a larger offset."""
+        with patch.object(arkm, 'ARKHAM_PAGE_SIZE', 2):
+            mock_get.side_effect = [
+                make_response([make_tx('0x4', 1704067204000), make_tx('0x3', 1704067203000)]),
+                make_response([make_tx('0x2', 1704067202000)]),
+            ]
+            arkm.cursors['binance'] = {'ts': 1704067201000, 'hashes': []}
+            transfers = arkm.get_arkham_transfers('binance')
+
+        offsets = [c[1]['params']['offset'] for c in mock_get.call_args_list]
+        assert offsets == [0, 2]
+        assert len(transfers) == 3
+        assert arkm.cursors['binance']['ts'] == 1704067204000
+
+    @patch('arkm.http.get')
+    def test_page_cap_resumes_backlog(self, mock_get):
+        """Test transfers beyond the page cap are fetched in later rounds, not skipped."""
+        with patch.object(arkm, 'ARKHAM_PAGE_SIZE', 2), patch.object(arkm, 'ARKHAM_MAX_PAGES', 1):
+            arkm.cursors['binance'] = {'ts': 1704067201000, 'hashes': ['0x1']}
+            mock_get.return_value = make_response([make_tx('0x5', 1704067205000), make_tx('0x4', 1704067204000)])
+            first = arkm.get_arkham_transfers('binance')
+
+            assert [tx['transactionHash'] for tx in first] == ['0x5', '0x4']
+            assert arkm.cursors['binance']['ts'] == 1704067201000
+            assert arkm.cursors['binance']['until'] == 1704067204000
+
+            mock_get.return_value = make_response([make_tx('0x3', 1704067203000)])
+            second = arkm.get_arkham_transfers('binance')
+
+        params = mock_get.call_args[1]['params']
+        assert (params['time_gte'], params['time_lte']) == (1704067201000, 1704067204000)
+        assert [tx['transactionHash'] for tx in second] == ['0x3']
+        assert arkm.cursors['binance'] == {'ts': 1704067205000, 'hashes': ['0x5']}
+
+    def test_backlog_cursor_file_roundtrip(self):
+        """Test an unfinished backlog survives a restart."""
+        arkm.cursors['binance'] = {'ts': 1, 'hashes': [], 'until': 5, 'next': {'ts': 9, 'hashes': ['0x9']}}
+        arkm.save_cursors()
+
+        assert arkm.load_cursors() == {'binance': arkm.cursors['binance']}
+
+    @patch('arkm.http.get')
+    def test_failed_page_keeps_cursor(self, mock_get):
+        """Test a failed request does not move the cursor forward."""
+        mock_get.return_value = make_response([], status_code=500)
+        arkm.cursors['binance'] = {'ts': 1000, 'hashes': ['0xa']}
+
+        assert arkm.get_arkham_transfers('binance') == []
+        assert arkm.cursors['binance'] == {'ts': 1000, 'hashes': ['0xa']}
+
+    def test_cursor_file_roundtrip(self):
+        """Test cursors survive a save/load cycle."""
+        arkm.cursors['binance'] = {'ts': 1234, 'hashes': ['0xa']}
+        arkm.save_cursors()
+
+        assert arkm.load_cursors() == {'binance': {'ts': 1234, 'hashes': ['0xa']}}
+
+    def test_corrupt_cursor_file(self):
+        """Test a corrupt cursor file starts from scratch."""
+        with open(arkm.ARKHAM_CURSOR_FILE, 'w', encoding='utf-8') as f:
+            f.write('{not json')
+
+        assert arkm.load_cursors() == {}
+
+
+class TestConcurrentPolling:
+    """Test the concurrent polling engine."""
+
+    def test_job_fetches_all_entities(self):
+        """Test every entity is fetched and analysed once per sweep."""
+        entities = ['binance', 'jump-trading', 'falconx']
+        with patch.object(arkm, 'TARGET_ENTITIES', entities), \
+                patch.object(arkm, 'get_arkham_transfers', side_effect=lambda e: [e]) as mock_get, \
+                patch.object(arkm, 'analyze_and_alert') as mock_analyze:
+            arkm.job()
+
+        assert sorted(c[0][0] for c in mock_get.call_args_list) == sorted(entities)
+        assert sorted(c[0] for c in mock_analyze.call_args_list) == sorted((e, [e]) for e in entities)
+
+    def test_entity_error_does_not_stop_sweep(self):
+        """Test a failing entity does not block the others."""
+        def fetch(entity):
+            if entity == 'bad':
+                raise RuntimeError('boom')
+            return []
+
+        with patch.object(arkm, 'TARGET_ENTITIES', ['bad', 'good']), \
+                patch.object(arkm, 'get_arkham_transfers', side_effect=fetch), \
+                patch.object(arkm, 'analyze_and_alert') as mock_analyze:
+            arkm.job()
+
+        mock_analyze.assert_called_once_with('good', [])
+
+    @patch('arkm.http.get')
+    def test_rate_limited_pauses_budget(self, mock_get):
+        """Test a 429 response pauses the shared request budget."""
         mock_response = Mock()
-        mock_response.json.return_value = {'ok': True}
-        mock_post.return_value = mock_response
-
-        arkm.send_tg('Test message')
-
-        mock_post.assert_called_once()
-        call_args = mock_post.call_args
-        assert 'test_bot_token' in call_args[0][0]
-
-    @patch('arkm.requests.post')
-    def test_send_telegram_topic_fallback(self, mock_post):
-        """Test automatic fallback when topic ID is invalid."""
-        mock_response1 = Mock()
-        mock_response1.json.return_value = {
-            'ok': False,
-            'description': 'message thread not found'
-        }
+        mock_response.status_code = 429
+        mock_response.headers = {'Retry-After': '7'}
+        mock_get.return_value = mock_response
 
-        mock_response2 = Mock()
-        mock_response2.json.return_value = {'ok': True}
+        with patch.object(arkm.arkham_budget, 'pause') as mock_pause:
+            assert arkm.get_arkham_transfers('binance') == []
 
-        mock_post.side_effect = [mock_response1, mock_response2]
+        mock_pause.assert_called_once_with(7.0)
 
-        arkm.send_tg('Test message')
+    def test_alerts_do_not_block(self):
+        """Test alerts are submitted to delivery without waiting."""
+        from concurrent.futures import Future
 
-        assert mock_post.call_count == 2
+        done = Future()
+        done.set_result(True)
+        tx = {'transactionHash': '0xabc', 'historicalUSD': 2e6, 'unitValue': 1}
+        with patch.object(arkm.delivery, 'submit', return_value=done) as mock_submit, \
+                patch.object(arkm.time, 'sleep') as mock_sleep:
+            arkm.analyze_and_alert('binance', [tx])
+
+        mock_submit.assert_called_once()
+        assert mock_submit.call_args[1]['thread_id'] == arkm.TOPIC_ID
+        mock_sleep.assert_not_called()
+
+    def test_alert_recorded_with_entity(self, tmp_path):
+        """Test pushed transfers are stored in the alert history."""
+        from concurrent.futures import Future
+        from alert_store import AlertStore
+
+        store = AlertStore(str(tmp_path / 'alerts.db'), flush_interval=0.01)
+        done = Future()
+        done.set_result(True)
+        tx = {'transactionHash': '0xrec', 'historicalUSD': 3e6, 'unitValue': 1, 'tokenSymbol': 'ETH'}
+        with patch.object(arkm, 'alerts', store), \
+                patch.object(arkm.delivery, 'submit', return_value=done):
+            arkm.analyze_and_alert('binance', [tx])
+        store.flush()
+        alert = store.query()['alerts'][0]
+        store.close()
+
+        assert (alert['source'], alert['symbol'], alert['value']) == ('arkm', 'binance', 3e6)
+        assert alert['delivered'] is True
+        assert alert['data']['tx_hash'] == '0xrec'
 
 
 class TestDeduplication:
@@ -137,25 +313,53 @@ class TestDeduplication:
         assert tx_hash in arkm.processed_txs
         assert '0xnew' not in arkm.processed_txs
 
+    def test_repeat_transfer_alerts_once(self):
+        """Test the same transfer is only pushed once."""
+        from concurrent.futures import Future
+
+        done = Future()
+        done.set_result(True)
+        tx = make_tx('0xdup', '2024-01-01T00:00:00Z')
+        with patch.object(arkm.delivery, 'submit', return_value=done) as mock_submit:
+            arkm.analyze_and_alert('binance', [tx])
+            arkm.analyze_and_alert('binance', [tx])
+
+        mock_submit.assert_called_once()
+
 
 class TestLogFunction:
     """Test logging functionality."""
 
-    def test_log_output(self):
-        """Test that log function produces output."""
-        import io
-        import sys
+    def test_log_output(self, caplog):
+        """Test that log function emits a record on the arkm logger."""
+        with caplog.at_level(logging.INFO, logger='arkm'):
+            arkm.log('Test message')
+
+        assert caplog.records[-1].name == 'arkm'
+        assert caplog.records[-1].getMessage() == 'Test message'
+        assert caplog.records[-1].levelno == logging.INFO
+
+    def test_log_lazy_args_and_level(self, caplog):
+        """Test that args are formatted lazily and the level can be raised."""
+        with caplog.at_level(logging.INFO, logger='arkm'):
+            arkm.log('推送了 %s 条', 3, level=logging.WARNING)
 
-        old_stdout = sys.stdout
-        sys.stdout = io.StringIO()
+        assert caplog.records[-1].getMessage() == '推送了 3 条'
+        assert caplog.records[-1].levelno == logging.WARNING
 
-        arkm.log('Test message')
+    def test_alert_summary_uses_template(self, caplog):
+        """Test hot-path messages share one template so sampling can group them."""
+        from concurrent.futures import Future
 
-        output = sys.stdout.getvalue()
-        sys.stdout = old_stdout
+        done = Future()
+        done.set_result(True)
+        with patch.object(arkm.delivery, 'submit', return_value=done), \
+                caplog.at_level(logging.INFO, logger='arkm'):
+            arkm.analyze_and_alert('binance', [make_tx('0xt', '2024-01-01T00:00:00Z')])
 
-        assert 'Test message' in output
-        assert '[' in output
+        record = caplog.records[-1]
+        assert record.msg == '✅ [%s] 推送了 %s 条新交易'
+        assert record.getMessage() == '✅ [binance] 推送了 1 条新交易'
 
 
 class TestCommonHeaders:
@@ -76,11 +76,16 @@ class TestGlobalState:
 
     def test_volume_baseline_starts_empty(self):
         """Test that volume baseline starts empty."""
-        assert bianjk.volume_baseline == {}
+        assert len(bianjk.volume_baseline) == 0
 
     def test_wall_alert_history_starts_empty(self):
         """Test that wall alert history starts empty."""
-        assert bianjk.wall_alert_history == {}
+        assert len(bianjk.wall_alert_history) == 0
+
+    def test_wall_alert_history_is_bounded(self):
+        """Test wall cooldowns use the capped TTL store."""
+        assert bianjk.wall_alert_history.ttl == bianjk.WALL_ALERT_COOLDOWN
+        assert bianjk.wall_alert_history.max_size == bianjk.WALL_ALERT_MAX_KEYS
 
 
 class TestDirectionIndicators:
@@ -137,3 +142,168 @@ class TestVolumeConfig:
     def test_order_book_wall_threshold(self):
         """Test order book wall threshold."""
         assert bianjk.ORDER_BOOK_WALL_THRESHOLD == 5000000.0
+
+
+
+class TestEventProcessing:
+    """Test detection logic on typed events."""
+
+    def test_large_trade_alert(self):
+        """Test a single large trade triggers an alert."""
+        import asyncio
+        from binance_events import AggTrade
+
+        trade = AggTrade(price=50000.0, qty=2.0, trade_time=1704067200000, is_buyer_maker=False)
+        with patch.object(bianjk, 'send_telegram_message', new=AsyncMock()) as mock_send:
+            asyncio.run(bianjk.process_trade_logic(None, trade, 'BTCUSDT'))
+
+        assert mock_send.await_count >= 1
+        assert '大额成交监控' in mock_send.await_args_list[0][0][1]
+
+    def test_open_kline_ignored(self):
+        """Test klines that are not closed are skipped."""
+        import asyncio
+        from binance_events import Kline
+
+        kline = Kline(event_time=1704067200000, closed=False, volume=1e9, close=1.0,
+                      close_time=1704067499999)
+        with patch.object(bianjk, 'send_telegram_message', new=AsyncMock()) as mock_send:
+            asyncio.run(bianjk.process_kline_logic(None, kline, 'BTCUSDT'))
+
+        mock_send.assert_not_awaited()
+
+    def test_burst_reports_longest_triggered_window(self):
+        """Test burst alerts name the longest window that crossed its trigger."""
+        import asyncio
+        from collections import defaultdict
+        from binance_events import AggTrade
+        from sliding_window import SlidingWindowAggregator
+
+        windows = [(10_000, 1), (60_000, 2)]
+        monitor = defaultdict(lambda: {
+            'BUY': SlidingWindowAggregator([10_000, 60_000]),
+            'SELL': SlidingWindowAggregator([10_000, 60_000]),
+        })
+        trades = [AggTrade(1000.0, 200.0, ts, False) for ts in (0, 30_000, 35_000)]
+
+        async def run():
+            for trade in trades:
+                await bianjk.process_trade_logic(None, trade, 'SOLUSDT')
+
+        with patch.object(bianjk, 'BURST_WINDOWS', windows), \
+                patch.object(bianjk, 'burst_monitor', monitor), \
+                patch.object(bianjk, 'send_telegram_message', new=AsyncMock()) as mock_send:
+            asyncio.run(run())
+
+        texts = [call[0][1] for call in mock_send.await_args_list]
+        assert len(texts) == 1
+        assert '1分钟内' in texts[0]
+        assert '频次: 3笔' in texts[0]
+        assert monitor['SOLUSDT']['BUY'].count(0) == 0
+
+    def test_closed_kline_compared_before_update(self):
+        """Test a spike is judged against the baseline before it is added."""
+        import asyncio
+        from binance_events import Kline
+        from volume_baseline import VolumeBaselineEngine
+
+        engine = VolumeBaselineEngine(window=10, min_samples=1)
+        engine.seed('ETHUSDT', [100.0] * 10, last_close_time=1000)
+        kline = Kline(event_time=2000, closed=True, volume=1000.0, close=2.0, close_time=1299)
+        with patch.object(bianjk, 'volume_baseline', engine), \
+                patch.object(bianjk, 'send_telegram_message', new=AsyncMock()) as mock_send:
+            asyncio.run(bianjk.process_kline_logic(None, kline, 'ETHUSDT'))
+
+        assert '10.0倍' in mock_send.await_args[0][1]
+        assert engine.last_close_time('ETHUSDT') == 1299
+        assert engine.get('ETHUSDT') == pytest.approx(190.0)
+
+    def test_alert_sink_replaces_delivery(self):
+        """Test alerts go to the local sink instead of Telegram when set."""
+        import asyncio
+
+        sink = []
+        with patch.object(bianjk, 'alert_sink', sink.append), \
+                patch.object(bianjk.delivery, 'enqueue') as mock_enqueue:
+            asyncio.run(bianjk.send_telegram_message(None, 'hello'))
+
+        assert sink == ['hello']
+        mock_enqueue.assert_not_called()
+
+    def test_delivered_alert_recorded(self, tmp_path):
+        """Test alerts are stored with type, symbol, value and delivery result."""
+        import asyncio
+        from alert_store import AlertStore
+
+        store = AlertStore(str(tmp_path / 'alerts.db'), flush_interval=0.01)
+
+        async def run():
+            future = asyncio.get_running_loop().create_future()
+            with patch.object(bianjk, 'alerts', store), \
+                    patch.object(bianjk.delivery, 'enqueue', return_value=future):
+                await bianjk.send_telegram_message(None, 'hi', 'large_trade', 'BTCUSDT', 1e6, side='buy')
+            future.set_result(True)
+            await asyncio.sleep(0)
+
+        asyncio.run(run())
+        store.flush()
+        alert = store.query()['alerts'][0]
+        store.close()
+        assert (alert['source'], alert['alert_type'], alert['symbol']) == ('bianjk', 'large_trade', 'BTCUSDT')
+        assert alert['value'] == 1e6 and alert['delivered'] is True
+        assert alert['data'] == {'side': 'buy'}
+
+
+class TestVolumeBaselineFill:
+    """Test startup gap filling of the rolling volume baseline."""
+
+    class FakeResponse:
+        def __init__(self, data):
+            self.data = data
+
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc):
+            return False
+
+        async def json(self):
+            return self.data
+
+    class FakeSession:
+        def __init__(self, data):
+            self.data = data
+            self.calls = []
+
+        def get(self, url, params=None):
+            self.calls.append(params)
+            return TestVolumeBaselineFill.FakeResponse(self.data)
+
+    def test_fetches_only_missing_closed_candles(self):
+        """Test a restored symbol only requests candles after its last close."""
+        import asyncio
+        from volume_baseline import VolumeBaselineEngine
+
+        interval = bianjk.KLINE_INTERVAL_MS
+        now_ms = 1_700_000_000_000
+        last_close = now_ms - 3 * interval
+        engine = VolumeBaselineEngine(window=288)
+        engine.seed('BTCUSDT', [10.0], last_close_time=last_close)
+        klines = [
+            [0, '', '', '', '', '20.0', last_close + interval],
+            [0, '', '', '', '', '30.0', last_close + 2 * interval],
+            [0, '', '', '', '', '99.0', now_ms + interval],  # 尚未收盘
+        ]
+        session = self.FakeSession(klines)
+
+        async def run():
+            await bianjk.fill_volume_baseline(session, 'BTCUSDT', asyncio.Semaphore(1))
+
+        with patch.object(bianjk, 'volume_baseline', engine), \
+                patch.object(bianjk.time, 'time', return_value=now_ms / 1000):
+            asyncio.run(run())
+
+        assert session.calls[0]['startTime'] == last_close + 1
+        assert session.calls[0]['limit'] == 4
+        assert engine.samples('BTCUSDT') == 3
+        assert engine.get('BTCUSDT') == pytest.approx(20.0)
@@ -0,0 +1,125 @@
+"""Tests for fast_json.py and binance_events.py - stream frame decoding."""
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fast_json
+import binance_events
+from binance_events import AggTrade, Depth, FrameDecoder, Kline
+
+TRADE_FRAME = json.dumps({
+    "stream": "btcusdt@aggTrade",
+    "data": {"e": "aggTrade", "E": 1, "p": "42000.50", "q": "1.25000",
+             "T": 1704067200000, "m": True, "M": True},
+})
+KLINE_FRAME = json.dumps({
+    "stream": "ethusdt@kline_5m",
+    "data": {"e": "kline", "E": 1704067200000,
+             "k": {"x": True, "v": "123.5", "c": "2281.64", "o": "2280",
+                   "T": 1704067499999}},
+})
+DEPTH_FRAME = json.dumps({
+    "stream": "btcusdt@depth20@100ms",
+    "data": {"lastUpdateId": 1, "bids": [["42000.00", "2.5"]], "asks": [["42001.00", "0.1"]]},
+})
+
+BACKENDS = fast_json.available_backends()
+
+
+class TestFastJson:
+    """Test decoder backend selection."""
+
+    def test_json_always_available(self):
+        """Test the stdlib fallback is always present."""
+        assert "json" in BACKENDS
+        assert fast_json.resolve_backend("json") == "json"
+
+    def test_auto_picks_fastest(self):
+        """Test auto selects the first available backend."""
+        assert fast_json.resolve_backend("auto") == BACKENDS[0]
+        assert fast_json.resolve_backend(None) == BACKENDS[0]
+
+    def test_unknown_backend(self):
+        """Test unknown backend names are rejected."""
+        with pytest.raises(ValueError):
+            fast_json.resolve_backend("yaml")
+
+    @pytest.mark.parametrize("backend", BACKENDS)
+    def test_loads_roundtrip(self, backend):
+        """Test every backend decodes the same document."""
+        loads = fast_json.get_loads(backend)
+        assert loads('{"a": [1, "2"]}') == {"a": [1, "2"]}
+
+
+class TestStreamKind:
+    """Test stream name routing."""
+
+    def test_known_streams(self):
+        """Test stream type and symbol are extracted."""
+        assert binance_events.stream_kind("btcusdt@aggTrade") == ("aggTrade", "BTCUSDT")
+        assert binance_events.stream_kind("ethusdt@kline_5m") == ("kline", "ETHUSDT")
+        assert binance_events.stream_kind("ethusdt@depth20@100ms") == ("depth", "ETHUSDT")
+
+    def test_unknown_stream(self):
+        """Test unknown streams are ignored."""
+        assert binance_events.stream_kind("btcusdt@bookTicker") is None
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+class TestFrameDecoder:
+    """Test typed decoding with every available backend."""
+
+    def test_decode_trade(self, backend):
+        """Test aggTrade frames decode to floats."""
+        kind, symbol, trade = FrameDecoder(backend).decode(TRADE_FRAME)
+        assert (kind, symbol) == ("aggTrade", "BTCUSDT")
+        assert trade.price == 42000.5
+        assert trade.qty == 1.25
+        assert trade.trade_time == 1704067200000
+        assert trade.is_buyer_maker is True
+
+    def test_decode_kline(self, backend):
+        """Test kline frames decode to a flat Kline."""
+        kind, symbol, kline = FrameDecoder(backend).decode(KLINE_FRAME)
+        assert kind == "kline"
+        assert kline == Kline(1704067200000, True, 123.5, 2281.64, 1704067499999)
+
+    def test_decode_depth(self, backend):
+        """Test depth frames decode to float level tuples."""
+        kind, symbol, depth = FrameDecoder(backend).decode(DEPTH_FRAME)
+        assert kind == "depth"
+        assert list(depth.bids) == [(42000.0, 2.5)]
+        assert list(depth.asks) == [(42001.0, 0.1)]
+
+    def test_non_data_frame(self, backend):
+        """Test subscription replies are skipped."""
+        assert FrameDecoder(backend).decode('{"result": null, "id": 1}') is None
+
+    def test_recorded_frames(self, backend):
+        """Test every recorded benchmark frame decodes."""
+        path = os.path.join(
+            os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            "benchmarks", "data", "binance_frames.jsonl",
+        )
+        decoder = FrameDecoder(backend)
+        with open(path, encoding="utf-8") as f:
+            events = [decoder.decode(line) for line in f]
+        assert all(event is not None for event in events)
+
+
+class TestBuildEvent:
+    """Test dict-to-struct conversion."""
+
+    def test_build_trade(self):
+        """Test AggTrade construction from a payload dict."""
+        trade = binance_events.build_event("aggTrade", {"p": "1.5", "q": "2", "T": 5, "m": False})
+        assert trade == AggTrade(1.5, 2.0, 5, False)
+
+    def test_build_depth_short_keys(self):
+        """Test depth payloads using b/a keys."""
+        depth = binance_events.build_event("depth", {"b": [["1", "2"]], "a": []})
+        assert depth == Depth([(1.0, 2.0)], [])
@@ -0,0 +1,140 @@
+"""Tests for binance_shards.py - sharded combined-stream connections."""
+import asyncio
+import os
+import sys
+import threading
+from unittest.mock import patch
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import binance_shards
+
+SUFFIXES = ['aggTrade', 'kline_5m', 'depth20@100ms']
+
+
+class TestShardPlanning:
+    """Test splitting symbols across connections."""
+
+    def test_single_shard_for_few_symbols(self):
+        """Test a small symbol set stays on one connection."""
+        shards = binance_shards.plan_shards(['btcusdt', 'ethusdt'], SUFFIXES)
+        assert shards == [['btcusdt', 'ethusdt']]
+
+    def test_stream_limit_respected(self):
+        """Test no shard exceeds the stream cap and symbols stay whole."""
+        symbols = [f'sym{i}usdt' for i in range(100)]
+        shards = binance_shards.plan_shards(symbols, SUFFIXES, max_streams=30, max_url_length=100000)
+
+        assert all(len(shard) * len(SUFFIXES) <= 30 for shard in shards)
+        assert [s for shard in shards for s in shard] == symbols
+        assert len(shards) == 10
+
+    def test_url_length_respected(self):
+        """Test no shard URL exceeds the length cap."""
+        symbols = [f'sym{i}usdt' for i in range(200)]
+        shards = binance_shards.plan_shards(symbols, SUFFIXES, max_streams=1024, max_url_length=1000)
+
+        for shard in shards:
+            assert len(binance_shards.shard_url(shard, SUFFIXES)) <= 1000
+
+    def test_stream_cap_clamped_to_binance_limit(self):
+        """Test the configured cap never exceeds Binance's 1024 streams."""
+        symbols = [f's{i}' for i in range(1000)]
+        shards = binance_shards.plan_shards(symbols, SUFFIXES, max_streams=5000, max_url_length=10**7)
+        assert all(len(shard) * len(SUFFIXES) <= 1024 for shard in shards)
+
+    def test_too_many_suffixes(self):
+        """Test impossible plans are rejected."""
+        with pytest.raises(ValueError):
+            binance_shards.plan_shards(['btcusdt'], SUFFIXES, max_streams=2)
+
+    def test_shard_url(self):
+        """Test combined-stream URL format."""
+        url = binance_shards.shard_url(['btcusdt'], ['aggTrade', 'kline_5m'])
+        assert url == 'wss://stream.binance.com:9443/stream?streams=btcusdt@aggTrade/btcusdt@kline_5m'
+
+
+class TestRunShard:
+    """Test per-shard reconnect behaviour."""
+
+    def test_reconnects_after_error(self):
+        """Test a failing connection is retried and counted."""
+
+        class FailingSession:
+            def __init__(self):
+                self.attempts = 0
+
+            def ws_connect(self, url, heartbeat=None):
+                self.attempts += 1
+                raise ConnectionError('refused')
+
+        session = FailingSession()
+        stats = binance_shards.ShardStats(0, ['btcusdt'])
+
+        async def scenario():
+            with patch.object(binance_shards, 'RECONNECT_BASE_DELAY', 0.001):
+                task = asyncio.create_task(binance_shards.run_shard(session, 'wss://x', None, stats))
+                await asyncio.sleep(0.05)
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+
+        asyncio.run(scenario())
+        assert session.attempts >= 2
+        assert stats.disconnects >= 2
+        assert stats.last_error == 'refused'
+        assert stats.snapshot()['connected'] is False
+
+
+class TestProcessShardGroup:
+    """Test shard distribution across worker processes."""
+
+    def test_round_robin_assignment(self):
+        """Test shards are spread evenly and empty workers are skipped."""
+        specs = [(i, [f's{i}'], f'url{i}') for i in range(5)]
+        group = binance_shards.ProcessShardGroup(specs, 2, dispatch=lambda batch: None)
+        assert [len(a) for a in group._assignments] == [3, 2]
+
+        group = binance_shards.ProcessShardGroup(specs[:1], 4, dispatch=lambda batch: None)
+        assert len(group._assignments) == 1
+
+    def test_workers_do_not_import_parent_main(self):
+        """Test spawned workers re-import only binance_shards, not the parent script."""
+        import multiprocessing.spawn
+
+        with binance_shards._worker_main_module():
+            data = multiprocessing.spawn.get_preparation_data('binance-shard-0')
+        assert data['init_main_from_name'] == 'binance_shards'
+        assert 'init_main_from_path' not in data
+        assert sys.modules['__main__'].__name__ == '__main__'
+
+    def test_async_dispatch_applies_backpressure(self):
+        """Test a coroutine dispatch is awaited per batch and bounds the process queue."""
+        received = []
+
+        async def dispatch(batch):
+            await asyncio.sleep(0.01)
+            received.append(batch)
+
+        group = binance_shards.ProcessShardGroup([(0, ['s'], 'u')], 1, dispatch=dispatch, max_pending_batches=2)
+        assert group._queue._maxsize == 2
+
+        async def scenario():
+            loop = asyncio.get_running_loop()
+            pump = threading.Thread(target=group._pump, args=(loop,), daemon=True)
+            pump.start()
+            for i in range(3):
+                await loop.run_in_executor(None, group._queue.put, [i])
+            while len(received) < 3:
+                await asyncio.sleep(0.01)
+            group._stopping.set()
+            await loop.run_in_executor(None, pump.join, 2)
+
+        asyncio.run(scenario())
+        assert received == [[0], [1], [2]]
+
+    def test_sync_dispatch_keeps_unbounded_queue(self):
+        """Test drop policies that never block keep the unbounded hand-off queue."""
+        group = binance_shards.ProcessShardGroup([(0, ['s'], 'u')], 1, dispatch=lambda batch: None)
+        assert not group._blocking
@@ -4,6 +4,7 @@ import os
 import sys
 import pytest
 import json
+import threading
 from unittest.mock import Mock, patch, MagicMock
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -31,6 +32,11 @@ class TestBotseverConfig:
         """Test default start port."""
         assert botsever.START_PORT == 5006
 
+    def test_default_keyword_matching_is_substring(self):
+        """Test word-boundary keyword matching is opt-in."""
+        assert botsever.TWITTER_KEYWORD_WORD_BOUNDARY is False
+        assert botsever.keyword_matcher.word_boundary is False
+
 
 class TestPortSelection:
     """Test port selection functionality."""
@@ -47,16 +53,21 @@ class TestTelegramSending:
 
     def test_send_to_telegram_success(self):
         """Test successful Telegram message send."""
-        with patch("botsever.requests.post") as mock_post:
-            mock_response = Mock()
-            mock_response.status_code = 200
-            mock_response.json.return_value = {"ok": True}
-            mock_post.return_value = mock_response
+        with patch.object(botsever.delivery, "send_sync") as mock_send:
+            mock_send.return_value = True
 
             result = botsever.send_to_telegram("Test message")
 
             assert result is True
-            mock_post.assert_called_once()
+            mock_send.assert_called_once()
+            assert mock_send.call_args[1]["thread_id"] == botsever.TOPIC_ID
+
+    def test_send_to_telegram_delivery_failure(self):
+        """Test failed delivery is reported as False."""
+        with patch.object(botsever.delivery, "send_sync", return_value=False):
+            result = botsever.send_to_telegram("Test message")
+
+        assert result is False
 
     def test_send_to_telegram_missing_token(self):
         """Test handling of missing bot token."""
@@ -112,6 +123,79 @@ class TestWebhookEndpoint:
             assert mock_send.called
 
 
+class TestAsyncWebhook:
+    """Test accept-and-enqueue webhook mode."""
+
+    TWEET = {"tweets": [{"id": "1", "text": "bitcoin breaks out", "author": {"username": "alice"}}]}
+
+    def test_sync_mode_processes_inline(self):
+        """Test the default mode forwards before responding."""
+        with patch.object(botsever, "WEBHOOK_ASYNC", False), \
+                patch.object(botsever, "send_to_telegram", return_value=True) as mock_send:
+            response = botsever.app.test_client().post("/twitter-webhook", json=self.TWEET)
+
+        assert response.status_code == 200
+        assert response.get_json()["processed"] == 1
+        mock_send.assert_called_once()
+
+    def test_async_mode_returns_202(self):
+        """Test the handler only enqueues and a worker forwards later."""
+        from work_queue import WorkQueue
+
+        work = WorkQueue(botsever._process_queued_payload, workers=1, maxsize=10, name="test")
+        with patch.object(botsever, "WEBHOOK_ASYNC", True), \
+                patch.object(botsever, "webhook_queue", work), \
+                patch.object(botsever, "send_to_telegram", return_value=True) as mock_send:
+            response = botsever.app.test_client().post("/twitter-webhook", json=self.TWEET)
+            assert response.status_code == 202
+            assert response.get_json()["status"] == "accepted"
+            work.join()
+            work.stop()
+
+        mock_send.assert_called_once()
+        assert work.metrics()["processed"] == 1
+
+    def test_async_mode_queue_full(self):
+        """Test a full queue is rejected with 503."""
+        queue = Mock()
+        queue.submit.return_value = False
+        with patch.object(botsever, "WEBHOOK_ASYNC", True), \
+                patch.object(botsever, "webhook_queue", queue):
+            response = botsever.app.test_client().post("/twitter-webhook", json=self.TWEET)
+
+        assert response.status_code == 503
+
+    def test_all_matched_keywords_forwarded(self):
+        """Test the forwarded message lists every matched keyword."""
+        tweet = {"tweets": [{"id": "2", "text": "BTC and ETH rally", "author": {"username": "bob"}}]}
+        with patch.object(botsever, "send_to_telegram", return_value=True) as mock_send:
+            result = botsever.process_webhook_payload(tweet)
+
+        assert result["processed"] == 1
+        assert "btc, eth" in mock_send.call_args[0][0]
+
+    def test_process_payload_without_tweets(self):
+        """Test payloads without tweets are ignored."""
+        result = botsever.process_webhook_payload({"event_type": "ping"})
+        assert result == {"status": "ignored", "reason": "no_tweets"}
+
+    def test_metrics_include_queue(self):
+        """Test queue gauges are exported."""
+        response = botsever.app.test_client().get("/metrics")
+        assert "botsever_webhook_queue_depth" in response.get_data(as_text=True)
+
+    def test_metrics_include_registry_histograms(self):
+        """Test processing time histograms and keyword labels are exported."""
+        with patch.object(botsever, "send_to_telegram", return_value=True):
+            botsever.app.test_client().post(
+                botsever.ROUTE_PATH, json={"tweets": [{"id": "1", "text": "btc pump"}]}
+            )
+        text = botsever.app.test_client().get("/metrics").get_data(as_text=True)
+        assert '# TYPE botsever_webhook_process_seconds histogram' in text
+        assert 'botsever_webhook_process_seconds_count{mode="sync"}' in text
+        assert 'twitter_keyword_hits_total{keyword="btc"}' in text
+
+
 class TestFlaskApp:
     """Test Flask application configuration."""
 
@@ -173,7 +257,7 @@ class TestTelegramConnectivityTester:
 
     def test_test_connectivity_success(self):
         """Test successful Telegram connectivity test."""
-        with patch("botsever.requests.post") as mock_post:
+        with patch("botsever.http.post") as mock_post:
             mock_response = Mock()
             mock_response.status_code = 200
             mock_response.json.return_value = {"ok": True, "result": {}}
@@ -190,7 +274,7 @@ class TestTelegramConnectivityTester:
 
     def test_test_connectivity_api_error(self):
         """Test Telegram connectivity test with API error."""
-        with patch("botsever.requests.post") as mock_post:
+        with patch("botsever.http.post") as mock_post:
             mock_response = Mock()
             mock_response.status_code = 200
             mock_response.json.return_value = {
@@ -210,7 +294,7 @@ class TestTelegramConnectivityTester:
         """Test Telegram connectivity test with HTTP error."""
         import requests
 
-        with patch("botsever.requests.post") as mock_post:
+        with patch("botsever.http.post") as mock_post:
             mock_post.side_effect = requests.HTTPError("500 Server Error")
 
             tester = botsever.TelegramConnectivityTester()
@@ -225,7 +309,7 @@ class TestTelegramConnectivityTester:
         """Test Telegram connectivity test with timeout."""
         import requests
 
-        with patch("botsever.requests.post") as mock_post:
+        with patch("botsever.http.post") as mock_post:
             mock_post.side_effect = requests.exceptions.Timeout()
 
             tester = botsever.TelegramConnectivityTester()
@@ -239,7 +323,7 @@ class TestTelegramConnectivityTester:
         """Test Telegram connectivity test with request exception."""
         import requests
 
-        with patch("botsever.requests.post") as mock_post:
+        with patch("botsever.http.post") as mock_post:
             mock_post.side_effect = requests.exceptions.RequestException(
                 "Connection refused"
             )
@@ -253,7 +337,7 @@ class TestTelegramConnectivityTester:
 
     def test_test_connectivity_unexpected_exception(self):
         """Test Telegram connectivity test with unexpected exception."""
-        with patch("botsever.requests.post") as mock_post:
+        with patch("botsever.http.post") as mock_post:
             mock_post.side_effect = ValueError("Unexpected error")
 
             tester = botsever.TelegramConnectivityTester()
@@ -343,3 +427,150 @@ class TestTwitterLoggerPrintStatus:
         captured = capsys.readouterr()
         assert "==Twitter==" in captured.out
         assert "🐦 Twitter 监控状态报告" in captured.out
+
+
+class TestLoggerConcurrency:
+    """Test logger counters stay exact under concurrent requests."""
+
+    def test_twitter_logger_counts_exact(self):
+        """Test parallel log calls lose no counts and logs stay bounded."""
+        logger = botsever.TwitterLogger(max_queue_size=10)
+
+        def work():
+            for _ in range(5000):
+                logger.log_webhook_request('/twitter-webhook', True)
+                logger.log_webhook_ignored('ping')
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        report = logger.get_status_report()
+        assert report['webhook']['total_requests'] == 40000
+        assert report['webhook']['success'] == 40000
+        assert report['webhook']['ignored'] == 40000
+        assert len(logger.message_queue) == 10
+
+    def test_monitor_logger_counts_exact(self):
+        """Test request totals always equal successes plus failures."""
+        logger = botsever.MonitorLogger()
+
+        def work(success):
+            for _ in range(5000):
+                logger.log_request('/twitter-webhook', success)
+
+        threads = [threading.Thread(target=work, args=(i % 2 == 0,)) for i in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        metrics = logger.get_status_report()['metrics']
+        assert metrics['total_requests'] == 40000
+        assert metrics['successful_requests'] == 20000
+        assert metrics['failed_requests'] == 20000
+
+
+class TestHealthEndpoint:
+    """Test /health serves cached dependency status."""
+
+    def make_prober(self, ok, calls):
+        from health_probe import HealthProber
+
+        def check():
+            calls.append(1)
+            return ok, "HTTP 200" if ok else "HTTP 401"
+
+        return HealthProber({"telegram_api": check}, interval=3600, min_interval=3600)
+
+    def test_health_does_not_call_telegram(self):
+        """Test plain /health reads the cache instead of calling getMe."""
+        calls = []
+        prober = self.make_prober(True, calls)
+        prober.run()
+        with patch.object(botsever, "health_prober", prober), \
+                patch.object(prober, "start"), \
+                patch("botsever.http.get") as mock_get:
+            for _ in range(5):
+                response = botsever.app.test_client().get("/health")
+
+        mock_get.assert_not_called()
+        assert len(calls) == 1
+        data = response.get_json()
+        assert response.status_code == 200
+        assert data["status"] == "healthy"
+        assert data["dependencies"]["checks"]["telegram_api"]["ok"] is True
+
+    def test_deep_check_reports_failure(self):
+        """Test ?deep=1 re-runs checks and returns 503 when a dependency fails."""
+        calls = []
+        prober = self.make_prober(False, calls)
+        with patch.object(botsever, "health_prober", prober), patch.object(prober, "start"):
+            response = botsever.app.test_client().get("/health?deep=1")
+            botsever.app.test_client().get("/health?deep=1")
+
+        assert response.status_code == 503
+        assert response.get_json()["status"] == "degraded"
+        assert len(calls) == 1
+
+    def test_unbounded_webhook_queue_is_healthy(self):
+        """Test WEBHOOK_QUEUE_SIZE=0 means unbounded rather than permanently over capacity."""
+        with patch.object(botsever, "WEBHOOK_QUEUE_SIZE", 0):
+            ok, detail = botsever._check_webhook_queue()
+
+        assert ok is True
+        assert detail.endswith("/unbounded")
+
+
+class TestAlertsEndpoint:
+    """Test /alerts queries the alert history store."""
+
+    @pytest.fixture
+    def store(self, tmp_path):
+        from alert_store import AlertStore
+
+        s = AlertStore(str(tmp_path / "alerts.db"), flush_interval=0.01)
+        with patch.object(botsever, "alerts", s):
+            yield s
+        s.close()
+
+    def test_forwarded_tweet_recorded(self, store):
+        """Test a forwarded tweet is stored with its delivery result and keywords."""
+        tweet = {"tweets": [{"id": "7", "text": "btc rally", "author": {"username": "carol"}}]}
+        with patch.object(botsever, "send_to_telegram", return_value=False):
+            botsever.process_webhook_payload(tweet)
+        store.flush()
+
+        alert = store.query()["alerts"][0]
+        assert alert["source"] == "botsever"
+        assert alert["symbol"] == "carol"
+        assert alert["delivered"] is False
+        assert alert["data"]["keywords"] == ["btc"]
+
+    def test_query_filters_and_pages(self, store):
+        """Test since/symbol filters and cursor paging over HTTP."""
+        for i in range(5):
+            store.record("bianjk", "burst", symbol="BTCUSDT", ts=1000.0 + i)
+        store.record("bianjk", "burst", symbol="ETHUSDT", ts=1002.5)
+        store.flush()
+        client = botsever.app.test_client()
+
+        first = client.get("/alerts?since=1001&symbol=btcusdt&limit=2").get_json()
+        assert [a["ts"] for a in first["alerts"]] == [1004.0, 1003.0]
+        second = client.get(f"/alerts?since=1001&symbol=btcusdt&limit=2&cursor={first['next_cursor']}").get_json()
+        assert [a["ts"] for a in second["alerts"]] == [1002.0, 1001.0]
+
+    def test_bad_parameter_returns_400(self, store):
+        """Test unparseable times are rejected."""
+        response = botsever.app.test_client().get("/alerts?since=tomorrow")
+        assert response.status_code == 400
+
+    def test_disabled_store_returns_503(self):
+        """Test the endpoint reports when no store is configured."""
+        from alert_store import AlertStore
+
+        with patch.object(botsever, "alerts", AlertStore("")):
+            response = botsever.app.test_client().get("/alerts")
+        assert response.status_code == 503
@@ -0,0 +1,159 @@
+"""Tests for cooldown_store.py - bounded TTL cooldown store."""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cooldown_store import CooldownStore, PersistentCooldownStore
+
+
+class FakeClock:
+    """Manually advanced wall clock."""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class TestCooldownStore:
+    """Test cooldown semantics, expiry and the size cap."""
+
+    def test_invalid_config(self):
+        """Test ttl and size validation."""
+        with pytest.raises(ValueError):
+            CooldownStore(0)
+        with pytest.raises(ValueError):
+            CooldownStore(1, max_size=0)
+
+    def test_check_and_set_suppresses_within_ttl(self):
+        """Test a key is suppressed until its cooldown ends."""
+        clock = FakeClock()
+        store = CooldownStore(300, clock=clock)
+
+        assert store.check_and_set('wall') is True
+        clock.now += 299
+        assert store.check_and_set('wall') is False
+        clock.now += 1
+        assert store.check_and_set('wall') is True
+
+    def test_explicit_timestamps(self):
+        """Test callers may pass their own timestamps."""
+        store = CooldownStore(10)
+        assert store.check_and_set('k', now=100.0)
+        assert not store.check_and_set('k', now=105.0)
+        assert store.remaining('k', now=105.0) == pytest.approx(5.0)
+
+    def test_expired_entries_are_pruned(self):
+        """Test memory is released once entries expire."""
+        clock = FakeClock()
+        store = CooldownStore(10, clock=clock)
+        for i in range(100):
+            store.add(i)
+        assert len(store) == 100
+
+        clock.now += 11
+        store.check_and_set('new')
+
+        assert len(store) == 1
+        assert store.stats()['expired'] == 100
+
+    def test_size_cap_evicts_oldest(self):
+        """Test the hard size cap evicts the soonest-expiring key."""
+        clock = FakeClock()
+        store = CooldownStore(100, max_size=3, clock=clock)
+        for key in 'abcd':
+            clock.now += 1
+            store.add(key)
+
+        assert len(store) == 3
+        assert 'a' not in store
+        assert 'd' in store
+        assert store.evicted == 1
+
+    def test_refresh_moves_key_to_back(self):
+        """Test re-adding a key extends its cooldown and eviction order."""
+        clock = FakeClock()
+        store = CooldownStore(100, max_size=2, clock=clock)
+        store.add('a')
+        clock.now += 1
+        store.add('b')
+        clock.now += 1
+        store.add('a')
+        store.add('c')
+
+        assert 'a' in store
+        assert 'b' not in store
+
+    def test_expire_and_clear(self):
+        """Test manual expiry and clearing."""
+        clock = FakeClock()
+        store = CooldownStore(5, clock=clock)
+        store.add('x')
+        clock.now += 10
+        assert store.expire() == 1
+        store.add('y')
+        store.clear()
+        assert len(store) == 0
+
+
+class TestPersistentCooldownStore:
+    """Test append-log persistence across restarts."""
+
+    def test_survives_restart(self, tmp_path):
+        """Test unexpired keys are restored from the log."""
+        path = str(tmp_path / 'seen.log')
+        clock = FakeClock()
+        store = PersistentCooldownStore(100, path, clock=clock)
+        assert store.check_and_set('0xa') is True
+        clock.now += 50
+        store.check_and_set('0xb')
+        store.close()
+
+        clock.now += 60
+        restored = PersistentCooldownStore(100, path, clock=clock)
+        assert '0xa' not in restored
+        assert '0xb' in restored
+        assert restored.check_and_set('0xb') is False
+        restored.close()
+
+    def test_restore_respects_max_size(self, tmp_path):
+        """Test only the newest entries are kept when the log exceeds the cap."""
+        path = str(tmp_path / 'seen.log')
+        clock = FakeClock()
+        store = PersistentCooldownStore(100, path, clock=clock)
+        for i in range(5):
+            store.add(f'k{i}')
+            clock.now += 1
+        store.close()
+
+        restored = PersistentCooldownStore(100, path, max_size=2, clock=clock)
+        assert len(restored) == 2
+        assert 'k4' in restored and 'k3' in restored
+        restored.close()
+
+    def test_partial_line_ignored(self, tmp_path):
+        """Test a truncated trailing line from a crash is skipped."""
+        path = tmp_path / 'seen.log'
+        path.write_text('0xa\t2000.000\n0xbroken', encoding='utf-8')
+
+        store = PersistentCooldownStore(100, str(path), clock=FakeClock())
+        assert len(store) == 1
+        assert '0xa' in store
+        store.close()
+
+    def test_log_is_compacted(self, tmp_path):
+        """Test refreshing keys rewrites the log instead of growing it."""
+        path = tmp_path / 'seen.log'
+        clock = FakeClock()
+        store = PersistentCooldownStore(10, str(path), clock=clock, compact_min=8)
+        for _ in range(50):
+            store.add('hot')
+            clock.now += 1
+        store.close()
+
+        assert len(path.read_text(encoding='utf-8').splitlines()) <= 8
+        assert store.stats()['log_lines'] <= 8
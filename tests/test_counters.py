@@ -0,0 +1,106 @@
+"""Tests for counters.py - thread-safe counters and ring log."""
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from counters import CounterGroup, RingLog, counter_property
+
+
+class TestCounterGroup:
+    """Test grouped counters."""
+
+    def test_inc_several_at_once(self):
+        """Test one inc call bumps every named counter."""
+        counters = CounterGroup(['total', 'ok', 'failed'])
+        counters.inc('total', 'ok')
+        counters.inc('total', 'failed', n=2)
+
+        assert counters.snapshot() == {'total': 3, 'ok': 1, 'failed': 2}
+
+    def test_unknown_counter_raises(self):
+        """Test typos in counter names are not silently created."""
+        counters = CounterGroup(['total'])
+        with pytest.raises(KeyError):
+            counters.inc('totl')
+
+    def test_exact_under_concurrency(self):
+        """Test no increments are lost across many threads."""
+        counters = CounterGroup(['total', 'ok'])
+
+        def work():
+            for _ in range(20000):
+                counters.inc('total', 'ok')
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert counters.snapshot() == {'total': 160000, 'ok': 160000}
+
+    def test_reset(self):
+        """Test reset zeroes every counter."""
+        counters = CounterGroup(['a'])
+        counters.inc('a', n=5)
+        counters.reset()
+        assert counters.get('a') == 0
+
+    def test_counter_property(self):
+        """Test counters read and write like plain attributes."""
+
+        class Holder:
+            hits = counter_property('hits')
+
+            def __init__(self):
+                self.counters = CounterGroup(['hits'])
+
+        holder = Holder()
+        holder.hits = 4
+        holder.counters.inc('hits')
+        assert holder.hits == 5
+
+
+class TestRingLog:
+    """Test the fixed-capacity recent log."""
+
+    def test_drops_oldest(self):
+        """Test only the newest entries are kept."""
+        log = RingLog(3)
+        for i in range(5):
+            log.append(i)
+
+        assert log.recent() == [2, 3, 4]
+        assert len(log) == 3
+
+    def test_recent_n(self):
+        """Test recent(n) returns the last n entries oldest first."""
+        log = RingLog(10)
+        for i in range(6):
+            log.append(i)
+
+        assert log.recent(2) == [4, 5]
+        assert log.recent(0) == []
+        assert log.recent(50) == [0, 1, 2, 3, 4, 5]
+
+    def test_read_while_appending(self):
+        """Test snapshots never fail while other threads append."""
+        log = RingLog(100)
+        stop = threading.Event()
+
+        def writer():
+            while not stop.is_set():
+                log.append('x')
+
+        thread = threading.Thread(target=writer)
+        thread.start()
+        try:
+            for _ in range(2000):
+                assert len(log.recent(50)) <= 50
+        finally:
+            stop.set()
+            thread.join()
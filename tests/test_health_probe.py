@@ -0,0 +1,110 @@
+"""Tests for health_probe.py - cached background health checks."""
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from health_probe import HealthProber
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestHealthProber:
+    """Test check execution and caching."""
+
+    def test_unknown_before_first_run(self):
+        """Test the snapshot is marked stale before any check ran."""
+        prober = HealthProber({'a': lambda: True}, clock=FakeClock())
+        report = prober.snapshot()
+
+        assert report['status'] == 'unknown'
+        assert report['stale'] is True
+        assert report['checks'] == {}
+
+    def test_results_and_age(self):
+        """Test results are cached with detail and age information."""
+        clock = FakeClock()
+        prober = HealthProber({'ok': lambda: (True, 'HTTP 200'), 'bad': lambda: False},
+                              interval=60, clock=clock)
+        prober.run()
+        clock.now += 30
+        report = prober.snapshot()
+
+        assert report['status'] == 'degraded'
+        assert report['checks']['ok']['detail'] == 'HTTP 200'
+        assert report['checks']['bad']['ok'] is False
+        assert report['age_seconds'] == 30
+        assert report['stale'] is False
+
+        clock.now += 200
+        assert prober.snapshot()['stale'] is True
+
+    def test_exception_counts_as_failure(self):
+        """Test a raising check is reported as failed, not propagated."""
+        def boom():
+            raise RuntimeError('down')
+
+        report = HealthProber({'x': boom}, clock=FakeClock()).run()
+        assert report['checks']['x']['ok'] is False
+        assert 'down' in report['checks']['x']['detail']
+
+    def test_non_forced_run_respects_min_interval(self):
+        """Test deep checks inside min_interval reuse the cache."""
+        clock = FakeClock()
+        calls = []
+        prober = HealthProber({'a': lambda: calls.append(1) or True}, min_interval=10, clock=clock)
+        prober.run(force=False)
+        clock.now += 5
+        prober.run(force=False)
+        assert len(calls) == 1
+
+        clock.now += 6
+        prober.run(force=False)
+        assert len(calls) == 2
+
+    def test_background_thread(self):
+        """Test start() runs checks immediately and stop() ends the thread."""
+        ran = threading.Event()
+        prober = HealthProber({'a': lambda: ran.set() or True}, interval=60)
+        prober.start()
+        prober.start()
+        try:
+            assert ran.wait(2)
+            assert prober.running
+        finally:
+            prober.stop()
+        assert not prober.running
+
+    def test_concurrent_start_spawns_one_thread(self, monkeypatch):
+        """Test racing start() calls create a single prober thread."""
+        created = []
+        real_thread = threading.Thread
+
+        def counting_thread(*args, **kwargs):
+            if kwargs.get('name') == 'health-prober':
+                created.append(1)
+            return real_thread(*args, **kwargs)
+
+        monkeypatch.setattr(threading, 'Thread', counting_thread)
+        prober = HealthProber({'a': lambda: True}, interval=60)
+        barrier = threading.Barrier(8)
+
+        def race():
+            barrier.wait()
+            prober.start()
+
+        callers = [real_thread(target=race) for _ in range(8)]
+        for caller in callers:
+            caller.start()
+        for caller in callers:
+            caller.join(5)
+        prober.stop()
+
+        assert created == [1]
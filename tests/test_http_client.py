@@ -0,0 +1,107 @@
+"""Tests for http_client.py - pooled HTTP client."""
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import http_client
+from http_client import HttpClient, parse_host_timeouts, parse_timeout
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    hits = {}
+
+    def _reply(self):
+        path = self.path.split("?")[0]
+        Handler.hits[path] = Handler.hits.get(path, 0) + 1
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        status = 503 if path == "/flaky" and Handler.hits[path] == 1 else 200
+        body = b"ok"
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = _reply
+    do_POST = _reply
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    Handler.hits = {}
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+class TestTimeoutParsing:
+    """Test timeout configuration strings."""
+
+    def test_parse_timeout(self):
+        """Test connect:read and single-value forms."""
+        assert parse_timeout("3:20") == (3.0, 20.0)
+        assert parse_timeout("7") == (7.0, 7.0)
+
+    def test_parse_host_timeouts(self):
+        """Test per-host overrides are parsed and lower-cased."""
+        assert parse_host_timeouts("API.telegram.org=5:15, bad, x.io=2") == {
+            "api.telegram.org": (5.0, 15.0),
+            "x.io": (2.0, 2.0),
+        }
+
+    def test_timeout_for_host(self):
+        """Test host overrides win over the default timeout."""
+        client = HttpClient(default_timeout=(1, 2), host_timeouts={"a.io": (3, 4)})
+        assert client.timeout_for("A.io") == (3, 4)
+        assert client.timeout_for("b.io") == (1, 2)
+
+
+class TestHttpClient:
+    """Test requests against a local keep-alive server."""
+
+    def test_connections_are_reused(self, server):
+        """Test sequential requests share one pooled connection."""
+        client = HttpClient(pool_size=2)
+        for _ in range(10):
+            assert client.get(server + "/ping").status_code == 200
+
+        stats = client.stats()["127.0.0.1"]
+        assert stats["requests"] == 10
+        assert stats["connections_opened"] == 1
+        assert stats["reuse_ratio"] == 0.9
+
+    def test_get_retries_on_5xx(self, server):
+        """Test idempotent requests are retried after a 503."""
+        client = HttpClient(retries=2, backoff=0)
+        assert client.get(server + "/flaky").status_code == 200
+        assert Handler.hits["/flaky"] == 2
+
+    def test_post_not_retried_on_5xx(self, server):
+        """Test POST is never re-sent after the server answered."""
+        client = HttpClient(retries=2, backoff=0)
+        assert client.post(server + "/flaky", json={}).status_code == 503
+        assert Handler.hits["/flaky"] == 1
+
+    def test_connection_errors_counted(self):
+        """Test failed connections are recorded as errors and re-raised."""
+        client = HttpClient(retries=0, default_timeout=(0.5, 0.5))
+        with pytest.raises(Exception):
+            client.get("http://127.0.0.1:9/")
+        assert client.stats()["127.0.0.1"]["errors"] == 1
+
+    def test_shared_client(self):
+        """Test get_client returns a process-wide instance."""
+        assert http_client.get_client() is http_client.get_client()
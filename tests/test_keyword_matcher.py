@@ -0,0 +1,113 @@
+"""Tests for keyword_matcher.py - precompiled multi-keyword matching."""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import keyword_matcher
+from keyword_matcher import KeywordFileWatcher, KeywordMatcher, parse_keywords
+
+
+class FakeClock:
+    """Manually advanced monotonic clock."""
+
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class TestKeywordMatcher:
+    """Test matching semantics."""
+
+    def test_returns_all_hits_in_order(self):
+        """Test every distinct keyword is reported once, in text order."""
+        matcher = KeywordMatcher(['btc', 'eth', 'binance'])
+        assert matcher.find_all('ETH up, BTC down, eth again') == ['eth', 'btc']
+        assert matcher.search('ETH up, BTC down') == 'eth'
+
+    def test_word_boundary(self):
+        """Test tickers do not match inside longer words but match with symbols."""
+        matcher = KeywordMatcher(['eth'])
+        assert matcher.find_all('together we build') == []
+        assert matcher.find_all('$ETH and #eth') == ['eth']
+
+    def test_substring_mode(self):
+        """Test word boundaries can be disabled."""
+        matcher = KeywordMatcher(['eth'], word_boundary=False)
+        assert matcher.find_all('together') == ['eth']
+
+    def test_prefix_keywords_all_reported(self):
+        """Test a keyword that is a prefix of another is reported too, longer first."""
+        matcher = KeywordMatcher(['eth', 'ethereum'], word_boundary=False)
+        assert matcher.find_all('Ethereum ETF') == ['ethereum', 'eth']
+
+    def test_overlapping_keywords_regex_path(self, monkeypatch):
+        """Test the compiled path reports prefix and overlapping keywords like the plain loop."""
+        keywords = ['bit', 'bitcoin', 'coin', 'ether', 'therm']
+        text = 'BITCOIN vs thermal ether'
+        plain = KeywordMatcher(keywords, word_boundary=False).find_all(text)
+        monkeypatch.setattr(keyword_matcher, 'SUBSTRING_LOOP_MAX', 0)
+        compiled = KeywordMatcher(keywords, word_boundary=False)
+        assert compiled._compiled.pattern is not None
+        assert compiled.find_all(text) == plain == ['bitcoin', 'bit', 'coin', 'therm', 'ether']
+
+    def test_overlapping_phrases_with_word_boundary(self):
+        """Test phrase keywords sharing a prefix each respect word boundaries."""
+        matcher = KeywordMatcher(['比特', '比特币', 'btc etf', 'btc etfs'])
+        assert matcher.find_all('比特币 btc etfs') == ['比特币', '比特', 'btc etfs']
+
+    def test_cjk_keywords(self):
+        """Test Chinese keywords match inside Chinese text."""
+        matcher = KeywordMatcher(['比特币'])
+        assert matcher.find_all('比特币突破十万') == ['比特币']
+
+    def test_special_characters_escaped(self):
+        """Test regex metacharacters in keywords are literal."""
+        matcher = KeywordMatcher(['c++', 'a.b'])
+        assert matcher.find_all('I like c++') == ['c++']
+        assert matcher.find_all('axb') == []
+
+    def test_reload_and_empty(self):
+        """Test reload replaces the keyword set."""
+        matcher = KeywordMatcher([' ', ''])
+        assert len(matcher) == 0
+        assert matcher.find_all('anything') == []
+        assert matcher.reload(['sol', 'SOL']) == 1
+        assert matcher.keywords == ['sol']
+        assert matcher.find_all('SOL pumps') == ['sol']
+
+
+class TestKeywordFile:
+    """Test keyword file parsing and hot reload."""
+
+    def test_parse_keywords(self):
+        """Test commas, newlines, comments and duplicates."""
+        text = "# tickers\nbtc, eth\n\nBTC\nsolana\n"
+        assert parse_keywords(text) == ['btc', 'eth', 'solana']
+
+    def test_watcher_reloads_on_change(self, tmp_path):
+        """Test the matcher picks up edits after the check interval."""
+        path = tmp_path / 'keywords.txt'
+        path.write_text('btc', encoding='utf-8')
+        clock = FakeClock()
+        matcher = KeywordMatcher()
+        watcher = KeywordFileWatcher(matcher, str(path), interval=5, clock=clock)
+
+        assert watcher.check() is True
+        assert matcher.keywords == ['btc']
+
+        path.write_text('doge', encoding='utf-8')
+        os.utime(path, ns=(1, 10**18))
+        assert watcher.check() is False
+        clock.now += 5
+        assert watcher.check() is True
+        assert matcher.keywords == ['doge']
+
+    def test_missing_file_keeps_keywords(self, tmp_path):
+        """Test a missing file leaves the current keywords untouched."""
+        matcher = KeywordMatcher(['btc'])
+        watcher = KeywordFileWatcher(matcher, str(tmp_path / 'none.txt'))
+        assert watcher.check(force=True) is False
+        assert matcher.keywords == ['btc']
@@ -0,0 +1,170 @@
+"""Tests for metrics.py - Prometheus registry and multiprocess merge."""
+import json
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import metrics
+from metrics import Registry, merge_snapshots, render
+from worker_stats import WorkerStats
+
+
+def dead_pid():
+    """Return the pid of a process that has already exited."""
+    process = subprocess.Popen([sys.executable, '-c', 'pass'])
+    process.wait()
+    return process.pid
+
+
+class TestMetricTypes:
+    """Test counters, gauges and histograms."""
+
+    def test_counter_with_labels(self):
+        """Test labelled counters keep separate series."""
+        registry = Registry()
+        counter = registry.counter('alerts_total', 'alerts', ['symbol'])
+        counter.labels('BTCUSDT').inc()
+        counter.labels(symbol='BTCUSDT').inc(2)
+        counter.labels('ETHUSDT').inc()
+
+        samples = dict((tuple(k), v) for k, v in registry.snapshot()['alerts_total']['samples'])
+        assert samples == {('BTCUSDT',): 3, ('ETHUSDT',): 1}
+
+    def test_counter_rejects_negative_and_bad_labels(self):
+        """Test counters only go up and label arity is checked."""
+        registry = Registry()
+        counter = registry.counter('c_total', 'c', ['a'])
+        with pytest.raises(ValueError):
+            counter.labels('x').inc(-1)
+        with pytest.raises(ValueError):
+            counter.labels('x', 'y')
+
+    def test_reregister_returns_same_metric(self):
+        """Test registering the same name twice is idempotent but type-checked."""
+        registry = Registry()
+        assert registry.counter('x_total', 'x') is registry.counter('x_total', 'x')
+        with pytest.raises(ValueError):
+            registry.gauge('x_total', 'x')
+
+    def test_gauge_function(self):
+        """Test callback gauges are evaluated at snapshot time."""
+        registry = Registry()
+        depth = [3]
+        registry.gauge('depth', 'queue depth').set_function(lambda: depth[0])
+        depth[0] = 7
+
+        assert registry.snapshot()['depth']['samples'] == [[[], 7.0]]
+
+    def test_histogram_buckets(self):
+        """Test observations land in the first bucket whose bound is >= value."""
+        registry = Registry()
+        histogram = registry.histogram('lat_seconds', 'lat', buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 3.0):
+            histogram.observe(value)
+
+        counts, total, count = registry.snapshot()['lat_seconds']['samples'][0][1]
+        assert counts == [2, 1, 1]
+        assert total == pytest.approx(3.65)
+        assert count == 4
+
+    def test_histogram_exact_under_concurrency(self):
+        """Test concurrent observations are all counted."""
+        registry = Registry()
+        histogram = registry.histogram('h', 'h', ['t'])
+
+        def work():
+            child = histogram.labels('x')
+            for _ in range(10000):
+                child.observe(0.01)
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert registry.snapshot()['h']['samples'][0][1][2] == 80000
+
+
+class TestRender:
+    """Test Prometheus text output."""
+
+    def test_render_histogram_and_labels(self):
+        """Test cumulative buckets, +Inf, sum/count and label escaping."""
+        registry = Registry()
+        histogram = registry.histogram('send_seconds', 'send', ['topic'], buckets=(0.5,))
+        histogram.labels('a"b').observe(0.2)
+        histogram.labels('a"b').observe(2)
+        registry.counter('hits_total', 'hits').inc()
+
+        text = render(merge_snapshots([(registry.snapshot(), True)]))
+
+        assert '# TYPE send_seconds histogram' in text
+        assert 'send_seconds_bucket{topic="a\\"b",le="0.5"} 1' in text
+        assert 'send_seconds_bucket{topic="a\\"b",le="+Inf"} 2' in text
+        assert 'send_seconds_count{topic="a\\"b"} 2' in text
+        assert 'hits_total 1' in text
+
+
+class TestMultiprocess:
+    """Test merging snapshots from several processes."""
+
+    def make_snapshot(self, hits, depth, lag):
+        registry = Registry()
+        registry.counter('hits_total', 'hits', ['symbol']).labels('BTC').inc(hits)
+        registry.gauge('depth', 'depth').set(depth)
+        registry.gauge('uptime', 'uptime', multiprocess_mode='max').set(depth * 10)
+        registry.histogram('lag', 'lag', buckets=(1.0,)).observe(lag)
+        return registry.snapshot()
+
+    def test_merge_rules(self):
+        """Test counters/histograms sum and gauges skip dead processes."""
+        merged = merge_snapshots([
+            (self.make_snapshot(1, 2, 0.5), True),
+            (self.make_snapshot(4, 5, 2.0), True),
+            (self.make_snapshot(10, 100, 0.1), False),
+        ])
+
+        assert merged['hits_total']['samples'] == [[['BTC'], 15]]
+        assert merged['depth']['samples'] == [[[], 7.0]]
+        assert merged['uptime']['samples'] == [[[], 50.0]]
+        assert merged['lag']['samples'] == [[[], [[2, 1], pytest.approx(2.6), 3]]]
+
+    def test_collect_from_stats_directory(self, tmp_path, monkeypatch):
+        """Test collect() merges this process with files left by others."""
+        other = {'pid': dead_pid(), 'updated_at': 0, 'metrics': self.make_snapshot(5, 9, 0.5)}
+        (tmp_path / f"{other['pid']}.json").write_text(json.dumps(other))
+        stats = WorkerStats(str(tmp_path))
+        registry = Registry()
+        registry.counter('hits_total', 'hits', ['symbol']).labels('BTC').inc(2)
+        registry.gauge('depth', 'depth').set(1)
+        stats.register('metrics', registry.snapshot)
+        monkeypatch.setattr(metrics.worker_stats, 'stats', stats)
+
+        merged = metrics.collect(registry)
+
+        assert merged['hits_total']['samples'] == [[['BTC'], 7]]
+        assert merged['depth']['samples'] == [[[], 1.0]]
+
+    def test_exited_process_counters_survive_cleanup(self, tmp_path, monkeypatch):
+        """Test a dead process's file is folded away without losing its counters."""
+        pid = dead_pid()
+        other = {'pid': pid, 'updated_at': 0, 'metrics': self.make_snapshot(5, 9, 0.5)}
+        (tmp_path / f"{pid}.json").write_text(json.dumps(other))
+        stats = WorkerStats(str(tmp_path))
+        registry = Registry()
+        registry.counter('hits_total', 'hits', ['symbol']).labels('BTC').inc(2)
+        stats.register('metrics', registry.snapshot)
+        monkeypatch.setattr(metrics.worker_stats, 'stats', stats)
+
+        metrics.collect(registry)
+        merged = metrics.collect(registry)
+
+        assert not (tmp_path / f"{pid}.json").exists()
+        assert merged['hits_total']['samples'] == [[['BTC'], 7]]
+        assert 'depth' not in merged
@@ -0,0 +1,95 @@
+"""Tests for mock_telegram.py - local Telegram Bot API stand-in."""
+import asyncio
+import os
+import sys
+
+import aiohttp
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mock_telegram import MockTelegramServer
+from tg_delivery import TelegramDelivery
+
+
+async def post(base_url, payload):
+    async with aiohttp.ClientSession() as session:
+        async with session.post(f'{base_url}/botTOKEN/sendMessage', json=payload) as response:
+            return response.status, await response.json()
+
+
+def with_server(server, coro_factory):
+    async def run():
+        base_url = await server.start()
+        try:
+            return await coro_factory(base_url)
+        finally:
+            await server.stop()
+    return asyncio.run(run())
+
+
+class TestMockResponses:
+    """Test injected responses."""
+
+    def test_send_message_recorded(self):
+        """Test successful sends are recorded."""
+        server = MockTelegramServer()
+        status, body = with_server(server, lambda url: post(url, {'chat_id': 1, 'text': 'hi'}))
+        assert status == 200 and body['ok']
+        assert server.stats['ok'] == 1
+        assert server.messages[0][1:] == (1, None, 'hi')
+
+    def test_chat_rate_limit_returns_retry_after(self):
+        """Test the per-chat budget answers 429 with retry_after."""
+        server = MockTelegramServer(chat_rate_per_min=2, retry_after=0.5)
+
+        async def run(url):
+            return [await post(url, {'chat_id': 1, 'text': str(i)}) for i in range(3)]
+
+        results = with_server(server, run)
+        assert [status for status, _ in results] == [200, 200, 429]
+        body = results[2][1]
+        assert body['error_code'] == 429
+        assert body['parameters']['retry_after'] >= 0.5
+
+    def test_failure_and_invalid_thread(self):
+        """Test failure injection and the thread-not-found error."""
+        failing = MockTelegramServer(failure_rate=1.0)
+        status, _ = with_server(failing, lambda url: post(url, {'chat_id': 1, 'text': 'x'}))
+        assert status == 500
+
+        server = MockTelegramServer(invalid_threads=[7])
+        status, body = with_server(
+            server, lambda url: post(url, {'chat_id': 1, 'text': 'x', 'message_thread_id': 7}),
+        )
+        assert status == 400
+        assert 'message thread not found' in body['description']
+
+
+class TestDeliveryAgainstMock:
+    """Test TelegramDelivery end to end through the mock API."""
+
+    def test_delivery_recovers_from_429_and_bad_thread(self):
+        """Test rate limits are retried and a dead topic falls back to the main chat."""
+        # seed=1: the first request draws a random 429, later ones mostly pass
+        server = MockTelegramServer(rate_limit_rate=0.5, retry_after=0.05, invalid_threads=[3], seed=1)
+
+        async def run(url):
+            delivery = TelegramDelivery(
+                'TOKEN', '-100', api_base=url, global_rate=1000,
+                chat_rate_per_min=60000, topic_rate_per_min=60000, batch=False,
+            )
+            await delivery.start()
+            try:
+                results = await asyncio.gather(
+                    delivery.send('a', thread_id=3),
+                    delivery.send('b', thread_id=3),
+                )
+            finally:
+                await delivery.close()
+            return results, delivery.stats
+
+        results, stats = with_server(server, run)
+        assert results == [True, True]
+        assert stats['thread_fallback'] == 1
+        assert stats['rate_limited'] >= 1
+        assert [m[2] for m in server.messages] == [None, None]
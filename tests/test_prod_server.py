@@ -0,0 +1,55 @@
+"""Tests for prod_server.py - production server selection."""
+import os
+import sys
+from unittest.mock import patch
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import prod_server
+
+
+class TestResolveServer:
+    """Test WEB_SERVER resolution."""
+
+    def test_auto_prefers_gunicorn(self):
+        """Test auto mode uses gunicorn when it is importable."""
+        with patch.object(prod_server, 'BaseApplication', object):
+            assert prod_server.resolve_server('auto') == 'gunicorn'
+
+    def test_auto_falls_back_to_dev(self):
+        """Test auto mode falls back to the Flask server without gunicorn."""
+        with patch.object(prod_server, 'BaseApplication', None):
+            assert prod_server.resolve_server('auto') == 'dev'
+
+    def test_forced_gunicorn_requires_install(self):
+        """Test asking for gunicorn without it installed fails loudly."""
+        with patch.object(prod_server, 'BaseApplication', None):
+            with pytest.raises(ImportError):
+                prod_server.resolve_server('gunicorn')
+
+    def test_unknown_server(self):
+        """Test unknown server names are rejected."""
+        with pytest.raises(ValueError):
+            prod_server.resolve_server('uwsgi')
+
+
+class TestGunicornOptions:
+    """Test generated gunicorn settings."""
+
+    def test_options(self):
+        """Test bind address, worker model and lifecycle hooks."""
+        options = prod_server.gunicorn_options(8080)
+        assert options['bind'] == '0.0.0.0:8080'
+        assert options['worker_class'] == 'gthread'
+        assert options['preload_app'] is False
+        assert options['worker_exit'] is prod_server.worker_exit
+
+    def test_enable_worker_stats(self, tmp_path, monkeypatch):
+        """Test the stats directory is exported for forked workers."""
+        monkeypatch.setenv('WORKER_STATS_DIR', str(tmp_path))
+        monkeypatch.setattr(prod_server.worker_stats.stats, 'directory', None)
+
+        assert prod_server.enable_worker_stats() == str(tmp_path)
+        assert prod_server.worker_stats.stats.directory == str(tmp_path)
@@ -0,0 +1,79 @@
+"""Tests for rate_limit.py - token bucket limiter."""
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rate_limit import TokenBucket, reserve_all
+
+
+class FakeClock:
+    """Manually advanced monotonic clock."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTokenBucket:
+    """Test token bucket accounting."""
+
+    def test_invalid_config(self):
+        """Test rate and capacity validation."""
+        with pytest.raises(ValueError):
+            TokenBucket(0, 1)
+        with pytest.raises(ValueError):
+            TokenBucket(1, 0)
+
+    def test_burst_then_wait(self):
+        """Test that the burst capacity is served immediately, then paced."""
+        clock = FakeClock()
+        bucket = TokenBucket(rate=2, capacity=2, clock=clock)
+
+        assert bucket.reserve() == 0
+        assert bucket.reserve() == 0
+        assert bucket.reserve() == pytest.approx(0.5)
+        assert bucket.reserve() == pytest.approx(1.0)
+
+    def test_refill_over_time(self):
+        """Test tokens refill up to capacity."""
+        clock = FakeClock()
+        bucket = TokenBucket(rate=1, capacity=3, clock=clock)
+        for _ in range(3):
+            assert bucket.try_acquire()
+        assert not bucket.try_acquire()
+
+        clock.now = 10.0
+        assert bucket.available == pytest.approx(3.0)
+
+    def test_pause(self):
+        """Test pause blocks acquisition until the deadline."""
+        clock = FakeClock()
+        bucket = TokenBucket(rate=10, capacity=10, clock=clock)
+        bucket.pause(5)
+
+        assert not bucket.try_acquire()
+        assert bucket.reserve() == pytest.approx(5.0)
+
+        clock.now = 5.0
+        assert bucket.try_acquire()
+
+    def test_reserve_all_returns_longest_wait(self):
+        """Test reserving across several buckets."""
+        clock = FakeClock()
+        fast = TokenBucket(rate=10, capacity=1, clock=clock)
+        slow = TokenBucket(rate=1, capacity=1, clock=clock)
+
+        assert reserve_all([fast, slow]) == 0
+        assert reserve_all([fast, slow]) == pytest.approx(1.0)
+
+    def test_acquire_async(self):
+        """Test async acquisition with an immediately available token."""
+        bucket = TokenBucket(rate=100, capacity=1)
+        asyncio.run(bucket.acquire_async())
+        assert bucket.available < 1
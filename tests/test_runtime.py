@@ -0,0 +1,103 @@
+"""Tests for runtime.py - single-process monitor runtime."""
+import asyncio
+import os
+import sys
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import runtime
+from runtime import MonitorTask, Runtime
+
+
+class TestMonitorTask:
+    """Test per-monitor supervision."""
+
+    def test_restarts_with_backoff(self):
+        """Test a failing monitor is restarted with growing delays."""
+        calls = []
+
+        async def flaky(rt):
+            calls.append(time.monotonic())
+            if len(calls) < 3:
+                raise RuntimeError('boom')
+            await asyncio.sleep(3600)
+
+        task = MonitorTask('flaky', flaky, backoff_min=0.01, backoff_max=1, stable_after=60)
+
+        async def run():
+            supervisor = asyncio.create_task(task.supervise(None))
+            while len(calls) < 3:
+                await asyncio.sleep(0.005)
+            status = task.status()
+            supervisor.cancel()
+            await asyncio.gather(supervisor, return_exceptions=True)
+            return status
+
+        status = asyncio.run(run())
+        assert status['running'] is True
+        assert status['restarts'] == 2
+        assert 'boom' in status['last_error']
+        assert calls[2] - calls[1] >= calls[1] - calls[0]
+
+    def test_returning_monitor_is_restarted(self):
+        """Test a monitor that returns normally is treated as a failure."""
+        calls = []
+
+        async def quits(rt):
+            calls.append(1)
+
+        task = MonitorTask('quits', quits, backoff_min=0.001, backoff_max=0.001)
+
+        async def run():
+            supervisor = asyncio.create_task(task.supervise(None))
+            while len(calls) < 2:
+                await asyncio.sleep(0.001)
+            supervisor.cancel()
+            await asyncio.gather(supervisor, return_exceptions=True)
+
+        asyncio.run(run())
+        assert task.restarts >= 1
+        assert task.last_error == '任务意外结束'
+
+
+class TestRuntime:
+    """Test running several monitors in one loop."""
+
+    def test_shared_session_and_delivery(self):
+        """Test monitors get the shared session and delivery starts on it."""
+        seen = {}
+        delivery = MagicMock()
+        delivery.start = AsyncMock()
+
+        async def monitor(rt):
+            seen['session'] = rt.session
+            raise asyncio.CancelledError
+
+        rt = Runtime({'a': monitor})
+        with patch('tg_delivery.get_delivery', return_value=delivery):
+            with pytest.raises(asyncio.CancelledError):
+                asyncio.run(rt.run())
+
+        delivery.start.assert_awaited_once_with(seen['session'])
+        assert seen['session'].closed
+
+    def test_build_runtime_rejects_unknown(self):
+        """Test unknown monitor names fail fast."""
+        with pytest.raises(ValueError):
+            runtime.build_runtime(['arkm', 'nope'])
+
+    def test_run_in_daemon_thread(self):
+        """Test blocking calls resolve or raise through the awaiting task."""
+        def fail():
+            raise KeyError('x')
+
+        async def run():
+            assert await runtime.run_in_daemon_thread(lambda a, b=0: a + b, 1, b=2) == 3
+            with pytest.raises(KeyError):
+                await runtime.run_in_daemon_thread(fail)
+
+        asyncio.run(run())
@@ -0,0 +1,82 @@
+"""Tests for sliding_window.py - multi-window burst aggregation."""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sliding_window
+from sliding_window import SlidingWindowAggregator, format_window, parse_windows
+
+
+class TestParseWindows:
+    """Test window configuration parsing."""
+
+    def test_default_window(self):
+        """Test an empty spec falls back to the single default window."""
+        assert parse_windows('', 6000, 1) == [(6000, 1)]
+
+    def test_multiple_windows(self):
+        """Test windows are sorted and counts default when omitted."""
+        assert parse_windows('300:6, 10:2,60', 6000, 3) == [(10000, 2), (60000, 3), (300000, 6)]
+
+    def test_invalid_window(self):
+        """Test zero-length windows are rejected."""
+        with pytest.raises(ValueError):
+            parse_windows('0:1', 6000, 1)
+
+    def test_format_window(self):
+        """Test window labels used in alert text."""
+        assert format_window(60000) == '1分钟'
+        assert format_window(10000) == '10秒'
+        assert format_window(6000) == '6秒'
+
+
+class TestSlidingWindowAggregator:
+    """Test running sums and eviction across several windows."""
+
+    def test_requires_window(self):
+        """Test at least one positive window is required."""
+        with pytest.raises(ValueError):
+            SlidingWindowAggregator([])
+
+    def test_windows_evict_independently(self):
+        """Test each window keeps only trades within its own span."""
+        agg = SlidingWindowAggregator([10_000, 60_000])
+        agg.add(0, 1.0)
+        agg.add(5_000, 2.0)
+        agg.add(20_000, 4.0)
+
+        assert agg.snapshot() == [(10_000, 1, 4.0), (60_000, 3, 7.0)]
+        agg.add(70_000, 8.0)
+        assert agg.snapshot() == [(10_000, 1, 8.0), (60_000, 2, 12.0)]
+
+    def test_boundary_is_inclusive(self):
+        """Test a trade exactly one window old is still counted."""
+        agg = SlidingWindowAggregator([1_000])
+        agg.add(0, 1.0)
+        agg.add(1_000, 1.0)
+        assert agg.count() == 2
+        agg.advance(1_001)
+        assert agg.count() == 1
+
+    def test_reset_clears_shorter_windows(self):
+        """Test resetting a window also resets every shorter one."""
+        agg = SlidingWindowAggregator([10, 100, 1000])
+        for ts in range(5):
+            agg.add(ts, 1.0)
+        agg.reset(1)
+        assert [count for _, count, _ in agg.snapshot()] == [0, 0, 5]
+        agg.add(5, 2.0)
+        assert agg.snapshot() == [(10, 1, 2.0), (100, 1, 2.0), (1000, 6, 7.0)]
+
+    def test_storage_is_compacted(self, monkeypatch):
+        """Test evicted prefixes are dropped from storage."""
+        monkeypatch.setattr(sliding_window, 'COMPACT_MIN', 4)
+        agg = SlidingWindowAggregator([10])
+        for ts in range(0, 1000, 5):
+            agg.add(ts, 1.0)
+        assert len(agg._times) < 10
+        assert agg.count() == 3
+        assert agg.total() == 3.0
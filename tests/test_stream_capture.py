@@ -0,0 +1,111 @@
+"""Tests for stream_capture.py - frame capture and replay."""
+import asyncio
+import gzip
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import stream_capture
+from binance_events import FrameDecoder
+from stream_capture import CaptureWriter, read_capture, replay
+
+FIXTURE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    'benchmarks', 'data', 'binance_frames.jsonl',
+)
+
+
+class TestCapture:
+    """Test writing and reading capture files."""
+
+    def test_round_trip(self, tmp_path):
+        """Test frames come back with their timestamps."""
+        path = str(tmp_path / 'cap.gz')
+        writer = CaptureWriter(path)
+        writer.write('{"a":1}', ts=100.5)
+        writer.write('{"b":2}', ts=101.25)
+        writer.close()
+
+        assert list(read_capture(path)) == [(100.5, '{"a":1}'), (101.25, '{"b":2}')]
+        with open(path, 'rb') as f:
+            assert f.read(2) == b'\x1f\x8b'
+
+    def test_reads_plain_fixture_without_timestamps(self):
+        """Test legacy jsonl recordings replay with no timestamp."""
+        frames = list(read_capture(FIXTURE))
+        assert len(frames) == 199
+        assert all(ts is None for ts, _ in frames)
+
+    def test_truncated_capture(self, tmp_path):
+        """Test a capture cut off mid-stream yields its complete frames."""
+        path = str(tmp_path / 'cap.gz')
+        copy = str(tmp_path / 'copy.gz')
+        writer = CaptureWriter(path, flush_interval=3600)
+        for i in range(100):
+            writer.write('{"i":%d}' % i, ts=float(i))
+        writer._file.flush()
+        writer.write('{"i":100}', ts=100.0)
+        # Snapshot the file as a killed process would leave it: no gzip trailer
+        with open(path, 'rb') as src, open(copy, 'wb') as dst:
+            dst.write(src.read())
+        writer.close()
+
+        frames = list(read_capture(copy))
+        assert len(frames) == 100
+        assert frames[-1] == (99.0, '{"i":99}')
+
+
+class TestReplay:
+    """Test the replay engine."""
+
+    def test_max_speed_dispatches_by_kind(self):
+        """Test decoded events reach the matching handler and stages are timed."""
+        seen = []
+
+        async def handler(event):
+            seen.append(event[0])
+
+        decoder = FrameDecoder('json')
+        report = asyncio.run(replay(
+            read_capture(FIXTURE), decoder.decode, {'aggTrade': handler, 'depth': handler, 'kline': handler},
+        ))
+        assert report['messages'] == 199
+        assert report['skipped'] == 0
+        assert len(seen) == 199
+        assert report['stages']['decode']['count'] == 199
+        assert sum(report['stages'][k]['count'] for k in ('aggTrade', 'depth', 'kline')) == 199
+        assert report['msgs_per_sec'] > 0
+        assert 'allocated_blocks_delta' in report['memory']
+
+    def test_unhandled_events_skipped(self):
+        """Test undecodable frames and kinds without handlers count as skipped."""
+        frames = [(None, 'x'), (None, 'y')]
+        report = asyncio.run(replay(frames, lambda raw: None if raw == 'x' else ('other', 'S', None), {}))
+        assert report['skipped'] == 2
+
+    def test_speed_scales_recorded_gaps(self):
+        """Test paced replay honours recorded timing divided by speed."""
+        frames = [(0.0, 'a'), (0.5, 'b'), (1.0, 'c')]
+
+        async def handler(event):
+            pass
+
+        started = time.perf_counter()
+        report = asyncio.run(replay(frames, lambda raw: ('k', 'S', raw), {'k': handler}, speed=20))
+        elapsed = time.perf_counter() - started
+        assert report['messages'] == 3
+        assert 0.04 <= elapsed < 0.5
+
+    def test_trace_memory_and_report(self):
+        """Test tracemalloc figures are reported and formatted."""
+        async def handler(event):
+            pass
+
+        report = asyncio.run(replay(
+            [(None, 'a')], lambda raw: ('k', 'S', raw), {'k': handler}, trace_memory=True,
+        ))
+        assert 'traced_peak_kb' in report['memory']
+        text = stream_capture.format_report(report)
+        assert 'msgs/s' in text and 'decode' in text
@@ -0,0 +1,118 @@
+"""Tests for stream_pipeline.py - bounded ingest pipeline."""
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stream_pipeline import StreamPipeline
+
+
+class TestStreamPipeline:
+    """Test bounded queueing, ordering and drop policies."""
+
+    def test_invalid_policy(self):
+        """Test unknown drop policy is rejected."""
+        with pytest.raises(ValueError):
+            StreamPipeline(None, drop_policy="random")
+
+    def test_items_processed_in_order_per_key(self):
+        """Test events for the same key are handled in order."""
+        seen = []
+
+        async def handler(item):
+            seen.append(item)
+
+        async def scenario():
+            pipeline = StreamPipeline(handler, shards=3)
+            await pipeline.start()
+            for i in range(20):
+                pipeline.put_nowait("BTCUSDT", i)
+            await pipeline.stop()
+            return pipeline
+
+        pipeline = asyncio.run(scenario())
+        assert seen == list(range(20))
+        assert pipeline.processed == 20
+        assert pipeline.dropped == 0
+
+    def test_drop_oldest(self):
+        """Test the oldest event is evicted when a shard is full."""
+        seen = []
+
+        async def handler(item):
+            seen.append(item)
+
+        async def scenario():
+            pipeline = StreamPipeline(handler, shards=1, maxsize=2)
+            for i in range(5):
+                assert pipeline.put_nowait("k", i) is True
+            await pipeline.start()
+            await pipeline.stop()
+            return pipeline
+
+        pipeline = asyncio.run(scenario())
+        assert seen == [3, 4]
+        assert pipeline.dropped == 3
+        assert pipeline.max_depth == 2
+
+    def test_drop_newest(self):
+        """Test new events are rejected when a shard is full."""
+        seen = []
+
+        async def handler(item):
+            seen.append(item)
+
+        async def scenario():
+            pipeline = StreamPipeline(
+                handler, shards=1, maxsize=2, drop_policy="drop_newest"
+            )
+            results = [pipeline.put_nowait("k", i) for i in range(4)]
+            await pipeline.start()
+            await pipeline.stop()
+            return results
+
+        assert asyncio.run(scenario()) == [True, True, False, False]
+        assert seen == [0, 1]
+
+    def test_slow_handler_does_not_block_producer(self):
+        """Test put_nowait returns immediately even when the consumer is slow."""
+
+        async def handler(item):
+            await asyncio.sleep(0.05)
+
+        async def scenario():
+            pipeline = StreamPipeline(handler, shards=1, maxsize=100)
+            await pipeline.start()
+            loop = asyncio.get_running_loop()
+            started = loop.time()
+            for i in range(50):
+                pipeline.put_nowait("k", i)
+            elapsed = loop.time() - started
+            await pipeline.stop(drain=False)
+            return elapsed
+
+        assert asyncio.run(scenario()) < 0.05
+
+    def test_handler_errors_are_counted(self):
+        """Test a failing handler does not kill the consumer."""
+
+        async def handler(item):
+            if item == 1:
+                raise RuntimeError("boom")
+
+        async def scenario():
+            pipeline = StreamPipeline(handler, shards=1)
+            await pipeline.start()
+            for i in range(3):
+                pipeline.put_nowait("k", i)
+            await pipeline.stop()
+            return pipeline.metrics()
+
+        metrics = asyncio.run(scenario())
+        assert metrics["errors"] == 1
+        assert metrics["processed"] == 3
+        assert metrics["depth"] == 0
+        assert "avg_ms" in metrics["queue_wait"]
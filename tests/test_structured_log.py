@@ -0,0 +1,191 @@
+"""Tests for structured_log.py - async queue logging, JSON output and sampling."""
+import io
+import json
+import logging
+import os
+import queue
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import structured_log
+from structured_log import JsonFormatter, LazyJson, SamplingFilter
+
+
+def make_record(msg="hello %s", args=("world",), level=logging.INFO, name="test", **extra):
+    record = logging.LogRecord(name, level, __file__, 1, msg, args, None)
+    for key, value in extra.items():
+        setattr(record, key, value)
+    return record
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def restore_root():
+    """Keep setup_logging from leaking handlers into other tests."""
+    root = logging.getLogger()
+    handlers, level = list(root.handlers), root.level
+    yield root
+    structured_log.shutdown()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    for handler in handlers:
+        root.addHandler(handler)
+    root.setLevel(level)
+
+
+class TestJsonFormatter:
+    """Test the one-object-per-line JSON format."""
+
+    def test_basic_fields(self):
+        """Test the formatted message and standard fields."""
+        entry = json.loads(JsonFormatter().format(make_record()))
+        assert entry["msg"] == "hello world"
+        assert entry["level"] == "INFO"
+        assert entry["logger"] == "test"
+        assert "ts" in entry and "pid" in entry
+
+    def test_extra_fields_included(self):
+        """Test extra= fields are written as top-level keys."""
+        entry = json.loads(JsonFormatter().format(make_record(symbol="BTCUSDT", amount=1.5)))
+        assert entry["symbol"] == "BTCUSDT"
+        assert entry["amount"] == 1.5
+
+    def test_exception_included(self):
+        """Test exc_info is rendered into the exc field."""
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            record = logging.LogRecord("test", logging.ERROR, __file__, 1, "failed", (), sys.exc_info())
+        entry = json.loads(JsonFormatter().format(record))
+        assert "ValueError: boom" in entry["exc"]
+
+    def test_unknown_format_rejected(self):
+        """Test an invalid LOG_FORMAT fails loudly."""
+        with pytest.raises(ValueError):
+            structured_log.make_formatter("xml")
+
+
+class TestSamplingFilter:
+    """Test per-template rate limiting."""
+
+    def test_burst_then_suppressed(self):
+        """Test only `burst` records per template pass in one window."""
+        sampler = SamplingFilter(burst=3, interval=10, clock=FakeClock())
+        passed = [sampler.filter(make_record(args=(i,))) for i in range(10)]
+        assert passed.count(True) == 3
+
+    def test_templates_counted_separately(self):
+        """Test different message templates have independent budgets."""
+        sampler = SamplingFilter(burst=1, interval=10, clock=FakeClock())
+        assert sampler.filter(make_record(msg="a %s"))
+        assert sampler.filter(make_record(msg="b %s"))
+        assert not sampler.filter(make_record(msg="a %s"))
+
+    def test_suppressed_count_carried_to_next_window(self):
+        """Test the first record of the next window reports how many were dropped."""
+        clock = FakeClock()
+        sampler = SamplingFilter(burst=2, interval=10, clock=clock)
+        for i in range(7):
+            sampler.filter(make_record(args=(i,)))
+        clock.now = 11
+        record = make_record()
+        assert sampler.filter(record)
+        assert record.suppressed == 5
+        second = make_record()
+        assert sampler.filter(second)
+        assert not hasattr(second, "suppressed")
+
+    def test_warnings_never_sampled(self):
+        """Test WARNING and above always pass."""
+        sampler = SamplingFilter(burst=1, interval=10, clock=FakeClock())
+        assert all(sampler.filter(make_record(level=logging.WARNING)) for _ in range(5))
+
+    def test_disabled_when_burst_zero(self):
+        """Test burst=0 turns sampling off."""
+        sampler = SamplingFilter(burst=0, interval=10, clock=FakeClock())
+        assert all(sampler.filter(make_record()) for _ in range(100))
+
+
+class TestAsyncQueueHandler:
+    """Test the non-blocking queue handler."""
+
+    def test_full_queue_drops_and_counts(self):
+        """Test records are dropped (not blocked on) when the queue is full."""
+        handler = structured_log._AsyncQueueHandler(queue.Queue(1))
+        before = structured_log.DROPPED.labels().value
+        handler.handle(make_record())
+        handler.handle(make_record())
+        assert structured_log.DROPPED.labels().value == before + 1
+
+    def test_message_not_formatted_on_enqueue(self):
+        """Test formatting is deferred to the writer thread."""
+        calls = []
+
+        class Probe:
+            def __str__(self):
+                calls.append(1)
+                return "probe"
+
+        q = queue.Queue()
+        structured_log._AsyncQueueHandler(q).handle(make_record(args=(Probe(),)))
+        assert calls == []
+        assert q.get_nowait().getMessage() == "hello probe"
+
+
+class TestLazyJson:
+    """Test deferred, truncated JSON rendering."""
+
+    def test_truncates(self):
+        """Test output is cut to the limit."""
+        text = str(LazyJson({"text": "x" * 1000}, limit=50))
+        assert len(text) == 53 and text.endswith("...")
+
+    def test_short_payload_unchanged(self):
+        """Test small payloads are rendered in full."""
+        assert str(LazyJson({"a": 1})) == '{"a": 1}'
+
+
+class TestSetupLogging:
+    """Test the background writer end to end."""
+
+    def test_writes_json_to_current_stdout(self, restore_root, monkeypatch):
+        """Test records reach the (current) stdout after flush."""
+        out = io.StringIO()
+        monkeypatch.setattr(sys, "stdout", out)
+        structured_log.setup_logging(fmt="json", level="INFO")
+        logging.getLogger("botsever").info("匹配 %s", "btc", extra={"tweet_id": "1"})
+        logging.getLogger("botsever").debug("not shown")
+        assert structured_log.flush()
+
+        lines = out.getvalue().splitlines()
+        assert len(lines) == 1
+        entry = json.loads(lines[0])
+        assert entry["msg"] == "匹配 btc"
+        assert entry["tweet_id"] == "1"
+
+    def test_setup_is_idempotent(self, restore_root):
+        """Test a second call keeps the same listener and handler."""
+        first = structured_log.setup_logging()
+        assert structured_log.setup_logging() is first
+        queue_handlers = [h for h in restore_root.handlers if isinstance(h, structured_log._AsyncQueueHandler)]
+        assert len(queue_handlers) == 1
+
+    def test_shutdown_drains_queue(self, restore_root, monkeypatch):
+        """Test pending records are written before shutdown returns."""
+        out = io.StringIO()
+        monkeypatch.setattr(sys, "stdout", out)
+        structured_log.setup_logging(fmt="text", level="INFO")
+        for i in range(20):
+            logging.getLogger("arkm").warning("line %s", i)
+        structured_log.shutdown()
+        assert len(out.getvalue().splitlines()) == 20
@@ -0,0 +1,198 @@
+"""Tests for supervisor.py - process supervision with backoff and heartbeats."""
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import supervisor
+from supervisor import Supervisor
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeProcess:
+    def __init__(self):
+        self.pid = 4242
+        self.returncode = None
+        self.terminated = False
+
+    def poll(self):
+        return self.returncode
+
+    def terminate(self):
+        self.terminated = True
+        self.returncode = -15
+
+    def wait(self, timeout=None):
+        return self.returncode
+
+    def kill(self):
+        self.returncode = -9
+
+
+def make_supervisor(tmp_path=None, **kwargs):
+    processes = {}
+    spawned = []
+
+    def spawn(script):
+        spawned.append(script)
+        processes[script] = {'type': 'process', 'obj': FakeProcess()}
+        return True
+
+    clock = FakeClock()
+    options = dict(backoff_min=1, backoff_max=8, stable_after=60, clock=clock)
+    options.update(kwargs)
+    sup = Supervisor(['a.py'], spawn, processes, heartbeat_dir=str(tmp_path) if tmp_path else None, **options)
+    return sup, processes, spawned, clock
+
+
+class TestBackoff:
+    """Test restart scheduling."""
+
+    def test_crash_loop_backs_off_exponentially(self):
+        """Test quick exits double the restart delay up to the cap."""
+        sup, processes, spawned, clock = make_supervisor()
+        sup.start('a.py')
+        delays = []
+        for _ in range(5):
+            processes['a.py']['obj'].returncode = 1
+            sup.check()
+            state = sup.states['a.py']
+            delays.append(state.next_start - clock.now)
+            clock.now = state.next_start
+            sup.check()
+        assert delays == [1, 2, 4, 8, 8]
+        assert len(spawned) == 6
+        assert sup.states['a.py'].restarts == 5
+
+    def test_restart_not_before_backoff(self):
+        """Test a crashed script is not respawned before its delay elapses."""
+        sup, processes, spawned, clock = make_supervisor(backoff_min=4)
+        sup.start('a.py')
+        processes['a.py']['obj'].returncode = 1
+        sup.check()
+        clock.now += 3
+        sup.check()
+        assert len(spawned) == 1
+        assert sup.status()['a.py']['restart_in'] == 1
+        clock.now += 1
+        sup.check()
+        assert len(spawned) == 2
+
+    def test_backoff_resets_after_stable_run(self):
+        """Test a long healthy run resets the backoff."""
+        sup, processes, spawned, clock = make_supervisor()
+        sup.start('a.py')
+        for _ in range(3):
+            processes['a.py']['obj'].returncode = 1
+            sup.check()
+            clock.now = sup.states['a.py'].next_start
+            sup.check()
+        clock.now += 120
+        processes['a.py']['obj'].returncode = 1
+        sup.check()
+        assert sup.states['a.py'].next_start - clock.now == 1
+
+    def test_spawn_failure_is_retried(self):
+        """Test a failed spawn schedules a retry instead of giving up."""
+        calls = []
+        sup = Supervisor(['a.py'], lambda s: calls.append(s) or False, {}, backoff_min=2, clock=FakeClock())
+        assert sup.start('a.py') is False
+        assert sup.states['a.py'].last_reason == 'spawn_failed'
+        assert sup.states['a.py'].next_start is not None
+
+    def test_thread_entries_ignored(self):
+        """Test thread-type entries (botsever) are never restarted."""
+        sup = Supervisor(['botsever.py'], lambda s: True, {'botsever.py': {'type': 'thread', 'port': 5001}})
+        sup.check()
+        assert sup.states['botsever.py'].restarts == 0
+
+
+class TestHeartbeat:
+    """Test hung-process detection."""
+
+    def test_stale_heartbeat_kills_and_restarts(self, tmp_path):
+        """Test a process whose heartbeat is too old is terminated."""
+        sup, processes, spawned, clock = make_supervisor(tmp_path, heartbeat_timeout=30)
+        sup.start('a.py')
+        path = supervisor.heartbeat_path(str(tmp_path), 'a.py')
+        open(path, 'w').close()
+        sup.check()
+        assert sup.states['a.py'].restarts == 0
+
+        old = time.time() - 60
+        os.utime(path, (old, old))
+        process = processes['a.py']['obj']
+        sup.check()
+        assert process.terminated
+        assert sup.states['a.py'].last_reason == 'hung'
+        assert not os.path.exists(path)
+
+    def test_missing_heartbeat_not_checked(self, tmp_path):
+        """Test scripts that never beat are not treated as hung."""
+        sup, processes, spawned, clock = make_supervisor(tmp_path, heartbeat_timeout=1)
+        sup.start('a.py')
+        sup.check()
+        assert sup.states['a.py'].restarts == 0
+        assert sup.status()['a.py']['heartbeat_age'] is None
+
+    def test_beat_writes_file_and_throttles(self, tmp_path, monkeypatch):
+        """Test beat() touches the file only when the env dir is set."""
+        monkeypatch.delenv(supervisor.HEARTBEAT_DIR_ENV, raising=False)
+        supervisor.beat('x.py')
+        assert not os.listdir(tmp_path)
+
+        monkeypatch.setenv(supervisor.HEARTBEAT_DIR_ENV, str(tmp_path))
+        monkeypatch.setattr(supervisor, '_last_beat', {})
+        supervisor.beat('x.py')
+        path = supervisor.heartbeat_path(str(tmp_path), 'x.py')
+        assert os.path.exists(path)
+        old = time.time() - 100
+        os.utime(path, (old, old))
+        supervisor.beat('x.py')
+        assert os.stat(path).st_mtime == pytest.approx(old)
+        supervisor.beat('x.py', force=True)
+        assert os.stat(path).st_mtime > old
+
+
+class TestSigchld:
+    """Test instant exit detection."""
+
+    def test_child_exit_wakes_supervisor(self):
+        """Test SIGCHLD wakes wait() well before the timeout."""
+        if not hasattr(supervisor.signal, 'SIGCHLD'):
+            pytest.skip('SIGCHLD not available')
+        processes = {}
+
+        def spawn(script):
+            processes[script] = {
+                'type': 'process',
+                'obj': subprocess.Popen([sys.executable, '-c', 'raise SystemExit(3)']),
+            }
+            return True
+
+        previous = supervisor.signal.getsignal(supervisor.signal.SIGCHLD)
+        sup = Supervisor(['a.py'], spawn, processes, backoff_min=5)
+        try:
+            assert sup.install_signal_handler()
+            sup.start('a.py')
+            started = time.monotonic()
+            woke = sup.wait(10)
+            while woke is False and time.monotonic() - started < 10:
+                woke = sup.wait(10)
+            assert time.monotonic() - started < 5
+            processes['a.py']['obj'].wait()
+            sup.check()
+            assert sup.states['a.py'].last_exit == 3
+        finally:
+            supervisor.signal.signal(supervisor.signal.SIGCHLD, previous)
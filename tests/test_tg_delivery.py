@@ -0,0 +1,291 @@
+"""Tests for tg_delivery.py - shared Telegram delivery service."""
+import asyncio
+import os
+import sys
+from unittest.mock import patch
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tg_delivery
+
+
+class FakeResponse:
+    """Minimal aiohttp response stand-in."""
+
+    def __init__(self, status, body):
+        self.status = status
+        self._body = body
+
+    async def json(self, content_type=None):
+        if isinstance(self._body, Exception):
+            raise self._body
+        return self._body
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeSession:
+    """Records posted payloads and replays scripted responses."""
+
+    def __init__(self, responses=None):
+        self.responses = list(responses or [])
+        self.payloads = []
+        self.closed = False
+
+    def post(self, url, json=None, **kwargs):
+        self.payloads.append(dict(json))
+        if self.responses:
+            status, body = self.responses.pop(0)
+            if status is None:
+                raise body
+        else:
+            status, body = 200, {"ok": True}
+        return FakeResponse(status, body)
+
+
+def make_delivery(**kwargs):
+    kwargs.setdefault("global_rate", 1000)
+    kwargs.setdefault("chat_rate_per_min", 60000)
+    kwargs.setdefault("topic_rate_per_min", 60000)
+    return tg_delivery.TelegramDelivery("token", "chat", **kwargs)
+
+
+async def run_with(delivery, session, coro_factory):
+    await delivery.start(session)
+    try:
+        return await coro_factory()
+    finally:
+        await delivery.close()
+
+
+class TestDelivery:
+    """Test message delivery through the queue."""
+
+    def test_send_success(self):
+        """Test a single message is posted with thread id and parse mode."""
+        session = FakeSession()
+        delivery = make_delivery()
+
+        result = asyncio.run(
+            run_with(delivery, session, lambda: delivery.send("hello", thread_id=3))
+        )
+
+        assert result is True
+        assert session.payloads == [
+            {
+                "chat_id": "chat",
+                "text": "hello",
+                "parse_mode": "HTML",
+                "message_thread_id": 3,
+            }
+        ]
+        assert delivery.stats["sent"] == 1
+
+    def test_topic_fallback(self):
+        """Test automatic fallback to the main chat when the topic is invalid."""
+        session = FakeSession(
+            [(400, {"ok": False, "description": "Bad Request: message thread not found"})]
+        )
+        delivery = make_delivery()
+
+        async def scenario():
+            first = await delivery.send("a", thread_id=99)
+            second = await delivery.send("b", thread_id=99)
+            return first, second
+
+        assert asyncio.run(run_with(delivery, session, scenario)) == (True, True)
+        assert "message_thread_id" in session.payloads[0]
+        assert "message_thread_id" not in session.payloads[1]
+        # Invalid topic is remembered, later messages go straight to the chat
+        assert "message_thread_id" not in session.payloads[2]
+        assert delivery.stats["thread_fallback"] == 1
+
+    def test_retry_after_is_honoured(self):
+        """Test 429 responses are retried rather than dropped."""
+        session = FakeSession(
+            [
+                (
+                    429,
+                    {
+                        "ok": False,
+                        "error_code": 429,
+                        "parameters": {"retry_after": 0.01},
+                    },
+                )
+            ]
+        )
+        delivery = make_delivery()
+
+        result = asyncio.run(run_with(delivery, session, lambda: delivery.send("x")))
+
+        assert result is True
+        assert len(session.payloads) == 2
+        assert delivery.stats["rate_limited"] == 1
+
+    def test_permanent_error_fails(self):
+        """Test a 400 error is reported as failure without retry."""
+        session = FakeSession([(400, {"ok": False, "description": "chat not found"})])
+        delivery = make_delivery()
+
+        result = asyncio.run(run_with(delivery, session, lambda: delivery.send("x")))
+
+        assert result is False
+        assert len(session.payloads) == 1
+        assert delivery.stats["failed"] == 1
+
+    def test_non_json_5xx_is_retried(self):
+        """Test an HTML 502 from a proxy is retried instead of losing the message."""
+        import json
+
+        html = json.JSONDecodeError("Expecting value", "<html>502 Bad Gateway</html>", 0)
+        session = FakeSession([(502, html)])
+        delivery = make_delivery()
+
+        async def scenario():
+            with patch.object(delivery, "_retry_delay", return_value=0):
+                return await delivery.send("x")
+
+        assert asyncio.run(run_with(delivery, session, scenario)) is True
+        assert len(session.payloads) == 2
+        assert delivery.stats["retried"] == 1
+
+    def test_retry_backoff_does_not_block_other_targets(self):
+        """Test a backing-off target releases the worker so other topics keep sending."""
+        session = FakeSession([(500, {"ok": False}), (200, {"ok": True}), (200, {"ok": True})])
+        delivery = make_delivery(workers=1)
+
+        async def scenario():
+            with patch.object(delivery, "_retry_delay", return_value=0.2):
+                failing = delivery.enqueue("slow", thread_id=1)
+                await asyncio.sleep(0)
+                healthy = await asyncio.wait_for(delivery.send("fast", thread_id=2), 0.1)
+                return healthy, await failing
+
+        assert asyncio.run(run_with(delivery, session, scenario)) == (True, True)
+        assert [p["text"] for p in session.payloads] == ["slow", "fast", "slow"]
+
+    def test_drain_waits_for_backoff(self):
+        """Test close(drain=True) still delivers a message that is backing off."""
+        session = FakeSession([(500, {"ok": False})])
+        delivery = make_delivery()
+
+        async def scenario():
+            await delivery.start(session)
+            with patch.object(delivery, "_retry_delay", return_value=0.05):
+                future = delivery.enqueue("x")
+                await asyncio.sleep(0.01)
+                await delivery.close(drain=True, timeout=2)
+            return future.result()
+
+        assert asyncio.run(scenario()) is True
+        assert len(session.payloads) == 2
+
+    def test_non_json_5xx_exhausted_resolves_false(self):
+        """Test the future resolves False once retries of a non-JSON 5xx run out."""
+        import json
+
+        html = json.JSONDecodeError("Expecting value", "<html>504</html>", 0)
+        session = FakeSession([(504, html)])
+        delivery = make_delivery(max_attempts=1)
+
+        result = asyncio.run(run_with(delivery, session, lambda: delivery.send("x")))
+
+        assert result is False
+        assert delivery.stats["failed"] == 1
+
+    def test_unexpected_error_resolves_future(self):
+        """Test an unexpected exception while sending still resolves the caller's future."""
+        session = FakeSession([(None, RuntimeError("boom"))])
+        delivery = make_delivery()
+
+        async def scenario():
+            return await asyncio.wait_for(delivery.send("x"), 5)
+
+        assert asyncio.run(run_with(delivery, session, scenario)) is False
+        assert delivery.stats["failed"] == 1
+
+    def test_backlog_is_batched(self):
+        """Test queued messages for one destination are merged into one post."""
+        session = FakeSession()
+        delivery = make_delivery(workers=1)
+
+        async def scenario():
+            futures = [delivery.enqueue(f"msg{i}", thread_id=1) for i in range(3)]
+            await delivery.start(session)
+            results = await asyncio.gather(*futures)
+            await delivery.close()
+            return results
+
+        assert asyncio.run(scenario()) == [True, True, True]
+        assert len(session.payloads) == 1
+        assert session.payloads[0]["text"] == "msg0\n\nmsg1\n\nmsg2"
+        assert delivery.stats["batched"] == 2
+
+    def test_batch_respects_length_limit(self):
+        """Test merged messages never exceed the Telegram length limit."""
+        session = FakeSession()
+        delivery = make_delivery(workers=1, max_batch_chars=10)
+
+        async def scenario():
+            futures = [delivery.enqueue("abcdef") for _ in range(2)]
+            await delivery.start(session)
+            await asyncio.gather(*futures)
+            await delivery.close()
+
+        asyncio.run(scenario())
+        assert len(session.payloads) == 2
+
+    def test_send_sync_from_thread(self):
+        """Test the synchronous bridge runs the service on a background loop."""
+        session = FakeSession()
+        delivery = make_delivery()
+        delivery._session = session
+
+        assert delivery.send_sync("sync", thread_id=4, timeout=5) is True
+        assert session.payloads[0]["message_thread_id"] == 4
+
+    def test_stop_background(self):
+        """Test the background loop drains and stops synchronously."""
+        session = FakeSession()
+        delivery = make_delivery()
+        delivery._session = session
+        delivery.submit("last", thread_id=4)
+
+        delivery.stop_background(timeout=5)
+
+        assert session.payloads[-1]["text"] == "last"
+        assert not delivery.running
+        assert delivery._thread is None
+
+
+class TestSharedInstance:
+    """Test the process-wide delivery instance."""
+
+    def test_get_delivery_is_singleton(self):
+        """Test the shared instance is reused and configured from env."""
+        first = tg_delivery.get_delivery()
+        assert first is tg_delivery.get_delivery()
+        assert first.bot_token == "test_bot_token"
+        assert first.chat_id == "test_chat_id"
+
+    def test_divide_rate_limits_splits_existing_share(self, monkeypatch):
+        """Test each level of process fan-out divides the share it inherited."""
+        monkeypatch.setenv("TELEGRAM_RATE_SHARE", "1")
+        assert tg_delivery.divide_rate_limits(3) == pytest.approx(1 / 3)
+        assert tg_delivery.divide_rate_limits(2) == pytest.approx(1 / 6)
+        assert float(os.environ["TELEGRAM_RATE_SHARE"]) == pytest.approx(1 / 6)
+
+    def test_get_delivery_applies_rate_share(self, monkeypatch):
+        """Test the shared instance's buckets only use this process's share of the limits."""
+        monkeypatch.setenv("TELEGRAM_RATE_SHARE", "0.5")
+        monkeypatch.setattr(tg_delivery, "_default_delivery", None)
+        delivery = tg_delivery.get_delivery()
+        assert delivery._chat_rate == pytest.approx(10 / 60)
+        assert delivery._topic_rate == pytest.approx(10 / 60)
+        assert delivery._global_bucket.rate == pytest.approx(15)
@@ -0,0 +1,94 @@
+"""Tests for volume_baseline.py - rolling volume baselines."""
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from volume_baseline import RollingBaseline, VolumeBaselineEngine
+
+
+class TestRollingBaseline:
+    """Test incremental mean / ewma / median updates."""
+
+    def test_invalid_config(self):
+        """Test mode and window validation."""
+        with pytest.raises(ValueError):
+            RollingBaseline(mode='max')
+        with pytest.raises(ValueError):
+            RollingBaseline(window=0)
+
+    def test_mean_slides_window(self):
+        """Test the oldest sample leaves the running mean."""
+        baseline = RollingBaseline(window=3)
+        for value in (1.0, 2.0, 3.0, 10.0):
+            baseline.update(value)
+        assert len(baseline) == 3
+        assert baseline.value == pytest.approx(5.0)
+
+    def test_median_ignores_outlier(self):
+        """Test the median mode is robust to a single spike."""
+        baseline = RollingBaseline(window=5, mode='median')
+        for value in (1.0, 2.0, 3.0, 4.0, 1000.0):
+            baseline.update(value)
+        assert baseline.value == 3.0
+        baseline.update(5.0)
+        assert baseline.value == 4.0
+
+    def test_ewma(self):
+        """Test the exponentially weighted mean."""
+        baseline = RollingBaseline(window=3, mode='ewma', alpha=0.5)
+        baseline.update(10.0)
+        baseline.update(20.0)
+        assert baseline.value == pytest.approx(15.0)
+
+    def test_dedup_by_close_time(self):
+        """Test the same candle is not counted twice."""
+        baseline = RollingBaseline(window=3)
+        assert baseline.update(5.0, close_time=100) is True
+        assert baseline.update(5.0, close_time=100) is False
+        assert baseline.update(7.0, close_time=50) is False
+        assert len(baseline) == 1
+
+
+class TestVolumeBaselineEngine:
+    """Test per-symbol baselines and persistence."""
+
+    def test_min_samples(self):
+        """Test no baseline is reported until enough samples exist."""
+        engine = VolumeBaselineEngine(window=10, min_samples=3)
+        engine.update('BTCUSDT', 1.0, 1)
+        engine.update('BTCUSDT', 2.0, 2)
+        assert engine.get('BTCUSDT') == 0.0
+        engine.update('BTCUSDT', 3.0, 3)
+        assert engine.get('BTCUSDT') == pytest.approx(2.0)
+        assert engine.get('ETHUSDT', 7.0) == 7.0
+
+    def test_save_and_load(self, tmp_path):
+        """Test state round-trips through the JSON file."""
+        path = str(tmp_path / 'baseline.json')
+        engine = VolumeBaselineEngine(window=4)
+        engine.seed('BTCUSDT', [1.0, 2.0, 3.0], last_close_time=300)
+        engine.save(path)
+
+        restored = VolumeBaselineEngine(window=4)
+        assert restored.load(path) == 1
+        assert restored.get('BTCUSDT') == pytest.approx(2.0)
+        assert restored.last_close_time('BTCUSDT') == 300
+        assert not os.path.exists(path + '.tmp')
+
+    def test_load_smaller_window_keeps_latest(self, tmp_path):
+        """Test a shrunk window keeps only the newest samples."""
+        path = str(tmp_path / 'baseline.json')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'symbols': {'BTCUSDT': {'values': [1.0, 2.0, 9.0, 11.0]}}}, f)
+
+        engine = VolumeBaselineEngine(window=2)
+        engine.load(path)
+        assert engine.get('BTCUSDT') == pytest.approx(10.0)
+
+    def test_load_missing_file(self, tmp_path):
+        """Test a missing state file restores nothing."""
+        assert VolumeBaselineEngine().load(str(tmp_path / 'none.json')) == 0
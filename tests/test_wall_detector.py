@@ -0,0 +1,57 @@
+"""Tests for wall_detector.py - batched order wall detection."""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from binance_events import Depth
+from wall_detector import WallDetector, np
+
+BACKENDS = ['python'] + (['numpy'] if np is not None else [])
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+class TestWallDetector:
+    """Test threshold filtering on depth snapshots."""
+
+    def test_only_levels_above_threshold(self, backend):
+        """Test levels below the notional threshold are skipped."""
+        detector = WallDetector(1_000_000, backend)
+        levels = [(100.0, 5.0), (50000.0, 30.0), (49999.0, 1.0), (20000.0, 50.0)]
+
+        walls = detector.find(levels)
+
+        assert walls == [(50000.0, 30.0, 1_500_000.0), (20000.0, 50.0, 1_000_000.0)]
+
+    def test_detect_both_sides(self, backend):
+        """Test bids and asks are filtered separately."""
+        detector = WallDetector(1000, backend)
+        depth = Depth(bids=[(10.0, 200.0), (9.0, 1.0)], asks=[(11.0, 1.0)])
+
+        bid_walls, ask_walls = detector.detect(depth)
+
+        assert bid_walls == [(10.0, 200.0, 2000.0)]
+        assert ask_walls == []
+
+    def test_empty_book(self, backend):
+        """Test empty snapshots produce no walls."""
+        detector = WallDetector(1000, backend)
+        assert detector.detect(Depth([], [])) == ([], [])
+
+
+class TestWallDetectorConfig:
+    """Test backend selection."""
+
+    def test_unknown_backend(self):
+        """Test unknown backends are rejected."""
+        with pytest.raises(ValueError):
+            WallDetector(1, 'gpu')
+
+    @pytest.mark.skipif(np is None, reason='numpy not installed')
+    def test_auto_uses_numpy_for_arrays(self):
+        """Test auto mode handles columnar numpy input."""
+        detector = WallDetector(100, 'auto')
+        levels = np.array([[10.0, 20.0], [1.0, 1.0]])
+        assert detector.find(levels) == [(10.0, 20.0, 200.0)]
@@ -0,0 +1,131 @@
+"""Tests for work_queue.py - bounded thread-pool work queue."""
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from work_queue import WorkQueue
+
+
+class TestWorkQueue:
+    """Test submission, backpressure and metrics."""
+
+    def test_invalid_workers(self):
+        """Test at least one worker is required."""
+        with pytest.raises(ValueError):
+            WorkQueue(lambda item: None, workers=0)
+
+    def test_items_processed(self):
+        """Test every submitted item reaches the handler."""
+        seen = []
+        lock = threading.Lock()
+
+        def handler(item):
+            with lock:
+                seen.append(item)
+
+        work = WorkQueue(handler, workers=3, maxsize=100)
+        for i in range(20):
+            assert work.submit(i) is True
+        work.join()
+        work.stop()
+
+        assert sorted(seen) == list(range(20))
+        metrics = work.metrics()
+        assert metrics["enqueued"] == 20
+        assert metrics["processed"] == 20
+        assert metrics["depth"] == 0
+
+    def test_full_queue_rejects(self):
+        """Test submit returns False once the queue is full."""
+        release = threading.Event()
+        started = threading.Event()
+
+        def handler(item):
+            started.set()
+            release.wait(5)
+
+        work = WorkQueue(handler, workers=1, maxsize=1)
+        work.submit("running")
+        started.wait(5)
+        assert work.submit("queued") is True
+        assert work.submit("overflow") is False
+        release.set()
+        work.join()
+        work.stop()
+
+        assert work.metrics()["rejected"] == 1
+
+    def test_handler_errors_counted(self):
+        """Test handler exceptions do not kill the worker."""
+        def handler(item):
+            if item == "bad":
+                raise RuntimeError("boom")
+
+        work = WorkQueue(handler, workers=1)
+        work.submit("bad")
+        work.submit("good")
+        work.join()
+        work.stop()
+
+        metrics = work.metrics()
+        assert metrics["errors"] == 1
+        assert metrics["processed"] == 2
+
+    def test_stop_without_drain(self):
+        """Test pending items are discarded when not draining."""
+        release = threading.Event()
+        started = threading.Event()
+        seen = []
+
+        def handler(item):
+            started.set()
+            release.wait(5)
+            seen.append(item)
+
+        work = WorkQueue(handler, workers=1, maxsize=10)
+        work.submit(1)
+        started.wait(5)
+        work.submit(2)
+        threads = list(work._threads)
+        work.stop(drain=False, timeout=0)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        assert seen == [1]
+        assert not work.running
+
+    def test_stop_without_drain_releases_join(self):
+        """Test discarded items are marked done so join() does not block forever."""
+        release = threading.Event()
+        started = threading.Event()
+
+        def handler(item):
+            started.set()
+            release.wait(5)
+
+        work = WorkQueue(handler, workers=1, maxsize=10)
+        work.submit(1)
+        started.wait(5)
+        work.submit(2)
+        work.submit(3)
+        work.stop(drain=False, timeout=0)
+        release.set()
+
+        joined = threading.Thread(target=work.join, daemon=True)
+        joined.start()
+        joined.join(5)
+        assert not joined.is_alive()
+
+    def test_zero_maxsize_is_unbounded(self):
+        """Test maxsize=0 accepts items instead of rejecting them."""
+        release = threading.Event()
+        work = WorkQueue(lambda item: release.wait(5), workers=1, maxsize=0)
+        assert all(work.submit(i) for i in range(50))
+        assert work.rejected == 0
+        release.set()
+        work.stop(timeout=5)
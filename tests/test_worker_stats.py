@@ -0,0 +1,174 @@
+"""Tests for worker_stats.py - cross-process stats aggregation."""
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import worker_stats
+from worker_stats import WorkerStats, merge
+
+
+class TestMerge:
+    """Test per-field merge rules."""
+
+    def test_numbers_are_summed(self):
+        """Test plain counters add up across workers."""
+        assert merge([{'total': 3}, {'total': 4}]) == {'total': 7}
+
+    def test_max_and_mean_keys(self):
+        """Test uptime/max keys take the max and avg keys the mean."""
+        merged = merge([
+            {'uptime_seconds': 10, 'max_ms': 5.0, 'avg_ms': 2.0},
+            {'uptime_seconds': 30, 'max_ms': 1.0, 'avg_ms': 4.0},
+        ])
+        assert merged == {'uptime_seconds': 30, 'max_ms': 5.0, 'avg_ms': 3.0}
+
+    def test_nested_dicts_lists_and_strings(self):
+        """Test nested dicts recurse, lists concatenate, other values keep the first."""
+        merged = merge([
+            {'queue': {'processed': 1}, 'logs': ['a'], 'status': 'running'},
+            {'queue': {'processed': 2}, 'logs': ['b'], 'status': 'idle'},
+        ])
+        assert merged == {'queue': {'processed': 3}, 'logs': ['a', 'b'], 'status': 'running'}
+
+    def test_missing_keys_and_none(self):
+        """Test keys present in only some reports are still merged."""
+        assert merge([{'a': 1}, {'a': None, 'b': 2}]) == {'a': 1, 'b': 2}
+
+
+class TestWorkerStats:
+    """Test publishing and aggregating snapshots."""
+
+    def test_disabled_returns_local_snapshot(self, tmp_path):
+        """Test single-process mode neither writes files nor merges."""
+        stats = WorkerStats(None)
+        stats.register('web', lambda: {'total': 5})
+        stats.publish()
+
+        assert stats.aggregate('web') == {'total': 5}
+        assert stats.collect() == []
+
+    def test_aggregate_across_workers(self, tmp_path):
+        """Test the current worker's snapshot is merged with other workers' files."""
+        other = {'pid': 1, 'updated_at': 0, 'web': {'total': 10, 'uptime_seconds': 99}}
+        (tmp_path / '1.json').write_text(json.dumps(other))
+        stats = WorkerStats(str(tmp_path))
+        stats.register('web', lambda: {'total': 5, 'uptime_seconds': 3})
+
+        merged = stats.aggregate('web')
+
+        assert merged == {'total': 15, 'uptime_seconds': 99, 'workers': 2}
+        assert (tmp_path / f'{os.getpid()}.json').exists()
+
+    def test_corrupt_and_foreign_files_are_skipped(self, tmp_path):
+        """Test unreadable snapshots and non-json files are ignored."""
+        (tmp_path / '2.json').write_text('{broken')
+        (tmp_path / 'notes.txt').write_text('x')
+        stats = WorkerStats(str(tmp_path))
+        stats.register('web', lambda: {'total': 1})
+
+        assert stats.aggregate('web') == {'total': 1, 'workers': 1}
+
+    def test_failing_source_does_not_block_others(self, tmp_path):
+        """Test one broken source is logged and the rest are still published."""
+        stats = WorkerStats(str(tmp_path))
+        stats.register('bad', lambda: 1 / 0)
+        stats.register('web', lambda: {'total': 2})
+        stats.publish()
+
+        snapshot = stats.collect()[0]
+        assert 'bad' not in snapshot
+        assert snapshot['web'] == {'total': 2}
+
+    def test_start_and_stop_publish(self, tmp_path):
+        """Test the background publisher writes a final snapshot on stop."""
+        counter = {'total': 0}
+        stats = WorkerStats(str(tmp_path / 'stats'), interval=60)
+        stats.register('web', lambda: dict(counter))
+        stats.start()
+        counter['total'] = 7
+        stats.stop()
+
+        assert stats.collect()[0]['web'] == {'total': 7}
+
+    def test_reset_directory(self, tmp_path):
+        """Test leftover snapshots from a previous run are removed."""
+        (tmp_path / '1.json').write_text('{}')
+        (tmp_path / '1.json.tmp').write_text('{}')
+        (tmp_path / 'keep.txt').write_text('')
+        worker_stats.reset_directory(str(tmp_path))
+
+        assert sorted(os.listdir(tmp_path)) == ['keep.txt']
+
+
+class TestRetiredWorkers:
+    """Test handling of snapshots left by exited workers."""
+
+    @staticmethod
+    def dead_pid():
+        process = subprocess.Popen([sys.executable, '-c', 'pass'])
+        process.wait()
+        return process.pid
+
+    def test_gauges_only_from_live_workers(self):
+        """Test queue depth and thread counts ignore exited workers while counters still add up."""
+        merged = merge(
+            [{'queue': {'depth': 3, 'workers': 4, 'processed': 10}},
+             {'queue': {'depth': 7, 'workers': 4, 'processed': 5}}],
+            [True, False],
+        )
+        assert merged == {'queue': {'depth': 3, 'workers': 4, 'processed': 15}}
+
+    def test_dead_snapshot_folded_into_retired(self, tmp_path):
+        """Test an exited worker's file is removed but its counters are kept."""
+        pid = self.dead_pid()
+        other = {'pid': pid, 'updated_at': 1, 'web': {'total': 10, 'depth': 9, 'logs': ['x'] * 150}}
+        (tmp_path / f'{pid}.json').write_text(json.dumps(other))
+        stats = WorkerStats(str(tmp_path))
+        stats.register('web', lambda: {'total': 5, 'depth': 1, 'logs': ['y']})
+
+        merged = stats.aggregate('web')
+
+        assert merged['total'] == 15
+        assert merged['depth'] == 1
+        assert merged['workers'] == 1
+        assert not (tmp_path / f'{pid}.json').exists()
+        retired = json.loads((tmp_path / worker_stats.RETIRED_FILE).read_text())
+        assert len(retired['web']['logs']) == worker_stats.RETIRED_LIST_MAX
+        assert stats.aggregate('web')['total'] == 15
+
+    def test_folded_snapshot_not_counted_twice(self, tmp_path):
+        """Test a snapshot listed in retired.json is skipped if its file still exists."""
+        pid = self.dead_pid()
+        other = {'pid': pid, 'updated_at': 1, 'web': {'total': 10}}
+        (tmp_path / f'{pid}.json').write_text(json.dumps(other))
+        retired = {'pid': None, 'updated_at': 2, 'web': {'total': 10}, 'folded': [[pid, 1]]}
+        (tmp_path / worker_stats.RETIRED_FILE).write_text(json.dumps(retired))
+        stats = WorkerStats(str(tmp_path))
+        stats.register('web', lambda: {'total': 1})
+
+        assert stats.aggregate('web')['total'] == 11
+
+    def test_lock_falls_back_without_fcntl(self, tmp_path, monkeypatch):
+        """Test the module imports and locks through msvcrt where fcntl is unavailable."""
+        import importlib.util
+        import types
+
+        calls = []
+        fake_msvcrt = types.SimpleNamespace(
+            LK_LOCK=1, LK_UNLCK=0, locking=lambda fd, mode, size: calls.append(mode),
+        )
+        monkeypatch.setitem(sys.modules, 'fcntl', None)
+        monkeypatch.setitem(sys.modules, 'msvcrt', fake_msvcrt)
+        spec = importlib.util.spec_from_file_location('worker_stats_win', worker_stats.__file__)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+
+        with module._file_lock(str(tmp_path / 'retired.lock')):
+            pass
+        assert module.fcntl is None
+        assert calls == [1, 0]
@@ -31,7 +31,7 @@ class TestZixunConfig:
 class TestNewsFetching:
     """Test news fetching functionality."""
 
-    @patch('zixun.requests.get')
+    @patch('zixun.http.get')
     def test_get_latest_news_success(self, mock_get):
         """Test successful news retrieval."""
         # Reset fingerprint to simulate first run
@@ -56,7 +56,7 @@ class TestNewsFetching:
         assert news is not None
         assert news['title'] == 'Test News Title'
 
-    @patch('zixun.requests.get')
+    @patch('zixun.http.get')
     def test_get_latest_news_empty(self, mock_get):
         """Test empty news list."""
         mock_response = Mock()
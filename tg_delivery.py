@@ -0,0 +1,526 @@
+"""
+Telegram 统一投递服务
+
+所有监控模块 (bianjk / arkm / zixun / botsever) 共用的出站发送通道:
+- asyncio 队列 + 多个发送协程, 复用同一个 aiohttp 连接池
+- 全局 / 每个群组 / 每个话题 三级令牌桶限速
+  (令牌桶在进程内; 多进程部署时各进程按 TELEGRAM_RATE_SHARE 分摊限额, 见 divide_rate_limits)
+- 遇到 429 按 retry_after 退避后重新入队, 不丢消息
+- 网络错误 / 5xx 按指数退避重试, 退避期间发送协程继续处理其他目标
+- 话题 ID 失效时自动改发到主群组
+- 同一目标积压多条消息时合并为一条发送 (不超过 4096 字符)
+
+异步代码直接 await send() / 调用 enqueue(); 同步代码使用 send_sync() / submit(),
+服务会在后台线程中运行自己的事件循环。
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Optional
+
+import aiohttp
+
+import metrics
+from rate_limit import TokenBucket, reserve_all
+
+logger = logging.getLogger(__name__)
+
+# 可指向本地模拟服务 (mock_telegram.py) 做压测
+TELEGRAM_API_BASE = os.environ.get("TELEGRAM_API_BASE", "https://api.telegram.org").rstrip("/")
+
+# Telegram 单条消息长度上限
+MAX_MESSAGE_CHARS = 4096
+BATCH_SEPARATOR = "\n\n"
+
+SEND_SECONDS = metrics.REGISTRY.histogram(
+    "telegram_send_seconds", "Telegram sendMessage 耗时（秒）", ["topic", "outcome"]
+)
+QUEUE_DEPTH = metrics.REGISTRY.gauge("telegram_delivery_queue_depth", "Telegram 待发消息数")
+
+
+@dataclass
+class _Message:
+    chat_id: str
+    thread_id: Optional[int]
+    text: str
+    parse_mode: Optional[str]
+    disable_web_page_preview: Optional[bool]
+    futures: list = field(default_factory=list)
+    attempts: int = 0
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+    def can_merge(self, other: "_Message", max_chars: int) -> bool:
+        return (
+            self.parse_mode == other.parse_mode
+            and self.disable_web_page_preview == other.disable_web_page_preview
+            and len(self.text) + len(BATCH_SEPARATOR) + len(other.text) <= max_chars
+        )
+
+
+class TelegramDelivery:
+    """Telegram 出站投递服务 (限速 / 重试 / 合并发送)"""
+
+    def __init__(
+        self,
+        bot_token: Optional[str],
+        chat_id: Optional[str],
+        *,
+        api_base: str = TELEGRAM_API_BASE,
+        workers: int = 4,
+        global_rate: float = 30.0,
+        chat_rate_per_min: float = 20.0,
+        topic_rate_per_min: float = 20.0,
+        batch: bool = True,
+        max_batch_chars: int = MAX_MESSAGE_CHARS,
+        max_attempts: int = 8,
+        request_timeout: float = 10.0,
+    ):
+        self.bot_token = bot_token
+        self.chat_id = chat_id
+        self.api_base = api_base.rstrip("/")
+        self.workers = workers
+        self.batch = batch
+        self.max_batch_chars = max_batch_chars
+        self.max_attempts = max_attempts
+        self.request_timeout = request_timeout
+        # 逐请求超时: 传入的共享会话 (可能用于 WebSocket) 不一定设置了总超时
+        self._timeout = aiohttp.ClientTimeout(total=request_timeout)
+
+        self._global_bucket = TokenBucket(global_rate, max(1.0, global_rate))
+        self._chat_rate = chat_rate_per_min / 60.0
+        self._chat_capacity = max(1.0, chat_rate_per_min)
+        self._topic_rate = topic_rate_per_min / 60.0
+        self._topic_capacity = max(1.0, topic_rate_per_min)
+        self._chat_buckets: dict = {}
+        self._topic_buckets: dict = {}
+
+        # 每个 (chat_id, thread_id) 目标一个待发队列, 保证同一目标内按序投递
+        self._pending: dict = {}
+        self._scheduled: set = set()
+        # 退避中的目标: 不占用发送协程, 到期后由 call_later 重新调度
+        self._deferred: set = set()
+        self._invalid_threads: set = set()
+        self._ready: Optional[asyncio.Queue] = None
+        self._tasks: list = []
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._owns_session = False
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+        self.stats = {
+            "enqueued": 0,
+            "sent": 0,
+            "failed": 0,
+            "batched": 0,
+            "rate_limited": 0,
+            "retried": 0,
+            "thread_fallback": 0,
+        }
+
+    # ------------------------------------------------------------------
+    # 生命周期
+    # ------------------------------------------------------------------
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    async def start(self, session: Optional[aiohttp.ClientSession] = None):
+        """在当前事件循环中启动发送协程, 可传入已有的 aiohttp 会话以复用连接"""
+        if self.running:
+            return
+        self._loop = asyncio.get_running_loop()
+        if self._ready is None:
+            self._ready = asyncio.Queue()
+        if session is not None:
+            self._session = session
+            self._owns_session = False
+        elif self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=self.workers, keepalive_timeout=60
+                ),
+                timeout=aiohttp.ClientTimeout(total=self.request_timeout),
+            )
+            self._owns_session = True
+        self._tasks = [
+            asyncio.create_task(self._worker()) for _ in range(self.workers)
+        ]
+        # 启动前已入队的目标需要重新调度
+        for key, pending in self._pending.items():
+            if pending and key not in self._scheduled:
+                self._scheduled.add(key)
+                self._ready.put_nowait(key)
+
+    async def close(self, drain: bool = True, timeout: float = 10.0):
+        """停止服务; drain=True 时先尽量发完积压消息"""
+        if drain and self._ready is not None and self.running:
+            try:
+                await asyncio.wait_for(self._ready.join(), timeout)
+            except asyncio.TimeoutError:
+                logger.warning("Telegram 投递队列未能在 %.0fs 内清空", timeout)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._owns_session and self._session is not None:
+            await self._session.close()
+        self._session = None
+
+    def start_background(self):
+        """在后台守护线程中运行独立事件循环 (供同步代码使用)"""
+        with self._start_lock:
+            if self._loop is not None and self._loop.is_running():
+                return
+            started = threading.Event()
+
+            def run():
+                loop = asyncio.new_event_loop()
+                asyncio.set_event_loop(loop)
+                loop.run_until_complete(self.start())
+                started.set()
+                loop.run_forever()
+
+            self._thread = threading.Thread(
+                target=run, name="tg-delivery", daemon=True
+            )
+            self._thread.start()
+            started.wait()
+
+    def stop_background(self, drain: bool = True, timeout: float = 10.0):
+        """停止 start_background 启动的后台循环 (同步调用, 用于进程优雅退出)"""
+        loop = self._loop
+        if self._thread is None or loop is None or not loop.is_running():
+            return
+        future = asyncio.run_coroutine_threadsafe(self.close(drain, timeout), loop)
+        try:
+            future.result(timeout + 5)
+        except Exception as e:
+            logger.error("Telegram 投递服务关闭失败: %r", e)
+        loop.call_soon_threadsafe(loop.stop)
+        self._thread.join(5)
+        self._thread = None
+
+    # ------------------------------------------------------------------
+    # 入队接口
+    # ------------------------------------------------------------------
+
+    def enqueue(
+        self,
+        text: str,
+        thread_id: Optional[int] = None,
+        *,
+        chat_id: Optional[str] = None,
+        parse_mode: Optional[str] = "HTML",
+        disable_web_page_preview: Optional[bool] = None,
+    ) -> asyncio.Future:
+        """
+        非阻塞入队 (必须在服务所在的事件循环中调用)
+
+        Returns:
+            asyncio.Future: 投递完成后结果为 True/False
+        """
+        loop = asyncio.get_running_loop()
+        if self._ready is None:
+            self._ready = asyncio.Queue()
+        future = loop.create_future()
+        message = _Message(
+            chat_id=chat_id or self.chat_id,
+            thread_id=thread_id or None,
+            text=text,
+            parse_mode=parse_mode,
+            disable_web_page_preview=disable_web_page_preview,
+            futures=[future],
+        )
+        self._push(message)
+        self.stats["enqueued"] += 1
+        return future
+
+    async def send(self, text: str, thread_id: Optional[int] = None, **kwargs) -> bool:
+        """入队并等待投递结果"""
+        return await self.enqueue(text, thread_id, **kwargs)
+
+    def submit(self, text: str, thread_id: Optional[int] = None, **kwargs):
+        """
+        线程安全入队, 返回 concurrent.futures.Future (可忽略以实现即发即走)
+        """
+        if self._loop is None or not self._loop.is_running():
+            self.start_background()
+        return asyncio.run_coroutine_threadsafe(
+            self.send(text, thread_id, **kwargs), self._loop
+        )
+
+    def send_sync(
+        self,
+        text: str,
+        thread_id: Optional[int] = None,
+        timeout: Optional[float] = None,
+        **kwargs,
+    ) -> bool:
+        """同步发送并阻塞等待结果, 超时返回 False (消息仍会继续投递)"""
+        future = self.submit(text, thread_id, **kwargs)
+        try:
+            return future.result(timeout)
+        except Exception as e:
+            logger.error("Telegram 同步发送等待失败: %r", e)
+            return False
+
+    def queue_depth(self) -> int:
+        """当前积压的待发消息数"""
+        # 可能在其他线程 (指标抓取) 调用: 先复制再遍历
+        return sum(len(pending) for pending in list(self._pending.values()))
+
+    # ------------------------------------------------------------------
+    # 内部实现
+    # ------------------------------------------------------------------
+
+    def _push(self, message: _Message, front: bool = False):
+        key = (message.chat_id, message.thread_id)
+        pending = self._pending.setdefault(key, deque())
+        if front:
+            pending.appendleft(message)
+        else:
+            pending.append(message)
+        if key not in self._scheduled:
+            self._scheduled.add(key)
+            self._ready.put_nowait(key)
+
+    def _buckets_for(self, key) -> tuple:
+        chat_id, thread_id = key
+        chat_bucket = self._chat_buckets.get(chat_id)
+        if chat_bucket is None:
+            chat_bucket = TokenBucket(self._chat_rate, self._chat_capacity)
+            self._chat_buckets[chat_id] = chat_bucket
+        if thread_id is None:
+            return self._global_bucket, chat_bucket
+        topic_bucket = self._topic_buckets.get(key)
+        if topic_bucket is None:
+            topic_bucket = TokenBucket(self._topic_rate, self._topic_capacity)
+            self._topic_buckets[key] = topic_bucket
+        return self._global_bucket, chat_bucket, topic_bucket
+
+    def _take_batch(self, pending: deque) -> _Message:
+        message = pending.popleft()
+        if not self.batch:
+            return message
+        while pending and message.can_merge(pending[0], self.max_batch_chars):
+            other = pending.popleft()
+            message = _Message(
+                chat_id=message.chat_id,
+                thread_id=message.thread_id,
+                text=message.text + BATCH_SEPARATOR + other.text,
+                parse_mode=message.parse_mode,
+                disable_web_page_preview=message.disable_web_page_preview,
+                futures=message.futures + other.futures,
+                attempts=max(message.attempts, other.attempts),
+                enqueued_at=message.enqueued_at,
+            )
+            self.stats["batched"] += 1
+        return message
+
+    async def _worker(self):
+        while True:
+            key = await self._ready.get()
+            try:
+                await self._deliver_next(key)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Telegram 投递协程异常: %r", e)
+            finally:
+                pending = self._pending.get(key)
+                if key in self._deferred:
+                    # 退避结束后由 _wake 重新入队并完成本次 task_done, 期间 close(drain) 仍会等待
+                    pass
+                elif pending:
+                    self._ready.put_nowait(key)
+                    self._ready.task_done()
+                else:
+                    self._scheduled.discard(key)
+                    self._ready.task_done()
+
+    def _defer(self, key, delay: float):
+        """目标退避 delay 秒, 发送协程先去处理其他目标"""
+        self._deferred.add(key)
+        asyncio.get_running_loop().call_later(delay, self._wake, key)
+
+    def _wake(self, key):
+        self._deferred.discard(key)
+        if self._pending.get(key):
+            self._ready.put_nowait(key)
+        else:
+            self._scheduled.discard(key)
+        self._ready.task_done()
+
+    @staticmethod
+    def _retry_delay(attempts: int) -> float:
+        return min(2 ** attempts, 30)
+
+    async def _deliver_next(self, key):
+        pending = self._pending.get(key)
+        if not pending:
+            return
+        buckets = self._buckets_for(key)
+        wait = reserve_all(buckets)
+        if wait > 0:
+            # 等待期间到达的消息会一起合并进本批次
+            await asyncio.sleep(wait)
+        if not pending:
+            return
+        message = self._take_batch(pending)
+        try:
+            await self._send_message(message, buckets)
+        except asyncio.CancelledError:
+            # 关闭服务时被取消: 放回队首, 不丢消息
+            self._push(message, front=True)
+            raise
+        except Exception as e:
+            # 消息已出队, 必须给出结果, 否则 send_sync 调用方会一直等到超时
+            logger.error("Telegram 投递异常, 按失败处理: %r", e)
+            self.stats["failed"] += 1
+            self._resolve(message, False)
+
+    async def _send_message(self, message: _Message, buckets: tuple):
+        started = time.perf_counter()
+        outcome, retry_after = await self._post(message)
+        SEND_SECONDS.labels(
+            message.thread_id if message.thread_id is not None else "main", outcome
+        ).observe(time.perf_counter() - started)
+
+        if outcome == "ok":
+            self.stats["sent"] += 1
+            self._resolve(message, True)
+        elif outcome == "rate_limited":
+            self.stats["rate_limited"] += 1
+            logger.warning(
+                "Telegram 限流 (chat=%s, topic=%s), %.1fs 后重试",
+                message.chat_id,
+                message.thread_id,
+                retry_after,
+            )
+            for bucket in buckets[1:]:
+                bucket.pause(retry_after)
+            self._push(message, front=True)
+        elif outcome == "retry" and message.attempts + 1 < self.max_attempts:
+            message.attempts += 1
+            self.stats["retried"] += 1
+            # 放回队首保证同一目标内按序投递, 退避期间不阻塞其他目标
+            self._push(message, front=True)
+            self._defer((message.chat_id, message.thread_id), self._retry_delay(message.attempts))
+        else:
+            self.stats["failed"] += 1
+            self._resolve(message, False)
+
+    async def _post(self, message: _Message) -> tuple:
+        """
+        调用 sendMessage
+
+        Returns:
+            (outcome, retry_after): outcome 为 ok / rate_limited / retry / failed
+        """
+        url = f"{self.api_base}/bot{self.bot_token}/sendMessage"
+        payload = {"chat_id": message.chat_id, "text": message.text}
+        if message.parse_mode:
+            payload["parse_mode"] = message.parse_mode
+        if message.disable_web_page_preview is not None:
+            payload["disable_web_page_preview"] = message.disable_web_page_preview
+        thread_key = (message.chat_id, message.thread_id)
+        if message.thread_id is not None and thread_key not in self._invalid_threads:
+            payload["message_thread_id"] = message.thread_id
+
+        status = 0
+        try:
+            async with self._session.post(url, json=payload, timeout=self._timeout) as response:
+                status = response.status
+                resp_json = await response.json(content_type=None)
+
+            # === 自动处理话题 ID 错误: 改发主群组 ===
+            if (
+                not resp_json.get("ok")
+                and "message thread not found" in resp_json.get("description", "")
+                and "message_thread_id" in payload
+            ):
+                logger.warning(
+                    "⚠️ 话题 ID (%s) 无效，正在尝试发送到主群组...", message.thread_id
+                )
+                self._invalid_threads.add(thread_key)
+                self.stats["thread_fallback"] += 1
+                payload.pop("message_thread_id", None)
+                async with self._session.post(url, json=payload, timeout=self._timeout) as response:
+                    status = response.status
+                    resp_json = await response.json(content_type=None)
+
+            if resp_json.get("ok"):
+                return "ok", 0.0
+            if status == 429 or resp_json.get("error_code") == 429:
+                parameters = resp_json.get("parameters") or {}
+                return "rate_limited", float(parameters.get("retry_after", 1))
+            if status >= 500:
+                logger.error("Telegram 服务端错误 (Code %s): %s", status, resp_json)
+                return "retry", 0.0
+            logger.error("TG 发送失败 (Code %s): %s", status, resp_json)
+            return "failed", 0.0
+
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.error("TG 请求错误: %r", e)
+            return "retry", 0.0
+        except (ValueError, AttributeError) as e:
+            # 代理 / 网关返回的 HTML 错误页等非 JSON 响应: 5xx 重试, 其余按失败处理
+            logger.error("TG 响应无法解析 (Code %s): %r", status, e)
+            return ("retry" if status >= 500 or status == 429 else "failed"), 0.0
+
+    @staticmethod
+    def _resolve(message: _Message, result: bool):
+        for future in message.futures:
+            if not future.done():
+                future.set_result(result)
+
+
+# ==========================================
+# 进程内共享实例
+# ==========================================
+
+_default_delivery: Optional[TelegramDelivery] = None
+_default_lock = threading.Lock()
+
+
+def divide_rate_limits(processes: int) -> float:
+    """多进程部署时把 Telegram 限额均分给各进程, 返回每个进程的份额
+
+    令牌桶只在进程内生效, 而 Telegram 按机器人计算限额: N 个进程各按完整限额发送,
+    合计会达到限额的 N 倍。启动子进程 / fork worker 之前调用, 子进程继承
+    TELEGRAM_RATE_SHARE; 已设置的份额会被继续均分 (如 main.py 分给 botsever 的份额
+    再由 gunicorn worker 均分)。
+    """
+    share = float(os.environ.get("TELEGRAM_RATE_SHARE", "1")) / max(1, processes)
+    os.environ["TELEGRAM_RATE_SHARE"] = repr(share)
+    return share
+
+
+def get_delivery() -> TelegramDelivery:
+    """获取进程内共享的投递服务 (按环境变量配置, 限额乘以 TELEGRAM_RATE_SHARE)"""
+    global _default_delivery
+    with _default_lock:
+        if _default_delivery is None:
+            share = float(os.environ.get("TELEGRAM_RATE_SHARE", "1"))
+            _default_delivery = TelegramDelivery(
+                os.environ.get("TELEGRAM_BOT_TOKEN"),
+                os.environ.get("TELEGRAM_CHAT_ID"),
+                workers=int(os.environ.get("TELEGRAM_DELIVERY_WORKERS", "4")),
+                global_rate=float(os.environ.get("TELEGRAM_GLOBAL_RATE", "30")) * share,
+                chat_rate_per_min=float(
+                    os.environ.get("TELEGRAM_CHAT_RATE_PER_MIN", "20")
+                ) * share,
+                topic_rate_per_min=float(
+                    os.environ.get("TELEGRAM_TOPIC_RATE_PER_MIN", "20")
+                ) * share,
+                batch=os.environ.get("TELEGRAM_BATCH", "1") != "0",
+            )
+            QUEUE_DEPTH.set_function(_default_delivery.queue_depth)
+        return _default_delivery
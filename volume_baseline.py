@@ -0,0 +1,198 @@
+"""
+滚动成交量基准
+
+每个交易对一个固定长度的环形缓冲, 每根收盘 K 线 O(1) 更新,
+替代启动时一次性拉取、之后再也不更新的静态均值。
+
+- mean: 滑动窗口均值 (维护滚动和, O(1))
+- ewma: 指数加权均值 (O(1), alpha 默认 2 / (window + 1))
+- median: 滑动窗口中位数 (有序列表 + 二分, 对异常值不敏感)
+
+支持把状态保存为 JSON 文件, 重启后只需补齐停机期间缺失的 K 线。
+"""
+
+import bisect
+import json
+import os
+import time
+from collections import deque
+from typing import Optional
+
+MODES = ("mean", "ewma", "median")
+
+
+class RollingBaseline:
+    """单个交易对的滚动基准"""
+
+    __slots__ = ("window", "mode", "alpha", "_values", "_sum", "_sorted", "_ewma", "last_close_time")
+
+    def __init__(self, window: int = 288, mode: str = "mean", alpha: Optional[float] = None):
+        if mode not in MODES:
+            raise ValueError(f"未知基准模式: {mode} (可选: {', '.join(MODES)})")
+        if window < 1:
+            raise ValueError("window 至少为 1")
+        self.window = window
+        self.mode = mode
+        self.alpha = alpha if alpha is not None else 2.0 / (window + 1)
+        self._values: deque = deque(maxlen=window)
+        self._sum = 0.0
+        self._sorted: list = []
+        self._ewma: Optional[float] = None
+        # 已计入基准的最后一根 K 线收盘时间 (毫秒), 用于去重和重启后补齐
+        self.last_close_time = 0
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def update(self, value: float, close_time: int = 0) -> bool:
+        """
+        计入一根收盘 K 线的成交量
+
+        Returns:
+            bool: False 表示该 K 线已计入过 (按 close_time 去重)
+        """
+        if close_time and close_time <= self.last_close_time:
+            return False
+        values = self._values
+        if len(values) == self.window:
+            evicted = values[0]
+            self._sum -= evicted
+            if self.mode == "median":
+                del self._sorted[bisect.bisect_left(self._sorted, evicted)]
+        values.append(value)
+        self._sum += value
+        if self.mode == "median":
+            bisect.insort(self._sorted, value)
+        self._ewma = value if self._ewma is None else self._ewma + self.alpha * (value - self._ewma)
+        if close_time:
+            self.last_close_time = close_time
+        return True
+
+    def seed(self, volumes: list, last_close_time: int = 0):
+        """用历史 K 线成交量 (按时间升序) 初始化"""
+        for value in volumes:
+            self.update(value)
+        if last_close_time:
+            self.last_close_time = max(self.last_close_time, last_close_time)
+
+    @property
+    def value(self) -> float:
+        """当前基准值, 没有数据时为 0"""
+        if not self._values:
+            return 0.0
+        if self.mode == "mean":
+            return self._sum / len(self._values)
+        if self.mode == "ewma":
+            return self._ewma
+        n = len(self._sorted)
+        mid = n // 2
+        if n % 2:
+            return self._sorted[mid]
+        return (self._sorted[mid - 1] + self._sorted[mid]) / 2
+
+    def to_dict(self) -> dict:
+        return {
+            "values": list(self._values),
+            "ewma": self._ewma,
+            "last_close_time": self.last_close_time,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict, window: int, mode: str, alpha: Optional[float] = None):
+        baseline = cls(window, mode, alpha)
+        baseline.seed(data.get("values", [])[-window:])
+        if data.get("ewma") is not None:
+            baseline._ewma = data["ewma"]
+        baseline.last_close_time = data.get("last_close_time", 0)
+        return baseline
+
+
+class VolumeBaselineEngine:
+    """所有交易对的滚动基准集合"""
+
+    def __init__(
+        self,
+        window: int = 288,
+        mode: str = "mean",
+        min_samples: int = 1,
+        alpha: Optional[float] = None,
+    ):
+        if mode not in MODES:
+            raise ValueError(f"未知基准模式: {mode} (可选: {', '.join(MODES)})")
+        self.window = window
+        self.mode = mode
+        self.min_samples = min_samples
+        self.alpha = alpha
+        self._baselines: dict = {}
+
+    def _baseline(self, symbol: str) -> RollingBaseline:
+        baseline = self._baselines.get(symbol)
+        if baseline is None:
+            baseline = RollingBaseline(self.window, self.mode, self.alpha)
+            self._baselines[symbol] = baseline
+        return baseline
+
+    def __len__(self) -> int:
+        return len(self._baselines)
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self._baselines
+
+    def get(self, symbol: str, default: float = 0.0) -> float:
+        """当前基准; 样本数不足 min_samples 时返回 default (不触发告警)"""
+        baseline = self._baselines.get(symbol)
+        if baseline is None or len(baseline) < self.min_samples:
+            return default
+        return baseline.value
+
+    def samples(self, symbol: str) -> int:
+        baseline = self._baselines.get(symbol)
+        return len(baseline) if baseline else 0
+
+    def last_close_time(self, symbol: str) -> int:
+        baseline = self._baselines.get(symbol)
+        return baseline.last_close_time if baseline else 0
+
+    def update(self, symbol: str, volume: float, close_time: int = 0) -> bool:
+        return self._baseline(symbol).update(volume, close_time)
+
+    def seed(self, symbol: str, volumes: list, last_close_time: int = 0):
+        self._baseline(symbol).seed(volumes, last_close_time)
+
+    # ------------------------------------------------------------------
+    # 持久化
+    # ------------------------------------------------------------------
+
+    def snapshot(self) -> dict:
+        """当前状态的可序列化副本 (可交给其他线程写盘)"""
+        return {
+            "window": self.window,
+            "mode": self.mode,
+            "saved_at": time.time(),
+            "symbols": {symbol: b.to_dict() for symbol, b in self._baselines.items()},
+        }
+
+    def save(self, path: str, snapshot: Optional[dict] = None):
+        """原子写入 JSON 状态文件"""
+        data = snapshot if snapshot is not None else self.snapshot()
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+    def load(self, path: str) -> int:
+        """
+        从状态文件恢复; 窗口长度不同时只保留最近 window 个样本
+
+        Returns:
+            int: 恢复的交易对数量 (文件不存在返回 0)
+        """
+        if not os.path.exists(path):
+            return 0
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        for symbol, state in data.get("symbols", {}).items():
+            self._baselines[symbol] = RollingBaseline.from_dict(
+                state, self.window, self.mode, self.alpha
+            )
+        return len(data.get("symbols", {}))
@@ -0,0 +1,72 @@
+"""
+订单簿挂单墙批量检测
+
+一次性计算整份深度快照各档位的挂单金额 (price * qty), 只把超过阈值的档位交给
+冷却判断和告警发送, 避免每 100ms 对 40 个档位逐个 await。
+
+后端:
+- numpy: 档位转为 float64 列向量, 向量化计算金额并筛选 (需安装 numpy)
+- python: 单次列表推导, 无额外依赖
+- auto: 档位本身已是 numpy 数组时用 numpy, 否则用 python
+  (实测从 (price, qty) 元组列表构造数组的开销高于纯 Python 单次遍历,
+   即使 1000 档也是如此, 见 benchmarks/bench_wall_detector.py)
+"""
+
+from typing import Optional
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - 取决于部署环境
+    np = None
+
+BACKENDS = ("auto", "numpy", "python")
+
+
+class WallDetector:
+    """挂单墙检测器"""
+
+    def __init__(self, threshold: float, backend: Optional[str] = "auto"):
+        backend = backend or "auto"
+        if backend not in BACKENDS:
+            raise ValueError(f"未知检测后端: {backend}")
+        if backend == "numpy" and np is None:
+            raise ImportError("numpy 未安装")
+        self.threshold = threshold
+        self.backend = backend
+
+    def _use_numpy(self, levels) -> bool:
+        if self.backend == "numpy":
+            return True
+        return self.backend == "auto" and np is not None and isinstance(levels, np.ndarray)
+
+    def find(self, levels) -> list:
+        """
+        筛选金额超过阈值的档位
+
+        Args:
+            levels: (price, qty) 序列, 或形状为 (n, 2) 的 numpy 数组
+
+        Returns:
+            list[tuple]: (price, qty, amount_usd), 保持原档位顺序
+        """
+        if len(levels) == 0:
+            return []
+        threshold = self.threshold
+        if self._use_numpy(levels):
+            columns = np.asarray(levels, dtype=np.float64)
+            prices = columns[:, 0]
+            qtys = columns[:, 1]
+            amounts = prices * qtys
+            hits = np.flatnonzero(amounts >= threshold)
+            return [
+                (float(prices[i]), float(qtys[i]), float(amounts[i])) for i in hits
+            ]
+        return [
+            (price, qty, price * qty)
+            for price, qty in levels
+            if price * qty >= threshold
+        ]
+
+    def detect(self, depth) -> tuple:
+        """检测一份深度快照, 返回 (买方挂单墙, 卖方挂单墙)"""
+        return self.find(depth.bids), self.find(depth.asks)
@@ -0,0 +1,176 @@
+"""
+有界线程池工作队列
+
+用于同步 Web 框架 (Flask) 中的"接收即返回": 请求线程只做校验和入队,
+解析、匹配、转发等耗时工作交给固定数量的工作线程。
+
+- 队列有上限, 满了 submit 直接返回 False, 由调用方决定如何拒绝 (如 HTTP 503);
+  maxsize <= 0 表示不设上限
+- 记录入队/处理/拒绝/异常计数、队列深度、排队延迟与处理耗时
+"""
+
+import logging
+import queue
+import threading
+import time
+from typing import Any, Callable, Optional
+
+from stream_pipeline import LatencyStat
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class WorkQueue:
+    """固定工作线程数的有界队列"""
+
+    def __init__(
+        self,
+        handler: Callable[[Any], None],
+        *,
+        workers: int = 4,
+        maxsize: int = 1000,
+        name: str = "work",
+    ):
+        if workers < 1:
+            raise ValueError("workers 至少为 1")
+        self.handler = handler
+        self.workers = workers
+        self.maxsize = maxsize
+        self.name = name
+
+        self._queue: queue.Queue = queue.Queue(maxsize)
+        self._threads: list = []
+        self._lock = threading.Lock()
+
+        self.enqueued = 0
+        self.processed = 0
+        self.rejected = 0
+        self.errors = 0
+        self.max_depth = 0
+        self.queue_wait = LatencyStat()
+        self.handle_time = LatencyStat()
+
+    # ------------------------------------------------------------------
+    # 生命周期
+    # ------------------------------------------------------------------
+
+    @property
+    def running(self) -> bool:
+        return bool(self._threads)
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return
+            self._threads = [
+                threading.Thread(target=self._worker, name=f"{self.name}-{i}", daemon=True)
+                for i in range(self.workers)
+            ]
+            for thread in self._threads:
+                thread.start()
+
+    def stop(self, drain: bool = True, timeout: Optional[float] = 10.0):
+        """停止工作线程; drain=False 时丢弃尚未处理的条目"""
+        with self._lock:
+            threads, self._threads = self._threads, []
+        if not threads:
+            return
+        if not drain:
+            try:
+                while True:
+                    self._queue.get_nowait()
+                    # 丢弃的条目同样要标记完成, 否则 join() 会一直等待
+                    self._queue.task_done()
+            except queue.Empty:
+                pass
+        for _ in threads:
+            self._queue.put(_STOP)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for thread in threads:
+            thread.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+
+    # ------------------------------------------------------------------
+    # 生产端
+    # ------------------------------------------------------------------
+
+    def submit(self, item: Any) -> bool:
+        """入队 (首次调用时自动启动工作线程), 队列已满返回 False"""
+        if not self._threads:
+            self.start()
+        try:
+            self._queue.put_nowait((time.monotonic(), item))
+        except queue.Full:
+            with self._lock:
+                self.rejected += 1
+            return False
+        depth = self._queue.qsize()
+        with self._lock:
+            self.enqueued += 1
+            if depth > self.max_depth:
+                self.max_depth = depth
+        return True
+
+    def join(self):
+        """阻塞直到所有已入队条目处理完毕"""
+        self._queue.join()
+
+    # ------------------------------------------------------------------
+    # 消费端
+    # ------------------------------------------------------------------
+
+    def _worker(self):
+        while True:
+            entry = self._queue.get()
+            try:
+                if entry is _STOP:
+                    return
+                enqueued_at, item = entry
+                started = time.monotonic()
+                failed = False
+                try:
+                    self.handler(item)
+                except Exception:
+                    failed = True
+                    logger.exception("[%s] 处理条目异常", self.name)
+                finished = time.monotonic()
+                with self._lock:
+                    self.processed += 1
+                    self.errors += failed
+                    self.queue_wait.add(started - enqueued_at)
+                    self.handle_time.add(finished - started)
+            finally:
+                self._queue.task_done()
+
+    # ------------------------------------------------------------------
+    # 指标
+    # ------------------------------------------------------------------
+
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                "name": self.name,
+                "workers": self.workers,
+                "capacity": self.maxsize,
+                "depth": self.depth(),
+                "max_depth": self.max_depth,
+                "enqueued": self.enqueued,
+                "processed": self.processed,
+                "rejected": self.rejected,
+                "errors": self.errors,
+                "queue_wait": self.queue_wait.snapshot(),
+                "handle_time": self.handle_time.snapshot(),
+            }
+
+    def format_metrics(self, metrics: Optional[dict] = None) -> str:
+        m = metrics or self.metrics()
+        return (
+            f"[{m['name']}] 深度 {m['depth']}/{m['capacity']} (峰值 {m['max_depth']}), "
+            f"入队 {m['enqueued']}, 处理 {m['processed']}, 拒绝 {m['rejected']}, "
+            f"异常 {m['errors']}, 排队延迟 avg {m['queue_wait']['avg_ms']}ms "
+            f"max {m['queue_wait']['max_ms']}ms"
+        )
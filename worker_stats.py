@@ -0,0 +1,329 @@
+"""
+多进程统计汇总
+
+多 worker 部署 (gunicorn 等) 时每个进程的计数器各自独立, 直接读只能看到
+处理当前请求那个 worker 的数据。这里让每个进程定期把自己的统计快照写到
+共享目录 (一个进程一个文件), 读取时合并所有文件。
+
+- 目录由环境变量 WORKER_STATS_DIR 指定, 未设置时为单进程模式 (不读写文件)
+- 已退出 worker 的快照在读取时并入 retired.json 并删除原文件, 计数器总数不会因
+  worker 重启而回退, 目录也不会随重启无限增长
+- 合并规则: 数值求和; MAX_KEYS 取最大值; MEAN_KEYS 取平均; 列表拼接; 其他取第一个非空值;
+  GAUGE_KEYS (当前深度 / 线程数等瞬时值) 只汇总存活的进程
+"""
+
+import atexit
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+STATS_DIR_ENV = "WORKER_STATS_DIR"
+
+# 合并时取最大值 / 平均值的字段名
+MAX_KEYS = {"uptime_seconds", "max_depth", "max_ms"}
+MEAN_KEYS = {"avg_ms"}
+# 瞬时值字段, 已退出进程的值不再计入
+GAUGE_KEYS = {"depth", "workers", "capacity"}
+
+# 已退出进程的快照合并到该文件 (pid 为 None)
+RETIRED_FILE = "retired.json"
+# retired.json 中每个列表最多保留的条目数 (最近日志等), 避免随 worker 重启不断变长
+RETIRED_LIST_MAX = 100
+
+# 来源名 -> 合并已退出进程快照的函数 (如 metrics 注册表快照), 未登记的来源按 merge() 规则
+RETIRED_MERGES: Dict[str, Callable[[List[dict]], dict]] = {}
+
+
+def pid_alive(pid) -> bool:
+    """进程是否仍在运行 (快照文件按 pid 命名, 同一主机内判断)"""
+    if not isinstance(pid, int) or pid <= 0:
+        return False
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    except OSError:
+        return False
+    return True
+
+
+def merge(reports: List[dict], alive: Optional[List[bool]] = None) -> dict:
+    """按字段规则合并多个进程的统计快照, alive 为各快照的进程是否存活 (默认全部存活)"""
+    if alive is None:
+        alive = [True] * len(reports)
+    merged: dict = {}
+    keys: list = []
+    for report in reports:
+        for key in report:
+            if key not in merged:
+                merged[key] = None
+                keys.append(key)
+    for key in keys:
+        pairs = [
+            (r[key], a) for r, a in zip(reports, alive)
+            if key in r and r[key] is not None and (a or key not in GAUGE_KEYS)
+        ]
+        merged[key] = _merge_values(key, pairs)
+    return merged
+
+
+def _merge_values(key: str, pairs: list):
+    if not pairs:
+        return None
+    values = [value for value, _ in pairs]
+    first = values[0]
+    if isinstance(first, dict):
+        return merge(
+            [v for v, _ in pairs if isinstance(v, dict)],
+            [a for v, a in pairs if isinstance(v, dict)],
+        )
+    if isinstance(first, list):
+        return [item for v in values if isinstance(v, list) for item in v]
+    numbers = [v for v in values if isinstance(v, (int, float)) and not isinstance(v, bool)]
+    if numbers and len(numbers) == len(values):
+        if key in MAX_KEYS:
+            return max(numbers)
+        if key in MEAN_KEYS:
+            return round(sum(numbers) / len(numbers), 3)
+        return sum(numbers)
+    return first
+
+
+@contextmanager
+def _file_lock(path: str):
+    """跨进程互斥锁 (POSIX 用 flock, Windows 用 msvcrt.locking 锁住第一个字节)"""
+    with open(path, "a+") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        else:  # pragma: no cover - Windows
+            f.seek(0)
+            while True:
+                try:
+                    # LK_LOCK 内部重试约 10 秒, 仍拿不到时抛 OSError, 继续等待
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            else:  # pragma: no cover - Windows
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _truncate_lists(value):
+    if isinstance(value, dict):
+        return {key: _truncate_lists(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return value[-RETIRED_LIST_MAX:]
+    return value
+
+
+def _merge_retired(reports: List[dict]) -> dict:
+    """默认的已退出快照合并: 按 merge() 规则, 丢弃瞬时值, 列表只保留最近部分"""
+    return _truncate_lists(merge(reports, [False] * len(reports)))
+
+
+class WorkerStats:
+    """本进程统计快照的发布与全体进程的汇总"""
+
+    def __init__(self, directory: Optional[str] = None, interval: float = 1.0):
+        self.directory = directory
+        self.interval = interval
+        self._sources: Dict[str, Callable[[], dict]] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.directory)
+
+    def register(self, name: str, source: Callable[[], dict]):
+        """登记一个快照来源 (返回可 JSON 序列化的 dict)"""
+        self._sources[name] = source
+
+    def _path(self, pid: int) -> str:
+        return os.path.join(self.directory, f"{pid}.json")
+
+    def publish(self):
+        """把本进程所有来源的当前快照原子写入 <pid>.json"""
+        if not self.enabled:
+            return
+        pid = os.getpid()
+        snapshot = {"pid": pid, "updated_at": time.time()}
+        for name, source in self._sources.items():
+            try:
+                snapshot[name] = source()
+            except Exception as e:
+                logger.error("统计快照 %s 生成失败: %r", name, e)
+        with self._lock:
+            try:
+                self._write(self._path(pid), snapshot)
+            except OSError as e:
+                logger.error("统计快照写入失败: %r", e)
+
+    def _read(self, path: str) -> Optional[dict]:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None  # 正在被替换或已损坏, 下次再读
+        return data if isinstance(data, dict) else None
+
+    def _write(self, path: str, data: dict):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, default=str)
+        os.replace(tmp_path, path)
+
+    def _read_all(self) -> List[dict]:
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return []
+        # retired.json 先读: 其中记录了刚并入、原文件可能尚未删除的快照, 避免重复计数
+        retired = self._read(os.path.join(self.directory, RETIRED_FILE))
+        folded = {tuple(entry) for entry in retired.get("folded", [])} if retired else set()
+        snapshots = [retired] if retired else []
+        for name in sorted(names):
+            if not name.endswith(".json") or name == RETIRED_FILE:
+                continue
+            snapshot = self._read(os.path.join(self.directory, name))
+            if snapshot is not None and (snapshot.get("pid"), snapshot.get("updated_at")) not in folded:
+                snapshots.append(snapshot)
+        return snapshots
+
+    def collect(self) -> List[dict]:
+        """读取目录下所有进程的快照 (已退出进程的快照先并入 retired.json)"""
+        if not self.enabled:
+            return []
+        snapshots = self._read_all()
+        dead = [s for s in snapshots if s.get("pid") is not None and not pid_alive(s.get("pid"))]
+        if dead:
+            try:
+                retired = self._retire(dead)
+            except OSError as e:
+                logger.error("合并已退出进程的统计快照失败: %r", e)
+                retired = False
+            if retired:
+                snapshots = self._read_all()
+        return snapshots
+
+    def _retire(self, dead: List[dict]) -> bool:
+        """把已退出进程的快照并入 retired.json 并删除原文件 (文件锁保证多进程间只合并一次)"""
+        retired_path = os.path.join(self.directory, RETIRED_FILE)
+        with _file_lock(os.path.join(self.directory, "retired.lock")):
+            # 拿到锁后重新读取: 其他进程可能已经合并过
+            fresh = []
+            for snapshot in dead:
+                current = self._read(self._path(snapshot["pid"]))
+                if current is not None and current.get("updated_at") == snapshot.get("updated_at"):
+                    fresh.append(current)
+            if not fresh:
+                return False
+            retired = self._read(retired_path) or {}
+            names = {key for s in fresh for key in s if key not in ("pid", "updated_at")}
+            merged = {"pid": None, "updated_at": time.time()}
+            for name in names | {key for key in retired if key not in ("pid", "updated_at", "folded")}:
+                reports = [r[name] for r in [retired] + fresh if isinstance(r.get(name), dict)]
+                if reports:
+                    merged[name] = RETIRED_MERGES.get(name, _merge_retired)(reports)
+            merged["folded"] = [[s["pid"], s.get("updated_at")] for s in fresh]
+            self._write(retired_path, merged)
+            for snapshot in fresh:
+                try:
+                    os.remove(self._path(snapshot["pid"]))
+                except OSError:
+                    pass
+        return True
+
+    def aggregate(self, name: str, fresh: bool = True) -> dict:
+        """
+        汇总所有进程中某个来源的快照
+
+        fresh=True 时先发布本进程的最新快照, 保证至少当前 worker 的数据是实时的;
+        单进程模式直接返回本进程快照。
+        """
+        if not self.enabled:
+            return self._sources[name]()
+        if fresh:
+            self.publish()
+        snapshots = [s for s in self.collect() if isinstance(s.get(name), dict)]
+        alive = [pid_alive(s.get("pid")) for s in snapshots]
+        merged = merge([s[name] for s in snapshots], alive)
+        merged["workers"] = sum(alive)
+        return merged
+
+    def start(self):
+        """启动后台定期发布线程 (进程退出时再发布一次)"""
+        if not self.enabled or self._thread is not None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        self._stop.clear()
+
+        def run():
+            while not self._stop.wait(self.interval):
+                self.publish()
+
+        self._thread = threading.Thread(target=run, name="worker-stats", daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+        self.publish()
+
+    def stop(self):
+        """停止发布线程并写入最终快照"""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(self.interval + 1)
+        self._thread = None
+        self.publish()
+
+
+def enable(prefix: str = "botsever-stats") -> str:
+    """
+    启用多进程统计: 未设置 WORKER_STATS_DIR 时在临时目录下创建一个,
+    写回环境变量让之后启动/fork 的子进程继承, 返回目录
+    """
+    directory = os.environ.get(STATS_DIR_ENV) or os.path.join(
+        tempfile.gettempdir(), f"{prefix}-{os.getpid()}"
+    )
+    os.environ[STATS_DIR_ENV] = directory
+    stats.directory = directory
+    return directory
+
+
+def reset_directory(directory: str):
+    """清空统计目录 (由主进程在启动 worker 前调用)"""
+    os.makedirs(directory, exist_ok=True)
+    for name in os.listdir(directory):
+        if name.endswith(".json") or name.endswith(".tmp"):
+            try:
+                os.remove(os.path.join(directory, name))
+            except OSError:
+                pass
+
+
+# 进程级共享实例
+stats = WorkerStats(os.environ.get(STATS_DIR_ENV) or None)
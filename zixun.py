@@ -16,6 +16,10 @@ import time
 import schedule
 import json
 
+import tg_delivery
+import alert_store
+import http_client
+
 # ================= 配置区域 =================
 BOT_TOKEN = os.environ.get("TELEGRAM_BOT_TOKEN")
 CHAT_ID = os.environ.get("TELEGRAM_CHAT_ID")
@@ -27,6 +31,9 @@ API_URL = os.environ.get(
 )
 MLION_API_KEY = os.environ.get("MLION_API_KEY")
 
+# 共享连接池的 HTTP 客户端 (轮询之间复用 keep-alive 连接)
+http = http_client.get_client()
+
 # ✅ 修复 4001 错误：添加 Authorization 头
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
@@ -70,6 +77,12 @@ def save_last_fingerprint(fingerprint):
         print(f"保存状态文件失败: {e}")
 
 
+# Telegram 统一投递服务 (限速 / 重试 / 合并发送)
+delivery = tg_delivery.get_delivery()
+
+# 报警历史 (连同投递结果写入 SQLite, 供回测 / 审计)
+alerts = alert_store.get_store()
+
 last_news_fingerprint = load_last_fingerprint()
 if last_news_fingerprint:
     print(f"已加载上次记录: {last_news_fingerprint}")
@@ -91,7 +104,7 @@ def get_latest_news():
     try:
         print(f"[DEBUG] 正在请求 Mlion API... URL: {API_URL}")
         # ✅ 使用修复后的 headers 发送请求
-        response = requests.get(API_URL, headers=HEADERS, timeout=10)
+        response = http.get(API_URL, headers=HEADERS, timeout=10)
         print(f"[DEBUG] API 响应状态码: {response.status_code}")
 
         if response.status_code != 200:
@@ -197,31 +210,15 @@ def send_telegram_message(text):
     if not text:
         return
 
-    url = f"https://api.telegram.org/bot{BOT_TOKEN}/sendMessage"
-    payload = {
-        "chat_id": CHAT_ID,
-        "text": text,
-        "parse_mode": "HTML",
-        "disable_web_page_preview": False,
-    }
-
-    if TOPIC_ID:
-        payload["message_thread_id"] = TOPIC_ID
-
-    try:
-        print(f"[DEBUG] 正在发送 Telegram 消息到 Chat: {CHAT_ID}, Topic: {TOPIC_ID}")
-        resp = requests.post(url, json=payload, timeout=10)
-        resp_json = resp.json()
-
-        if resp.status_code == 200 and resp_json.get("ok"):
-            print(f"✅ 消息发送成功 (Topic: {TOPIC_ID})")
-        else:
-            print(f"❌ 发送失败: HTTP {resp.status_code}, 响应: {resp_json}")
-            # 如果是话题ID错误，提示可能的解决方案
-            if "message thread not found" in str(resp_json):
-                print(f"💡 提示: 话题 ID {TOPIC_ID} 无效，请确认话题是否存在")
-    except Exception as e:
-        print(f"❌ 发送报错: {e}")
+    print(f"[DEBUG] 正在发送 Telegram 消息到 Chat: {CHAT_ID}, Topic: {TOPIC_ID}")
+    ok = delivery.send_sync(
+        text, thread_id=TOPIC_ID, disable_web_page_preview=False, timeout=60
+    )
+    alerts.record("zixun", "news", text, delivered=ok)
+    if ok:
+        print(f"✅ 消息发送成功 (Topic: {TOPIC_ID})")
+    else:
+        print("❌ 发送失败 (详见投递服务日志)")
 
 
 def job():